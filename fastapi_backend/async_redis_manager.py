@@ -0,0 +1,353 @@
+"""
+Async Redis Manager for Real-time Features
+Non-blocking counterpart of RedisManager for async request/socket handlers
+
+RedisManager wraps a synchronous client, so every call from a coroutine blocks
+the event loop for a full network round trip. This manager uses redis.asyncio
+with one shared connection pool and offers the same online/typing/unread
+operations (same keys and TTLs, so both managers interoperate) plus JSON cache
+and pipelining helpers. Multi-command operations are sent as one pipeline.
+
+Every method is best-effort like RedisManager: errors are logged and a
+neutral value (False / [] / None / 0) is returned.
+"""
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import redis.asyncio as redis
+
+from redis_manager import build_message_data, redis_manager, redis_url
+
+logger = logging.getLogger(__name__)
+
+MAX_CONNECTIONS = 50
+MESSAGE_QUEUE_TTL = 30 * 24 * 60 * 60  # 30 days, as in RedisManager
+
+
+class AsyncRedisManager:
+    """Manages a pooled async Redis client and real-time operations"""
+
+    # Key prefixes and TTLs are shared with the sync manager
+    ONLINE_PREFIX = redis_manager.ONLINE_PREFIX
+    ONLINE_SET = redis_manager.ONLINE_SET
+    MESSAGE_PREFIX = redis_manager.MESSAGE_PREFIX
+    UNREAD_PREFIX = redis_manager.UNREAD_PREFIX
+    TYPING_PREFIX = redis_manager.TYPING_PREFIX
+    ONLINE_TTL = redis_manager.ONLINE_TTL
+    TYPING_TTL = redis_manager.TYPING_TTL
+
+    def __init__(self, url: str = redis_url, max_connections: int = MAX_CONNECTIONS):
+        self.url = url
+        self.max_connections = max_connections
+        self.pool: Optional[redis.ConnectionPool] = None
+        self.redis_client: Optional[redis.Redis] = None
+
+    async def connect(self) -> bool:
+        """Create the shared connection pool and verify the connection"""
+        try:
+            self.pool = redis.ConnectionPool.from_url(
+                self.url,
+                decode_responses=True,
+                max_connections=self.max_connections,
+                socket_connect_timeout=5,
+                socket_keepalive=True
+            )
+            self.redis_client = redis.Redis(connection_pool=self.pool)
+            await self.redis_client.ping()
+            logger.info(f"✅ Async Redis connected (pool max {self.max_connections})")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Async Redis connection error: {e}")
+            self.redis_client = None
+            return False
+
+    async def disconnect(self):
+        """Close the client and its pool"""
+        if self.redis_client:
+            await self.redis_client.aclose()
+            self.redis_client = None
+        if self.pool:
+            await self.pool.disconnect()
+            self.pool = None
+            logger.info("🔌 Async Redis connection closed")
+
+    def pipeline(self, transaction: bool = False):
+        """Pipeline on the shared pool; queue commands, then `await pipe.execute()`"""
+        return self.redis_client.pipeline(transaction=transaction)
+
+    # ===== ONLINE/OFFLINE STATUS =====
+
+    async def set_user_online(self, username: str) -> bool:
+        """Mark user as online with auto-expiration"""
+        try:
+            pipe = self.pipeline()
+            pipe.setex(f"{self.ONLINE_PREFIX}{username}", self.ONLINE_TTL, datetime.now().isoformat())
+            pipe.zadd(self.ONLINE_SET, {username: datetime.now().timestamp()})
+            await pipe.execute()
+            logger.info(f"🟢 User '{username}' marked as online (TTL: {self.ONLINE_TTL}s)")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error setting user online: {e}")
+            return False
+
+    async def set_user_offline(self, username: str) -> bool:
+        """Mark user as offline"""
+        try:
+            pipe = self.pipeline()
+            pipe.delete(f"{self.ONLINE_PREFIX}{username}")
+            pipe.zrem(self.ONLINE_SET, username)
+            await pipe.execute()
+            logger.info(f"⚪ User '{username}' marked as offline")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error setting user offline: {e}")
+            return False
+
+    async def is_user_online(self, username: str) -> bool:
+        """Check if user is online"""
+        try:
+            return await self.redis_client.exists(f"{self.ONLINE_PREFIX}{username}") > 0
+        except Exception as e:
+            logger.error(f"❌ Error checking user online status: {e}")
+            return False
+
+    async def get_online_status(self, usernames: Iterable[str]) -> Dict[str, bool]:
+        """Online flag for many users in one round trip"""
+        usernames = list(usernames)
+        if not usernames:
+            return {}
+        try:
+            pipe = self.pipeline()
+            for username in usernames:
+                pipe.exists(f"{self.ONLINE_PREFIX}{username}")
+            results = await pipe.execute()
+            return {username: bool(found) for username, found in zip(usernames, results)}
+        except Exception as e:
+            logger.error(f"❌ Error checking online status: {e}")
+            return {username: False for username in usernames}
+
+    async def get_online_users(self) -> List[str]:
+        """Get list of all online users with automatic cleanup of stale entries"""
+        try:
+            members = await self.redis_client.zrange(self.ONLINE_SET, 0, -1)
+            if not members:
+                return []
+            pipe = self.pipeline()
+            for username in members:
+                pipe.exists(f"{self.ONLINE_PREFIX}{username}")
+            found = await pipe.execute()
+            valid_users = [username for username, alive in zip(members, found) if alive]
+            stale_users = [username for username, alive in zip(members, found) if not alive]
+
+            # Remove all stale entries in one operation
+            if stale_users:
+                await self.redis_client.zrem(self.ONLINE_SET, *stale_users)
+                logger.info(f"🧹 Cleaned up {len(stale_users)} stale online entries")
+
+            logger.debug(f"🟢 Found {len(valid_users)} online users")
+            return valid_users
+        except Exception as e:
+            logger.error(f"❌ Error getting online users: {e}")
+            return []
+
+    async def refresh_user_online(self, username: str) -> bool:
+        """Refresh user's online status (extend TTL)"""
+        try:
+            if await self.redis_client.expire(f"{self.ONLINE_PREFIX}{username}", self.ONLINE_TTL):
+                await self.redis_client.zadd(self.ONLINE_SET, {username: datetime.now().timestamp()})
+                return True
+            # User was offline, mark as online
+            return await self.set_user_online(username)
+        except Exception as e:
+            logger.error(f"❌ Error refreshing user online status: {e}")
+            return False
+
+    # ===== MESSAGING =====
+
+    async def send_message(self, from_user: str, to_user: str, message: str, message_id: str = None) -> bool:
+        """Queue a message for the recipient, bump unread and publish it"""
+        try:
+            message_data = build_message_data(from_user, to_user, message, message_id)
+            if not message_data:
+                return False
+            payload = json.dumps(message_data)
+
+            queue_key = f"{self.MESSAGE_PREFIX}{to_user}"
+            unread_key = f"{self.UNREAD_PREFIX}{to_user}:{from_user}"
+            pipe = self.pipeline()
+            pipe.lpush(queue_key, payload)
+            pipe.expire(queue_key, MESSAGE_QUEUE_TTL)
+            pipe.ltrim(queue_key, 0, 999)  # Keep last 1000
+            pipe.incr(unread_key)
+            pipe.expire(unread_key, MESSAGE_QUEUE_TTL)
+            pipe.publish(f"messages:{to_user}", payload)
+            published = (await pipe.execute())[-1]
+            logger.info(f"💬 Message sent from '{from_user}' to '{to_user}' (ID: {message_data['id']}, {published} subscribers)")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error sending message: {e}", exc_info=True)
+            return False
+
+    async def get_new_messages_since(self, username: str, since_timestamp: str = None, limit: int = 50) -> List[Dict]:
+        """Get queued messages for a user, newer than `since_timestamp` if given"""
+        if not username:
+            logger.error("❌ Invalid username: username is required")
+            return []
+        if limit <= 0 or limit > 1000:
+            logger.warning(f"⚠️ Invalid limit {limit}, using default 50")
+            limit = 50
+        try:
+            raw_messages = await self.redis_client.lrange(f"{self.MESSAGE_PREFIX}{username}", 0, limit - 1)
+        except Exception as e:
+            logger.error(f"❌ Error getting messages: {e}", exc_info=True)
+            return []
+
+        messages = []
+        for raw in raw_messages:
+            try:
+                messages.append(json.loads(raw))
+            except json.JSONDecodeError as e:
+                logger.error(f"❌ Failed to parse message: {e}")
+        if since_timestamp:
+            messages = [msg for msg in messages if msg.get('timestamp', '') > since_timestamp]
+        return messages
+
+    async def mark_messages_read(self, username: str, from_user: str) -> bool:
+        """Mark messages from a specific user as read"""
+        try:
+            await self.redis_client.delete(f"{self.UNREAD_PREFIX}{username}:{from_user}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error marking messages as read: {e}")
+            return False
+
+    async def get_unread_count(self, username: str, from_user: str = None) -> int:
+        """Get unread message count (from one sender, or in total)"""
+        try:
+            if from_user:
+                count = await self.redis_client.get(f"{self.UNREAD_PREFIX}{username}:{from_user}")
+                return int(count) if count else 0
+            keys = [key async for key in self.redis_client.scan_iter(match=f"{self.UNREAD_PREFIX}{username}:*")]
+            if not keys:
+                return 0
+            return sum(int(count) for count in await self.redis_client.mget(keys) if count)
+        except Exception as e:
+            logger.error(f"❌ Error getting unread count: {e}")
+            return 0
+
+    # ===== TYPING INDICATORS =====
+
+    async def set_typing(self, username: str, to_user: str) -> bool:
+        """Set typing indicator"""
+        return await self._typing(username, to_user, True)
+
+    async def clear_typing(self, username: str, to_user: str) -> bool:
+        """Clear typing indicator"""
+        return await self._typing(username, to_user, False)
+
+    async def _typing(self, username: str, to_user: str, typing: bool) -> bool:
+        try:
+            key = f"{self.TYPING_PREFIX}{to_user}:{username}"
+            pipe = self.pipeline()
+            if typing:
+                pipe.setex(key, self.TYPING_TTL, "1")
+            else:
+                pipe.delete(key)
+            pipe.publish(f"typing:{to_user}", json.dumps({'user': username, 'typing': typing}))
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error updating typing indicator: {e}")
+            return False
+
+    async def is_typing(self, username: str, from_user: str) -> bool:
+        """Check if user is typing"""
+        try:
+            return await self.redis_client.exists(f"{self.TYPING_PREFIX}{username}:{from_user}") > 0
+        except Exception as e:
+            logger.error(f"❌ Error checking typing status: {e}")
+            return False
+
+    # ===== JSON CACHE =====
+
+    async def cache_get(self, key: str) -> Optional[Any]:
+        """JSON-decoded cached value, or None on miss/error"""
+        try:
+            cached = await self.redis_client.get(key)
+            return json.loads(cached) if cached else None
+        except Exception as e:
+            logger.warning(f"⚠️ Cache get error for {key}: {e}")
+            return None
+
+    async def cache_get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """JSON-decoded values for the keys that are cached (one MGET)"""
+        if not keys:
+            return {}
+        try:
+            values = await self.redis_client.mget(keys)
+        except Exception as e:
+            logger.warning(f"⚠️ Cache mget error ({len(keys)} keys): {e}")
+            return {}
+        found = {}
+        for key, cached in zip(keys, values):
+            if cached:
+                try:
+                    found[key] = json.loads(cached)
+                except json.JSONDecodeError:
+                    continue
+        return found
+
+    async def cache_set(self, key: str, value: Any, ttl: int) -> bool:
+        """JSON-encode and cache a value with a TTL"""
+        try:
+            await self.redis_client.setex(key, ttl, json.dumps(value, default=str))
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Cache set error for {key}: {e}")
+            return False
+
+    async def cache_set_many(self, items: Dict[str, Any], ttl: int) -> bool:
+        """Cache several values with one pipelined round trip"""
+        if not items:
+            return True
+        try:
+            pipe = self.pipeline()
+            for key, value in items.items():
+                pipe.setex(key, ttl, json.dumps(value, default=str))
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Cache set error ({len(items)} keys): {e}")
+            return False
+
+    async def cache_delete(self, *keys: str) -> int:
+        """Delete cached keys"""
+        if not keys:
+            return 0
+        try:
+            return await self.redis_client.delete(*keys)
+        except Exception as e:
+            logger.warning(f"⚠️ Cache delete error: {e}")
+            return 0
+
+    # ===== PUB/SUB =====
+
+    async def publish(self, channel: str, message: str) -> bool:
+        """Publish message to a channel"""
+        try:
+            await self.redis_client.publish(channel, message)
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error publishing message: {e}")
+            return False
+
+
+# Global async Redis manager instance (connected in the app lifespan)
+async_redis_manager = AsyncRedisManager()
+
+
+def get_async_redis() -> AsyncRedisManager:
+    """Get async Redis manager instance"""
+    return async_redis_manager
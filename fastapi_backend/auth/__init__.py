@@ -48,6 +48,11 @@ from .jwt_auth import (
     create_token_pair,
     get_current_user_dependency
 )
+from .auth_context import (
+    AuthContext,
+    get_auth_context,
+    invalidate_user
+)
 from .authorization import (
     PermissionChecker,
     RoleChecker,
@@ -113,6 +118,11 @@ __all__ = [
     'create_token_pair',
     'get_current_user_dependency',
     
+    # Auth Context
+    'AuthContext',
+    'get_auth_context',
+    'invalidate_user',
+    
     # Authorization
     'PermissionChecker',
     'RoleChecker',
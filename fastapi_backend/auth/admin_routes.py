@@ -10,6 +10,7 @@ from datetime import datetime
 from bson import ObjectId
 import sys
 import os
+import asyncio
 import logging
 import re
 
@@ -18,6 +19,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import get_database
 from .jwt_auth import get_current_user_dependency
+from .auth_context import invalidate_user
 from .authorization import require_admin, require_moderator_or_admin, PermissionChecker, RoleChecker
 from .security_models import (
     UserManagementRequest, RoleAssignmentRequest, PermissionGrantRequest,
@@ -62,6 +64,9 @@ ADMIN_USER_LIST_PROJECTION = {
     "adminApprovedBy": 1,
 }
 
+# Thread-pool width for batch PII decryption of large admin user lists and scans
+SEARCH_DECRYPT_WORKERS = 4
+
 @router.get("/users", dependencies=[Depends(require_moderator_or_admin)])
 async def get_all_users(
     page: int = Query(1, ge=1),
@@ -75,6 +80,7 @@ async def get_all_users(
     phone_search: Optional[str] = Query(None, description="Search by phone number (searches decrypted contactNumber)"),
     promo_code: Optional[str] = Query(None, description="Filter by promo code (has_promo/no_promo)"),
     contribution_popup: Optional[str] = Query(None, description="Filter by contribution popup status (enabled/disabled)"),
+    cursor: Optional[str] = Query(None, description="Opt-in keyset pagination: empty for the first page, then the previous nextCursor"),
     db = Depends(get_database)
 ):
     """
@@ -88,9 +94,15 @@ async def get_all_users(
     - phone_search: Dedicated phone number search (decrypts contactNumber for matching)
     - promo_code: Filter by promo code (has_promo/no_promo)
     - contribution_popup: Filter by contribution popup status (enabled/disabled)
+    - cursor: Keyset pagination instead of page/skip (response includes nextCursor;
+      total is a cached estimate). Email/phone searches always paginate by page.
     
     Performance optimized: Uses projection to fetch only needed fields.
     """
+    from utils.pagination import after_cursor, split_page, count_cache
+    
+    users_sort = [("created_at", -1), ("_id", -1)]
+    next_cursor = None
     try:
         # Build query
         query = {}
@@ -189,49 +201,56 @@ async def get_all_users(
             users_cursor = db.users.find(query, ADMIN_USER_LIST_PROJECTION).sort("created_at", -1)
             all_users = await users_cursor.to_list(length=10000)  # Reasonable max
             
-            # Decrypt and filter by email (and optionally username/name)
+            # Decrypt only the searched fields for the whole scan (batched, off the
+            # event loop); the returned page is fully decrypted below
+            search_fields = [
+                field for field, term in (("contactEmail", email_search_term), ("contactNumber", phone_search_term))
+                if term
+            ]
+            scanned_users = await asyncio.to_thread(
+                encryptor.decrypt_many, all_users, search_fields, SEARCH_DECRYPT_WORKERS
+            )
+            
+            # Filter by email (and optionally username/name)
             filtered_users = []
-            for user in all_users:
+            for user, decrypted_user in zip(all_users, scanned_users):
                 user["_id"] = str(user["_id"])
-                try:
-                    decrypted_user = encryptor.decrypt_user_pii(user)
-                    # Check email filter
-                    if email_search_term:
-                        dec_email = (decrypted_user.get('contactEmail') or '').lower()
-                        if email_search_term not in dec_email:
-                            continue
-                    
-                    # Check phone filter (strip non-digits for comparison)
-                    if phone_search_term:
-                        dec_phone = re.sub(r'[^0-9]', '', decrypted_user.get('contactNumber') or '')
-                        if phone_search_term not in dec_phone:
-                            continue
-                    
-                    # If username/name search is also provided, filter by that too (case-insensitive)
-                    if search_term:
-                        username = (decrypted_user.get('username') or '').lower()
-                        first_name = (decrypted_user.get('firstName') or '').lower()
-                        last_name = (decrypted_user.get('lastName') or '').lower()
-                        search_lower = search_term.lower()
-                        
-                        if not (search_lower in username or search_lower in first_name or search_lower in last_name):
-                            continue
+                # Check email filter
+                if email_search_term:
+                    dec_email = (decrypted_user.get('contactEmail') or '').lower()
+                    if email_search_term not in dec_email:
+                        continue
+                
+                # Check phone filter (strip non-digits for comparison)
+                if phone_search_term:
+                    dec_phone = re.sub(r'[^0-9]', '', decrypted_user.get('contactNumber') or '')
+                    if phone_search_term not in dec_phone:
+                        continue
+                
+                # If username/name search is also provided, filter by that too (case-insensitive)
+                if search_term:
+                    username = (decrypted_user.get('username') or '').lower()
+                    first_name = (decrypted_user.get('firstName') or '').lower()
+                    last_name = (decrypted_user.get('lastName') or '').lower()
+                    search_lower = search_term.lower()
                     
-                    # Remove sensitive data
-                    if "security" in decrypted_user:
-                        decrypted_user["security"].pop("password_hash", None)
-                        decrypted_user["security"].pop("password_history", None)
-                    if "mfa" in decrypted_user:
-                        decrypted_user["mfa"].pop("mfa_secret", None)
-                        decrypted_user["mfa"].pop("mfa_backup_codes", None)
-                    filtered_users.append(decrypted_user)
-                except Exception as decrypt_err:
-                    logger.error(f"❌ Decryption failed for {user.get('username', 'unknown')}: {decrypt_err}")
+                    if not (search_lower in username or search_lower in first_name or search_lower in last_name):
+                        continue
+                
+                filtered_users.append(user)
             
             total = len(filtered_users)
             # Apply pagination to filtered results
             skip = (page - 1) * limit
-            users = filtered_users[skip:skip + limit]
+            users = encryptor.decrypt_many(filtered_users[skip:skip + limit])
+            for user in users:
+                # Remove sensitive data
+                if "security" in user:
+                    user["security"].pop("password_hash", None)
+                    user["security"].pop("password_history", None)
+                if "mfa" in user:
+                    user["mfa"].pop("mfa_secret", None)
+                    user["mfa"].pop("mfa_backup_codes", None)
             
             search_desc = []
             if email_search_term:
@@ -242,22 +261,32 @@ async def get_all_users(
         else:
             # Standard query without email search - use projection for performance
             logger.info(f"📊 Final query: {query}")
-            total = await db.users.count_documents(query)
-            skip = (page - 1) * limit
-            users_cursor = db.users.find(query, ADMIN_USER_LIST_PROJECTION).skip(skip).limit(limit).sort("created_at", -1)
-            users = await users_cursor.to_list(length=limit)
+            if cursor is not None:
+                try:
+                    page_query = after_cursor(query, users_sort, cursor, nullable=("created_at",))
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                total = await count_cache.get(
+                    count_cache.key("admin_users", query),
+                    lambda: db.users.count_documents(query)
+                )
+                users_cursor = db.users.find(page_query, ADMIN_USER_LIST_PROJECTION).sort(users_sort).limit(limit + 1)
+                users, next_cursor = split_page(await users_cursor.to_list(length=limit + 1), limit, users_sort)
+            else:
+                total = await db.users.count_documents(query)
+                skip = (page - 1) * limit
+                users_cursor = db.users.find(query, ADMIN_USER_LIST_PROJECTION).skip(skip).limit(limit).sort("created_at", -1)
+                users = await users_cursor.to_list(length=limit)
+            
+            # 🔓 DECRYPT PII fields (batched; large exports fan out off the event loop)
+            try:
+                users = await asyncio.to_thread(encryptor.decrypt_many, users, None, SEARCH_DECRYPT_WORKERS)
+            except Exception as decrypt_err:
+                logger.error(f"❌ Decryption failed for {len(users)} users: {decrypt_err}")
             
             for i, user in enumerate(users):
                 user["_id"] = str(user["_id"])
                 
-                # 🔓 DECRYPT PII fields
-                try:
-                    decrypted_user = encryptor.decrypt_user_pii(user)
-                    users[i] = decrypted_user
-                except Exception as decrypt_err:
-                    logger.error(f"❌ Decryption failed for {user.get('username', 'unknown')}: {decrypt_err}")
-                    users[i] = user  # Keep original if decryption fails
-                
                 if "security" in users[i]:
                     users[i]["security"].pop("password_hash", None)
                     users[i]["security"].pop("password_history", None)
@@ -265,14 +294,19 @@ async def get_all_users(
                     users[i]["mfa"].pop("mfa_secret", None)
                     users[i]["mfa"].pop("mfa_backup_codes", None)
         
-        return {
+        response = {
             "users": users,
             "total": total,
             "page": page,
             "limit": limit,
             "pages": (total + limit - 1) // limit
         }
+        if cursor is not None:
+            response["nextCursor"] = next_cursor
+        return response
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting users: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -415,6 +449,7 @@ async def manage_user(
             {"username": username},
             {"$set": update_data}
         )
+        await invalidate_user(username)
         
         if result.modified_count == 0:
             raise HTTPException(status_code=400, detail="Failed to update user")
@@ -501,6 +536,7 @@ async def assign_role_to_user(
                 }
             }
         )
+        await invalidate_user(username)
         
         if result.modified_count == 0:
             raise HTTPException(status_code=400, detail="Failed to assign role")
@@ -696,6 +732,7 @@ async def update_user_status(
             {"username": username},
             {"$set": update_data}
         )
+        await invalidate_user(username)
         
         logger.info(f"📊 Update result: matched={result.matched_count}, modified={result.modified_count}")
         
@@ -780,6 +817,11 @@ async def update_user_status(
             )
         else:
             logger.info(f"ℹ️ Status change {old_status_value} → {new_account_status} does not trigger notification (disabled in config)")
+            # No event dispatched, so flag the L3V3L score matrix and search cache directly
+            from services.l3v3l_score_maintenance import mark_l3v3l_dirty
+            from services.search_cache import invalidate_search_cache
+            await mark_l3v3l_dirty(db, username, f"status_{new_account_status}")
+            await invalidate_search_cache(f"status_{new_account_status}")
         
         return {
             "message": f"Status updated to '{request.status}' successfully",
@@ -827,6 +869,7 @@ async def grant_custom_permissions(
                 }
             }
         )
+        await invalidate_user(username)
         
         # Log audit event
         await db.audit_logs.insert_one({
@@ -885,6 +928,7 @@ async def revoke_custom_permissions(
                 }
             }
         )
+        await invalidate_user(username)
         
         # Log audit event
         await db.audit_logs.insert_one({
@@ -1026,6 +1070,7 @@ async def force_password_reset(
                 }
             }
         )
+        await invalidate_user(username)
         
         # Log audit event
         await db.audit_logs.insert_one({
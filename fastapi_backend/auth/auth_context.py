@@ -0,0 +1,211 @@
+# fastapi_backend/auth/auth_context.py
+"""
+Per-Request Auth Context
+
+The rate limiter, the session middleware and the auth dependencies all need
+the caller's identity. The first of them to ask builds an AuthContext on
+`request.state` (one JWT decode); everyone else reuses it, and the user
+document is loaded at most once per request.
+
+User documents are cached in-process (USER_LOCAL_TTL) and in Redis
+(USER_REDIS_TTL), keyed by lower-cased username. Entries are dropped:
+- after any successful write request made by that user
+  (middleware/auth_context.py) - profile, photo, password, MFA changes
+- by invalidate_user() on admin status/role/permission changes and
+  user status events
+Other API instances' in-process entries expire within USER_LOCAL_TTL.
+
+Credentials (SECRET_FIELDS) are excluded when the document is loaded, so they
+never reach either cache tier; handlers that verify passwords or MFA codes
+read them from Mongo.
+"""
+
+import copy
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from bson import json_util
+from fastapi import HTTPException, status
+from starlette.requests import HTTPConnection
+
+from .jwt_auth import JWTManager, get_username_query
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_PREFIX = "auth_user:"
+USER_LOCAL_TTL = 10             # seconds
+USER_REDIS_TTL = 60             # seconds
+USER_LOCAL_MAX_ENTRIES = 5000
+
+# Never loaded into the auth cache (password hashes, MFA secrets, verification tokens)
+SECRET_FIELDS = (
+    "password",
+    "security.password_hash",
+    "security.password_history",
+    "mfa.mfa_secret",
+    "mfa.mfa_backup_codes",
+    "status.email_verification_token",
+    "emailVerificationToken",
+)
+USER_AUTH_PROJECTION = {field: 0 for field in SECRET_FIELDS}
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+class UserCache:
+    """Two-tier (in-process + Redis) cache of user documents for authentication"""
+
+    def __init__(
+        self,
+        local_ttl: float = USER_LOCAL_TTL,
+        redis_ttl: int = USER_REDIS_TTL,
+        max_entries: int = USER_LOCAL_MAX_ENTRIES
+    ):
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self.max_entries = max_entries
+        self._local: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self.hits = 0
+        self.db_lookups = 0
+
+    @staticmethod
+    def _redis():
+        from async_redis_manager import get_async_redis
+        redis = get_async_redis()
+        return redis if redis.redis_client is not None else None
+
+    async def get(self, db, username: str) -> Optional[Dict]:
+        """User document without SECRET_FIELDS for `username` (exact match, then case-insensitive)"""
+        key = username.lower()
+        entry = self._local.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._local.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+        redis = self._redis()
+        cached = await redis.cache_get(f"{USER_CACHE_PREFIX}{key}") if redis else None
+        if cached:
+            user = json_util.loads(cached)
+            self.hits += 1
+        else:
+            self.db_lookups += 1
+            user = await db.users.find_one({"username": username}, USER_AUTH_PROJECTION)
+            if user is None:
+                user = await db.users.find_one(get_username_query(username), USER_AUTH_PROJECTION)
+            if user is None:
+                return None
+            if redis:
+                # json_util keeps ObjectId/datetime types intact
+                await redis.cache_set(f"{USER_CACHE_PREFIX}{key}", json_util.dumps(user), self.redis_ttl)
+
+        self._local[key] = (time.monotonic() + self.local_ttl, user)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+        # Handlers are free to mutate what they get back
+        return copy.deepcopy(user)
+
+    async def invalidate(self, username: str):
+        key = username.lower()
+        self._local.pop(key, None)
+        redis = self._redis()
+        if redis:
+            await redis.cache_delete(f"{USER_CACHE_PREFIX}{key}")
+
+    def clear(self):
+        self._local.clear()
+
+
+# Process-wide user cache
+user_cache = UserCache()
+
+
+class AuthContext:
+    """Identity of one request: the decoded bearer token and, lazily, the user document"""
+
+    def __init__(self, token: Optional[str]):
+        self.token = token
+        self.payload: Optional[Dict] = None
+        self.error: Optional[HTTPException] = None
+        self._user: Optional[Dict] = None
+        if token:
+            try:
+                self.payload = JWTManager.decode_token(token)
+            except HTTPException as e:
+                self.error = e
+
+    @property
+    def username(self) -> Optional[str]:
+        """Token subject, or None when there is no valid token"""
+        return self.payload.get("sub") if self.payload else None
+
+    def require_access_token(self) -> Dict:
+        """Payload of a valid, unexpired access token; raises 401 otherwise"""
+        if self.error is not None:
+            raise self.error
+        if self.payload is None:
+            raise _unauthorized("Not authenticated")
+
+        JWTManager.verify_token_type(self.payload, "access")
+        if JWTManager.is_token_expired(self.payload):
+            raise _unauthorized("Token has expired")
+        if self.username is None:
+            raise _unauthorized("Could not validate credentials")
+        return self.payload
+
+    async def get_user(self, db) -> Dict:
+        """The authenticated user's document, loaded once per request"""
+        self.require_access_token()
+        if self._user is None:
+            self._user = await user_cache.get(db, self.username)
+            if self._user is None:
+                raise _unauthorized("User not found")
+
+        # NOTE: We no longer block non-active users here.
+        # Users should be able to view/edit their OWN profile even if:
+        # - Email not verified (pending_email_verification)
+        # - Admin not approved (pending_admin_approval)
+        # Individual endpoints should check accountStatus if they need to restrict access.
+        return self._user
+
+
+def _bearer_token(connection: HTTPConnection) -> Optional[str]:
+    auth_header = connection.headers.get("authorization", "")
+    if not auth_header.startswith("Bearer "):
+        return None
+    return auth_header.split(" ", 1)[1].strip() or None
+
+
+def get_auth_context(connection: HTTPConnection, token: Optional[str] = None) -> AuthContext:
+    """
+    The request's AuthContext, created on first use
+
+    Args:
+        connection: Request (state is shared by middleware, dependencies and handlers)
+        token: Explicit bearer token; when it differs from the cached context's
+            token a fresh context is built for it
+    """
+    context = getattr(connection.state, "auth_context", None)
+    if context is None or (token is not None and context.token != token):
+        context = AuthContext(token if token is not None else _bearer_token(connection))
+        connection.state.auth_context = context
+    return context
+
+
+async def invalidate_user(username: Optional[str]) -> None:
+    """Best-effort helper for write paths - never raises"""
+    if not username:
+        return
+    try:
+        await user_cache.invalidate(username)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to invalidate cached user {username}: {e}")
@@ -184,6 +184,7 @@ async def register(
             "email": reg_request.email,
             "firstName": reg_request.firstName,
             "lastName": reg_request.lastName,
+            "hasPhoto": 0,  # /search sort key (see services/search_snapshot.has_photo_flag)
             
             # Security
             "security": {
@@ -6,7 +6,7 @@ JWT Authentication System with Refresh Tokens
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional, Dict
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from .security_config import security_settings
 import secrets
@@ -147,55 +147,19 @@ class AuthenticationService:
         Get current authenticated user from JWT token
         This is a dependency that can be used in route handlers
         """
-        token = credentials.credentials
+        from .auth_context import AuthContext
         
-        # Decode token
-        payload = JWTManager.decode_token(token)
-        
-        # Verify it's an access token
-        JWTManager.verify_token_type(payload, "access")
-        
-        # Check if token is expired
-        if JWTManager.is_token_expired(payload):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token has expired",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        # Decode token, verify it's an unexpired access token and extract user info
+        context = AuthContext(credentials.credentials)
+        payload = context.require_access_token()
         
-        # Extract user info
-        username = payload.get("sub")
-        if username is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Get user from database (if db provided) - case-insensitive
+        # Get user from database (if db provided) - case-insensitive, cached
         if db is not None:
-            user = await db.users.find_one({"username": username})
-            if user is None:
-                user = await db.users.find_one(get_username_query(username))
-            if user is None:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="User not found",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-            
-            # NOTE: We no longer block non-active users here.
-            # Users should be able to view/edit their OWN profile even if:
-            # - Email not verified (pending_email_verification)
-            # - Admin not approved (pending_admin_approval)
-            # Individual endpoints should check accountStatus if they need to restrict access.
-            # The user's accountStatus is included in the returned dict for endpoints to check.
-            
-            return user
+            return await context.get_user(db)
         
         # Return minimal user info from token
         return {
-            "username": username,
+            "username": context.username,
             "role": payload.get("role", "free_user"),
             "permissions": payload.get("permissions", [])
         }
@@ -293,15 +257,18 @@ def create_token_pair(user: Dict, remember_me: bool = False) -> Dict:
 
 # Dependency for getting current user (to be used in routes)
 async def get_current_user_dependency(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security_scheme)
 ) -> Dict:
-    """Dependency to get current user from token"""
+    """Dependency to get current user from the request's auth context"""
     from database import get_database
+    from .auth_context import get_auth_context
     db = get_database()  # Not async - returns database directly
-    return await AuthenticationService.get_current_user(credentials, db)
+    return await get_auth_context(request, credentials.credentials).get_user(db)
 
 # Optional version that returns None instead of raising exception
 async def get_current_user_optional(
+    request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))
 ) -> Optional[Dict]:
     """Optional dependency - returns None if no valid token instead of raising exception"""
@@ -309,8 +276,9 @@ async def get_current_user_optional(
         return None
     try:
         from database import get_database
+        from .auth_context import get_auth_context
         db = get_database()
-        return await AuthenticationService.get_current_user(credentials, db)
+        return await get_auth_context(request, credentials.credentials).get_user(db)
     except HTTPException:
         return None
 
@@ -324,7 +292,8 @@ async def get_current_user_from_token(token: str, db) -> Optional[Dict]:
         username = payload.get("sub")
         if not username:
             return None
-        user = await db.users.find_one(get_username_query(username))
+        from .auth_context import user_cache
+        user = await user_cache.get(db, username)
         if user and user.get("accountStatus") == "active":
             return user
         return None
@@ -265,10 +265,8 @@ async def get_verification_status(
     """
     Get current verification status
     """
-    # Get full user data from database (JWT doesn't have all fields)
-    user = await db.users.find_one({"username": current_user["username"]})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    # current_user is the full (request-cached) user document
+    user = current_user
     
     status_data = user.get("status", {})
     
@@ -363,10 +361,8 @@ async def get_otp_preference(
     """
     Get current OTP channel preference
     """
-    # Get full user data from database (JWT doesn't have all fields)
-    user = await db.users.find_one({"username": current_user["username"]})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    # current_user is the full (request-cached) user document
+    user = current_user
     
     prefs = user.get("notification_preferences", {})
     channel = prefs.get("otp_channel", "email")  # Default to email
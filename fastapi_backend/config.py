@@ -72,6 +72,8 @@ class Settings(BaseSettings):
     from_email: Optional[str] = None
     from_name: Optional[str] = "L3V3L MATCHES"
     reply_to_email: Optional[str] = None  # If set, adds Reply-To header (use for no-reply)
+    email_delivery_workers: int = 4  # Concurrent SMTP connections per email notifier run
+    email_smtp_rate_per_second: Optional[float] = 5  # SMTP send rate per process (0 = unthrottled)
     
     # SMS Configuration
     sms_provider: Optional[str] = "twilio"  # Options: "simpletexting", "twilio", "auto"
@@ -96,6 +98,15 @@ class Settings(BaseSettings):
     # Feature Flags
     enable_notifications: Optional[bool] = True
     enable_scheduler: Optional[bool] = True
+    # "inline": the API process runs due dynamic jobs; "enqueue": it only records
+    # due/manual runs and a separate `python -m job_worker` process executes them
+    scheduler_mode: Optional[str] = "inline"
+    job_worker_concurrency: Optional[int] = 4    # Jobs run concurrently per worker
+    job_worker_processes: Optional[int] = 2      # Process pool size for cpu_bound templates
+    job_lease_seconds: Optional[int] = 120       # Claim lease; renewed every third of this
+    # Seconds to buffer profile-view/favorite/shortlist events before sending one
+    # coalesced notification per recipient ("5 people viewed your profile"); 0 = off
+    event_coalesce_window_seconds: Optional[float] = 0
     enable_websockets: Optional[bool] = True
     debug_mode: Optional[bool] = False
     registration_open: Optional[bool] = False  # False = invitation-only, True = public registration
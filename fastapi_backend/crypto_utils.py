@@ -5,11 +5,14 @@ Provides field-level encryption for sensitive user data at rest
 """
 
 from cryptography.fernet import Fernet, InvalidToken
-from typing import Optional, List, Dict, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Iterable
 import logging
 import base64
 import hashlib
 import os
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +42,16 @@ class PIIEncryption:
         'contactNumber': 'contactNumberHash',
     }
     
+    # Everything decrypt_user_pii touches (contactNumbers holds {"number": token} entries)
+    ALL_PII_FIELDS = frozenset(ENCRYPTED_FIELDS | {'contactNumbers'})
+    
+    # Bounded ciphertext -> plaintext memo (stored tokens never change, so
+    # repeat views of the same profiles skip Fernet)
+    DECRYPT_CACHE_SIZE = 20000
+    
+    # decrypt_many: users per thread-pool task when workers > 1
+    DECRYPT_CHUNK_SIZE = 250
+    
     @staticmethod
     def hash_for_lookup(value: Optional[str]) -> Optional[str]:
         """
@@ -84,6 +97,11 @@ class PIIEncryption:
         except Exception as e:
             logger.error(f"❌ Failed to initialize encryption: {e}")
             raise ValueError(f"Invalid encryption key: {e}")
+        
+        self._decrypt_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._decrypt_cache_lock = threading.Lock()
+        self.decrypt_cache_hits = 0
+        self.legacy_plaintext_count = 0
     
     def encrypt(self, data: Optional[str]) -> Optional[str]:
         """
@@ -122,13 +140,26 @@ class PIIEncryption:
         # If data doesn't look encrypted (legacy data), return as-is
         # Encrypted data starts with 'gAAAAA' (Fernet token prefix)
         if not isinstance(encrypted_data, str) or not encrypted_data.startswith('gAAAAA'):
-            logger.warning(f"⚠️ Data does not appear to be encrypted, returning as-is")
+            # Warn once per process; list endpoints would otherwise log per field per user
+            self.legacy_plaintext_count += 1
+            if self.legacy_plaintext_count == 1:
+                logger.warning("⚠️ Data does not appear to be encrypted, returning as-is (further occurrences logged at debug)")
+            else:
+                logger.debug("⚠️ Data does not appear to be encrypted, returning as-is")
             return encrypted_data
         
+        cache_key = hashlib.sha256(encrypted_data.encode('utf-8')).hexdigest()
+        with self._decrypt_cache_lock:
+            cached = self._decrypt_cache.get(cache_key)
+            if cached is not None:
+                self._decrypt_cache.move_to_end(cache_key)
+                self.decrypt_cache_hits += 1
+                return cached
+        
         try:
             # Decrypt and return as string
             decrypted_bytes = self.cipher.decrypt(encrypted_data.encode('utf-8'))
-            return decrypted_bytes.decode('utf-8')
+            plaintext = decrypted_bytes.decode('utf-8')
         except InvalidToken:
             logger.error(f"❌ Decryption failed: Invalid token (data may be corrupted or use wrong key)")
             # Return None or raise - depends on your error handling preference
@@ -136,6 +167,17 @@ class PIIEncryption:
         except Exception as e:
             logger.error(f"❌ Decryption failed: {e}")
             return None
+        
+        with self._decrypt_cache_lock:
+            self._decrypt_cache[cache_key] = plaintext
+            if len(self._decrypt_cache) > self.DECRYPT_CACHE_SIZE:
+                self._decrypt_cache.popitem(last=False)
+        return plaintext
+    
+    def clear_decrypt_cache(self):
+        """Drop memoized plaintexts (e.g. after a key rotation)"""
+        with self._decrypt_cache_lock:
+            self._decrypt_cache.clear()
     
     def encrypt_list(self, data_list: Optional[List[str]]) -> Optional[List[str]]:
         """
@@ -232,9 +274,54 @@ class PIIEncryption:
         Returns:
             User document with decrypted PII fields
         """
+        return self._decrypt_fields(user_data, self.ALL_PII_FIELDS)
+    
+    def decrypt_many(
+        self,
+        users: Iterable[Dict[str, Any]],
+        fields: Optional[Iterable[str]] = None,
+        workers: int = 1
+    ) -> List[Dict[str, Any]]:
+        """
+        Decrypt PII for a list of user documents (search results, favorites, reports)
+        
+        Args:
+            users: User documents with encrypted PII
+            fields: PII fields the caller needs (default: all, like decrypt_user_pii).
+                Other PII fields are dropped from the returned copies rather than
+                returned as ciphertext; fields=() skips Fernet entirely.
+            workers: Fan out to a thread pool for large exports (>1)
+            
+        Returns:
+            New list of user documents with the requested fields decrypted
+        """
+        users = list(users)
+        wanted = self.ALL_PII_FIELDS if fields is None else frozenset(fields)
+        unknown = wanted - self.ALL_PII_FIELDS
+        if unknown:
+            raise ValueError(f"Not PII fields: {sorted(unknown)}")
+        dropped = self.ALL_PII_FIELDS - wanted
+        
+        def decrypt_chunk(chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            results = []
+            for user in chunk:
+                decrypted = self._decrypt_fields(user, wanted)
+                for field in dropped:
+                    decrypted.pop(field, None)
+                results.append(decrypted)
+            return results
+        
+        if workers <= 1 or len(users) <= self.DECRYPT_CHUNK_SIZE:
+            return decrypt_chunk(users)
+        
+        chunks = [users[i:i + self.DECRYPT_CHUNK_SIZE] for i in range(0, len(users), self.DECRYPT_CHUNK_SIZE)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return [user for chunk in pool.map(decrypt_chunk, chunks) for user in chunk]
+    
+    def _decrypt_fields(self, user_data: Dict[str, Any], fields: frozenset) -> Dict[str, Any]:
         decrypted_data = user_data.copy()
         
-        for field in self.ENCRYPTED_FIELDS:
+        for field in self.ENCRYPTED_FIELDS & fields:
             if field in decrypted_data and decrypted_data[field]:
                 try:
                     decrypted_data[field] = self.decrypt(decrypted_data[field])
@@ -245,9 +332,14 @@ class PIIEncryption:
                     decrypted_data[field] = None
         
         # Decrypt contactNumbers array (each entry's number field)
-        if 'contactNumbers' in decrypted_data and decrypted_data['contactNumbers']:
+        if 'contactNumbers' in fields and 'contactNumbers' in decrypted_data and decrypted_data['contactNumbers']:
             try:
                 if isinstance(decrypted_data['contactNumbers'], list):
+                    # Copy the entries so the caller's (encrypted) document is left intact
+                    decrypted_data['contactNumbers'] = [
+                        dict(entry) if isinstance(entry, dict) else entry
+                        for entry in decrypted_data['contactNumbers']
+                    ]
                     for entry in decrypted_data['contactNumbers']:
                         if isinstance(entry, dict) and entry.get('number'):
                             entry['number'] = self.decrypt(entry['number'])
@@ -1,7 +1,7 @@
 """
 Backup Job Template
 Creates compressed mongodump backups → local + optional GCS upload.
-Falls back to Python-based JSON dump if mongodump binary is not available.
+Falls back to a Python streaming NDJSON dump if mongodump binary is not available.
 Supports retention policies and automatic cleanup of old backups.
 """
 
@@ -9,9 +9,7 @@ from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timezone
 from .base import JobTemplate, JobResult, JobExecutionContext
 from pathlib import Path
-import json
-import gzip
-import shutil
+import asyncio
 import subprocess
 import logging
 
@@ -27,7 +25,7 @@ class BackupJobTemplate(JobTemplate):
     
     template_type = "backup_job"
     template_name = "MongoDB Backup"
-    template_description = "Full database backup via mongodump → local + GCS. Falls back to JSON dump if mongodump unavailable."
+    template_description = "Full database backup via mongodump → local + GCS. Falls back to streaming NDJSON dump if mongodump unavailable."
     category = "maintenance"
     icon = "💾"
     estimated_duration = "5-30 minutes"
@@ -146,6 +144,8 @@ class BackupJobTemplate(JobTemplate):
         try:
             # Try mongodump first (if available and not Cloud Run), fall back to Python dump
             mongodump_available = self._check_mongodump()
+            gcs_url = None
+            gcs_configured = bool(settings.use_gcs and settings.gcs_bucket_name)
             
             if mongodump_available and use_mongodump:
                 context.log("INFO", "Using mongodump binary")
@@ -154,27 +154,39 @@ class BackupJobTemplate(JobTemplate):
                 )
             else:
                 if not mongodump_available:
-                    context.log("INFO", "mongodump not found — using Python JSON dump")
+                    context.log("INFO", "mongodump not found — using Python streaming dump")
                 else:
-                    context.log("INFO", "Using Python JSON dump (Cloud Run or low disk space)")
-                archive_path, method = await self._backup_python(
-                    context, db_name, timestamp, collections
+                    context.log("INFO", "Using Python streaming dump (Cloud Run or low disk space)")
+                # Stream straight to GCS when local storage is skipped
+                stream_to_gcs = skip_local_storage and upload_to_gcs and gcs_configured
+                archive_path, method, gcs_url, streamed_bytes = await self._backup_python(
+                    context, db_name, timestamp, collections,
+                    gcs_bucket=settings.gcs_bucket_name if stream_to_gcs else None,
+                    gcs_prefix=gcs_prefix
                 )
             
-            if not archive_path or not archive_path.exists():
+            if gcs_url:
+                archive_name = archive_path.name
+                file_size = streamed_bytes
+                local_path = None
+            elif not archive_path or not archive_path.exists():
                 return JobResult(
                     status="failed",
                     message="Backup file was not created",
                     errors=["Archive file missing after backup"]
                 )
+            else:
+                archive_name = archive_path.name
+                file_size = archive_path.stat().st_size
+                local_path = str(archive_path)
             
-            file_size = archive_path.stat().st_size
             size_mb = file_size / (1024 * 1024)
-            context.log("INFO", f"Backup archive: {archive_path.name} ({size_mb:.1f} MB)")
+            context.log("INFO", f"Backup archive: {archive_name} ({size_mb:.1f} MB)")
             
-            # Upload to GCS if configured
-            gcs_url = None
-            if upload_to_gcs and settings.use_gcs and settings.gcs_bucket_name:
+            # Upload to GCS if configured (streamed dumps are already there)
+            if gcs_url:
+                context.log("INFO", f"Streamed to {gcs_url}")
+            elif upload_to_gcs and gcs_configured:
                 gcs_url = await self._upload_to_gcs(
                     context, archive_path, settings.gcs_bucket_name, gcs_prefix
                 )
@@ -184,12 +196,12 @@ class BackupJobTemplate(JobTemplate):
             # Log backup metadata to database
             env = getattr(settings, "env", "development") or "development"
             backup_record = {
-                "filename": archive_path.name,
+                "filename": archive_name,
                 "timestamp": now,
                 "size_bytes": file_size,
                 "method": method,
                 "collections": collections or "all",
-                "local_path": str(archive_path),
+                "local_path": local_path,
                 "gcs_url": gcs_url,
                 "gcs_bucket": settings.gcs_bucket_name if gcs_url else None,
                 "gcs_prefix": gcs_prefix if gcs_url else None,
@@ -202,7 +214,7 @@ class BackupJobTemplate(JobTemplate):
             # Cleanup old backups
             cleaned = await self._cleanup_old(context, retention_days, settings, gcs_prefix)
             
-            msg = f"Backup complete: {archive_path.name} ({size_mb:.1f} MB, {method})"
+            msg = f"Backup complete: {archive_name} ({size_mb:.1f} MB, {method})"
             if gcs_url:
                 msg += f" — uploaded to GCS"
             if cleaned > 0:
@@ -212,7 +224,7 @@ class BackupJobTemplate(JobTemplate):
                 status="success",
                 message=msg,
                 details={
-                    "filename": archive_path.name,
+                    "filename": archive_name,
                     "size_mb": round(size_mb, 2),
                     "method": method,
                     "gcs_url": gcs_url,
@@ -275,51 +287,73 @@ class BackupJobTemplate(JobTemplate):
         return archive_path, "mongodump"
     
     async def _backup_python(
-        self, context, db_name, timestamp, collections
-    ) -> Tuple[Optional[Path], str]:
-        """Python-based JSON dump as fallback."""
-        backup_name = f"{db_name}_{timestamp}_json"
-        backup_subdir = BACKUP_DIR / backup_name
-        backup_subdir.mkdir(parents=True, exist_ok=True)
+        self, context, db_name, timestamp, collections,
+        gcs_bucket: Optional[str] = None, gcs_prefix: str = "backups"
+    ) -> Tuple[Path, str, Optional[str], int]:
+        """
+        Python streaming dump as fallback: collections are read in cursor
+        batches (a few in parallel) into one gzipped NDJSON archive, written to
+        BACKUP_DIR or, with gcs_bucket, uploaded to GCS as it is produced.
+        
+        Returns:
+            (archive path, method, gcs_url if streamed to GCS, compressed bytes written)
+        """
+        from services.streaming_export import (
+            BACKUP_ARCHIVE_SUFFIX, GzipStreamWriter, export_collections, open_gcs_sink, open_local_sink
+        )
+        
+        archive_path = BACKUP_DIR / f"{db_name}_{timestamp}{BACKUP_ARCHIVE_SUFFIX}"
+        gcs_url = None
+        blob_path = None
         
         if not collections:
             collections = await context.db.list_collection_names()
         
-        total_records = 0
-        for coll_name in collections:
-            try:
-                coll = context.db[coll_name]
-                records = await coll.find({}).to_list(length=None)
-                
-                for r in records:
-                    if "_id" in r:
-                        r["_id"] = str(r["_id"])
-                
-                out_file = backup_subdir / f"{coll_name}.json"
-                with open(out_file, "w") as f:
-                    json.dump(records, f, default=str)
-                
-                total_records += len(records)
-                context.log("INFO", f"  {coll_name}: {len(records)} records")
-            except Exception as e:
-                context.log("ERROR", f"  Failed {coll_name}: {e}")
+        if gcs_bucket:
+            blob_path = f"{gcs_prefix}/{archive_path.name}"
+            context.log("INFO", f"Streaming to gs://{gcs_bucket}/{blob_path}")
+            sink = await asyncio.to_thread(open_gcs_sink, gcs_bucket, blob_path)
+            gcs_url = f"gs://{gcs_bucket}/{blob_path}"
+        else:
+            sink = open_local_sink(archive_path)
         
-        # Compress into a single .tar.gz
-        archive_name = f"{db_name}_{timestamp}.tar.gz"
-        archive_path = BACKUP_DIR / archive_name
+        failed = []
         
-        shutil.make_archive(
-            str(BACKUP_DIR / f"{db_name}_{timestamp}"),
-            "gztar",
-            root_dir=str(BACKUP_DIR),
-            base_dir=backup_name
-        )
+        def on_collection_done(name: str, count: int, error: Optional[Exception]):
+            if error:
+                failed.append(name)
+                context.log("ERROR", f"  Failed {name}: {error}")
+            else:
+                context.log("INFO", f"  {name}: {count} records")
+        
+        writer = GzipStreamWriter(sink)
+        try:
+            counts = await export_collections(context.db, collections, writer, on_collection_done=on_collection_done)
+        finally:
+            await writer.close()
         
-        # Clean up the uncompressed directory
-        shutil.rmtree(backup_subdir, ignore_errors=True)
+        if failed:
+            # A failed collection's lines stop partway; restore would load them as complete
+            await self._discard_archive(context, archive_path, gcs_bucket, blob_path)
+            raise RuntimeError(f"Export failed for {len(failed)} collection(s): {', '.join(sorted(failed))}")
         
-        context.log("INFO", f"Python dump complete: {total_records} records across {len(collections)} collections")
-        return archive_path, "python_json"
+        context.log("INFO", f"Python dump complete: {sum(counts.values())} records across {len(counts)} collections")
+        return archive_path, "python_ndjson", gcs_url, writer.bytes_written
+    
+    async def _discard_archive(
+        self, context, archive_path: Path, gcs_bucket: Optional[str], blob_path: Optional[str]
+    ):
+        """Delete a partial archive (local file or finalized GCS blob)."""
+        try:
+            if gcs_bucket:
+                from google.cloud import storage
+                blob = storage.Client().bucket(gcs_bucket).blob(blob_path)
+                await asyncio.to_thread(blob.delete)
+            else:
+                archive_path.unlink(missing_ok=True)
+            context.log("WARNING", f"Discarded partial archive {archive_path.name}")
+        except Exception as e:
+            context.log("ERROR", f"Could not discard partial archive {archive_path.name}: {e}")
     
     async def _upload_to_gcs(
         self, context, archive_path: Path, bucket_name: str, prefix: str
@@ -82,6 +82,9 @@ class JobTemplate(ABC):
     estimated_duration: str = "Unknown"
     resource_usage: str = "medium"  # low, medium, high
     risk_level: str = "low"  # low, medium, high, critical
+    # CPU-heavy templates run in the job worker's process pool; execute() must
+    # then rely only on context.db and its parameters (no in-process state)
+    cpu_bound: bool = False
     
     @abstractmethod
     async def execute(self, context: JobExecutionContext) -> JobResult:
@@ -33,6 +33,7 @@ class DailyDigestTemplate(JobTemplate):
     estimated_duration = "5-15 minutes"
     resource_usage = "medium"
     risk_level = "low"
+    cpu_bound = True
     
     def get_schema(self) -> Dict[str, Any]:
         return {
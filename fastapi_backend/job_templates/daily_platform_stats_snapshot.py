@@ -3,6 +3,7 @@ Daily Platform Stats Snapshot Job Template
 
 Creates daily statistics snapshots from activity_logs.
 Runs daily at 00:05 UTC to capture previous day's activity.
+Also refreshes the admin report cube (services/admin_report_cube.py).
 """
 
 from datetime import datetime, timedelta
@@ -163,18 +164,28 @@ class PlatformStatsDailySnapshotTemplate(JobTemplate):
                     "updatedAt": datetime.utcnow()
                 })
             
+            # 9. Refresh admin report cube (reports compute on read if this fails)
+            details = {
+                "searches": searches,
+                "profileViews": profile_views,
+                "favorited": favorited,
+                "shortlisted": shortlisted,
+                "messagesSent": messages_sent,
+                "activeMembers": active_members
+            }
+            warnings = []
+            try:
+                from services.admin_report_cube import AdminReportCube
+                details.update(await AdminReportCube(db).refresh_daily(yesterday))
+            except Exception as e:
+                warnings.append(f"Admin report cube refresh failed: {e}")
+            
             return JobResult(
                 status="success",
                 message=f"Daily snapshot created for {date_str}",
-                details={
-                    "searches": searches,
-                    "profileViews": profile_views,
-                    "favorited": favorited,
-                    "shortlisted": shortlisted,
-                    "messagesSent": messages_sent,
-                    "activeMembers": active_members
-                },
-                records_affected=1
+                details=details,
+                records_affected=1,
+                warnings=warnings
             )
             
         except Exception as e:
@@ -1,13 +1,15 @@
 """
 Data Export Job Template
 Exports data from database collections to various formats
+
+Records are streamed from the cursor in batches into a gzipped NDJSON or CSV
+file (local or GCS), so large exports never sit in memory.
 """
 
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from .base import JobTemplate, JobResult, JobExecutionContext
-import json
-import csv
+import asyncio
 import logging
 from pathlib import Path
 
@@ -19,7 +21,7 @@ class DataExportTemplate(JobTemplate):
     
     template_type = "data_export"
     template_name = "Data Export"
-    template_description = "Export data from database collections to JSON or CSV format"
+    template_description = "Export data from database collections to gzipped NDJSON or CSV"
     category = "reports"
     icon = "📊"
     estimated_duration = "5-20 minutes"
@@ -75,7 +77,7 @@ class DataExportTemplate(JobTemplate):
                 "destination": {
                     "type": "string",
                     "description": "Destination type for export",
-                    "enum": ["file", "database", "memory"],
+                    "enum": ["file", "gcs", "database", "memory"],
                     "default": "file"
                 },
                 "filename": {
@@ -133,38 +135,33 @@ class DataExportTemplate(JobTemplate):
         try:
             collection = context.db[collection_name]
             
-            # Build query
-            query = collection.find(filters, projection)
-            if sort_order:
-                query = query.sort(list(sort_order.items()))
-            query = query.limit(limit)
-            
-            # Fetch data
-            records = await query.to_list(length=limit)
-            record_count = len(records)
-            
-            context.log("INFO", f"Fetched {record_count} records")
-            
-            if record_count == 0:
+            if not await collection.find_one(filters, {"_id": 1}):
                 return JobResult(
                     status="success",
                     message="No records found to export",
                     records_processed=0
                 )
             
-            # Convert ObjectId to string for JSON serialization
-            for record in records:
-                if "_id" in record:
-                    record["_id"] = str(record["_id"])
-            
-            # Export based on format
-            if format_type == "json":
-                export_path = await self._export_json(records, filename, destination, context)
-            elif format_type == "csv":
-                export_path = await self._export_csv(records, filename, destination, context)
+            if destination == "memory":
+                record_count = await collection.count_documents(filters, limit=limit)
+                context.log("INFO", "Exported to memory (result details)")
+                export_path = "memory://result_details/export_data"
             else:
-                raise ValueError(f"Unsupported format: {format_type}")
-            
+                # Build query (consumed in cursor batches, never materialized)
+                query = collection.find(filters, projection)
+                if sort_order:
+                    query = query.sort(list(sort_order.items()))
+                query = query.limit(limit)
+                
+                # Export based on format
+                if format_type == "json":
+                    export_path, record_count = await self._export_json(query, filename, destination, context)
+                elif format_type == "csv":
+                    export_path, record_count = await self._export_csv(query, projection, filename, destination, context)
+                else:
+                    raise ValueError(f"Unsupported format: {format_type}")
+            
+            context.log("INFO", f"Exported {record_count} records")
             context.log("INFO", f"Export completed: {export_path}")
             
             return JobResult(
@@ -189,59 +186,63 @@ class DataExportTemplate(JobTemplate):
                 errors=[str(e)]
             )
     
-    async def _export_json(self, records: list, filename: str, destination: str, context: JobExecutionContext) -> str:
-        """Export records to JSON file"""
+    async def _open_writer(self, output_name: str, destination: str, context: JobExecutionContext):
+        """Gzip writer for the export file; returns (writer, export path)"""
+        from services.streaming_export import GzipStreamWriter, open_gcs_sink, open_local_sink
+        
         if destination == "file":
-            output_dir = Path("exports")
-            output_dir.mkdir(exist_ok=True)
-            
-            output_path = output_dir / f"{filename}.json"
-            
-            with open(output_path, 'w') as f:
-                json.dump(records, f, indent=2, default=str)
-            
-            context.log("INFO", f"Exported to file: {output_path}")
-            return str(output_path)
+            output_path = Path("exports") / output_name
+            return GzipStreamWriter(open_local_sink(output_path)), str(output_path)
         
-        elif destination == "memory":
-            # Store in job result details
-            context.log("INFO", "Exported to memory (result details)")
-            return "memory://result_details/export_data"
+        elif destination == "gcs":
+            from config import settings
+            if not (settings.use_gcs and settings.gcs_bucket_name):
+                raise ValueError("GCS is not configured")
+            blob_path = f"exports/{output_name}"
+            sink = await asyncio.to_thread(open_gcs_sink, settings.gcs_bucket_name, blob_path)
+            return GzipStreamWriter(sink), f"gs://{settings.gcs_bucket_name}/{blob_path}"
         
         else:
             raise ValueError(f"Unsupported destination: {destination}")
     
-    async def _export_csv(self, records: list, filename: str, destination: str, context: JobExecutionContext) -> str:
-        """Export records to CSV file"""
-        if not records:
-            return ""
+    async def _export_json(self, query, filename: str, destination: str, context: JobExecutionContext) -> Tuple[str, int]:
+        """Stream records to a gzipped NDJSON file (one Extended JSON document per line)"""
+        from services.streaming_export import write_ndjson
         
-        if destination == "file":
-            output_dir = Path("exports")
-            output_dir.mkdir(exist_ok=True)
-            
-            output_path = output_dir / f"{filename}.csv"
-            
-            # Get all unique keys from records
-            keys = set()
-            for record in records:
-                keys.update(record.keys())
-            keys = sorted(list(keys))
-            
-            with open(output_path, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=keys)
-                writer.writeheader()
-                writer.writerows(records)
-            
-            context.log("INFO", f"Exported to file: {output_path}")
-            return str(output_path)
+        writer, export_path = await self._open_writer(f"{filename}.ndjson.gz", destination, context)
+        try:
+            record_count = await write_ndjson(query, writer)
+        finally:
+            await writer.close()
         
-        elif destination == "memory":
-            context.log("INFO", "Exported to memory (result details)")
-            return "memory://result_details/export_data"
+        context.log("INFO", f"Exported to {destination}: {export_path}")
+        return export_path, record_count
+    
+    async def _export_csv(self, query, projection: Optional[Dict[str, Any]], filename: str, destination: str,
+                          context: JobExecutionContext) -> Tuple[str, int]:
+        """Stream records to a gzipped CSV file"""
+        from services.streaming_export import write_csv
         
-        else:
-            raise ValueError(f"Unsupported destination: {destination}")
+        writer, export_path = await self._open_writer(f"{filename}.csv.gz", destination, context)
+        try:
+            record_count, dropped = await write_csv(query, writer, columns=self._projection_columns(projection))
+        finally:
+            await writer.close()
+        
+        if dropped:
+            context.log("WARNING", f"{dropped} field values outside the CSV header were skipped; pass a projection to choose columns")
+        context.log("INFO", f"Exported to {destination}: {export_path}")
+        return export_path, record_count
+    
+    @staticmethod
+    def _projection_columns(projection: Optional[Dict[str, Any]]) -> Optional[List[str]]:
+        """CSV columns from an inclusion projection (None: take them from the data)"""
+        if not projection:
+            return None
+        included = [field for field, value in projection.items() if value and field != "_id"]
+        if not included:
+            return None
+        return ([] if projection.get("_id", 1) == 0 else ["_id"]) + included
 
 
 # Import re for filename validation
@@ -1,7 +1,7 @@
 """
 Email Notifier Job Template
 Processes email notification queue and sends emails
-Uses centralized email_sender.py for Resend + SMTP fallback
+Delivers each batch through services/email_delivery.py (Resend batch + pooled SMTP fallback)
 """
 
 from typing import Dict, Any, Optional, List, Tuple
@@ -9,6 +9,8 @@ from datetime import datetime
 
 from .base import JobTemplate, JobExecutionContext, JobResult
 from services.notification_service import NotificationService
+from services.email_delivery import DeliveryResult, EmailDeliveryEngine, OutgoingEmail
+from services.template_engine import template_cache_key
 from models.notification_models import (
     NotificationQueueItem,
     NotificationChannel,
@@ -36,8 +38,6 @@ class EmailNotifierTemplate(JobTemplate):
     
     def __init__(self):
         from config import settings
-        from utils.branding import get_app_name
-        from utils.gcp_secrets import get_email_config
         
         # Get email config with Courier -> Gmail SMTP failover
         email_config = get_email_config()
@@ -142,7 +142,7 @@ class EmailNotifierTemplate(JobTemplate):
             
             # Get pending email notifications (atomically claimed)
             context.log("info", f"Fetching pending email notifications (limit: {params.get('batchSize', 100)})")
-            notifications = await service.get_pending_notifications(
+            notifications = await service.claim_pending_notifications(
                 channel=NotificationChannel.EMAIL,
                 limit=params.get("batchSize", 100)
             )
@@ -156,7 +156,14 @@ class EmailNotifierTemplate(JobTemplate):
             
             context.log("info", f"Processing {len(notifications)} email notifications")
             
-            # Send emails
+            # Recipient addresses for the whole batch: one $in query + batch decrypt
+            recipient_emails = {}
+            if not (params.get("testMode") and params.get("testEmail")):
+                recipient_emails = await self._prefetch_recipient_emails(context.db, notifications)
+            
+            # Render every email, then hand the batch to the delivery engine
+            outgoing = []
+            rendered = {}
             for notification in notifications:
                 try:
                     # Get recipient email
@@ -168,62 +175,24 @@ class EmailNotifierTemplate(JobTemplate):
                         recipient_email = notification.templateData["recipientEmail"]
                         context.log("info", f"📨 External recipient: {recipient_email[:3]}***@{recipient_email.split('@')[1] if '@' in recipient_email else '***'}")
                     else:
-                        context.log("info", f"Looking up email for user: {notification.username}")
-                        user = await context.db.users.find_one({"username": notification.username})
-                        context.log("info", f"Found user: {user is not None}")
-                        
-                        if not user:
+                        if notification.username not in recipient_emails:
                             raise Exception(f"User '{notification.username}' not found in database")
                         
-                        # Check both 'email' and 'contactEmail' fields
-                        email_field = user.get("email") or user.get("contactEmail")
-                        contactEmail_field = user.get("contactEmail")
-                        context.log("info", f"DB Fields - email: {email_field or 'NOT SET'}, contactEmail: {contactEmail_field or 'NOT SET'}")
-                        
-                        recipient_email = email_field or contactEmail_field
-                        
+                        recipient_email = recipient_emails[notification.username]
                         if not recipient_email:
                             raise Exception(f"User '{notification.username}' has no email address (checked 'email' and 'contactEmail' fields)")
-                        
-                        # 🔓 Decrypt email if encrypted
-                        from crypto_utils import get_encryptor
-                        if recipient_email and recipient_email.startswith('gAAAAA'):
-                            try:
-                                encryptor = get_encryptor()
-                                decrypted_email = encryptor.decrypt(recipient_email)
-                                context.log("info", f"🔓 Decrypted email: {decrypted_email[:3]}***@{decrypted_email.split('@')[1] if '@' in decrypted_email else '***'}")
-                                recipient_email = decrypted_email
-                            except Exception as decrypt_err:
-                                raise Exception(f"Failed to decrypt email address: {decrypt_err}")
-                        
-                        context.log("info", f"✅ Using email: {recipient_email[:3]}***@{recipient_email.split('@')[1] if '@' in recipient_email else '***'}")
                     
                     # Render email
                     subject, body = await self._render_email(service, notification, context.db)
                     
-                    # Send email
-                    await self._send_email(recipient_email, subject, body, notification, context)
-                    
-                    # Mark as sent (use notification.id directly)
-                    await service.mark_as_sent(
-                        notification.id,  # Use .id field directly, not dict()
-                        NotificationChannel.EMAIL,
-                        success=True  # ✅ FIXED: Use boolean instead of string
-                    )
-                    
-                    # Log notification with lineage tracking
-                    await service.log_notification(
-                        username=notification.username,
-                        trigger=notification.trigger,
-                        channel=NotificationChannel.EMAIL,
-                        priority=notification.priority,
+                    key = str(notification.id)
+                    rendered[key] = (notification, subject, body)
+                    outgoing.append(OutgoingEmail(
+                        key=key,
+                        to_email=recipient_email,
                         subject=subject,
-                        preview=body[:100],
-                        cost=0.0,
-                        template_data=notification.templateData  # Include lineage_token
-                    )
-                    
-                    sent_count += 1
+                        html_content=self._create_html_email(body, notification)
+                    ))
                     
                 except Exception as e:
                     await service.mark_as_sent(
@@ -236,6 +205,55 @@ class EmailNotifierTemplate(JobTemplate):
                     errors.append(f"{notification.username}: {str(e)}")
                     context.log("error", f"Failed to send email to {notification.username}: {str(e)}")
             
+            # Send emails (Resend batch endpoint, then pooled SMTP connections)
+            engine = EmailDeliveryEngine()
+            context.log("info", f"📧 Delivering {len(outgoing)} emails via {engine.provider} ({engine.workers} SMTP workers)")
+            try:
+                results = await engine.deliver(outgoing) if outgoing else {}
+            finally:
+                await engine.close()
+            
+            for key, (notification, subject, body) in rendered.items():
+                result = results.get(key) or DeliveryResult(success=False, error="Not delivered")
+                if result.resend_error:
+                    context.log("warning", f"⚠️ Resend FAILED for {notification.username}: {result.resend_error}")
+                
+                if not result.success:
+                    await service.mark_as_sent(
+                        notification.id,
+                        NotificationChannel.EMAIL,
+                        success=False,
+                        error=result.error
+                    )
+                    failed_count += 1
+                    errors.append(f"{notification.username}: {result.error}")
+                    context.log("error", f"Failed to send email to {notification.username}: {result.error}")
+                    continue
+                
+                # Mark as sent (use notification.id directly)
+                await service.mark_as_sent(
+                    notification.id,  # Use .id field directly, not dict()
+                    NotificationChannel.EMAIL,
+                    success=True  # ✅ FIXED: Use boolean instead of string
+                )
+                
+                # Log notification with lineage tracking
+                await service.log_notification(
+                    username=notification.username,
+                    trigger=notification.trigger,
+                    channel=NotificationChannel.EMAIL,
+                    priority=notification.priority,
+                    subject=subject,
+                    preview=body[:100],
+                    cost=0.0,
+                    template_data=notification.templateData  # Include lineage_token
+                )
+                
+                sent_count += 1
+            
+            if outgoing:
+                context.log("info", f"✅ Delivery stats: {engine.get_stats()}")
+            
             duration = (datetime.utcnow() - start_time).total_seconds()
             
             return JobResult(
@@ -261,6 +279,39 @@ class EmailNotifierTemplate(JobTemplate):
                 duration_seconds=(datetime.utcnow() - start_time).total_seconds()
             )
     
+    async def _prefetch_recipient_emails(self, db, notifications) -> Dict[str, Optional[str]]:
+        """
+        Email address per queue username (None if the user has none), fetched
+        with one $in query and decrypted as a batch
+        """
+        usernames = {
+            n.username for n in notifications
+            if not (n.templateData and n.templateData.get("recipientEmail"))
+        }
+        if not usernames:
+            return {}
+        
+        users = await db.users.find(
+            {"username": {"$in": list(usernames)}},
+            {"username": 1, "email": 1, "contactEmail": 1}
+        ).to_list(None)
+        
+        # 🔓 Decrypt only when the batch holds encrypted values
+        if any(str(u.get(f) or "").startswith('gAAAAA') for u in users for f in ("email", "contactEmail")):
+            from crypto_utils import get_encryptor
+            encryptor = get_encryptor()
+            users = encryptor.decrypt_many(users, fields=("contactEmail",))
+            for user in users:
+                # Some legacy documents hold the encrypted address in 'email'
+                if str(user.get("email") or "").startswith('gAAAAA'):
+                    try:
+                        user["email"] = encryptor.decrypt(user["email"])
+                    except Exception:
+                        user["email"] = None
+        
+        # Check both 'email' and 'contactEmail' fields
+        return {u["username"]: u.get("email") or u.get("contactEmail") for u in users}
+    
     async def _render_email(self, service, notification, db) -> Tuple[str, str]:
         """Render email subject and body from template"""
         from config import settings
@@ -511,8 +562,13 @@ class EmailNotifierTemplate(JobTemplate):
                 subject_template = template.get("subject", "")
                 body_template = template.get("body", template.get("bodyTemplate", ""))
             
-            subject = service.render_template(subject_template, template_data)
-            body = service.render_template(body_template, template_data)
+            # Compiled once per (trigger, template version) and reused across the batch
+            subject = service.render_template(
+                subject_template, template_data, cache_key=template_cache_key(template, "email.subject")
+            )
+            body = service.render_template(
+                body_template, template_data, cache_key=template_cache_key(template, "email.body")
+            )
         
         return subject, body
     
@@ -783,46 +839,6 @@ class EmailNotifierTemplate(JobTemplate):
 </html>"""
         return html
     
-    async def _send_email(self, to_email: str, subject: str, body: str, notification, context=None) -> None:
-        """Send email via centralized email sender (Resend + SMTP fallback)"""
-        from services.email_sender import send_email
-        import os
-        
-        # Log email provider info
-        email_provider = os.environ.get("EMAIL_PROVIDER", "resend").lower()
-        if context:
-            context.log("info", f"📧 Using centralized email_sender (EMAIL_PROVIDER={email_provider})")
-        
-        # Create HTML email with styling
-        html_body = self._create_html_email(body, notification)
-        
-        # Use centralized email sender with Resend + SMTP fallback
-        try:
-            result = await send_email(to_email, subject, html_body)
-            
-            # Log detailed result
-            if context and isinstance(result, dict):
-                if result.get("resend_attempted"):
-                    if result.get("resend_error"):
-                        context.log("warning", f"⚠️ Resend FAILED: {result['resend_error']}")
-                    elif result.get("provider") == "resend":
-                        context.log("info", f"✅ Email sent via Resend")
-                
-                if result.get("smtp_attempted"):
-                    if result.get("smtp_error"):
-                        context.log("error", f"❌ SMTP FAILED: {result['smtp_error']}")
-                    elif result.get("provider") == "smtp":
-                        context.log("info", f"✅ Email sent via SMTP fallback")
-                
-                if result.get("success"):
-                    context.log("info", f"✅ Email delivered via {result.get('provider', 'unknown')}")
-            elif context:
-                context.log("info", f"✅ Email sent via centralized sender")
-        except Exception as e:
-            if context:
-                context.log("error", f"❌ Email send failed: {e}")
-            raise
-    
     def _create_html_email(self, body: str, notification) -> str:
         """Create HTML email with inline CSS styling (email client compatible)"""
         frontend_url = settings.frontend_url or "http://localhost:3000"
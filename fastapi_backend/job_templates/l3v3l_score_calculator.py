@@ -220,20 +220,20 @@ async def calculate_scores_for_user(db, username: str) -> dict:
     
     logger.info(f"🦋 Calculating L3V3L scores for {username} against {len(potential_matches)} {opposite_gender} users")
     
-    # Calculate scores
+    # Calculate scores in one vectorized pass with the same engine the profile page uses
+    from l3v3l_matching_engine import matching_engine
+    results = matching_engine.score_many(user, potential_matches, include_reasons=False)
+    
     scores_to_insert = []
     now = datetime.utcnow()
     
-    for match in potential_matches:
-        result = calculate_l3v3l_score(user, match)
-        
-        # Store bidirectional scores
+    for match, result in zip(potential_matches, results):
         scores_to_insert.append({
             "fromUsername": username,
             "toUsername": match['username'],
-            "score": result['score'],
-            "level": result['level'],
-            "breakdown": result['breakdown'],
+            "score": result['total_score'],
+            "level": result['compatibility_level'],
+            "breakdown": result.get('component_scores', {}),
             "calculatedAt": now
         })
     
@@ -11,6 +11,7 @@ Benefits:
 """
 
 from .base import JobTemplate, JobExecutionContext, JobResult
+from services.search_snapshot import SearchSnapshotService
 from datetime import datetime
 from typing import Dict, Any, Tuple, Optional
 import logging
@@ -40,6 +41,7 @@ class L3V3LScoreCalculatorTemplate(JobTemplate):
     estimated_duration = "5-30 minutes"
     resource_usage = "high"
     risk_level = "low"
+    cpu_bound = True
     
     def validate_params(self, params: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
         """Validate parameters before execution"""
@@ -57,7 +59,7 @@ class L3V3LScoreCalculatorTemplate(JobTemplate):
                 "mode": {
                     "type": "string",
                     "enum": ["incremental", "full"],
-                    "description": "incremental = only new/updated profiles, full = recalculate all",
+                    "description": "incremental = only dirty (changed/activated/deactivated) profiles, full = recalculate all",
                     "default": "incremental"
                 },
                 "username": {
@@ -70,6 +72,12 @@ class L3V3LScoreCalculatorTemplate(JobTemplate):
                     "description": "Number of users to process in each batch",
                     "default": 50,
                     "minimum": 1
+                },
+                "max_dirty_users": {
+                    "type": "integer",
+                    "description": "Incremental mode: maximum dirty users to recompute per run (the rest resume next run)",
+                    "default": 1000,
+                    "minimum": 1
                 }
             },
             "required": []
@@ -91,6 +99,7 @@ class L3V3LScoreCalculatorTemplate(JobTemplate):
         await db.l3v3l_scores.create_index([("fromUsername", 1), ("toUsername", 1)], unique=True)
         await db.l3v3l_scores.create_index([("fromUsername", 1)])
         await db.l3v3l_scores.create_index([("toUsername", 1)])
+        await SearchSnapshotService(db).ensure_indexes()
         
         try:
             if username:
@@ -161,8 +170,18 @@ class L3V3LScoreCalculatorTemplate(JobTemplate):
         }
     
     async def _calculate_incremental(self, db, batch_size: int, context: JobExecutionContext) -> Dict[str, Any]:
-        """Calculate scores only for new/updated profiles since last run"""
-        from datetime import timedelta
+        """
+        Recompute scores only for dirty users (rows and columns, both directions)
+        
+        Users are marked dirty by EventDispatcher (profile_updated, user_approved,
+        user_paused/suspended/banned) and pause/status paths. As a safety net this
+        run also marks users whose profile timestamps moved since the last run and
+        users who still own scores but are no longer active.
+        """
+        from services.l3v3l_score_maintenance import L3V3LScoreMaintainer
+        
+        maintainer = L3V3LScoreMaintainer(db)
+        await maintainer.ensure_indexes()
         
         # Get last successful run time from job metadata
         job_id = context.job_id
@@ -182,27 +201,25 @@ class L3V3LScoreCalculatorTemplate(JobTemplate):
             if latest_score and latest_score.get("calculatedAt"):
                 last_run = latest_score["calculatedAt"]
         
-        # Build query for new/updated users
-        user_query = {
-            "accountStatus": "active",
-            "gender": {"$in": ["Male", "Female"]}
-        }
-        
-        if last_run:
-            # Find users created or updated since last run
-            user_query["$or"] = [
-                {"createdAt": {"$gte": last_run}},
-                {"updatedAt": {"$gte": last_run}},
-                {"profileUpdatedAt": {"$gte": last_run}}
-            ]
-            context.log("INFO", f"🔍 Looking for profiles created/updated since {last_run}")
-        else:
+        if not last_run:
             context.log("INFO", "🔍 No previous run found - calculating for all users (first run)")
+            result = await self._calculate_all(db, batch_size)
+            result["mode"] = "incremental"
+            return result
         
-        users = await db.users.find(user_query).to_list(None)
+        marked = await maintainer.mark_changed_since(last_run)
+        context.log("INFO", f"🔍 {marked} profiles created/updated since {last_run}")
         
-        if not users:
-            context.log("INFO", "✅ No new or updated profiles found - nothing to calculate")
+        active_usernames = set(await db.users.distinct("username", {
+            "accountStatus": "active",
+            "gender": {"$in": ["Male", "Female"]}
+        }))
+        orphaned = await maintainer.mark_orphaned_scores(active_usernames)
+        if orphaned:
+            context.log("INFO", f"🔍 {orphaned} inactive users still have scores")
+        
+        if not await maintainer.dirty.count_documents({"pending": True}):
+            context.log("INFO", "✅ No dirty profiles - nothing to calculate")
             return {
                 "status": "completed",
                 "mode": "incremental",
@@ -211,52 +228,25 @@ class L3V3LScoreCalculatorTemplate(JobTemplate):
                 "message": "No new or updated profiles since last run"
             }
         
-        context.log("INFO", f"🦋 Found {len(users)} new/updated profiles to process")
-        
-        total_scores = 0
-        processed = 0
-        errors = []
-        
-        for user in users:
-            try:
-                user_gender = user.get('gender')
-                if not user_gender:
-                    continue
-                
-                opposite_gender = "Female" if user_gender == "Male" else "Male"
-                
-                # Get ALL opposite-gender users (not just new ones) to calculate scores against
-                potential_matches = await db.users.find({
-                    "gender": opposite_gender,
-                    "accountStatus": "active",
-                    "username": {"$ne": user['username']}
-                }).to_list(None)
-                
-                count = await self._calculate_and_store_scores(db, user, potential_matches)
-                total_scores += count
-                processed += 1
-                
-                context.log("INFO", f"   ✓ {user['username']}: {count} scores calculated")
-                    
-            except Exception as e:
-                errors.append(f"{user.get('username')}: {str(e)}")
-                context.log("ERROR", f"❌ Error for {user.get('username')}: {e}")
+        # Encode the whole active pool once and recompute each dirty user's row and column against it
+        pool = await self._load_scoring_pool(db)
+        result = await maintainer.process_pending(
+            pool,
+            limit=context.parameters.get('max_dirty_users', 1000),
+            log=context.log
+        )
         
         return {
             "status": "completed",
             "mode": "incremental",
-            "usersProcessed": processed,
-            "totalScoresCalculated": total_scores,
-            "errorCount": len(errors),
-            "errors": errors[:10]
+            "calculated": result["totalScoresCalculated"],
+            **result
         }
     
     async def _calculate_all(self, db, batch_size: int) -> Dict[str, Any]:
         """Calculate scores for all active users (full rebuild)"""
-        users = await db.users.find({
-            "accountStatus": "active",
-            "gender": {"$in": ["Male", "Female"]}
-        }).to_list(None)
+        pool = await self._load_scoring_pool(db)
+        users = pool['users']
         
         logger.info(f"🦋 Starting batch calculation for {len(users)} users")
         
@@ -266,19 +256,10 @@ class L3V3LScoreCalculatorTemplate(JobTemplate):
         
         for user in users:
             try:
-                user_gender = user.get('gender')
-                if not user_gender:
+                if not user.get('gender'):
                     continue
                 
-                opposite_gender = "Female" if user_gender == "Male" else "Male"
-                
-                potential_matches = await db.users.find({
-                    "gender": opposite_gender,
-                    "accountStatus": "active",
-                    "username": {"$ne": user['username']}
-                }).to_list(None)
-                
-                count = await self._calculate_and_store_scores(db, user, potential_matches)
+                count = await self._score_against_pool(db, pool, user['username'])
                 total_scores += count
                 processed += 1
                 
@@ -297,18 +278,55 @@ class L3V3LScoreCalculatorTemplate(JobTemplate):
             "errors": errors[:10]
         }
     
+    async def _load_scoring_pool(self, db) -> Dict[str, Any]:
+        """Load all active Male/Female profiles once and encode them for batch scoring"""
+        from l3v3l_matching_engine import matching_engine
+        
+        users = await db.users.find({
+            "accountStatus": "active",
+            "gender": {"$in": ["Male", "Female"]}
+        }).to_list(None)
+        
+        by_gender = {"Male": [], "Female": []}
+        for index, user in enumerate(users):
+            by_gender[user['gender']].append(index)
+        
+        return {
+            "users": users,
+            "features": matching_engine.encode_profiles(users),
+            "index": {user['username']: index for index, user in enumerate(users)},
+            "byGender": by_gender
+        }
+    
+    async def _score_against_pool(self, db, pool: Dict[str, Any], username: str) -> int:
+        """Score one pooled user against every opposite-gender pooled user and store the results"""
+        from l3v3l_matching_engine import matching_engine
+        
+        user_index = pool['index'][username]
+        user = pool['users'][user_index]
+        opposite_gender = "Female" if user['gender'] == "Male" else "Male"
+        candidates = [i for i in pool['byGender'][opposite_gender] if i != user_index]
+        
+        results = matching_engine.score_encoded(pool['features'], user_index, candidates, include_reasons=False)
+        matches = [pool['users'][i] for i in candidates]
+        return await self._store_scores(db, user, matches, results)
+    
     async def _calculate_and_store_scores(self, db, user: dict, matches: list) -> int:
         """Calculate and store scores for a user against matches using the SAME algorithm as profile page"""
-        from pymongo import UpdateOne
         from l3v3l_matching_engine import matching_engine  # Use the same engine as profile page
         
+        # One vectorized pass; results are identical to matching_engine.calculate_match_score per pair
+        results = matching_engine.score_many(user, matches, include_reasons=False)
+        return await self._store_scores(db, user, matches, results)
+    
+    async def _store_scores(self, db, user: dict, matches: list, results: list) -> int:
+        """Upsert the user's scores against matches (results aligned with matches)"""
+        from pymongo import UpdateOne
+        
         now = datetime.utcnow()
         bulk_ops = []
         
-        for match in matches:
-            # Use the SAME matching_engine as the profile page for consistent scores
-            match_result = matching_engine.calculate_match_score(user, match)
-            
+        for match, match_result in zip(matches, results):
             bulk_ops.append(UpdateOne(
                 {"fromUsername": user['username'], "toUsername": match['username']},
                 {"$set": {
@@ -328,6 +346,9 @@ class L3V3LScoreCalculatorTemplate(JobTemplate):
                 batch = bulk_ops[i:i+500]
                 await db.l3v3l_scores.bulk_write(batch)
         
+        # Keep the viewer's /search snapshot in step with their score row
+        await SearchSnapshotService(db).replace(user['username'], matches, results)
+        
         return len(bulk_ops)
     
     def _calculate_score(self, user1: dict, user2: dict) -> dict:
@@ -4,6 +4,7 @@ Monthly Platform Stats Aggregation Job Template
 Aggregates previous month's daily snapshots into monthly snapshot.
 Runs on 1st of each month at 01:00 UTC.
 Marks daily snapshots as aggregated instead of deleting them.
+Closes out the month's member-acquisition cells in the admin report cube.
 """
 
 from datetime import datetime, timedelta
@@ -120,11 +121,20 @@ class PlatformStatsMonthlyAggregationTemplate(JobTemplate):
                 {"$set": {"aggregated": True, "updatedAt": datetime.utcnow()}}
             )
             
+            # 6. Final recompute of the month in the admin report cube
+            warnings = []
+            try:
+                from services.admin_report_cube import AdminReportCube
+                aggregated["cubeCellsRefreshed"] = await AdminReportCube(db).close_month(month_id)
+            except Exception as e:
+                warnings.append(f"Admin report cube refresh failed: {e}")
+            
             return JobResult(
                 status="success",
                 message=f"Monthly snapshot created for {month_id}, marked {mark_result.modified_count} daily docs as aggregated",
                 details=aggregated,
-                records_affected=mark_result.modified_count
+                records_affected=mark_result.modified_count,
+                warnings=warnings
             )
             
         except Exception as e:
@@ -8,6 +8,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime
 from config import settings
 from services.notification_service import NotificationService
+from services.conversation_summaries import remove_user_conversation_summaries
 import logging
 import re
 from pathlib import Path
@@ -202,6 +203,7 @@ async def delete_user_completely(username: str, db):
         # 9. Delete messages (received by user)
         messages_received = await db.messages.delete_many({"toUsername": username})
         deletion_summary["messages_received"] = messages_received.deleted_count
+        await remove_user_conversation_summaries(db, username)
         
         # 10. Delete activity logs
         activity_logs = await db.activity_logs.delete_many({"username": username})
@@ -220,11 +222,15 @@ async def delete_user_completely(username: str, db):
         deletion_summary["audit_logs"] = audit_logs.deleted_count
         
         # 14. Delete profile views (where user viewed others)
-        profile_views_as_viewer = await db.profile_views.delete_many({"viewer_username": username})
+        profile_views_as_viewer = await db.profile_views.delete_many({
+            "$or": [{"viewer_username": username}, {"viewedByUsername": username}]
+        })
         deletion_summary["profile_views_as_viewer"] = profile_views_as_viewer.deleted_count
         
         # 15. Delete profile views (where user was viewed by others)
-        profile_views_as_viewed = await db.profile_views.delete_many({"viewed_username": username})
+        profile_views_as_viewed = await db.profile_views.delete_many({
+            "$or": [{"viewed_username": username}, {"profileUsername": username}]
+        })
         deletion_summary["profile_views_as_viewed"] = profile_views_as_viewed.deleted_count
         
         # 16. Delete PII requests
@@ -260,8 +266,13 @@ async def delete_user_completely(username: str, db):
         
         # 20. Finally, delete the user account itself
         user_result = await db.users.delete_one(get_username_query(username))
+        from auth.auth_context import invalidate_user
+        await invalidate_user(username)
         deletion_summary["user_account"] = user_result.deleted_count
         
+        from services.media_index import remove_user_media
+        await remove_user_media(db, username)
+        
         logger.info(f"📊 Deletion summary for {username}: {deletion_summary}")
         return deletion_summary
         
@@ -115,7 +115,7 @@ class PushNotifierTemplate(JobTemplate):
                 logger.warning(f"🔄 Reset {stuck_count} stuck push notifications from previous failed runs")
             
             # Get pending push notifications (atomically claimed)
-            claimed_notifications = await service.get_pending_notifications(
+            claimed_notifications = await service.claim_pending_notifications(
                 channel=NotificationChannel.PUSH,
                 limit=batch_size
             )
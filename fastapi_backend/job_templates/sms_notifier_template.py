@@ -10,6 +10,7 @@ import aiohttp
 
 from .base import JobTemplate, JobExecutionContext, JobResult
 from services.notification_service import NotificationService
+from services.template_engine import template_cache_key
 from models.notification_models import (
     NotificationChannel,
     NotificationPriority
@@ -146,7 +147,7 @@ class SMSNotifierTemplate(JobTemplate):
             
             # Get pending SMS notifications (atomically claimed)
             context.log("info", f"Fetching pending SMS notifications (limit: {params.get('batchSize', 50)})")
-            notifications = await service.get_pending_notifications(
+            notifications = await service.claim_pending_notifications(
                 channel=NotificationChannel.SMS,
                 limit=params.get("batchSize", 50)
             )
@@ -413,7 +414,8 @@ class SMSNotifierTemplate(JobTemplate):
             
             message = service.render_template(
                 template.get("bodyTemplate", ""),
-                enriched_data
+                enriched_data,
+                cache_key=template_cache_key(template, "sms.bodyTemplate")
             )
             
             # If template variables weren't substituted (still contain {match_firstName}), replace manually
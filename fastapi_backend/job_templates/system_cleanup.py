@@ -142,6 +142,7 @@ class SystemCleanupTemplate(JobTemplate):
                     
                     messages_deleted = 0
                     exclusions_processed = 0
+                    cleared_pairs = []
                     
                     for exclusion in old_exclusions:
                         user1 = exclusion.get("userUsername")
@@ -159,6 +160,12 @@ class SystemCleanupTemplate(JobTemplate):
                         })
                         messages_deleted += result.deleted_count
                         exclusions_processed += 1
+                        if result.deleted_count:
+                            cleared_pairs.append((user1, user2))
+                    
+                    if cleared_pairs:
+                        from services.conversation_summaries import refresh_conversation_summaries
+                        await refresh_conversation_summaries(context.db, cleared_pairs)
                     
                     cleanup_results["excluded_messages"] = messages_deleted
                     cleanup_results["exclusions_processed"] = exclusions_processed
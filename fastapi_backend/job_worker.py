@@ -0,0 +1,203 @@
+# fastapi_backend/job_worker.py
+"""
+Job Worker - executes dynamic jobs outside the API process
+
+Run with:
+    python -m job_worker [--concurrency N] [--processes N] [--once]
+
+Workers (and API instances in "inline" scheduler mode) claim due jobs from
+`dynamic_jobs` with an atomic lease (see JobRegistryService.claim_next_job),
+so with several instances each due run executes exactly once. The lease is
+renewed by a heartbeat while the job runs; if a worker dies, its lease expires
+and another worker picks the job up.
+
+Up to `concurrency` jobs run at once. Templates marked `cpu_bound` (L3V3L
+rebuilds, digest rendering) run in a process pool so they don't stall the
+worker's event loop.
+
+Set SCHEDULER_MODE=enqueue on the API service so it only records due/manual
+runs and leaves execution to this worker.
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SECONDS = 5
+
+
+def make_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class JobWorker:
+    """Claims due dynamic jobs under a lease and runs them concurrently"""
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        concurrency: int = 4,
+        lease_seconds: int = 120,
+        process_pool: Optional[Executor] = None,
+        worker_id: Optional[str] = None
+    ):
+        from services.job_executor import JobExecutor
+        from services.job_registry import JobRegistryService
+
+        self.db = db
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or make_worker_id()
+        self.registry = JobRegistryService(db)
+        self.executor = JobExecutor(db, process_pool=process_pool, execution_host=self.worker_id)
+        self.running: Set[asyncio.Task] = set()
+        self.is_running = False
+
+    async def run_due_jobs(self) -> int:
+        """
+        Claim and run every currently due job, then wait for them to finish
+
+        Returns:
+            Number of jobs run
+        """
+        # Each job runs at most once per pass, even if it is due again right away
+        seen: List[str] = []
+        while await self._fill_slots(seen):
+            pass
+        while self.running:
+            await asyncio.wait(set(self.running))
+            while await self._fill_slots(seen):
+                pass
+        return len(seen)
+
+    async def run_forever(self, poll_interval: float = POLL_INTERVAL_SECONDS):
+        """Poll for due jobs until stop() is called"""
+        self.is_running = True
+        logger.info(f"🚀 Job worker {self.worker_id} started (concurrency={self.concurrency})")
+        while self.is_running:
+            try:
+                while self.is_running and await self._fill_slots():
+                    pass
+            except Exception as e:
+                logger.error(f"❌ Error claiming jobs: {e}", exc_info=True)
+            await asyncio.sleep(poll_interval)
+
+        if self.running:
+            logger.info(f"⏳ Waiting for {len(self.running)} running job(s) to finish")
+            await asyncio.wait(set(self.running))
+        logger.info(f"🛑 Job worker {self.worker_id} stopped")
+
+    def stop(self):
+        self.is_running = False
+
+    async def _fill_slots(self, seen: Optional[List[str]] = None) -> bool:
+        """Claim one job if a slot is free; True if a job was started"""
+        if len(self.running) >= self.concurrency:
+            return False
+        job = await self.registry.claim_next_job(self.worker_id, self.lease_seconds, exclude_ids=seen)
+        if not job:
+            return False
+        if seen is not None:
+            seen.append(job["_id"])
+        task = asyncio.create_task(self._run_claimed(job))
+        self.running.add(task)
+        task.add_done_callback(self.running.discard)
+        return True
+
+    async def _run_claimed(self, job: Dict[str, Any]):
+        """Execute a claimed job while heartbeating its lease, then release it"""
+        job_id = job["_id"]
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            logger.info(f"▶️ Executing dynamic job: {job['name']} (worker {self.worker_id})")
+            await self.executor.execute_job(job, triggered_by=job.get("triggered_by", "scheduler"))
+        except Exception as e:
+            logger.error(f"❌ Error executing dynamic job {job['name']}: {e}", exc_info=True)
+        finally:
+            heartbeat.cancel()
+            try:
+                # Moves nextRunAt forward even if the execution record could not be written
+                await self.registry.update_job_after_execution(job_id, {})
+                await self.registry.release_lease(job_id, self.worker_id)
+            except Exception as e:
+                logger.error(f"❌ Error releasing lease for job {job['name']}: {e}")
+
+    async def _heartbeat(self, job: Dict[str, Any]):
+        interval = max(1, self.lease_seconds // 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await self.registry.renew_lease(job["_id"], self.worker_id, self.lease_seconds):
+                    logger.warning(f"⚠️ Lost lease on job {job['name']}; another worker may run it")
+                    return
+            except Exception as e:
+                logger.warning(f"⚠️ Lease heartbeat failed for job {job['name']}: {e}")
+
+
+async def run_worker(concurrency: int, processes: int, once: bool = False):
+    from config import settings
+    from database import connect_to_mongo, close_mongo_connection, get_database
+    from job_templates.registry import initialize_templates
+
+    initialize_templates()
+    await connect_to_mongo()
+
+    # spawn: children must not inherit the parent's event loop or Mongo client
+    process_pool = ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("spawn")
+    ) if processes > 0 else None
+
+    worker = JobWorker(
+        get_database(),
+        concurrency=concurrency,
+        lease_seconds=settings.job_lease_seconds,
+        process_pool=process_pool
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            pass
+
+    try:
+        if once:
+            count = await worker.run_due_jobs()
+            logger.info(f"✅ Ran {count} due job(s)")
+        else:
+            await worker.run_forever()
+    finally:
+        if process_pool:
+            process_pool.shutdown(wait=True)
+        await close_mongo_connection()
+
+
+def main():
+    from config import settings
+
+    parser = argparse.ArgumentParser(description="Run dynamic scheduler jobs outside the API process")
+    parser.add_argument("--concurrency", type=int, default=settings.job_worker_concurrency,
+                        help="Jobs to run at once")
+    parser.add_argument("--processes", type=int, default=settings.job_worker_processes,
+                        help="Process pool size for cpu_bound templates (0 runs them in the event loop)")
+    parser.add_argument("--once", action="store_true", help="Run the currently due jobs and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(run_worker(args.concurrency, args.processes, once=args.once))
+
+
+if __name__ == "__main__":
+    main()
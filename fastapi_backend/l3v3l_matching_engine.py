@@ -26,6 +26,63 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+
+class _Codebook:
+    """Assigns dense integer codes to raw field values (equal values share a code)"""
+    
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+    
+    def code(self, value) -> int:
+        try:
+            key = (0, value)
+            hash(key)
+        except TypeError:
+            key = (1, repr(value))  # Unhashable values compare by repr
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.values)
+            self.values.append(value)
+        return code
+    
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+def _contains(value, token) -> Tuple[bool, bool]:
+    """Evaluate `token in value` the way the pairwise scorer does; returns (result, raised)"""
+    try:
+        return bool(token in value), False
+    except TypeError:
+        return False, True
+
+
+def _multi_hot(code_sets: List[set], width: int) -> np.ndarray:
+    """Build a boolean (rows x width) matrix from per-row sets of codes"""
+    matrix = np.zeros((len(code_sets), max(width, 1)), dtype=bool)
+    for row, codes in enumerate(code_sets):
+        if codes:
+            matrix[row, list(codes)] = True
+    return matrix
+
+
+class L3V3LProfileFeatures:
+    """
+    Columnar encoding of a list of profiles for batch scoring.
+    
+    Built once by L3V3LMatchingEngine.encode_profiles(); every attribute is a
+    NumPy array indexed by profile position (categorical fields are integer
+    codes, text fields are keyword masks, list fields are multi-hot matrices).
+    """
+    
+    def __init__(self, profiles: List[Dict]):
+        self.profiles = profiles
+        self.size = len(profiles)
+    
+    def __len__(self) -> int:
+        return self.size
+
 class L3V3LMatchingEngine:
     """
     Comprehensive matching engine using ML techniques to calculate compatibility scores
@@ -304,26 +361,7 @@ class L3V3LMatchingEngine:
         if 'ageRange' in criteria or 'ageRangeRelative' in criteria:
             age = self._calculate_age(profile)
             if age:
-                # Try absolute range first
-                min_age_val = criteria.get('ageRange', {}).get('min', '')
-                max_age_val = criteria.get('ageRange', {}).get('max', '')
-                
-                # If absolute range is empty, calculate from relative range
-                if not min_age_val or not max_age_val:
-                    if criteria_owner and 'ageRangeRelative' in criteria:
-                        owner_age = self._calculate_age(criteria_owner)
-                        if owner_age:
-                            relative = criteria['ageRangeRelative']
-                            min_age = owner_age + relative.get('minOffset', -5)
-                            max_age = owner_age + relative.get('maxOffset', 5)
-                        else:
-                            min_age, max_age = 18, 100  # Fallback
-                    else:
-                        min_age, max_age = 18, 100  # Fallback
-                else:
-                    # Use absolute range
-                    min_age = int(min_age_val) if min_age_val not in ['', None] else 18
-                    max_age = int(max_age_val) if max_age_val not in ['', None] else 100
+                min_age, max_age = self._resolve_age_range(criteria, criteria_owner)
                 
                 # Score based on range
                 if min_age <= age <= max_age:
@@ -336,33 +374,7 @@ class L3V3LMatchingEngine:
         if 'heightRange' in criteria or 'heightRangeRelative' in criteria:
             height_inches = self._height_to_inches(profile.get('height', ''))
             if height_inches:
-                # Try absolute range first
-                height_range = criteria.get('heightRange', {})
-                min_feet = height_range.get('minFeet', '')
-                min_inches_part = height_range.get('minInches', '')
-                max_feet = height_range.get('maxFeet', '')
-                max_inches_part = height_range.get('maxInches', '')
-                
-                # Check if absolute range is empty
-                if not min_feet or not max_feet:
-                    # Use relative range if available
-                    if criteria_owner and 'heightRangeRelative' in criteria:
-                        owner_height_inches = self._height_to_inches(criteria_owner.get('height', ''))
-                        if owner_height_inches:
-                            relative = criteria['heightRangeRelative']
-                            min_height = owner_height_inches + relative.get('minInches', -6)
-                            max_height = owner_height_inches + relative.get('maxInches', 6)
-                        else:
-                            min_height, max_height = 48, 84  # 4'0" to 7'0" fallback
-                    else:
-                        min_height, max_height = 48, 84  # Fallback
-                else:
-                    # Convert absolute range to inches
-                    try:
-                        min_height = int(min_feet) * 12 + int(min_inches_part or 0)
-                        max_height = int(max_feet) * 12 + int(max_inches_part or 0)
-                    except (ValueError, TypeError):
-                        min_height, max_height = 48, 84  # Fallback on error
+                min_height, max_height = self._resolve_height_range(criteria, criteria_owner)
                 
                 # Score based on range
                 if min_height <= height_inches <= max_height:
@@ -407,6 +419,52 @@ class L3V3LMatchingEngine:
         
         return score / checks if checks > 0 else 0.8
     
+    def _resolve_age_range(self, criteria: Dict, criteria_owner: Dict = None) -> Tuple[int, int]:
+        """Resolve the age bounds of partner criteria (absolute range first, then relative)"""
+        min_age_val = criteria.get('ageRange', {}).get('min', '')
+        max_age_val = criteria.get('ageRange', {}).get('max', '')
+        
+        # If absolute range is empty, calculate from relative range
+        if not min_age_val or not max_age_val:
+            if criteria_owner and 'ageRangeRelative' in criteria:
+                owner_age = self._calculate_age(criteria_owner)
+                if owner_age:
+                    relative = criteria['ageRangeRelative']
+                    return (owner_age + relative.get('minOffset', -5),
+                            owner_age + relative.get('maxOffset', 5))
+            return 18, 100  # Fallback
+        
+        # Use absolute range
+        min_age = int(min_age_val) if min_age_val not in ['', None] else 18
+        max_age = int(max_age_val) if max_age_val not in ['', None] else 100
+        return min_age, max_age
+    
+    def _resolve_height_range(self, criteria: Dict, criteria_owner: Dict = None) -> Tuple[float, float]:
+        """Resolve the height bounds (inches) of partner criteria (absolute range first, then relative)"""
+        height_range = criteria.get('heightRange', {})
+        min_feet = height_range.get('minFeet', '')
+        min_inches_part = height_range.get('minInches', '')
+        max_feet = height_range.get('maxFeet', '')
+        max_inches_part = height_range.get('maxInches', '')
+        
+        # Check if absolute range is empty
+        if not min_feet or not max_feet:
+            # Use relative range if available
+            if criteria_owner and 'heightRangeRelative' in criteria:
+                owner_height_inches = self._height_to_inches(criteria_owner.get('height', ''))
+                if owner_height_inches:
+                    relative = criteria['heightRangeRelative']
+                    return (owner_height_inches + relative.get('minInches', -6),
+                            owner_height_inches + relative.get('maxInches', 6))
+            return 48, 84  # 4'0" to 7'0" fallback
+        
+        # Convert absolute range to inches
+        try:
+            return (int(min_feet) * 12 + int(min_inches_part or 0),
+                    int(max_feet) * 12 + int(max_inches_part or 0))
+        except (ValueError, TypeError):
+            return 48, 84  # Fallback on error
+    
     def _score_habits_personality(self, user1: Dict, user2: Dict) -> float:
         """Score lifestyle and personality compatibility"""
         score = 0.0
@@ -854,5 +912,566 @@ class L3V3LMatchingEngine:
         return {'score': total, 'level': level, 'isQuickScore': True}
 
 
+    # ===== BATCH SCORING =====
+    
+    EMOTIONAL_KEYWORDS = ['honest', 'open', 'caring', 'understanding',
+                          'supportive', 'kind', 'empathetic', 'loyal']
+    POSITIVE_TRAITS = ['fun', 'funny', 'humor', 'adventure', 'travel',
+                       'growth', 'ambitious', 'positive', 'optimistic']
+    
+    def score_many(self, user: Dict, candidates: List[Dict], include_reasons: bool = True) -> List[Dict]:
+        """
+        Score one user against many candidates in a single vectorized pass
+        
+        Equivalent to [calculate_match_score(user, c) for c in candidates], but the
+        profiles are encoded into columnar arrays once and all eight component
+        scores are computed with NumPy operations.
+        
+        Args:
+            user: The user being matched (user1 in calculate_match_score)
+            candidates: Candidate profiles (user2 in calculate_match_score)
+            include_reasons: Build match_reasons for each result (skip for bulk storage)
+            
+        Returns:
+            List of result dicts, aligned with candidates
+        """
+        if not candidates:
+            return []
+        features = self.encode_profiles([user] + list(candidates))
+        return self.score_encoded(features, 0, np.arange(1, len(features)), include_reasons)
+    
+    def encode_profiles(self, profiles: List[Dict]) -> L3V3LProfileFeatures:
+        """
+        Encode profiles into columnar feature arrays for score_encoded()
+        
+        A profile whose fields would make calculate_match_score raise is flagged
+        as invalid, so every pair involving it scores 0 / 'Unknown' just like the
+        pairwise error path.
+        """
+        n = len(profiles)
+        f = L3V3LProfileFeatures(profiles)
+        
+        codebooks = {name: _Codebook() for name in (
+            'family_values', 'location', 'work_location', 'raw', 'education', 'religion',
+            'eating', 'language', 'nature'
+        )}
+        raw = codebooks['raw']
+        
+        def flags():
+            return np.zeros(n, dtype=bool)
+        
+        def codes():
+            return np.zeros(n, dtype=np.int64)
+        
+        def numbers():
+            return np.zeros(n, dtype=np.float64)
+        
+        f.invalid = flags()
+        f.gender = codes()                     # 1 = male, 2 = female, 0 = other/missing
+        f.is_male = flags()                    # raw gender == 'Male' (physical scoring direction)
+        
+        # L3V3L pillars
+        f.fv_lower, f.has_fv_lower = codes(), flags()
+        f.fv_traditional, f.fv_moderate, f.fv_liberal = flags(), flags(), flags()
+        f.has_partner_text, f.has_about = flags(), flags()
+        f.partner_keywords = np.zeros((n, len(self.EMOTIONAL_KEYWORDS)), dtype=bool)
+        f.about_traits = np.zeros((n, len(self.POSITIVE_TRAITS)), dtype=bool)
+        language_sets = [set() for _ in range(n)]
+        
+        # Demographics
+        f.origin, f.residence, f.state = codes(), codes(), codes()
+        f.residence_us = flags()
+        f.location, f.has_location = codes(), flags()
+        f.citizenship, f.has_citizenship = codes(), flags()
+        
+        # Partner criteria (owner side) and matching profile attributes
+        f.has_criteria = flags()
+        f.crit_age_on, f.crit_age_err = flags(), flags()
+        f.crit_age_min, f.crit_age_max = numbers(), numbers()
+        f.crit_height_on, f.crit_height_err = flags(), flags()
+        f.crit_height_min, f.crit_height_max = numbers(), numbers()
+        f.crit_edu_on, f.crit_edu_list = flags(), flags()
+        f.crit_religion_on, f.crit_eating_on, f.crit_language_on = flags(), flags(), flags()
+        crit_edu_sets = [set() for _ in range(n)]
+        crit_religion_sets = [set() for _ in range(n)]
+        crit_eating_sets = [set() for _ in range(n)]
+        crit_language_sets = [set() for _ in range(n)]
+        f.age, f.has_age = numbers(), flags()
+        f.height, f.height_int, f.has_height = numbers(), numbers(), flags()
+        f.edu_label, f.has_edu_label = codes(), flags()
+        f.religion_value, f.eating_value = codes(), codes()
+        
+        # Habits & personality
+        f.has_eating, f.eating_veg, f.eating_egg = flags(), flags(), flags()
+        f.eating_nonveg, f.eating_nonveg_err = flags(), flags()
+        f.family_type, f.has_family_type = codes(), flags()
+        f.mother_tongue, f.has_mother_tongue = codes(), flags()
+        
+        # Career & education
+        f.edu_level = numbers()
+        f.has_profession, f.profession_shifts = flags(), flags()
+        f.profession_stress, f.profession_nature = numbers(), codes()
+        f.work_location, f.has_work_location = codes(), flags()
+        
+        # Cultural factors
+        f.has_religion, f.religion_none, f.religion_none_err = flags(), flags(), flags()
+        f.caste, f.has_caste, f.caste_pref_set = codes(), flags(), flags()
+        f.caste_pref_any, f.caste_pref_any_err = flags(), flags()
+        f.has_origin = flags()
+        f.family_values, f.has_family_values, f.family_values_err = codes(), flags(), flags()
+        f.fv_raw_traditional, f.fv_raw_moderate, f.fv_raw_liberal = flags(), flags(), flags()
+        
+        for i, user in enumerate(profiles):
+            try:
+                gender = self._safe_lower(user.get('gender'))
+                f.gender[i] = 1 if gender == 'male' else 2 if gender == 'female' else 0
+                f.is_male[i] = user.get('gender') == 'Male'
+                
+                family_values = self._safe_lower(user.get('familyValues'))
+                if family_values:
+                    f.has_fv_lower[i] = True
+                    f.fv_lower[i] = codebooks['family_values'].code(family_values)
+                    f.fv_traditional[i] = 'traditional' in family_values
+                    f.fv_moderate[i] = 'moderate' in family_values
+                    f.fv_liberal[i] = 'liberal' in family_values
+                partner_text = self._safe_lower(user.get('partnerPreference'))
+                if partner_text:
+                    f.has_partner_text[i] = True
+                    f.partner_keywords[i] = [k in partner_text for k in self.EMOTIONAL_KEYWORDS]
+                about = self._safe_lower(user.get('aboutMe'))
+                if about:
+                    f.has_about[i] = True
+                    f.about_traits[i] = [t in about for t in self.POSITIVE_TRAITS]
+                language_sets[i] = {codebooks['language'].code(lang)
+                                    for lang in set(user.get('languagesSpoken', []))}
+                
+                f.origin[i] = raw.code(user.get('countryOfOrigin'))
+                f.residence[i] = raw.code(user.get('countryOfResidence'))
+                f.state[i] = raw.code(user.get('state'))
+                f.residence_us[i] = user.get('countryOfResidence') == 'US'
+                location = self._safe_lower(user.get('location'))
+                if location:
+                    f.has_location[i] = True
+                    f.location[i] = codebooks['location'].code(location)
+                citizenship = user.get('citizenshipStatus', '')
+                if citizenship:
+                    f.has_citizenship[i] = True
+                    f.citizenship[i] = raw.code(citizenship)
+                
+                age = self._calculate_age(user)
+                if age:
+                    f.has_age[i] = True
+                    f.age[i] = age
+                height = self._height_to_inches(user.get('height', ''))
+                if height:
+                    f.has_height[i] = True
+                    f.height[i] = height
+                    f.height_int[i] = int(height)
+                edu_label = self._extract_education_level(user)
+                f.has_edu_label[i] = bool(edu_label)
+                f.edu_label[i] = codebooks['education'].code(edu_label)
+                f.religion_value[i] = codebooks['religion'].code(user.get('religion'))
+                f.eating_value[i] = codebooks['eating'].code(user.get('eatingPreference'))
+                
+                criteria = user.get('partnerCriteria', {})
+                if criteria:
+                    if not isinstance(criteria, dict):
+                        raise TypeError("partnerCriteria is not a dict")
+                    f.has_criteria[i] = True
+                    if 'ageRange' in criteria or 'ageRangeRelative' in criteria:
+                        f.crit_age_on[i] = True
+                        try:
+                            f.crit_age_min[i], f.crit_age_max[i] = self._resolve_age_range(criteria, user)
+                        except Exception:
+                            f.crit_age_err[i] = True  # Raises only against profiles with an age
+                    if 'heightRange' in criteria or 'heightRangeRelative' in criteria:
+                        f.crit_height_on[i] = True
+                        try:
+                            f.crit_height_min[i], f.crit_height_max[i] = self._resolve_height_range(criteria, user)
+                        except Exception:
+                            f.crit_height_err[i] = True
+                    if 'educationLevel' in criteria:
+                        f.crit_edu_on[i] = True
+                        if isinstance(criteria['educationLevel'], list):
+                            f.crit_edu_list[i] = True
+                            crit_edu_sets[i] = {codebooks['education'].code(v) for v in criteria['educationLevel']}
+                    if 'religion' in criteria and isinstance(criteria['religion'], list):
+                        f.crit_religion_on[i] = True
+                        crit_religion_sets[i] = {codebooks['religion'].code(v) for v in criteria['religion']}
+                    if 'languages' in criteria:
+                        f.crit_language_on[i] = True
+                        crit_language_sets[i] = {codebooks['language'].code(v)
+                                                 for v in set(criteria.get('languages', []))}
+                    if 'eatingPreference' in criteria and isinstance(criteria['eatingPreference'], list):
+                        f.crit_eating_on[i] = True
+                        crit_eating_sets[i] = {codebooks['eating'].code(v) for v in criteria['eatingPreference']}
+                
+                eating = user.get('eatingPreference', '')
+                if eating:
+                    f.has_eating[i] = True
+                    f.eating_veg[i] = eating == 'Vegetarian'
+                    f.eating_egg[i] = eating == 'Eggetarian'
+                    f.eating_nonveg[i], f.eating_nonveg_err[i] = _contains(eating, 'Non-Veg')
+                family_type = user.get('familyType', '')
+                if family_type:
+                    f.has_family_type[i] = True
+                    f.family_type[i] = raw.code(family_type)
+                mother_tongue = user.get('motherTongue', '')
+                if mother_tongue:
+                    f.has_mother_tongue[i] = True
+                    f.mother_tongue[i] = raw.code(mother_tongue)
+                
+                f.edu_level[i] = self._get_education_numeric(user) or 0
+                profession = self._analyze_profession(user)
+                if profession:
+                    stress = profession.get('stress', 5)
+                    f.has_profession[i] = True
+                    f.profession_stress[i] = int(stress) if stress not in ['', None] else 5
+                    f.profession_shifts[i] = profession['shifts']
+                    f.profession_nature[i] = codebooks['nature'].code(profession['nature'])
+                work_location = self._safe_lower(user.get('workLocation'))
+                if work_location:
+                    f.has_work_location[i] = True
+                    f.work_location[i] = codebooks['work_location'].code(work_location)
+                
+                religion = user.get('religion', '')
+                if religion:
+                    f.has_religion[i] = True
+                    f.religion_none[i], f.religion_none_err[i] = _contains(religion, 'No Religion')
+                caste = user.get('caste', '')
+                if caste:
+                    f.has_caste[i] = True
+                    f.caste[i] = raw.code(caste)
+                caste_pref = user.get('castePreference', 'None')
+                f.caste_pref_set[i] = caste_pref != 'None'
+                f.caste_pref_any[i], f.caste_pref_any_err[i] = _contains(caste_pref, 'Any')
+                f.has_origin[i] = bool(user.get('countryOfOrigin', ''))
+                family_values_raw = user.get('familyValues', '')
+                if family_values_raw:
+                    f.has_family_values[i] = True
+                    f.family_values[i] = raw.code(family_values_raw)
+                    traditional, err1 = _contains(family_values_raw, 'Traditional')
+                    moderate, err2 = _contains(family_values_raw, 'Moderate')
+                    liberal, err3 = _contains(family_values_raw, 'Liberal')
+                    f.fv_raw_traditional[i], f.fv_raw_moderate[i], f.fv_raw_liberal[i] = traditional, moderate, liberal
+                    f.family_values_err[i] = err1 or err2 or err3
+            except Exception as e:
+                logger.debug(f"Profile {user.get('username') if isinstance(user, dict) else user} "
+                             f"cannot be batch-encoded: {e}")
+                f.invalid[i] = True
+        
+        f.languages = _multi_hot(language_sets, len(codebooks['language']))
+        f.language_count = f.languages.sum(axis=1)
+        f.crit_languages = _multi_hot(crit_language_sets, len(codebooks['language']))
+        f.crit_edu = _multi_hot(crit_edu_sets, len(codebooks['education']))
+        f.crit_religion = _multi_hot(crit_religion_sets, len(codebooks['religion']))
+        f.crit_eating = _multi_hot(crit_eating_sets, len(codebooks['eating']))
+        f.location_values = codebooks['location'].values
+        f.work_location_values = codebooks['work_location'].values
+        return f
+    
+    def score_encoded(self, features: L3V3LProfileFeatures, user_index: int,
+                      candidate_indices, include_reasons: bool = True) -> List[Dict]:
+        """
+        Score features[user_index] against features[candidate_indices] (one row of the score matrix)
+        
+        Lets a full rebuild encode every active profile once and reuse the
+        encoding for each user. Results are aligned with candidate_indices.
+        """
+        candidates = np.asarray(candidate_indices, dtype=np.int64)
+        users = np.full(len(candidates), user_index, dtype=np.int64)
+        return self.score_pairs(features, users, candidates, include_reasons)
+    
+    def score_column(self, features: L3V3LProfileFeatures, candidate_index: int,
+                     user_indices, include_reasons: bool = True) -> List[Dict]:
+        """
+        Score every features[user_indices] against features[candidate_index] (one column of the score matrix)
+        
+        Results are aligned with user_indices.
+        """
+        users = np.asarray(user_indices, dtype=np.int64)
+        candidates = np.full(len(users), candidate_index, dtype=np.int64)
+        return self.score_pairs(features, users, candidates, include_reasons)
+    
+    def score_pairs(self, features: L3V3LProfileFeatures, user_indices, candidate_indices,
+                    include_reasons: bool = True) -> List[Dict]:
+        """
+        Vectorized calculate_match_score(features[u], features[c]) for aligned index arrays
+        """
+        f = features
+        u = np.asarray(user_indices, dtype=np.int64)
+        c = np.asarray(candidate_indices, dtype=np.int64)
+        if len(c) == 0:
+            return []
+        
+        error = f.invalid[u] | f.invalid[c]
+        scores = {}
+        
+        # 1. Gender
+        opposite = ((f.gender[u] == 1) & (f.gender[c] == 2)) | ((f.gender[u] == 2) & (f.gender[c] == 1))
+        scores['gender'] = opposite.astype(np.float64)
+        
+        scores['l3v3l_pillars'] = self._batch_pillars(f, u, c)
+        scores['demographics'] = self._batch_demographics(f, u, c)
+        
+        # 4. Partner preferences (bi-directional)
+        score1, err1 = self._batch_criteria(f, profiles=c, owners=u)
+        score2, err2 = self._batch_criteria(f, profiles=u, owners=c)
+        scores['partner_preferences'] = (score1 + score2) / 2.0
+        error |= err1 | err2
+        
+        scores['habits_personality'], err = self._batch_habits(f, u, c)
+        error |= err
+        scores['career_education'] = self._batch_career(f, u, c)
+        scores['physical_attributes'] = self._batch_physical(f, u, c)
+        scores['cultural_factors'], err = self._batch_cultural(f, u, c)
+        error |= err
+        
+        # Accumulate in the same order as calculate_match_score for identical rounding
+        total = np.zeros(len(c))
+        for key in scores:
+            total = total + scores[key] * self.WEIGHTS[key]
+        total = total * 100
+        
+        results = []
+        keys = list(scores.keys())
+        columns = [scores[key].tolist() for key in keys]
+        totals = total.tolist()
+        for j, row_error in enumerate(error.tolist()):
+            if row_error:
+                results.append({
+                    'total_score': 0,
+                    'component_scores': {},
+                    'compatibility_level': 'Unknown',
+                    'match_reasons': []
+                })
+                continue
+            row_scores = {key: column[j] for key, column in zip(keys, columns)}
+            results.append({
+                'total_score': round(totals[j], 2),
+                'component_scores': {k: round(v * 100, 2) for k, v in row_scores.items()},
+                'compatibility_level': self._get_compatibility_level(totals[j]),
+                'match_reasons': self._generate_match_reasons(
+                    row_scores, f.profiles[u[j]], f.profiles[c[j]]
+                ) if include_reasons else []
+            })
+        return results
+    
+    @staticmethod
+    def _near_text(values: List[str], source_codes: np.ndarray, other_codes: np.ndarray,
+                   symmetric: bool) -> np.ndarray:
+        """Word-overlap check (see _score_demographics) evaluated once per distinct pair of values"""
+        width = len(values) + 1
+        unique, inverse = np.unique(source_codes * width + other_codes, return_inverse=True)
+        near = []
+        for key in unique.tolist():
+            source_code, other_code = divmod(key, width)
+            source = values[source_code] if source_code < len(values) else ''
+            other = values[other_code] if other_code < len(values) else ''
+            hit = any(word in other for word in source.split())
+            if symmetric and not hit:
+                hit = any(word in source for word in other.split())
+            near.append(hit)
+        return np.asarray(near, dtype=bool)[inverse]
+    
+    def _batch_pillars(self, f: L3V3LProfileFeatures, u: np.ndarray, c: np.ndarray) -> np.ndarray:
+        """Vectorized _score_l3v3l_pillars"""
+        score = np.zeros(len(c))
+        factors = np.zeros(len(c))
+        
+        both = f.has_fv_lower[u] & f.has_fv_lower[c]
+        partial = (f.fv_traditional[u] & f.fv_moderate[c]) | (f.fv_moderate[u] & f.fv_liberal[c])
+        value = np.where(f.fv_lower[c] == f.fv_lower[u], 1.0, np.where(partial, 0.7, 0.0))
+        score = score + np.where(both, value, 0.0)
+        factors = factors + both
+        
+        for has, masks in ((f.has_partner_text, f.partner_keywords), (f.has_about, f.about_traits)):
+            both = has[u] & has[c]
+            matches = (masks[c] & masks[u]).sum(axis=1)
+            value = np.where(matches > 0, np.minimum(matches / masks.shape[1], 1.0), 0.0)
+            score = score + np.where(both, value, 0.0)
+            factors = factors + both
+        
+        both = (f.language_count[u] > 0) & (f.language_count[c] > 0)
+        common = (f.languages[c] & f.languages[u]).sum(axis=1)
+        largest = np.maximum(np.maximum(f.language_count[c], f.language_count[u]), 1)
+        value = np.where(common > 0, common / largest, 0.0)
+        score = score + np.where(both, value, 0.0)
+        factors = factors + both
+        
+        return np.where(factors > 0, score / np.maximum(factors, 1), 0.5)
+    
+    def _batch_demographics(self, f: L3V3LProfileFeatures, u: np.ndarray, c: np.ndarray) -> np.ndarray:
+        """Vectorized _score_demographics"""
+        score = np.where(f.origin[c] == f.origin[u], 1.0, 0.5)
+        factors = np.ones(len(c))
+        
+        same_country = f.residence[c] == f.residence[u]
+        score = score + np.where(same_country, 1.0, 0.3)
+        factors = factors + 1
+        
+        same_state = same_country & (f.state[c] == f.state[u])
+        score = score + np.where(same_state, 1.0, 0.0)
+        factors = factors + same_state
+        
+        both = same_state & f.has_location[u] & f.has_location[c]
+        if both.any():
+            near = self._near_text(f.location_values, f.location[u], f.location[c], symmetric=True)
+            value = np.where(f.location[c] == f.location[u], 1.0, np.where(near, 0.7, 0.0))
+            score = score + np.where(both, value, 0.0)
+            factors = factors + both
+        
+        both = f.residence_us[u] & f.residence_us[c] & f.has_citizenship[u] & f.has_citizenship[c]
+        value = np.where(f.citizenship[c] == f.citizenship[u], 1.0, 0.7)
+        score = score + np.where(both, value, 0.0)
+        factors = factors + both
+        
+        return score / factors
+    
+    def _batch_criteria(self, f: L3V3LProfileFeatures, profiles: np.ndarray,
+                        owners: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized _check_matches_criteria(profile, owner criteria, owner); returns (scores, errors)"""
+        score = np.zeros(len(profiles))
+        checks = np.zeros(len(profiles))
+        error = np.zeros(len(profiles), dtype=bool)
+        
+        for on, has, value, lo, hi, err in (
+            (f.crit_age_on, f.has_age, f.age, f.crit_age_min, f.crit_age_max, f.crit_age_err),
+            (f.crit_height_on, f.has_height, f.height, f.crit_height_min, f.crit_height_max, f.crit_height_err),
+        ):
+            active = on[owners] & has[profiles]
+            x, low, high = value[profiles], lo[owners], hi[owners]
+            in_range = (low <= x) & (x <= high)
+            close = (low - 2 <= x) & (x <= high + 2)
+            score = score + np.where(active, np.where(in_range, 1.0, np.where(close, 0.7, 0.0)), 0.0)
+            checks = checks + active
+            error |= active & err[owners]
+        
+        on = f.crit_edu_on[owners]
+        listed = f.crit_edu_list[owners] & f.crit_edu[owners, f.edu_label[profiles]]
+        score = score + np.where(on & listed, 1.0, 0.0)
+        checks = checks + (on & (listed | f.has_edu_label[profiles]))
+        
+        on = f.crit_religion_on[owners]
+        score = score + np.where(on & f.crit_religion[owners, f.religion_value[profiles]], 1.0, 0.0)
+        checks = checks + on
+        
+        hit = f.crit_language_on[owners] & (f.languages[profiles] & f.crit_languages[owners]).any(axis=1)
+        score = score + np.where(hit, 1.0, 0.0)
+        checks = checks + hit
+        
+        on = f.crit_eating_on[owners]
+        score = score + np.where(on & f.crit_eating[owners, f.eating_value[profiles]], 1.0, 0.0)
+        checks = checks + on
+        
+        result = np.where(checks > 0, score / np.maximum(checks, 1), 0.8)
+        return np.where(f.has_criteria[owners], result, 0.8), error
+    
+    def _batch_habits(self, f: L3V3LProfileFeatures, u: np.ndarray, c: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized _score_habits_personality; returns (scores, errors)"""
+        both = f.has_eating[u] & f.has_eating[c]
+        same = f.eating_value[c] == f.eating_value[u]
+        close = (f.eating_veg[u] & f.eating_egg[c]) | (f.eating_egg[u] & f.eating_veg[c])
+        nonveg = f.eating_nonveg[u] | f.eating_nonveg[c]
+        value = np.where(same, 1.0, np.where(close, 0.8, np.where(nonveg, 0.6, 0.0)))
+        score = np.where(both, value, 0.0)
+        factors = both.astype(np.float64)
+        reached = both & ~same & ~close
+        error = reached & (f.eating_nonveg_err[u] | (~f.eating_nonveg[u] & f.eating_nonveg_err[c]))
+        
+        both = f.has_family_type[u] & f.has_family_type[c]
+        score = score + np.where(both, np.where(f.family_type[c] == f.family_type[u], 1.0, 0.7), 0.0)
+        factors = factors + both
+        
+        both = f.has_mother_tongue[u] & f.has_mother_tongue[c]
+        score = score + np.where(both & (f.mother_tongue[c] == f.mother_tongue[u]), 1.0, 0.0)
+        factors = factors + both
+        
+        return np.where(factors > 0, score / np.maximum(factors, 1), 0.5), error
+    
+    def _batch_career(self, f: L3V3LProfileFeatures, u: np.ndarray, c: np.ndarray) -> np.ndarray:
+        """Vectorized _score_career_education"""
+        both = (f.edu_level[u] > 0) & (f.edu_level[c] > 0)
+        diff = np.abs(f.edu_level[u] - f.edu_level[c])
+        value = np.where(diff == 0, 1.0, np.where(diff == 1, 0.9, np.where(diff == 2, 0.7, 0.5)))
+        score = np.where(both, value, 0.0)
+        factors = both.astype(np.float64)
+        
+        both = f.has_profession[u] & f.has_profession[c]
+        stress_diff = np.abs(f.profession_stress[u] - f.profession_stress[c])
+        value = np.where(stress_diff <= 2, 1.0, np.where(stress_diff <= 4, 0.7, 0.4))
+        score = score + np.where(both, value, 0.0)
+        factors = factors + both
+        value = np.where(f.profession_shifts[c] == f.profession_shifts[u], 1.0, 0.6)
+        score = score + np.where(both, value, 0.0)
+        factors = factors + both
+        value = np.where(f.profession_nature[c] == f.profession_nature[u], 0.8, 0.6)
+        score = score + np.where(both, value, 0.0)
+        factors = factors + both
+        
+        both = f.has_work_location[u] & f.has_work_location[c]
+        if both.any():
+            near = self._near_text(f.work_location_values, f.work_location[u], f.work_location[c],
+                                   symmetric=False)
+            value = np.where(f.work_location[c] == f.work_location[u], 1.0, np.where(near, 0.7, 0.0))
+            score = score + np.where(both, value, 0.0)
+            factors = factors + both
+        
+        return np.where(factors > 0, score / np.maximum(factors, 1), 0.5)
+    
+    def _batch_physical(self, f: L3V3LProfileFeatures, u: np.ndarray, c: np.ndarray) -> np.ndarray:
+        """Vectorized _score_physical_attributes"""
+        sign = np.where(f.is_male[u], 1.0, -1.0)  # Male user1: user1 - user2, else user2 - user1
+        
+        both = f.has_height[u] & f.has_height[c]
+        diff = sign * (f.height_int[u] - f.height_int[c])
+        value = np.where((1 <= diff) & (diff <= 3), 1.0,
+                         np.where((0 <= diff) & (diff <= 5), 0.8, np.where(diff < 0, 0.5, 0.6)))
+        score = np.where(both, value, 0.0)
+        factors = both.astype(np.float64)
+        
+        both = f.has_age[u] & f.has_age[c]
+        diff = sign * (f.age[u] - f.age[c])
+        value = np.where((-1 <= diff) & (diff <= 3), 1.0,
+                         np.where((-2 <= diff) & (diff <= 5), 0.8, np.where(diff < -2, 0.6, 0.7)))
+        score = score + np.where(both, value, 0.0)
+        factors = factors + both
+        
+        return np.where(factors > 0, score / np.maximum(factors, 1), 0.5)
+    
+    def _batch_cultural(self, f: L3V3LProfileFeatures, u: np.ndarray, c: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized _score_cultural_factors; returns (scores, errors)"""
+        both = f.has_religion[u] & f.has_religion[c]
+        same = f.religion_value[c] == f.religion_value[u]
+        none = f.religion_none[u] | f.religion_none[c]
+        score = np.where(both, np.where(same, 1.0, np.where(none, 0.7, 0.3)), 0.0)
+        factors = both.astype(np.float64)
+        error = both & ~same & (f.religion_none_err[u] | (~f.religion_none[u] & f.religion_none_err[c]))
+        
+        both = (f.has_caste[u] & f.has_caste[c] & f.caste_pref_set[u] & f.caste_pref_set[c])
+        same = f.caste[c] == f.caste[u]
+        any_pref = f.caste_pref_any[u] | f.caste_pref_any[c]
+        score = score + np.where(both, np.where(same, 1.0, np.where(any_pref, 0.9, 0.4)), 0.0)
+        factors = factors + both
+        error |= both & ~same & (f.caste_pref_any_err[u] | (~f.caste_pref_any[u] & f.caste_pref_any_err[c]))
+        
+        both = f.has_origin[u] & f.has_origin[c]
+        score = score + np.where(both, np.where(f.origin[c] == f.origin[u], 1.0, 0.6), 0.0)
+        factors = factors + both
+        
+        both = f.has_family_values[u] & f.has_family_values[c]
+        same = f.family_values[c] == f.family_values[u]
+        close = ((f.fv_raw_traditional[u] & f.fv_raw_moderate[c]) |
+                 (f.fv_raw_moderate[u] & f.fv_raw_traditional[c]))
+        near = ((f.fv_raw_moderate[u] & f.fv_raw_liberal[c]) |
+                (f.fv_raw_liberal[u] & f.fv_raw_moderate[c]))
+        value = np.where(same, 1.0, np.where(close, 0.8, np.where(near, 0.7, 0.5)))
+        score = score + np.where(both, value, 0.0)
+        factors = factors + both
+        error |= both & ~same & (f.family_values_err[u] | f.family_values_err[c])
+        
+        return np.where(factors > 0, score / np.maximum(factors, 1), 0.5), error
+
+
 # Global instance
 matching_engine = L3V3LMatchingEngine()
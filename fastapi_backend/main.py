@@ -66,6 +66,7 @@ from config import settings
 from websocket_manager import sio
 from sse_manager import sse_manager
 from middleware.session_validation import validate_session_middleware
+from middleware.auth_context import auth_context_middleware
 from middleware.rate_limiter import limiter, rate_limit_exceeded_handler
 from middleware.cache_control import add_cache_control_middleware
 from slowapi.errors import RateLimitExceeded
@@ -171,6 +172,10 @@ async def lifespan(app: FastAPI):
     else:
         logger.warning("⚠️ Redis connection failed - online status features may not work")
     
+    # Async Redis pool for async handlers (online status, typing, caches)
+    from async_redis_manager import async_redis_manager
+    await async_redis_manager.connect()
+    
     # Initialize SSE Manager
     await sse_manager.initialize()
     logger.info("✅ SSE Manager initialized for real-time messaging")
@@ -290,6 +295,72 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"⚠️ Messenger index creation failed (non-critical): {e}")
 
+    # Media index: owner lookups for /media are served by _id; the owner index
+    # backs per-user rebuilds when photos change
+    try:
+        from services.media_index import MediaIndexService
+        await MediaIndexService(db).ensure_indexes()
+        logger.info("✅ Media index indexes created")
+    except Exception as e:
+        logger.warning(f"⚠️ Media index creation failed (non-critical): {e}")
+
+    # Conversation summaries: per-user conversation list sorted by last message
+    try:
+        from services.conversation_summaries import ConversationSummaryService
+        await ConversationSummaryService(db).ensure_indexes()
+        logger.info("✅ Conversation summary indexes created")
+    except Exception as e:
+        logger.warning(f"⚠️ Conversation summary index creation failed (non-critical): {e}")
+
+    # Report facets: admin location/profession reports $group on derived user fields
+    try:
+        from services.report_facets import ensure_facet_indexes
+        await ensure_facet_indexes(db)
+        logger.info("✅ Report facet indexes created")
+    except Exception as e:
+        logger.warning(f"⚠️ Report facet index creation failed (non-critical): {e}")
+
+    # Search sort key: stored hasPhoto backs the keyset index on /search
+    try:
+        from services.search_snapshot import ensure_user_search_indexes, backfill_has_photo
+        await ensure_user_search_indexes(db)
+        backfilled = await backfill_has_photo(db)
+        logger.info(f"✅ User search index ready ({backfilled} users backfilled with hasPhoto)")
+    except Exception as e:
+        logger.warning(f"⚠️ User search index setup failed (non-critical): {e}")
+
+    # Admin report cube: pre-aggregated dashboard breakdowns
+    try:
+        from services.admin_report_cube import AdminReportCube
+        await AdminReportCube(db).ensure_indexes()
+        logger.info("✅ Admin report cube indexes created")
+    except Exception as e:
+        logger.warning(f"⚠️ Admin report cube index creation failed (non-critical): {e}")
+
+    # Notification queue: batch-claim eligibility index
+    try:
+        from services.notification_service import NotificationService
+        await NotificationService(db).ensure_queue_indexes()
+        logger.info("✅ Notification queue claim indexes created")
+    except Exception as e:
+        logger.warning(f"⚠️ Notification queue index creation failed (non-critical): {e}")
+
+    # Settings cache: system settings / role config / site settings served from memory
+    try:
+        from async_redis_manager import async_redis_manager
+        from services.settings_cache import settings_cache
+        await settings_cache.start(db, async_redis_manager.redis_client)
+    except Exception as e:
+        logger.warning(f"⚠️ Settings cache startup failed (non-critical): {e}")
+
+    # Profile view counter: unique pair index + periodic flush of Redis-buffered views
+    try:
+        from async_redis_manager import async_redis_manager
+        from services.profile_view_counter import get_profile_view_counter
+        await get_profile_view_counter().start(db, async_redis_manager.redis_client)
+    except Exception as e:
+        logger.warning(f"⚠️ Profile view counter startup failed (non-critical): {e}")
+
     # Eagerly initialize face detection backends so they're ready before requests arrive.
     # Strategy: Vision API (primary) → OpenCV (fallback) → reject if both unavailable.
     if settings.face_detection_enabled:
@@ -312,6 +383,20 @@ async def lifespan(app: FastAPI):
     # Stop unified scheduler
     await shutdown_unified_scheduler()
     
+    # Queue notifications still buffered for coalescing
+    try:
+        from services.event_dispatcher import flush_event_dispatcher
+        await flush_event_dispatcher()
+    except Exception as e:
+        logger.warning(f"⚠️ Coalesced notification flush failed: {e}")
+    
+    # Write buffered profile views to MongoDB
+    try:
+        from services.profile_view_counter import get_profile_view_counter
+        await get_profile_view_counter().stop()
+    except Exception as e:
+        logger.warning(f"⚠️ Profile view counter flush failed: {e}")
+    
     # Cleanup activity logger
     from services.activity_logger import get_activity_logger
     try:
@@ -323,6 +408,10 @@ async def lifespan(app: FastAPI):
     
     await close_mongo_connection()
     
+    # Stop settings cache invalidation listener
+    from services.settings_cache import settings_cache
+    await settings_cache.stop()
+    
     # Close SSE Manager
     await sse_manager.close()
     logger.info("🔌 SSE Manager closed")
@@ -330,6 +419,8 @@ async def lifespan(app: FastAPI):
     # Disconnect Redis
     from redis_manager import redis_manager
     redis_manager.disconnect()
+    from async_redis_manager import async_redis_manager
+    await async_redis_manager.disconnect()
 
 app = FastAPI(
     title="Matrimonial Profile API",
@@ -429,6 +520,12 @@ add_cache_control_middleware(app)
 async def session_validation(request: Request, call_next):
     return await validate_session_middleware(request, call_next)
 
+# Auth context middleware: one JWT decode and user lookup per request,
+# shared by the rate limiter, session validation and auth dependencies
+@app.middleware("http")
+async def auth_context(request: Request, call_next):
+    return await auth_context_middleware(request, call_next)
+
 # Request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -4,5 +4,6 @@ Middleware package for FastAPI application.
 """
 
 from .session_validation import validate_session_middleware
+from .auth_context import auth_context_middleware
 
-__all__ = ["validate_session_middleware"]
+__all__ = ["validate_session_middleware", "auth_context_middleware"]
@@ -0,0 +1,33 @@
+# fastapi_backend/middleware/auth_context.py
+"""
+Auth Context Middleware
+
+Attaches the per-request AuthContext (see auth/auth_context.py) so the rate
+limiter, session validation and auth dependencies share one JWT decode and
+one user lookup.
+
+After a successful write request (POST/PUT/PATCH/DELETE) the caller's cached
+user document is dropped, so profile, photo, password or MFA changes are
+visible to their next request.
+"""
+
+import logging
+
+from fastapi import Request
+
+from auth.auth_context import get_auth_context, invalidate_user
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+async def auth_context_middleware(request: Request, call_next):
+    """Build the auth context up front and invalidate the caller's cached user after writes"""
+    context = get_auth_context(request)
+    response = await call_next(request)
+
+    if request.method not in SAFE_METHODS and response.status_code < 400 and context.username:
+        await invalidate_user(context.username)
+
+    return response
@@ -37,19 +37,15 @@ def _get_user_or_ip(request: Request) -> str:
     This ensures rate limits are per-user for authenticated requests
     and per-IP for unauthenticated ones (login, register, etc.).
     """
-    # Try to get username from request state (set by auth middleware)
-    # or from the Authorization header's decoded JWT
-    auth_header = request.headers.get("authorization", "")
-    if auth_header.startswith("Bearer "):
-        try:
-            from auth.jwt_auth import JWTManager
-            token = auth_header.split(" ", 1)[1]
-            payload = JWTManager.decode_token(token)
-            username = payload.get("sub")
-            if username:
-                return f"user:{username}"
-        except Exception:
-            pass  # Token invalid/expired - fall back to IP
+    # Identity comes from the request's auth context, so the JWT is decoded
+    # once per request no matter how many middlewares/dependencies need it
+    try:
+        from auth.auth_context import get_auth_context
+        username = get_auth_context(request).username
+        if username:
+            return f"user:{username}"
+    except Exception:
+        pass  # Token invalid/expired - fall back to IP
 
     return get_remote_address(request)
 
@@ -57,14 +57,13 @@ async def validate_session_middleware(request: Request, call_next):
     if any(path.startswith(skip) or path == skip.rstrip('/') for skip in skip_paths):
         return await call_next(request)
     
-    # Check for Authorization header
-    auth_header = request.headers.get("authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
+    # Check for Authorization header (parsed once into the request's auth context)
+    from auth.auth_context import get_auth_context
+    token = get_auth_context(request).token
+    if not token:
         # No auth header - let the endpoint handle authentication
         return await call_next(request)
     
-    token = auth_header.split(" ")[1]
-    
     try:
         # Get database
         from database import get_database
@@ -0,0 +1,166 @@
+"""
+Backfill Conversation Summaries from Messages
+
+Populates the conversation_summaries collection (one document per user pair:
+last message, last visible message, per-recipient unread counts) read by
+GET /api/users/messages/conversations, so existing threads are listed
+without the legacy $group over every message.
+
+Safe to re-run: summaries are replaced by pair id. Use --rebuild to drop
+summaries for pairs that no longer have any messages.
+
+Usage:
+    python -m migrations.backfill_conversation_summaries --env development
+    python -m migrations.backfill_conversation_summaries --env production --rebuild
+"""
+
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Set APP_ENVIRONMENT BEFORE any imports that depend on config.py (database, etc.)
+# config.py loads environment at module import time, so this must run first
+env_value = None
+if "--env" in sys.argv:
+    env_index = sys.argv.index("--env") + 1
+    if env_index < len(sys.argv):
+        env_value = sys.argv[env_index]
+        if env_value and not env_value.startswith("-"):
+            os.environ["APP_ENVIRONMENT"] = env_value
+            print(f"🔧 Set APP_ENVIRONMENT={env_value} before imports")
+
+# Force-load the correct .env file BEFORE config.py is imported
+script_dir = Path(__file__).resolve().parent.parent  # migrations -> fastapi_backend
+env_file = script_dir / f".env.{env_value or 'local'}"
+if env_file.exists():
+    print(f"📄 Force-loading env file: {env_file}")
+    load_dotenv(str(env_file), override=True)
+else:
+    print(f"⚠️ Env file not found: {env_file}")
+
+import asyncio
+import argparse
+from datetime import datetime
+from typing import Dict, Any
+
+from pymongo import ReplaceOne
+
+from database import connect_to_mongo, close_mongo_connection, get_database
+from services.conversation_summaries import (
+    MESSAGE_PROJECTION,
+    SUMMARY_COLLECTION,
+    ConversationSummaryService,
+    empty_summary,
+    fold_message,
+    pair_id,
+)
+
+BATCH_SIZE = 500
+
+
+async def backfill_conversation_summaries(db, rebuild: bool = False) -> Dict[str, Any]:
+    """
+    Summarize every conversation in the messages collection.
+
+    Args:
+        db: AsyncIOMotorDatabase instance
+        rebuild: Drop existing summaries first (removes orphans)
+
+    Returns:
+        Dict with backfill results
+    """
+    collection = db[SUMMARY_COLLECTION]
+    results = {
+        "messages_scanned": 0,
+        "summaries_written": 0,
+        "errors": []
+    }
+
+    if rebuild:
+        deleted = await collection.delete_many({})
+        print(f"🗑️ Removed {deleted.deleted_count} existing conversation summaries")
+
+    await ConversationSummaryService(db).ensure_indexes()
+
+    # One small document per pair, folded in a single pass over messages
+    summaries: Dict[str, Dict[str, Any]] = {}
+    async for message in db.messages.find({}, MESSAGE_PROJECTION):
+        results["messages_scanned"] += 1
+        sender, recipient = message.get("fromUsername"), message.get("toUsername")
+        if sender and recipient:
+            key = pair_id(sender, recipient)
+            if key not in summaries:
+                summaries[key] = empty_summary(sender, recipient)
+            fold_message(summaries[key], message)
+        if results["messages_scanned"] % 10000 == 0:
+            print(f"  → {results['messages_scanned']} messages scanned, {len(summaries)} conversations")
+
+    now = datetime.utcnow()
+    ops = [ReplaceOne({"_id": key}, {**summary, "updatedAt": now}, upsert=True) for key, summary in summaries.items()]
+    for start in range(0, len(ops), BATCH_SIZE):
+        batch = ops[start:start + BATCH_SIZE]
+        try:
+            await collection.bulk_write(batch, ordered=False)
+            results["summaries_written"] += len(batch)
+        except Exception as e:
+            error_msg = f"Bulk write of {len(batch)} summaries failed: {str(e)}"
+            results["errors"].append(error_msg)
+            print(f"❌ {error_msg}")
+
+    return results
+
+
+async def main():
+    """Main backfill function."""
+    parser = argparse.ArgumentParser(description="Backfill conversation_summaries from messages")
+    parser.add_argument(
+        "--env",
+        choices=["local", "development", "staging", "production", "docker", "test"],
+        default=None,
+        help="Environment to use for database connection (auto-detect if not specified)"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Drop existing conversation summaries before backfilling"
+    )
+    args = parser.parse_args()
+
+    if args.env:
+        os.environ["APP_ENVIRONMENT"] = args.env
+
+    print("=" * 60)
+    print("Conversation Summary Backfill Script")
+    if args.env:
+        print(f"📦 Environment: {args.env}")
+    print("=" * 60)
+
+    await connect_to_mongo()
+    db = get_database()
+
+    from config import settings
+    print(f"📁 Database name: {settings.database_name}")
+
+    results = await backfill_conversation_summaries(db, rebuild=args.rebuild)
+
+    print("\n" + "=" * 60)
+    print("Backfill Summary")
+    print("=" * 60)
+    print(f"✅ Messages scanned: {results['messages_scanned']}")
+    print(f"✅ Summaries written: {results['summaries_written']}")
+    total = await db[SUMMARY_COLLECTION].count_documents({})
+    print(f"🔍 Verification: {SUMMARY_COLLECTION} has {total} documents")
+
+    if results["errors"]:
+        print(f"\n❌ Errors encountered: {len(results['errors'])}")
+        for error in results["errors"]:
+            print(f"  - {error}")
+    else:
+        print("\n✅ Backfill completed successfully!")
+
+    await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
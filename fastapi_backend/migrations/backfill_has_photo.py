@@ -0,0 +1,95 @@
+"""
+Backfill hasPhoto on User Documents
+
+Sets hasPhoto (1 when the user has at least one image, else 0) on every user
+and creates the (hasPhoto, createdAt, _id) index, so /search can sort photos
+first and seek keyset cursors on a stored field instead of computing it per
+document. The API maintains the field on registration and photo edits and
+fills in missing values at startup; this script recomputes it everywhere.
+
+Safe to re-run: hasPhoto is recomputed from images.
+
+Usage:
+    python -m migrations.backfill_has_photo --env development
+    python -m migrations.backfill_has_photo --env production --only-missing
+"""
+
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Set APP_ENVIRONMENT BEFORE any imports that depend on config.py (database, etc.)
+# config.py loads environment at module import time, so this must run first
+env_value = None
+if "--env" in sys.argv:
+    env_index = sys.argv.index("--env") + 1
+    if env_index < len(sys.argv):
+        env_value = sys.argv[env_index]
+        if env_value and not env_value.startswith("-"):
+            os.environ["APP_ENVIRONMENT"] = env_value
+            print(f"🔧 Set APP_ENVIRONMENT={env_value} before imports")
+
+# Force-load the correct .env file BEFORE config.py is imported
+script_dir = Path(__file__).resolve().parent.parent  # migrations -> fastapi_backend
+env_file = script_dir / f".env.{env_value or 'local'}"
+if env_file.exists():
+    print(f"📄 Force-loading env file: {env_file}")
+    load_dotenv(str(env_file), override=True)
+else:
+    print(f"⚠️ Env file not found: {env_file}")
+
+import asyncio
+import argparse
+
+from database import connect_to_mongo, close_mongo_connection, get_database
+from services.search_snapshot import backfill_has_photo, ensure_user_search_indexes
+
+
+async def main():
+    """Main backfill function."""
+    parser = argparse.ArgumentParser(description="Backfill hasPhoto on users")
+    parser.add_argument(
+        "--env",
+        choices=["local", "development", "staging", "production", "docker", "test"],
+        default=None,
+        help="Environment to use for database connection (auto-detect if not specified)"
+    )
+    parser.add_argument(
+        "--only-missing",
+        action="store_true",
+        help="Only process users without hasPhoto"
+    )
+    args = parser.parse_args()
+
+    if args.env:
+        os.environ["APP_ENVIRONMENT"] = args.env
+
+    print("=" * 60)
+    print("hasPhoto Backfill Script")
+    if args.env:
+        print(f"📦 Environment: {args.env}")
+    print("=" * 60)
+
+    await connect_to_mongo()
+    db = get_database()
+
+    from config import settings
+    print(f"📁 Database name: {settings.database_name}")
+
+    await ensure_user_search_indexes(db)
+    updated = await backfill_has_photo(db, only_missing=args.only_missing)
+
+    print("\n" + "=" * 60)
+    print("Backfill Summary")
+    print("=" * 60)
+    print(f"✅ Users updated: {updated}")
+    missing = await db.users.count_documents({"hasPhoto": {"$exists": False}})
+    print(f"🔍 Verification: {missing} users without hasPhoto")
+    print("\n✅ Backfill completed successfully!")
+
+    await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
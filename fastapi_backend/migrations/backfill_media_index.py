@@ -0,0 +1,175 @@
+"""
+Backfill Media Index from User Documents
+
+Populates the media_index collection (filename -> owner, visibility bucket,
+public/profile-pic flags) used by /api/users/media/{filename}, so existing
+photos are served without the legacy regex scan over the users collection.
+
+Safe to re-run: entries are upserted by filename. Use --rebuild to drop
+entries for files no longer referenced by any user.
+
+Usage:
+    python -m migrations.backfill_media_index --env development
+    python -m migrations.backfill_media_index --env production --rebuild
+"""
+
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Set APP_ENVIRONMENT BEFORE any imports that depend on config.py (database, etc.)
+# config.py loads environment at module import time, so this must run first
+env_value = None
+if "--env" in sys.argv:
+    env_index = sys.argv.index("--env") + 1
+    if env_index < len(sys.argv):
+        env_value = sys.argv[env_index]
+        if env_value and not env_value.startswith("-"):
+            os.environ["APP_ENVIRONMENT"] = env_value
+            print(f"🔧 Set APP_ENVIRONMENT={env_value} before imports")
+
+# Force-load the correct .env file BEFORE config.py is imported
+script_dir = Path(__file__).resolve().parent.parent  # migrations -> fastapi_backend
+env_file = script_dir / f".env.{env_value or 'local'}"
+if env_file.exists():
+    print(f"📄 Force-loading env file: {env_file}")
+    load_dotenv(str(env_file), override=True)
+else:
+    print(f"⚠️ Env file not found: {env_file}")
+
+import asyncio
+import argparse
+from datetime import datetime
+from typing import Dict, Any
+
+from pymongo import UpdateOne
+
+from database import connect_to_mongo, close_mongo_connection, get_database
+from services.media_index import (
+    MEDIA_INDEX_COLLECTION,
+    MEDIA_USER_PROJECTION,
+    MediaIndexService,
+    build_media_entries,
+)
+
+BATCH_SIZE = 500
+
+# Users referencing at least one uploaded file
+HAS_MEDIA_QUERY = {
+    "$or": [
+        {"images.0": {"$exists": True}},
+        {"publicImages.0": {"$exists": True}},
+        {"profileImage": {"$nin": [None, ""]}},
+        {"imageVisibility.profilePic": {"$nin": [None, ""]}},
+        {"imageVisibility.memberVisible.0": {"$exists": True}},
+        {"imageVisibility.onRequest.0": {"$exists": True}},
+    ]
+}
+
+
+async def backfill_media_index(db, rebuild: bool = False) -> Dict[str, Any]:
+    """
+    Index every file referenced by a user document.
+
+    Args:
+        db: AsyncIOMotorDatabase instance
+        rebuild: Drop existing entries first (removes orphans)
+
+    Returns:
+        Dict with backfill results
+    """
+    collection = db[MEDIA_INDEX_COLLECTION]
+    results = {
+        "users_scanned": 0,
+        "files_indexed": 0,
+        "errors": []
+    }
+
+    if rebuild:
+        deleted = await collection.delete_many({})
+        print(f"🗑️ Removed {deleted.deleted_count} existing media index entries")
+
+    await MediaIndexService(db).ensure_indexes()
+
+    ops = []
+    now = datetime.utcnow()
+
+    async def flush():
+        if not ops:
+            return
+        try:
+            await collection.bulk_write(ops, ordered=False)
+        except Exception as e:
+            error_msg = f"Bulk write of {len(ops)} entries failed: {str(e)}"
+            results["errors"].append(error_msg)
+            print(f"❌ {error_msg}")
+        ops.clear()
+
+    async for user in db.users.find(HAS_MEDIA_QUERY, MEDIA_USER_PROJECTION):
+        results["users_scanned"] += 1
+        for filename, entry in build_media_entries(user).items():
+            ops.append(UpdateOne({"_id": filename}, {"$set": {**entry, "updatedAt": now}}, upsert=True))
+            results["files_indexed"] += 1
+        if len(ops) >= BATCH_SIZE:
+            await flush()
+        if results["users_scanned"] % 1000 == 0:
+            print(f"  → {results['users_scanned']} users scanned, {results['files_indexed']} files indexed")
+
+    await flush()
+    return results
+
+
+async def main():
+    """Main backfill function."""
+    parser = argparse.ArgumentParser(description="Backfill media_index from user documents")
+    parser.add_argument(
+        "--env",
+        choices=["local", "development", "staging", "production", "docker", "test"],
+        default=None,
+        help="Environment to use for database connection (auto-detect if not specified)"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Drop existing media_index entries before backfilling"
+    )
+    args = parser.parse_args()
+
+    if args.env:
+        os.environ["APP_ENVIRONMENT"] = args.env
+
+    print("=" * 60)
+    print("Media Index Backfill Script")
+    if args.env:
+        print(f"📦 Environment: {args.env}")
+    print("=" * 60)
+
+    await connect_to_mongo()
+    db = get_database()
+
+    from config import settings
+    print(f"📁 Database name: {settings.database_name}")
+
+    results = await backfill_media_index(db, rebuild=args.rebuild)
+
+    print("\n" + "=" * 60)
+    print("Backfill Summary")
+    print("=" * 60)
+    print(f"✅ Users scanned: {results['users_scanned']}")
+    print(f"✅ Files indexed: {results['files_indexed']}")
+    total = await db[MEDIA_INDEX_COLLECTION].count_documents({})
+    print(f"🔍 Verification: {MEDIA_INDEX_COLLECTION} has {total} documents")
+
+    if results["errors"]:
+        print(f"\n❌ Errors encountered: {len(results['errors'])}")
+        for error in results["errors"]:
+            print(f"  - {error}")
+    else:
+        print("\n✅ Backfill completed successfully!")
+
+    await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,172 @@
+"""
+Backfill Report Facets on User Documents
+
+Sets locationFacet (normalized city/state/country from the decrypted
+location) and professionFacet (report category from occupation or the first
+workExperience entry) on every user, so the admin location and profession
+reports can $group on them instead of decrypting users one by one.
+
+City/state parsing follows migrations/populate_city_state.py and
+normalize_city_field.py; unlike those it leaves the city/state profile
+fields untouched.
+
+Safe to re-run: facets are recomputed from the source fields.
+
+Usage:
+    python -m migrations.backfill_report_facets --env development
+    python -m migrations.backfill_report_facets --env production --only-missing
+"""
+
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Set APP_ENVIRONMENT BEFORE any imports that depend on config.py (database, etc.)
+# config.py loads environment at module import time, so this must run first
+env_value = None
+if "--env" in sys.argv:
+    env_index = sys.argv.index("--env") + 1
+    if env_index < len(sys.argv):
+        env_value = sys.argv[env_index]
+        if env_value and not env_value.startswith("-"):
+            os.environ["APP_ENVIRONMENT"] = env_value
+            print(f"🔧 Set APP_ENVIRONMENT={env_value} before imports")
+
+# Force-load the correct .env file BEFORE config.py is imported
+script_dir = Path(__file__).resolve().parent.parent  # migrations -> fastapi_backend
+env_file = script_dir / f".env.{env_value or 'local'}"
+if env_file.exists():
+    print(f"📄 Force-loading env file: {env_file}")
+    load_dotenv(str(env_file), override=True)
+else:
+    print(f"⚠️ Env file not found: {env_file}")
+
+import asyncio
+import argparse
+from typing import Dict, Any
+
+from pymongo import UpdateOne
+
+from database import connect_to_mongo, close_mongo_connection, get_database
+from crypto_utils import get_encryptor
+from services.report_facets import (
+    FACET_SOURCE_FIELDS,
+    build_location_facet,
+    build_profession_facet,
+    ensure_facet_indexes,
+)
+
+BATCH_SIZE = 500
+
+
+async def backfill_report_facets(db, only_missing: bool = False) -> Dict[str, Any]:
+    """
+    Compute report facets for every user.
+
+    Args:
+        db: AsyncIOMotorDatabase instance
+        only_missing: Skip users that already have both facets
+
+    Returns:
+        Dict with backfill results
+    """
+    results = {
+        "users_scanned": 0,
+        "locations_faceted": 0,
+        "errors": []
+    }
+
+    await ensure_facet_indexes(db)
+    encryptor = get_encryptor()
+
+    query = {}
+    if only_missing:
+        query = {"$or": [{"locationFacet": {"$exists": False}}, {"professionFacet": {"$exists": False}}]}
+    projection = {"username": 1, **{field: 1 for field in FACET_SOURCE_FIELDS}}
+
+    ops = []
+
+    async def flush():
+        if not ops:
+            return
+        try:
+            await db.users.bulk_write(ops, ordered=False)
+        except Exception as e:
+            error_msg = f"Bulk write of {len(ops)} users failed: {str(e)}"
+            results["errors"].append(error_msg)
+            print(f"❌ {error_msg}")
+        ops.clear()
+
+    async for user in db.users.find(query, projection):
+        results["users_scanned"] += 1
+        location = encryptor.decrypt(user.get("location"))
+        location_facet = build_location_facet(location, user.get("state"), user.get("countryOfResidence"))
+        if location_facet:
+            results["locations_faceted"] += 1
+        ops.append(UpdateOne({"_id": user["_id"]}, {"$set": {
+            "locationFacet": location_facet,
+            "professionFacet": build_profession_facet(user),
+        }}))
+        if len(ops) >= BATCH_SIZE:
+            await flush()
+        if results["users_scanned"] % 1000 == 0:
+            print(f"  → {results['users_scanned']} users scanned")
+
+    await flush()
+    return results
+
+
+async def main():
+    """Main backfill function."""
+    parser = argparse.ArgumentParser(description="Backfill locationFacet/professionFacet on users")
+    parser.add_argument(
+        "--env",
+        choices=["local", "development", "staging", "production", "docker", "test"],
+        default=None,
+        help="Environment to use for database connection (auto-detect if not specified)"
+    )
+    parser.add_argument(
+        "--only-missing",
+        action="store_true",
+        help="Only process users without facets"
+    )
+    args = parser.parse_args()
+
+    if args.env:
+        os.environ["APP_ENVIRONMENT"] = args.env
+
+    print("=" * 60)
+    print("Report Facet Backfill Script")
+    if args.env:
+        print(f"📦 Environment: {args.env}")
+    print("=" * 60)
+
+    await connect_to_mongo()
+    db = get_database()
+
+    from config import settings
+    print(f"📁 Database name: {settings.database_name}")
+
+    results = await backfill_report_facets(db, only_missing=args.only_missing)
+
+    print("\n" + "=" * 60)
+    print("Backfill Summary")
+    print("=" * 60)
+    print(f"✅ Users scanned: {results['users_scanned']}")
+    print(f"✅ Users with a location facet: {results['locations_faceted']}")
+    missing = await db.users.count_documents({"professionFacet": {"$exists": False}})
+    print(f"🔍 Verification: {missing} users without facets")
+
+    if results["errors"]:
+        print(f"\n❌ Errors encountered: {len(results['errors'])}")
+        for error in results["errors"]:
+            print(f"  - {error}")
+    else:
+        print("\n✅ Backfill completed successfully!")
+
+    await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
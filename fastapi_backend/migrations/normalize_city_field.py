@@ -8,17 +8,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 load_dotenv()
 
-ST = {"AL":"Alabama","AK":"Alaska","AZ":"Arizona","AR":"Arkansas","CA":"California",
-"CO":"Colorado","CT":"Connecticut","DE":"Delaware","FL":"Florida","GA":"Georgia",
-"HI":"Hawaii","ID":"Idaho","IL":"Illinois","IN":"Indiana","IA":"Iowa",
-"KS":"Kansas","KY":"Kentucky","LA":"Louisiana","ME":"Maine","MD":"Maryland",
-"MA":"Massachusetts","MI":"Michigan","MN":"Minnesota","MS":"Mississippi",
-"MO":"Missouri","MT":"Montana","NE":"Nebraska","NV":"Nevada","NH":"New Hampshire",
-"NJ":"New Jersey","NM":"New Mexico","NY":"New York","NC":"North Carolina",
-"ND":"North Dakota","OH":"Ohio","OK":"Oklahoma","OR":"Oregon","PA":"Pennsylvania",
-"RI":"Rhode Island","SC":"South Carolina","SD":"South Dakota","TN":"Tennessee",
-"TX":"Texas","UT":"Utah","VT":"Vermont","VA":"Virginia","WA":"Washington",
-"WV":"West Virginia","WI":"Wisconsin","WY":"Wyoming","DC":"DC"}
+from services.report_facets import US_STATES as ST
 
 async def run():
     c = AsyncIOMotorClient(os.getenv('MONGODB_URL'))
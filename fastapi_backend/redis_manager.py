@@ -11,6 +11,34 @@ from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+def build_message_data(from_user: str, to_user: str, message: str, message_id: str = None) -> Optional[Dict]:
+    """Validate a chat message and build its queued payload (None if invalid)"""
+    # Validation
+    if not from_user or not to_user:
+        logger.error("❌ Invalid users: from_user and to_user are required")
+        return None
+    
+    if not message or not message.strip():
+        logger.error("❌ Invalid message: message cannot be empty")
+        return None
+    
+    if len(message) > 10000:  # Prevent extremely large messages
+        logger.error(f"❌ Message too large: {len(message)} characters")
+        return None
+    
+    if not message_id:
+        message_id = f"{from_user}_{to_user}_{datetime.now().timestamp()}"
+    
+    return {
+        'id': message_id,
+        'from': from_user,
+        'to': to_user,
+        'message': message.strip(),
+        'timestamp': datetime.now().isoformat(),
+        'read': False
+    }
+
+
 class RedisManager:
     """Manages Redis connections and operations for real-time features"""
     
@@ -158,30 +186,10 @@ class RedisManager:
     def send_message(self, from_user: str, to_user: str, message: str, message_id: str = None) -> bool:
         """Send a message to a user with validation and error handling"""
         try:
-            # Validation
-            if not from_user or not to_user:
-                logger.error("❌ Invalid users: from_user and to_user are required")
-                return False
-            
-            if not message or not message.strip():
-                logger.error("❌ Invalid message: message cannot be empty")
+            message_data = build_message_data(from_user, to_user, message, message_id)
+            if not message_data:
                 return False
-            
-            if len(message) > 10000:  # Prevent extremely large messages
-                logger.error(f"❌ Message too large: {len(message)} characters")
-                return False
-            
-            if not message_id:
-                message_id = f"{from_user}_{to_user}_{datetime.now().timestamp()}"
-            
-            message_data = {
-                'id': message_id,
-                'from': from_user,
-                'to': to_user,
-                'message': message.strip(),
-                'timestamp': datetime.now().isoformat(),
-                'read': False
-            }
+            message_id = message_data['id']
             
             # Store message ONLY in recipient's queue for polling
             # The sender will handle their sent messages locally in the frontend
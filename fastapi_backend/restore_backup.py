@@ -10,6 +10,9 @@ Usage:
   # Restore from local JSON archive (to temp DB)
   python restore_backup.py backups/matrimonialDB_20260314_060000.tar.gz
 
+  # Restore a streaming NDJSON backup (read from GCS as it is imported)
+  python restore_backup.py --from-gcs backups/matrimonialDB_20260314_060000.ndjson.gz
+
   # Download from GCS first, then restore
   python restore_backup.py --from-gcs backups/matrimonialDB_20260314_060000.archive.gz
 
@@ -24,6 +27,8 @@ NOTE: By default, restores go to '<dbname>_restore' to prevent accidental overwr
 """
 
 import argparse
+import gzip
+import io
 import os
 import sys
 import subprocess
@@ -271,6 +276,80 @@ def restore_json_dump(archive_path: str, target_db: str):
     print(f"\n✅ JSON restore complete → database: {target_db}")
 
 
+NDJSON_BACKUP_SUFFIX = ".ndjson.gz"
+RESTORE_BATCH_SIZE = 1000
+GCS_READ_CHUNK_BYTES = 8 * 1024 * 1024
+
+
+def iter_backup_batches(lines, batch_size: int = RESTORE_BATCH_SIZE):
+    """
+    (collection, documents) batches from a streaming NDJSON backup
+
+    Each line is {"collection": ..., "document": ...} in Extended JSON;
+    collections may interleave. At most batch_size documents per collection
+    are held in memory.
+    """
+    from bson import json_util
+
+    buffers = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json_util.loads(line)
+        name = record["collection"]
+        buffer = buffers.setdefault(name, [])
+        buffer.append(record["document"])
+        if len(buffer) >= batch_size:
+            yield name, buffer
+            buffers[name] = []
+    for name, buffer in buffers.items():
+        if buffer:
+            yield name, buffer
+
+
+def open_backup_stream(backup_path: str, from_gcs: bool = False):
+    """Decompressed text stream over an NDJSON backup, local or read from GCS in chunks"""
+    if from_gcs:
+        bucket = get_gcs_bucket()
+        if not bucket:
+            print("ERROR: GCS_BUCKET_NAME not configured in environment")
+            sys.exit(1)
+        from google.cloud import storage
+        blob = storage.Client().bucket(bucket).blob(backup_path)
+        print(f"Streaming: gs://{bucket}/{backup_path}")
+        raw = blob.open("rb", chunk_size=GCS_READ_CHUNK_BYTES)
+    else:
+        raw = open(backup_path, "rb")
+    return io.TextIOWrapper(gzip.GzipFile(fileobj=raw), encoding="utf-8")
+
+
+def restore_ndjson_stream(stream, target_db: str, batch_size: int = RESTORE_BATCH_SIZE):
+    """Restore a streaming NDJSON backup, inserting batch_size documents at a time"""
+    from pymongo import MongoClient
+
+    client = MongoClient(get_mongodb_url())
+    db = client[target_db]
+    restored = {}
+
+    try:
+        for collection_name, documents in iter_backup_batches(stream, batch_size):
+            if collection_name not in restored:
+                # Same semantics as mongoimport --drop
+                print(f"  Restoring: {collection_name}...")
+                db[collection_name].drop()
+                restored[collection_name] = 0
+            db[collection_name].insert_many(documents, ordered=False)
+            restored[collection_name] += len(documents)
+    finally:
+        stream.close()
+        client.close()
+
+    for collection_name, count in sorted(restored.items()):
+        print(f"    ✅ {collection_name}: {count} records")
+    print(f"\n✅ NDJSON restore complete → database: {target_db} ({len(restored)} collections)")
+    return restored
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Restore MongoDB backup from local file or GCS",
@@ -296,24 +375,26 @@ def main():
         sys.exit(1)
 
     backup_path = args.backup_file
+    # NDJSON backups are read from GCS as they are restored, no local copy
+    stream_from_gcs = args.from_gcs and backup_path.endswith(NDJSON_BACKUP_SUFFIX)
 
     # Download from GCS if requested
-    if args.from_gcs:
+    if args.from_gcs and not stream_from_gcs:
         backup_path = download_from_gcs(backup_path)
 
-    if not os.path.exists(backup_path):
+    if not stream_from_gcs and not os.path.exists(backup_path):
         print(f"ERROR: File not found: {backup_path}")
         sys.exit(1)
 
     source_db = get_database_name()
     target_db = args.target_db or f"{source_db}_restore"
 
-    file_size = os.path.getsize(backup_path)
     print(f"\n{'='*60}")
     print(f"  MongoDB Restore")
     print(f"{'='*60}")
     print(f"  File:      {backup_path}")
-    print(f"  Size:      {file_size / (1024*1024):.1f} MB")
+    if not stream_from_gcs:
+        print(f"  Size:      {os.path.getsize(backup_path) / (1024*1024):.1f} MB")
     print(f"  Source DB: {source_db}")
     print(f"  Target DB: {target_db}")
     print(f"{'='*60}")
@@ -327,11 +408,13 @@ def main():
 
     if backup_path.endswith(".archive.gz"):
         restore_mongodump(backup_path, target_db, source_db)
+    elif backup_path.endswith(NDJSON_BACKUP_SUFFIX):
+        restore_ndjson_stream(open_backup_stream(backup_path, from_gcs=stream_from_gcs), target_db)
     elif backup_path.endswith(".tar.gz"):
         restore_json_dump(backup_path, target_db)
     else:
         print(f"ERROR: Unsupported file format: {backup_path}")
-        print("Supported: .archive.gz (mongodump), .tar.gz (JSON dump)")
+        print("Supported: .archive.gz (mongodump), .ndjson.gz (streaming dump), .tar.gz (JSON dump)")
         sys.exit(1)
 
 
@@ -321,6 +321,18 @@ async def get_restore_command(
             f"# 3. Cleanup: rm -rf restore_temp/"
         )
         restore_type = "mongoimport"
+    elif filename.endswith(".ndjson.gz"):
+        # Python streaming dump format (one {"collection", "document"} line per document)
+        prod_cmd = (
+            f'MONGODB_URL="{settings.mongodb_url}" '
+            f'python restore_backup.py --from-gcs --target-db={settings.database_name}_restore '
+            f'backups/{filename}'
+        )
+        dev_cmd = (
+            f'MONGODB_URL="{dest_uri}" '
+            f'python restore_backup.py --target-db={dest_db} backups/{filename}'
+        )
+        restore_type = "restore_backup.py"
     else:
         prod_cmd = "Unknown backup format"
         dev_cmd = "Unknown backup format"
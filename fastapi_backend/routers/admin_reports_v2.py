@@ -10,6 +10,7 @@ from datetime import datetime
 from database import get_database
 from auth.jwt_auth import get_current_user_dependency as get_current_user
 from pydantic import BaseModel
+import asyncio
 import logging
 import re
 import json
@@ -408,20 +409,14 @@ async def get_by_location_report(
         )
         users = await users_cursor.to_list(1000)
         
+        # Decrypt every location in one batch, off the event loop
+        users = await asyncio.to_thread(encryptor.decrypt_many, users, ("location",))
+        
         # Process locations with decrypted data
         location_groups = {}
         for user in users:
-            encrypted_location = user.get("location")
-            if not encrypted_location:
-                continue
-            
-            # Decrypt location safely
-            try:
-                decrypted_location = encryptor.decrypt(encrypted_location)
-                if not decrypted_location or decrypted_location.strip() == "":
-                    continue
-            except Exception as decrypt_err:
-                logger.debug(f"⚠️ Could not decrypt location for user {user.get('username')}")
+            decrypted_location = user.get("location")
+            if not decrypted_location or decrypted_location.strip() == "":
                 continue
             
             # Initialize group if needed
@@ -14,7 +14,9 @@ import pytz
 
 from database import get_database
 from auth.jwt_auth import get_current_user_dependency as get_current_user
+from auth.auth_context import invalidate_user
 from services.email_sender import send_email
+from services.settings_cache import settings_cache
 from config import settings
 
 logger = logging.getLogger(__name__)
@@ -247,14 +249,13 @@ async def get_contribution_status(
 ):
     """Get user's contribution status for popup logic"""
     try:
-        user = await db.users.find_one({"username": current_user["username"]})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        # current_user is the full (request-cached) user document
+        user = current_user
         
         contributions = user.get("contributions", {})
         
         # Check site-level setting
-        site_settings = await db.site_settings.find_one({"_id": "site_settings"})
+        site_settings = await settings_cache.get_document(db, "site_settings")
         contribution_config = site_settings.get("contributions", {}) if site_settings else {}
         
         # Get site-level enabled setting - MUST be explicitly True to show popup
@@ -314,7 +315,7 @@ async def get_contribution_settings(
     if current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    site_settings = await db.site_settings.find_one({"_id": "site_settings"})
+    site_settings = await settings_cache.get_document(db, "site_settings")
     contribution_config = site_settings.get("contributions", {}) if site_settings else {}
     
     return {
@@ -347,6 +348,7 @@ async def update_contribution_settings(
         {"$set": {"contributions": settings_data}},
         upsert=True
     )
+    await settings_cache.invalidate(db, "site_settings")
     
     logger.info(f"💝 Contribution settings updated by {current_user['username']}: enabled={settings_data.get('enabled')}")
     
@@ -368,6 +370,7 @@ async def toggle_user_contribution_popup(
         {"username": username},
         {"$set": {"contributionPopupDisabledByAdmin": disabled}}
     )
+    await invalidate_user(username)
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
@@ -1097,6 +1100,7 @@ async def add_manual_contribution(
             }
         }
     )
+    await invalidate_user(request.username)
 
     # Optionally send thank you email
     thank_you_sent = None
@@ -1400,7 +1404,7 @@ async def apply_promo_code(
     """Calculate price after applying a promo code"""
     try:
         # Get plan
-        site_settings = await db.site_settings.find_one({"_id": "site_settings"})
+        site_settings = await settings_cache.get(db, "site_settings")
         if not site_settings:
             raise HTTPException(status_code=404, detail="Plans not configured")
         
@@ -10,6 +10,7 @@ import logging
 
 from auth.jwt_auth import get_current_user_dependency as get_current_user
 from database import get_database
+from services.admin_report_cube import AdminReportCube
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -282,6 +283,7 @@ async def get_inactive_users(
 
 @router.get("/inactive-users/summary")
 async def get_inactive_users_summary(
+    refresh: bool = Query(False, description="Recompute instead of serving the pre-aggregated data"),
     current_user: dict = Depends(get_current_user),
     db=Depends(get_database)
 ):
@@ -290,66 +292,13 @@ async def get_inactive_users_summary(
         raise HTTPException(status_code=403, detail="Admin access required")
 
     try:
-        today = datetime.utcnow()
-
-        # Fetch active users with updatedAt
-        projection = {"updatedAt": 1, "gender": 1, "_id": 0}
-        cursor = db.users.find(
-            {"accountStatus": "active", "updatedAt": {"$exists": True, "$ne": None}},
-            projection
-        )
-        raw_users = await cursor.to_list(length=10000)
-
-        # Process in Python
-        total_active = len(raw_users)
-        inactive_15_30 = 0
-        inactive_30_60 = 0
-        inactive_60_plus = 0
-        never_logged_in = 0
-        total_days = 0
-        max_days = 0
-        gender_counts = {}
-
-        for user in raw_users:
-            updated_at = _parse_updated_at(user.get("updatedAt"))
-            if updated_at is None:
-                days = 999
-                never_logged_in += 1
-            else:
-                if updated_at.tzinfo is not None:
-                    updated_at = updated_at.replace(tzinfo=None)
-                days = (today - updated_at).days
-
-            total_days += days
-            if days > max_days:
-                max_days = days
-
-            if 15 <= days < 30:
-                inactive_15_30 += 1
-            elif 30 <= days < 60:
-                inactive_30_60 += 1
-            elif days >= 60:
-                inactive_60_plus += 1
-
-            # Gender breakdown for inactive users (15+ days)
-            if days >= 15:
-                g = user.get("gender") or "Unknown"
-                gender_counts[g] = gender_counts.get(g, 0) + 1
-
-        avg_days = total_days / total_active if total_active > 0 else 0
+        # Pre-aggregated by the daily platform stats snapshot (services/admin_report_cube.py)
+        cell = await AdminReportCube(db).get_current("inactivity", refresh=refresh)
 
         return {
-            "summary": {
-                "totalActive": total_active,
-                "inactive15_30": inactive_15_30,
-                "inactive30_60": inactive_30_60,
-                "inactive60_plus": inactive_60_plus,
-                "neverLoggedIn": never_logged_in,
-                "avgDaysInactive": round(avg_days, 1),
-                "maxDaysInactive": max_days
-            },
-            "genderBreakdown": gender_counts,
-            "lastUpdated": datetime.utcnow().isoformat()
+            **cell["data"],
+            "lastUpdated": cell["refreshedAt"].isoformat(),
+            "refreshedAt": cell["refreshedAt"].isoformat()
         }
 
     except Exception as e:
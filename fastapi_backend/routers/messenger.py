@@ -105,21 +105,16 @@ async def get_or_create_portal_members_group(
             "participantsCount": len(participants),
         }
 
-    try:
-        from redis_manager import get_redis_manager
-        redis = get_redis_manager()
-        cache_key = "portal_members_group"
-        cached = redis.redis_client.get(cache_key)
-        if cached:
-            import json
-            existing = json.loads(cached)
-            logger.info(f"✅ Cache hit for Portal Members group: {existing.get('_id')}")
-            conv_id = existing.get("_id")
-            if conv_id:
-                await _ensure_portal_member(conv_id)
-            return {"success": True, "conversation": existing}
-    except Exception as e:
-        logger.warning(f"⚠️ Redis cache check failed: {e}")
+    from async_redis_manager import get_async_redis
+    redis = get_async_redis()
+    cache_key = "portal_members_group"
+    existing = await redis.cache_get(cache_key)
+    if existing:
+        logger.info(f"✅ Cache hit for Portal Members group: {existing.get('_id')}")
+        conv_id = existing.get("_id")
+        if conv_id:
+            await _ensure_portal_member(conv_id)
+        return {"success": True, "conversation": existing}
 
     # Check if Portal Members group already exists
     existing = await db.messenger_conversations.find_one({
@@ -141,15 +136,8 @@ async def get_or_create_portal_members_group(
                 except Exception:
                     pass
 
-        try:
-            from redis_manager import get_redis_manager
-            redis = get_redis_manager()
-            import json
-            cache_key = "portal_members_group"
-            redis.redis_client.setex(cache_key, 300, json.dumps(summary))
+        if await redis.cache_set(cache_key, summary, 300):
             logger.debug(f"💾 Cached Portal Members group: {cache_key}")
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to cache Portal Members group: {e}")
         
         return {"success": True, "conversation": summary}
 
@@ -174,15 +162,8 @@ async def get_or_create_portal_members_group(
     summary = _portal_group_summary(conv)
     logger.info(f"✅ Created Portal Members group: {summary['id']}")
     
-    try:
-        from redis_manager import get_redis_manager
-        redis = get_redis_manager()
-        import json
-        cache_key = "portal_members_group"
-        redis.redis_client.setex(cache_key, 300, json.dumps(summary))
+    if await redis.cache_set(cache_key, summary, 300):
         logger.debug(f"💾 Cached newly created Portal Members group: {cache_key}")
-    except Exception as e:
-        logger.warning(f"⚠️ Failed to cache Portal Members group: {e}")
     
     return {"success": True, "conversation": summary}
 
@@ -1629,23 +1610,17 @@ async def _enrich_participants(
     if not usernames:
         return
 
-    from redis_manager import get_redis_manager
-    import json
-    redis = get_redis_manager()
+    from async_redis_manager import get_async_redis
+    redis = get_async_redis()
+    cached = await redis.cache_get_many([f"participant_profile:{uname}" for uname in usernames])
     cached_profiles = {}
     uncached_usernames = []
-    
-    try:
-        for uname in usernames:
-            cache_key = f"participant_profile:{uname}"
-            cached = redis.redis_client.get(cache_key)
-            if cached:
-                cached_profiles[uname] = json.loads(cached)
-            else:
-                uncached_usernames.append(uname)
-    except Exception as e:
-        logger.warning(f"⚠️ Redis cache check failed for participant profiles: {e}")
-        uncached_usernames = usernames
+    for uname in usernames:
+        profile = cached.get(f"participant_profile:{uname}")
+        if profile:
+            cached_profiles[uname] = profile
+        else:
+            uncached_usernames.append(uname)
 
     by_username = {}
     if uncached_usernames:
@@ -1666,11 +1641,9 @@ async def _enrich_participants(
             uname = user.get("username")
             if uname:
                 by_username[uname] = user
-                try:
-                    cache_key = f"participant_profile:{uname}"
-                    redis.redis_client.setex(cache_key, 300, json.dumps(user))
-                except Exception as e:
-                    logger.warning(f"⚠️ Failed to cache participant profile {uname}: {e}")
+        await redis.cache_set_many(
+            {f"participant_profile:{uname}": user for uname, user in by_username.items()}, 300
+        )
 
     by_username.update(cached_profiles)
 
@@ -1752,27 +1725,31 @@ async def _send_push(
     content_type = message.get("contentType", "text")
     body_text = message.get("content", "")[:100] if content_type == "text" else f"📎 {content_type.capitalize()}"
 
-    for p in conv.get("participants", []):
-        recipient = p.get("username")
-        if not recipient or recipient == sender_username:
-            continue
-        # Skip if user is online (already got real-time)
-        if recipient in online_users:
-            continue
+    # Skip the sender and anyone online (they already got it in real time)
+    recipients = [
+        p.get("username") for p in conv.get("participants", [])
+        if p.get("username") and p.get("username") != sender_username
+        and p.get("username") not in online_users
+    ]
+    if not recipients:
+        return
 
-        tokens = await messenger_service.get_device_tokens(db, recipient)
-        if tokens:
-            await push.send_to_multiple_tokens(
-                tokens=tokens,
-                title=sender_name,
-                body=body_text,
-                data={
-                    "type": "messenger_new_message",
-                    "conversationId": conversation_id,
-                    "senderUsername": sender_username,
-                    "messageId": message.get("id", ""),
-                },
-            )
+    # Every recipient gets the same payload, so batch all their tokens into
+    # chunked multicasts instead of one lookup + send per recipient
+    tokens_by_user = await messenger_service.get_device_tokens_many(db, recipients)
+    tokens = list(dict.fromkeys(t for user_tokens in tokens_by_user.values() for t in user_tokens))
+    if tokens:
+        await push.send_to_multiple_tokens(
+            tokens=tokens,
+            title=sender_name,
+            body=body_text,
+            data={
+                "type": "messenger_new_message",
+                "conversationId": conversation_id,
+                "senderUsername": sender_username,
+                "messageId": message.get("id", ""),
+            },
+        )
 
 
 def _serialize_for_socket(msg: dict) -> dict:
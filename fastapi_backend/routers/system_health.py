@@ -99,6 +99,19 @@ async def get_system_health(db = Depends(get_database)):
         "details": f"{status_text}. {note}"
     }
     
+    # Activity log write-behind pipeline (buffer, spill file, drop/overflow counters)
+    try:
+        from services.activity_logger import get_activity_logger
+        health_data["services"]["activity_logger"] = {
+            "healthy": get_activity_logger().db_available,
+            **get_activity_logger().get_pipeline_stats()
+        }
+    except RuntimeError as e:
+        health_data["services"]["activity_logger"] = {
+            "healthy": False,
+            "details": str(e)
+        }
+    
     # Storage Type
     health_data["services"]["storage"] = {
         "type": "gcs" if settings.use_gcs else "local",
@@ -124,6 +137,16 @@ def format_uptime(seconds):
     return " ".join(parts) if parts else "< 1m"
 
 
+@router.get("/health/sse")
+async def get_sse_health():
+    """Real-time messaging stream metrics for this process (connections, drops, fan-out latency)"""
+    from sse_manager import get_sse_manager
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        **get_sse_manager().get_metrics()
+    }
+
+
 @router.get("/health/encryption")
 async def get_encryption_health():
     """
@@ -1,8 +1,9 @@
 # fastapi_backend/routes.py
 from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form, Depends, Request, Query, Body
-from fastapi.responses import JSONResponse, FileResponse, Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta, date
+import asyncio
 import time
 import logging
 import uuid
@@ -11,8 +12,6 @@ import json
 import re
 import io
 import httpx
-from pathlib import Path
-from urllib.parse import urlparse
 from sse_starlette.sse import EventSourceResponse
 from models import (
     UserCreate, UserResponse, LoginRequest, Token,
@@ -33,6 +32,13 @@ from config import settings
 from utils import get_full_image_url, save_multiple_files
 from crypto_utils import get_encryptor
 from middleware.rate_limiter import limiter, RATE_LIMITS
+from services.settings_cache import settings_cache
+from services.profile_cards import (
+    compute_public_image_paths as _compute_public_image_paths,
+    extract_image_path as _extract_image_path,
+    remove_consent_metadata,
+)
+from services.search_snapshot import has_photo_flag
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 logger = logging.getLogger(__name__)
@@ -196,56 +202,6 @@ SEARCH_RESULT_PROJECTION = {
     "role": 1,
 }
 
-# Full projection for detailed profile view
-DASHBOARD_USER_PROJECTION = {
-    "_id": 0,  # Special case: _id can be excluded with inclusions
-    # Include only fields needed for dashboard/search cards
-    "username": 1,
-    "firstName": 1,
-    "lastName": 1,
-    "age": 1,
-    "birthMonth": 1,
-    "birthYear": 1,
-    "dateOfBirth": 1,
-    "gender": 1,
-    "location": 1,
-    "region": 1,
-    "occupation": 1,
-    "education": 1,
-    "educationHistory": 1,  # Structured education array
-    "workExperience": 1,    # Structured work experience array
-    "bio": 1,
-    "aboutMe": 1,
-    "about": 1,
-    "description": 1,
-    "aboutYou": 1,
-    "profileImage": 1,
-    "images": 1,
-    "publicImages": 1,
-    "contactEmail": 1,
-    "contactNumber": 1,
-    "lastActive": 1,
-    "onlineStatus": 1,
-    # Additional fields for search results
-    "height": 1,
-    "heightInches": 1,
-    "religion": 1,
-    "eatingPreference": 1,
-    "bodyType": 1,
-    "matchScore": 1,
-    "compatibilityLevel": 1,
-    # Partner preferences for "Looking for" display
-    "partnerPreferences": 1,
-    "partnerCriteria": 1,
-    "partnerPreference": 1,
-    "lookingFor": 1,
-    # Date fields for sorting
-    "createdAt": 1,
-    "adminApprovedAt": 1,
-    "badges": 1,
-    # All other fields automatically excluded (MongoDB inclusion projection)
-}
-
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return PasswordManager.verify_password(plain_password, hashed_password)
 
@@ -287,36 +243,6 @@ def safe_datetime_serialize(dt):
         return dt  # Already a string
     return str(dt)
 
-# Helper function to remove consent metadata from user objects
-def remove_consent_metadata(user_dict):
-    """Remove consent-related metadata fields (backend-only, not shown to frontend)"""
-    consent_fields = [
-        "agreedToAge", "agreedToTerms", "agreedToPrivacy", "agreedToGuidelines",
-        "agreedToDataProcessing", "agreedToMarketing",
-        "termsAgreedAt", "privacyAgreedAt",
-        "consentIpAddress", "consentUserAgent"
-    ]
-    for field in consent_fields:
-        user_dict.pop(field, None)
-    return user_dict
-
-def _extract_image_path(url_or_path: str) -> str:
-    if not url_or_path:
-        return ''
-    if isinstance(url_or_path, str) and url_or_path.startswith('http'):
-        parsed = urlparse(url_or_path)
-        return parsed.path
-    if isinstance(url_or_path, str) and url_or_path.startswith('uploads/'):
-        return '/' + url_or_path
-    if isinstance(url_or_path, str) and not url_or_path.startswith('/') and url_or_path.startswith(f"{settings.upload_dir}/"):
-        return '/' + url_or_path
-    return url_or_path
-
-def _compute_public_image_paths(existing_images: List[str], public_images: List[str]) -> List[str]:
-    normalized_images = {_extract_image_path(img) for img in (existing_images or []) if img}
-    normalized_public = [_extract_image_path(img) for img in (public_images or []) if img]
-    return [p for p in normalized_public if p in normalized_images]
-
 def _enrich_user_with_image_visibility(user: dict) -> dict:
     """
     Enrich user dict with imageVisibility containing full URLs.
@@ -348,39 +274,19 @@ def _enrich_user_with_image_visibility(user: dict) -> dict:
     
     return user
 
-# Cache for profile_picture_always_visible setting (TTL: 60 seconds)
-_profile_pic_cache = {"value": None, "expires_at": 0}
-
 async def _get_profile_picture_always_visible(db) -> bool:
     """
     Get the profile_picture_always_visible setting from database or config fallback.
-    Uses in-memory cache with 60-second TTL to avoid repeated DB calls.
+    Served from the process-wide settings cache (services/settings_cache.py).
     
     When True: Profile picture (first image) is always visible to logged-in members
     When False: Profile picture follows same privacy rules as other images
     """
-    import time
-    
-    # Check cache first
-    if _profile_pic_cache["value"] is not None and time.time() < _profile_pic_cache["expires_at"]:
-        return _profile_pic_cache["value"]
-    
     try:
-        # Try with _id: "global" first (standard format)
-        system_settings = await db.system_settings.find_one({"_id": "global"})
-        if not system_settings:
-            # Fallback: try without filter (some deployments use different format)
-            system_settings = await db.system_settings.find_one({})
+        system_settings = await settings_cache.get_document(db, "system_settings")
         if system_settings:
-            value = system_settings.get("profile_picture_always_visible", True)
-        else:
-            value = settings.profile_picture_always_visible
-        
-        # Cache for 60 seconds
-        _profile_pic_cache["value"] = value
-        _profile_pic_cache["expires_at"] = time.time() + 60
-        
-        return value
+            return system_settings.get("profile_picture_always_visible", True)
+        return settings.profile_picture_always_visible
     except Exception:
         return True  # Default to True (industry standard)
 
@@ -418,19 +324,23 @@ def _is_admin_user(user_doc: Dict[str, Any]) -> bool:
     username = (user_doc.get("username") or "").lower()
     return role == "admin" or role_name == "admin" or username == "admin"
 
-async def _has_images_access(db, requester_username: str, owner_username: str, image_filename: str = None) -> bool:
-    """Check if requester has access to owner's images.
+async def _images_access_grant(db, requester_username: str, owner_username: str, image_filename: str = None) -> Optional[str]:
+    """Find the grant that gives requester access to owner's images.
     
     If image_filename is provided, also checks per-image access rules including one-time views.
+    
+    Returns:
+        "owner", "admin", "general", "permanent", "timed" or "onetime" (an unviewed
+        one-time grant), or None when access is denied
     """
     if not requester_username:
-        return False
+        return None
     if requester_username.lower() == owner_username.lower():
-        return True
+        return "owner"
 
     requester_user = await db.users.find_one(get_username_query(requester_username), {"role": 1, "role_name": 1, "username": 1})
     if _is_admin_user(requester_user):
-        return True
+        return "admin"
 
     # Get ALL active access records (there may be multiple)
     access_docs = await db.pii_access.find({
@@ -441,7 +351,7 @@ async def _has_images_access(db, requester_username: str, owner_username: str, i
     }).sort("grantedAt", -1).to_list(10)  # Most recent first
     
     if not access_docs:
-        return False
+        return None
     
     # Use the most recent access doc for general checks
     access_doc = access_docs[0]
@@ -455,13 +365,13 @@ async def _has_images_access(db, requester_username: str, owner_username: str, i
                 expires_dt = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
             if expires_dt <= datetime.utcnow():
                 await db.pii_access.update_one({"_id": access_doc.get("_id")}, {"$set": {"isActive": False}})
-                return False
+                return None
         except Exception:
             pass
     
     # If no specific image requested, just check general access
     if not image_filename:
-        return True
+        return "general"
     
     # Find the image index by matching filename in owner's images
     owner = await db.users.find_one(
@@ -469,7 +379,7 @@ async def _has_images_access(db, requester_username: str, owner_username: str, i
         {"images": 1}
     )
     if not owner:
-        return False
+        return None
     
     owner_images = owner.get("images", [])
     image_index = None
@@ -480,14 +390,14 @@ async def _has_images_access(db, requester_username: str, owner_username: str, i
     
     if image_index is None:
         # Image not found in owner's images, deny access
-        return False
+        return None
     
     # Check ALL access records for this image - if ANY grants access, allow it
     for access_doc in access_docs:
         picture_durations = access_doc.get("pictureDurations", {})
         if not picture_durations:
             # No per-image rules in this record, general access applies
-            return True
+            return "general"
         
         # Check if this specific image has access rules in this record
         image_access = picture_durations.get(image_index)
@@ -503,13 +413,13 @@ async def _has_images_access(db, requester_username: str, owner_username: str, i
             viewed_at = image_access.get("viewedAt")
             if viewed_at is None:
                 # Not yet viewed - access granted
-                return True
+                return "onetime"
             # Already viewed in this record, try next record
             continue
         
         # Check permanent access
         if duration_str == "permanent":
-            return True
+            return "permanent"
         
         # Check time-based expiry (numeric days)
         if duration_str.isdigit() or isinstance(duration, int):
@@ -521,16 +431,57 @@ async def _has_images_access(db, requester_username: str, owner_username: str, i
                         expires_dt = datetime.fromisoformat(image_expires_at.replace('Z', '+00:00'))
                     if expires_dt > datetime.utcnow():
                         # Not expired yet - access granted
-                        return True
+                        return "timed"
                 except Exception:
                     pass
             else:
                 # No expiresAt set, assume access granted
-                return True
+                return "timed"
     
     # No access record grants access to this image
     logger.info(f"🚫 No active access for image {image_index} by {requester_username}")
-    return False
+    return None
+
+
+async def _has_images_access(db, requester_username: str, owner_username: str, image_filename: str = None) -> bool:
+    """Check if requester has access to owner's images.
+    
+    If image_filename is provided, also checks per-image access rules including one-time views.
+    """
+    return await _images_access_grant(db, requester_username, owner_username, image_filename) is not None
+
+
+# Per (viewer, owner) memo of /media access decisions (TTL: 30 seconds).
+# A search page requests every card image of the same owners repeatedly;
+# one-time grants are never memoized because serving them consumes the grant.
+MEDIA_ACCESS_TTL_SECONDS = 30
+MEDIA_ACCESS_MAX_ENTRIES = 5000
+_media_access_cache: Dict[tuple, Dict[str, Any]] = {}
+
+
+async def _media_images_access(db, requester_username: str, owner_username: str, image_filename: str) -> Optional[str]:
+    """_images_access_grant for /media, memoized per (viewer, owner) for a short TTL"""
+    key = (requester_username.lower(), owner_username.lower())
+    now = time.time()
+    memo = _media_access_cache.get(key)
+    if memo and memo["expires_at"] > now and image_filename in memo["files"]:
+        return memo["files"][image_filename]
+
+    grant = await _images_access_grant(db, requester_username, owner_username, image_filename)
+    if grant == "onetime":
+        return grant
+
+    if not memo or memo["expires_at"] <= now:
+        if len(_media_access_cache) >= MEDIA_ACCESS_MAX_ENTRIES:
+            # Drop expired entries first, then the oldest ones
+            for stale_key in [k for k, v in _media_access_cache.items() if v["expires_at"] <= now]:
+                _media_access_cache.pop(stale_key, None)
+            while len(_media_access_cache) >= MEDIA_ACCESS_MAX_ENTRIES:
+                _media_access_cache.pop(next(iter(_media_access_cache)))
+        memo = {"expires_at": now + MEDIA_ACCESS_TTL_SECONDS, "files": {}}
+        _media_access_cache[key] = memo
+    memo["files"][image_filename] = grant
+    return grant
 
 
 async def _mark_image_as_viewed(db, requester_username: str, owner_username: str, image_filename: str):
@@ -587,6 +538,7 @@ async def _mark_image_as_viewed(db, requester_username: str, owner_username: str
 async def get_protected_media(
     filename: str,
     token: Optional[str] = Query(None, description="JWT token for img src requests"),
+    size: Optional[str] = Query(None, description="Pre-resized variant: thumb or card (original if omitted)"),
     current_user: dict = Depends(get_current_user_optional),
     db = Depends(get_database),
     request: Request = None
@@ -601,6 +553,8 @@ async def get_protected_media(
     - else: requires active pii_access grant with accessType='images'
     
     Supports token via query param for <img src> tags that can't send headers.
+    Responses carry a strong ETag with Cache-Control: private, so repeat loads
+    revalidate with 304 Not Modified instead of re-downloading.
     """
     # Check Referer header to prevent external hotlinking
     # Only allow requests from our app's frontend
@@ -653,54 +607,57 @@ async def get_protected_media(
     if not requester_username:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
 
-    # Locate owner by filename across known fields
-    safe_filename = re.escape(filename)
-    owner = await db.users.find_one(
-        {
-            "$or": [
-                {"images": {"$regex": safe_filename}},
-                {"publicImages": {"$regex": safe_filename}},
-                {"profileImage": {"$regex": safe_filename}},
-                {"imageVisibility.profilePic": {"$regex": safe_filename}},
-                {"imageVisibility.memberVisible": {"$regex": safe_filename}},
-                {"imageVisibility.onRequest": {"$regex": safe_filename}}
-            ]
-        },
-        {"username": 1, "images": 1, "publicImages": 1, "profileImage": 1, "imageVisibility": 1}
-    )
-    if not owner:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+    from services.storage_service import IMAGE_VARIANTS
+    if size and size not in IMAGE_VARIANTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"size must be one of: {', '.join(IMAGE_VARIANTS)}"
+        )
 
-    owner_username = owner.get("username")
+    # Locate owner via the media index (LRU + indexed lookup); files written by
+    # paths that don't maintain the index fall back to scanning user fields once
+    from services.media_index import MediaIndexService, MEDIA_USER_PROJECTION, build_media_entries
+    media_index = MediaIndexService(db)
+    entry = await media_index.lookup(filename)
+    if entry is None:
+        safe_filename = re.escape(filename)
+        owner = await db.users.find_one(
+            {
+                "$or": [
+                    {"images": {"$regex": safe_filename}},
+                    {"publicImages": {"$regex": safe_filename}},
+                    {"profileImage": {"$regex": safe_filename}},
+                    {"imageVisibility.profilePic": {"$regex": safe_filename}},
+                    {"imageVisibility.memberVisible": {"$regex": safe_filename}},
+                    {"imageVisibility.onRequest": {"$regex": safe_filename}}
+                ]
+            },
+            MEDIA_USER_PROJECTION
+        )
+        if not owner:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+        try:
+            await media_index.sync_user(owner)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to index media for {owner.get('username')}: {e}")
+        entry = build_media_entries(owner).get(filename)
+        if entry is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+
+    owner_username = entry.get("owner")
     if not owner_username:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
 
     # =================================================================
     # NEW IMAGE VISIBILITY SYSTEM (3-bucket)
     # =================================================================
-    # Check imageVisibility first (new system), fallback to publicImages (legacy)
-    image_visibility = owner.get("imageVisibility")
-    
-    is_profile_pic_bucket = False
-    is_member_visible_bucket = False
-    is_on_request_bucket = False
-    
-    if image_visibility:
-        # New system: check which bucket the image belongs to
-        profile_pic = image_visibility.get("profilePic", "")
-        member_visible = image_visibility.get("memberVisible", [])
-        on_request = image_visibility.get("onRequest", [])
-        
-        if profile_pic and profile_pic.split('/')[-1].split('?')[0] == filename:
-            is_profile_pic_bucket = True
-        elif any((img or "").split('/')[-1].split('?')[0] == filename for img in member_visible):
-            is_member_visible_bucket = True
-        elif any((img or "").split('/')[-1].split('?')[0] == filename for img in on_request):
-            is_on_request_bucket = True
-    
-    # Legacy fallback: determine if this image is public
-    public_list = owner.get("publicImages", [])
-    is_public = any((p or "").split('/')[-1].split('?')[0] == filename for p in public_list)
+    # The index records which imageVisibility bucket the file is in (new
+    # system) and whether it is in publicImages (legacy fallback)
+    bucket = entry.get("bucket")
+    is_profile_pic_bucket = bucket == "profilePic"
+    is_member_visible_bucket = bucket == "memberVisible"
+    is_on_request_bucket = bucket == "onRequest"
+    is_public = bool(entry.get("isPublic"))
     
     # =================================================================
     # PROFILE PICTURE ALWAYS VISIBLE
@@ -714,27 +671,12 @@ async def get_protected_media(
     #   3. Fallback: config.py -> profile_picture_always_visible (if DB not set)
     # =================================================================
     
-    # Check database setting first, fallback to config.py
-    system_settings = await db.system_settings.find_one({"_id": "global"})
-    profile_pic_always_visible = True  # Default
-    if system_settings:
-        profile_pic_always_visible = system_settings.get("profile_picture_always_visible", True)
-    else:
-        profile_pic_always_visible = settings.profile_picture_always_visible
-    
-    is_profile_picture = False
-    owner_images = owner.get("images", [])
+    # Database setting with config.py fallback (cached for 60 seconds)
+    profile_pic_always_visible = await _get_profile_picture_always_visible(db)
     
-    # Check profile picture: new system (imageVisibility.profilePic) or legacy (images[0])
-    if profile_pic_always_visible:
-        if is_profile_pic_bucket:
-            # New system: explicitly in profilePic bucket
-            is_profile_picture = True
-        elif not image_visibility and owner_images:
-            # Legacy fallback: first image is profile picture
-            first_image = owner_images[0] if owner_images else None
-            if first_image and first_image.split('/')[-1].split('?')[0] == filename:
-                is_profile_picture = True
+    # Profile picture: imageVisibility.profilePic (new system) or images[0] when
+    # imageVisibility is not set (legacy) - resolved into isProfilePic by the index
+    is_profile_picture = profile_pic_always_visible and bool(entry.get("isProfilePic"))
 
     is_one_time_view = False
     has_full_access = True
@@ -761,23 +703,23 @@ async def get_protected_media(
         has_full_access = True
     elif is_on_request_bucket:
         # New system: on request bucket - requires pii_access grant
-        has_access = await _has_images_access(db, requester_username, owner_username, filename)
-        if not has_access:
+        grant = await _media_images_access(db, requester_username, owner_username, filename)
+        if not grant:
             has_full_access = False
             logger.info(f"🔒 Serving blurred image {filename} to {requester_username} (on-request, no access)")
         else:
-            is_one_time_view = True
+            is_one_time_view = grant == "onetime"
     elif is_public:
         # Legacy: public images are visible to all
         has_full_access = True
     else:
         # Legacy: non-public images require pii_access
-        has_access = await _has_images_access(db, requester_username, owner_username, filename)
-        if not has_access:
+        grant = await _media_images_access(db, requester_username, owner_username, filename)
+        if not grant:
             has_full_access = False
             logger.info(f"🔒 Serving blurred image {filename} to {requester_username} (access expired/denied)")
         else:
-            is_one_time_view = True
+            is_one_time_view = grant == "onetime"
 
     # Check if the image format needs conversion for browser compatibility
     NON_BROWSER_EXTENSIONS = {'.tiff', '.tif', '.bmp', '.heic', '.heif'}
@@ -794,81 +736,85 @@ async def get_protected_media(
         img.save(output_buf, format='JPEG', quality=90)
         return output_buf.getvalue()
 
-    # Serve from GCS if enabled, else local filesystem
-    if settings.use_gcs and settings.gcs_bucket_name:
-        try:
-            from services.storage_service import get_storage_service
-            storage = get_storage_service()
-            
-            # If user has full access and format is browser-compatible, use Signed URL
-            # For non-browser formats (TIFF, BMP, HEIC), we must proxy and convert
-            if has_full_access and not needs_conversion:
-                signed_url = storage.generate_signed_url(filename)
-                if signed_url:
-                    # Mark one-time view as used before redirecting
-                    if is_one_time_view:
-                        await _mark_image_as_viewed(db, requester_username, owner_username, filename)
-                    
-                    logger.info(f"🔗 Redirecting {requester_username} to Signed URL for {filename}")
-                    from fastapi.responses import RedirectResponse
-                    return RedirectResponse(
-                        url=signed_url,
-                        headers={"Cache-Control": "no-store, no-cache, must-revalidate"}
-                    )
-            
-            # Proxy through backend: for blurred images, non-browser formats, or signed URL failure
-            from google.cloud import storage as gcs_storage
-            client = gcs_storage.Client()
-            bucket = client.bucket(settings.gcs_bucket_name)
-            blob = bucket.blob(f"uploads/{filename}")
-            if not blob.exists():
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
-            data = blob.download_as_bytes()
-            
-            # Convert non-browser formats to JPEG
-            media_type = "application/octet-stream"
-            if needs_conversion:
-                try:
-                    data = _convert_image_to_jpeg(data)
-                    media_type = "image/jpeg"
-                    logger.info(f"🔄 Converted {file_ext} to JPEG for {filename}")
-                except Exception as conv_err:
-                    logger.error(f"❌ Image conversion failed for {filename}: {conv_err}")
-            
-            # Mark one-time view as used after serving
-            if is_one_time_view:
-                await _mark_image_as_viewed(db, requester_username, owner_username, filename)
-            
-            # Add header to indicate access status for frontend blurring
-            headers = {"X-Image-Access": "full" if has_full_access else "blur"}
-            return Response(content=data, media_type=media_type, headers=headers)
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"❌ Failed to serve GCS media {filename}: {e}", exc_info=True)
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to fetch media")
+    from services.storage_service import StorageService, get_storage_service
+    try:
+        storage = get_storage_service()
+    except RuntimeError:
+        storage = StorageService(use_gcs=False)
+    use_gcs = bool(settings.use_gcs and settings.gcs_bucket_name and storage.use_gcs)
+
+    try:
+        # GCS: full-access, browser-compatible files are offloaded to a Signed URL
+        # For non-browser formats (TIFF, BMP, HEIC) and blurred images we proxy below
+        if use_gcs and has_full_access and not needs_conversion:
+            media_name = filename
+            if size:
+                located = await storage.stat_media(filename, size)
+                if located:
+                    media_name = located["filename"]
+            # Signing may call the IAM signBlob API; keep it off the event loop
+            signed_url = await asyncio.to_thread(storage.generate_signed_url, media_name)
+            if signed_url:
+                # Mark one-time view as used before redirecting
+                if is_one_time_view:
+                    await _mark_image_as_viewed(db, requester_username, owner_username, filename)
+                
+                logger.info(f"🔗 Redirecting {requester_username} to Signed URL for {media_name}")
+                from fastapi.responses import RedirectResponse
+                return RedirectResponse(
+                    url=signed_url,
+                    headers={"Cache-Control": "no-store, no-cache, must-revalidate"}
+                )
 
-    file_path = Path(settings.upload_dir) / filename
-    if not file_path.exists():
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
-    
-    # Mark one-time view as used after serving
-    if is_one_time_view:
-        await _mark_image_as_viewed(db, requester_username, owner_username, filename)
-    
-    # Add header to indicate access status for frontend blurring
-    headers = {"X-Image-Access": "full" if has_full_access else "blur"}
-    
-    # Convert non-browser formats to JPEG for local files too
-    if needs_conversion:
-        try:
-            with open(file_path, 'rb') as f:
-                data = _convert_image_to_jpeg(f.read())
-            return Response(content=data, media_type="image/jpeg", headers=headers)
-        except Exception as conv_err:
-            logger.error(f"❌ Local image conversion failed for {filename}: {conv_err}")
-    
-    return FileResponse(path=str(file_path), headers=headers)
+        # Serve through the backend (local disk, or GCS proxy), falling back to
+        # the original when the requested variant was never generated
+        media = await storage.stat_media(filename, size)
+        if not media:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+
+        # Strong validator per stored object and access state (the blur flag is a response header)
+        access_state = "full" if has_full_access else "blur"
+        etag = f'{media["etag"][:-1]}-{access_state}{"-jpeg" if needs_conversion else ""}"'
+        headers = {
+            "X-Image-Access": access_state,
+            "ETag": etag,
+            # Per-viewer response: browsers may store it but must revalidate (304) on each use;
+            # one-time views must not be kept at all
+            "Cache-Control": "private, no-store" if is_one_time_view else "private, no-cache",
+        }
+
+        if not is_one_time_view and request is not None:
+            if_none_match = request.headers.get("if-none-match", "")
+            if etag in [tag.strip() for tag in if_none_match.split(",")]:
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        if needs_conversion:
+            data = await storage.read_media(media)
+            try:
+                data = _convert_image_to_jpeg(data)
+                media_type = "image/jpeg"
+                logger.info(f"🔄 Converted {file_ext} to JPEG for {filename}")
+            except Exception as conv_err:
+                logger.error(f"❌ Image conversion failed for {filename}: {conv_err}")
+                media_type = "application/octet-stream"
+            response = Response(content=data, media_type=media_type, headers=headers)
+        else:
+            import mimetypes
+            media_type = mimetypes.guess_type(media["filename"])[0] or "application/octet-stream"
+            if media.get("size") is not None:
+                headers["Content-Length"] = str(media["size"])
+            response = StreamingResponse(storage.stream_media(media), media_type=media_type, headers=headers)
+
+        # Mark one-time view as used after serving
+        if is_one_time_view:
+            await _mark_image_as_viewed(db, requester_username, owner_username, filename)
+
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Failed to serve media {filename}: {e}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to fetch media")
 
 def parse_height_to_inches(height_str):
     """Convert height string '5'8"' or '5 ft 8 in' to total inches"""
@@ -1380,6 +1326,7 @@ async def register_user(
             "notes": creatorNotes
         } if profileCreatedBy and profileCreatedBy != "Self" else None,
         "images": image_paths,
+        "hasPhoto": has_photo_flag(image_paths),
         # Legal consent metadata (for audit trail and GDPR compliance)
         "agreedToAge": agreedToAge,
         "agreedToTerms": agreedToTerms,
@@ -1437,6 +1384,10 @@ async def register_user(
         }
     }
     
+    # Derived report facets (normalized city/state, profession category - no PII)
+    from services.report_facets import facet_updates
+    user_doc.update(facet_updates(user_doc))
+    
     # 🔒 ENCRYPT PII fields before saving
     try:
         encryptor = get_encryptor()
@@ -3047,6 +2998,7 @@ async def update_user_profile(
     # Update images field if modified
     if images_modified:
         update_data["images"] = existing_images
+        update_data["hasPhoto"] = has_photo_flag(existing_images)
         logger.info(f"📸 Final image count: {len(existing_images)}")
         logger.info(f"📸 Images field in update_data: {existing_images}")
         
@@ -3089,6 +3041,10 @@ async def update_user_profile(
     # Update timestamp
     update_data["updatedAt"] = datetime.utcnow().isoformat()
     
+    # Keep derived report facets in sync with plaintext location/work changes
+    from services.report_facets import facet_updates
+    update_data.update(facet_updates(update_data, user))
+    
     # Log what's being updated
     logger.info(f"📝 update_data keys: {list(update_data.keys())}")
     
@@ -3118,6 +3074,14 @@ async def update_user_profile(
         
         logger.info(f"✅ Profile updated successfully for user '{username}' (modified: {result.modified_count} fields)")
         
+        if "images" in update_data:
+            from services.media_index import sync_user_media
+            await sync_user_media(db, username)
+            from services.search_snapshot import sync_candidate_photo
+            await sync_candidate_photo(db, username, existing_images)
+        from services.profile_cards import invalidate_profile_card
+        await invalidate_profile_card(username)
+        
         # Log activity for profile edit
         try:
             from services.activity_logger import get_activity_logger
@@ -3352,6 +3316,7 @@ async def upload_photos(
             {"username": username},
             {"$set": {
                 "images": all_images,
+                "hasPhoto": has_photo_flag(all_images),
                 "updatedAt": datetime.utcnow().isoformat()
             }}
         )
@@ -3361,6 +3326,13 @@ async def upload_photos(
         
         logger.info(f"✅ Photos auto-uploaded successfully for user '{username}'")
         
+        from services.media_index import sync_user_media
+        await sync_user_media(db, username)
+        from services.search_snapshot import sync_candidate_photo
+        await sync_candidate_photo(db, username, all_images)
+        from services.profile_cards import invalidate_profile_card
+        await invalidate_profile_card(username)
+        
         # Log activity
         try:
             activity_logger = get_activity_logger()
@@ -3503,6 +3475,12 @@ async def reorder_photos(
         if result.modified_count == 0:
             logger.warning(f"⚠️ No changes made to user '{username}' photo order")
         
+        # images[0] is the legacy profile picture, so its index flags move with the order
+        from services.media_index import sync_user_media
+        await sync_user_media(db, username)
+        from services.profile_cards import invalidate_profile_card
+        await invalidate_profile_card(username)
+        
         logger.info(f"✅ Photos reordered successfully for user '{username}'")
         logger.info(f"📸 New profile picture: {normalized_order[0] if normalized_order else 'none'}")
         
@@ -3619,6 +3597,9 @@ async def rotate_photo(
         {"$set": update_fields}
     )
     
+    from services.profile_cards import invalidate_profile_card
+    await invalidate_profile_card(username)
+    
     logger.info(f"🔄 Photo rotated {degrees}° for {username}: {target_filename}")
     
     return {
@@ -3800,6 +3781,7 @@ async def delete_photo(
             get_username_query(username),
             {"$set": {
                 "images": normalized_remaining_paths,
+                "hasPhoto": has_photo_flag(normalized_remaining_paths),
                 "publicImages": normalized_public_paths,
                 "imageVisibility": new_visibility,
                 "updatedAt": datetime.utcnow().isoformat()
@@ -3818,6 +3800,13 @@ async def delete_photo(
             logger.info(f"🔍 Post-delete DB verify: images={verify.get('images', [])}, profilePic={verify.get('imageVisibility', {}).get('profilePic')}")
         
         logger.info(f"✅ Photo deleted successfully for user '{username}'")
+        
+        from services.media_index import sync_user_media
+        await sync_user_media(db, user.get("username", username))
+        from services.search_snapshot import sync_candidate_photo
+        await sync_candidate_photo(db, user.get("username", username), normalized_remaining_paths)
+        from services.profile_cards import invalidate_profile_card
+        await invalidate_profile_card(user.get("username", username))
         logger.info(f"📸 Images before: {len(existing_images)}, after: {len(normalized_remaining)}")
         logger.info(f"📸 New visibility: profilePic={new_visibility['profilePic']}, memberVisible={len(new_visibility['memberVisible'])}, onRequest={len(new_visibility['onRequest'])}")
         
@@ -3920,6 +3909,11 @@ async def update_public_images(
         {"$set": {"publicImages": normalized_public, "updatedAt": datetime.utcnow().isoformat()}}
     )
 
+    from services.media_index import sync_user_media
+    await sync_user_media(db, username)
+    from services.profile_cards import invalidate_profile_card
+    await invalidate_profile_card(username)
+
     return {
         "publicImages": [get_full_image_url(img) for img in normalized_public],
         "message": "Public photos updated"
@@ -4127,6 +4121,11 @@ async def update_image_visibility(
 
     logger.info(f"📸 Image visibility updated for {username}: profilePic={normalized_profile_pic}, memberVisible={len(normalized_member_visible)}, onRequest={len(normalized_on_request)}")
 
+    from services.media_index import sync_user_media
+    await sync_user_media(db, username)
+    from services.profile_cards import invalidate_profile_card
+    await invalidate_profile_card(username)
+
     # Log activity
     try:
         activity_logger = get_activity_logger()
@@ -4498,18 +4497,17 @@ async def get_all_users(
         cursor = db.users.find(query, SEARCH_RESULT_PROJECTION).sort(sort).skip(skip).limit(limit)
         users = await cursor.to_list(length=limit)
         
-        # Remove sensitive data and decrypt PII
+        # 🔓 DECRYPT PII fields (one batch pass, memoized per ciphertext)
+        try:
+            users = get_encryptor().decrypt_many(users)
+        except Exception as decrypt_err:
+            logger.warning(f"⚠️ Decryption skipped for {len(users)} users: {decrypt_err}")
+        
+        # Remove sensitive data
         for i, user in enumerate(users):
             user.pop("password", None)
             user.pop("_id", None)
             
-            # 🔓 DECRYPT PII fields
-            try:
-                encryptor = get_encryptor()
-                users[i] = encryptor.decrypt_user_pii(user)  # ✅ Assign back to list!
-            except Exception as decrypt_err:
-                logger.warning(f"⚠️ Decryption skipped for {user.get('username', 'unknown')}: {decrypt_err}")
-            
             # Set default role_name to 'free_user' if not set
             if not users[i].get("role_name"):
                 users[i]["role_name"] = "free_user"
@@ -4841,6 +4839,8 @@ async def delete_user_profile(
         messages_received = await db.messages.delete_many({"toUsername": username})
         deletion_summary["deleted_items"]["messages_received"] = messages_received.deleted_count
         logger.info(f"🗑️ Deleted {messages_received.deleted_count} messages received by '{username}'")
+        from services.conversation_summaries import remove_user_conversation_summaries
+        await remove_user_conversation_summaries(db, username)
         
         # 10. Delete activity logs
         activity_logs = await db.activity_logs.delete_many({"username": username})
@@ -4873,12 +4873,19 @@ async def delete_user_profile(
         logger.info(f"🗑️ Deleted {event_logs.deleted_count} event logs involving '{username}'")
         
         # 15. Delete profile views (where user viewed others)
-        profile_views_as_viewer = await db.profile_views.delete_many({"viewer_username": username})
+        # Buffered view counts are keyed by these rows - clear them while the rows still exist
+        from services.profile_view_counter import get_profile_view_counter
+        await get_profile_view_counter().forget_user(db, username)
+        profile_views_as_viewer = await db.profile_views.delete_many({
+            "$or": [{"viewer_username": username}, {"viewedByUsername": username}]
+        })
         deletion_summary["deleted_items"]["profile_views_as_viewer"] = profile_views_as_viewer.deleted_count
         logger.info(f"🗑️ Deleted {profile_views_as_viewer.deleted_count} profile views by '{username}'")
         
         # 16. Delete profile views (where others viewed user)
-        profile_views_as_viewed = await db.profile_views.delete_many({"viewed_username": username})
+        profile_views_as_viewed = await db.profile_views.delete_many({
+            "$or": [{"viewed_username": username}, {"profileUsername": username}]
+        })
         deletion_summary["deleted_items"]["profile_views_as_viewed"] = profile_views_as_viewed.deleted_count
         logger.info(f"🗑️ Deleted {profile_views_as_viewed.deleted_count} profile views of '{username}'")
         
@@ -4895,6 +4902,8 @@ async def delete_user_profile(
         # 19. Finally, delete the user profile itself
         logger.info(f"💾 Deleting user profile for '{username}' from database...")
         user_result = await db.users.delete_one({"username": username})
+        from auth.auth_context import invalidate_user
+        await invalidate_user(username)
         
         if user_result.deleted_count == 0:
             logger.error(f"❌ Failed to delete user '{username}' from database")
@@ -4905,6 +4914,11 @@ async def delete_user_profile(
         
         deletion_summary["deleted_items"]["user_profile"] = 1
         
+        from services.media_index import remove_user_media
+        await remove_user_media(db, username)
+        from services.profile_cards import invalidate_profile_card
+        await invalidate_profile_card(username)
+        
         # Calculate total items deleted
         total_deleted = sum(deletion_summary["deleted_items"].values())
         deletion_summary["total_items_deleted"] = total_deleted
@@ -5080,6 +5094,182 @@ async def get_location_options(db = Depends(get_database)):
             "count": len(fallback_options)
         }
 
+def _search_key_stages(query: dict, age_min: Optional[int], age_max: Optional[int],
+                       keyset: Optional[dict] = None) -> list:
+    """
+    Pipeline stages matching the search query down to lean sort keys (plus calculatedAge)
+
+    keyset: cursor predicate on stored sort keys; it joins the first $match so
+            the (hasPhoto, createdAt, _id) index can bound the page
+    """
+    pipeline = [
+        {"$match": {"$and": [query, keyset]} if keyset else query},
+        {"$project": {
+            "username": 1, "createdAt": 1, "firstName": 1, "location": 1,
+            "birthYear": 1, "birthMonth": 1, "hasPhoto": 1
+        }}
+    ]
+
+    # Age is calculated dynamically from birthMonth and birthYear so it is never stale
+    if age_min is not None or age_max is not None:
+        now = datetime.now()
+        age_conditions = [{"calculatedAge": {"$ne": None}}]  # Must have age data
+        if age_min is not None:
+            age_conditions.append({"calculatedAge": {"$gte": age_min}})
+        if age_max is not None:
+            age_conditions.append({"calculatedAge": {"$lte": age_max}})
+        pipeline += [
+            {"$addFields": {"calculatedAge": {"$cond": {
+                "if": {"$and": [{"$ne": ["$birthMonth", None]}, {"$ne": ["$birthYear", None]}]},
+                # current_year - birthYear, minus 1 if the birthday hasn't occurred yet this year
+                "then": {"$subtract": [
+                    {"$subtract": [now.year, "$birthYear"]},
+                    {"$cond": {"if": {"$lt": [now.month, "$birthMonth"]}, "then": 1, "else": 0}}
+                ]},
+                "else": None
+            }}}},
+            {"$match": {"$and": age_conditions}}
+        ]
+    return pipeline
+
+
+async def _search_page_usernames(db, query: dict, age_min: Optional[int], age_max: Optional[int],
+                                 sort: list, skip: int, limit: int):
+    """Match, sort and paginate on lean keys only; returns (page usernames, total)"""
+    pipeline = _search_key_stages(query, age_min, age_max) + [
+        # Profiles with photos first, then by user's chosen sort
+        {"$sort": {"hasPhoto": -1, **dict(sort)}},
+        {"$facet": {
+            "users": [{"$skip": skip}, {"$limit": limit}, {"$project": {"_id": 0, "username": 1}}],
+            "totalCount": [{"$count": "count"}]
+        }}
+    ]
+
+    result = await db.users.aggregate(pipeline).to_list(1)
+    if not result:
+        return [], 0
+    total_count = result[0].get("totalCount", [])
+    return [u["username"] for u in result[0].get("users", [])], total_count[0]["count"] if total_count else 0
+
+
+async def _search_cached_page(db, criteria: dict, query: dict, exclude_usernames: List[str],
+                              age_min: Optional[int], age_max: Optional[int], sort: list, skip: int, limit: int):
+    """
+    Page from the shared criteria cache (viewer exclusions applied as a post-filter)
+
+    Returns (page usernames, total), or None when the result set is too large to
+    cache or Redis is unavailable
+    """
+    from services.search_cache import SearchResultCache, MAX_CACHED_IDS
+
+    cache = SearchResultCache()
+    cached = await cache.lookup(criteria)
+    if cached is None or cached.uncacheable:
+        return None
+    candidates = cached.usernames
+    if candidates is None:
+        # Fill without the viewer-specific username exclusions so every viewer can share it
+        shared_query = {key: value for key, value in query.items() if key != "username"}
+        pipeline = _search_key_stages(shared_query, age_min, age_max) + [
+            {"$sort": {"hasPhoto": -1, **dict(sort)}},
+            {"$limit": MAX_CACHED_IDS + 1},
+            {"$project": {"_id": 0, "username": 1}}
+        ]
+        docs = await db.users.aggregate(pipeline).to_list(MAX_CACHED_IDS + 1)
+        if len(docs) > MAX_CACHED_IDS:
+            await cache.store(criteria, cached.generation, None)
+            return None
+        candidates = [doc["username"] for doc in docs]
+        await cache.store(criteria, cached.generation, candidates)
+
+    excluded = set(exclude_usernames)
+    visible = [username for username in candidates if username not in excluded]
+    return visible[skip:skip + limit], len(visible)
+
+
+async def _search_cursor_page(db, query: dict, age_min: Optional[int], age_max: Optional[int],
+                              sort: list, after: Optional[list], limit: int):
+    """Keyset page on lean keys; returns (page usernames, nextCursor, cached total)"""
+    from utils.pagination import keyset_match, split_page, count_cache
+
+    keyset = None
+    if after is not None:
+        # Profile sort fields may be missing (or mixed date/string); hasPhoto and _id never are
+        nullable = [field for field, _ in sort if field not in ("hasPhoto", "_id")]
+        keyset = keyset_match(sort, after, nullable)
+    pipeline = _search_key_stages(query, age_min, age_max, keyset) + [{"$sort": dict(sort)}, {"$limit": limit + 1}]
+    docs, next_cursor = split_page(await db.users.aggregate(pipeline).to_list(limit + 1), limit, sort)
+
+    async def count():
+        result = await db.users.aggregate(
+            _search_key_stages(query, age_min, age_max) + [{"$count": "count"}]
+        ).to_list(1)
+        return result[0]["count"] if result else 0
+
+    total = await count_cache.get(count_cache.key("search", query, age_min, age_max), count)
+    return [doc["username"] for doc in docs], next_cursor, total
+
+
+async def _reconcile_search_snapshot(db, query: dict) -> Optional[tuple]:
+    """
+    Split users still queued for L3V3L recomputation by the live search query
+
+    Their snapshot entries may predate a status/profile change (or be missing
+    after an approval), so the snapshot page must drop the ones that no longer
+    match and contain the ones that do.
+
+    Returns:
+        (no longer matching, still matching) or None when too many are queued to check
+    """
+    from services.l3v3l_score_maintenance import L3V3LScoreMaintainer
+    from services.search_snapshot import MAX_PENDING_RECONCILE
+
+    pending = await L3V3LScoreMaintainer(db).get_pending_usernames(MAX_PENDING_RECONCILE)
+    if pending is None:
+        return None
+    if not pending:
+        return [], []
+    matching = set(await db.users.distinct("username", {"$and": [query, {"username": {"$in": pending}}]}))
+    return [u for u in pending if u not in matching], sorted(matching)
+
+
+async def _load_search_page(db, viewer: str, usernames: List[str], projection: dict,
+                            scores: Optional[Dict[str, tuple]] = None, live_query: Optional[dict] = None):
+    """
+    Join full profile fields and L3V3L scores for one page of usernames (order preserved)
+
+    scores: {username: (matchScore, level)} when already known (search snapshot),
+            otherwise read from l3v3l_scores for just this page
+    live_query: re-applied to the page so users who changed since a cached result set drop out
+    """
+    if not usernames:
+        return []
+
+    user_query = {"username": {"$in": usernames}}
+    if live_query:
+        user_query = {"$and": [live_query, user_query]}
+    docs = await db.users.find(user_query, projection).to_list(len(usernames))
+
+    if scores is None:
+        score_docs = await db.l3v3l_scores.find(
+            {"fromUsername": viewer, "toUsername": {"$in": usernames}},
+            {"toUsername": 1, "score": 1, "level": 1, "_id": 0}
+        ).to_list(len(usernames))
+        scores = {s["toUsername"]: (s.get("score"), s.get("level")) for s in score_docs}
+
+    by_username = {doc["username"]: doc for doc in docs}
+    page = []
+    for username in usernames:
+        user = by_username.get(username)
+        if user is None:
+            continue
+        score, level = scores.get(username, (None, None))
+        user["matchScore"] = score if score is not None else 0
+        user["compatibilityLevel"] = level
+        page.append(user)
+    return page
+
+
 # Search endpoint for advanced user search
 @router.get("/search")
 @limiter.limit(RATE_LIMITS["search"])
@@ -5111,6 +5301,7 @@ async def search_users(
     sortOrder: str = "desc",
     page: int = 1,
     limit: int = 20,
+    cursor: Optional[str] = Query(None, description="Opt-in keyset pagination: empty for the first page, then the previous nextCursor"),
     current_user: dict = Depends(get_current_user),
     db = Depends(get_database)
 ):
@@ -5382,6 +5573,16 @@ async def search_users(
     skip = (page - 1) * limit
     logger.info(f"📄 Pagination: page={page}, limit={limit}, skip={skip}")
 
+    # Keyset mode: position after the cursor on (hasPhoto, sort keys..., _id)
+    cursor_sort = [("hasPhoto", -1)] + sort
+    cursor_after = None
+    if cursor:
+        from utils.pagination import decode_cursor
+        try:
+            cursor_after = decode_cursor(cursor, cursor_sort)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
     # Get user's exclusions (both directions) and filter them out from search results
     current_username = current_user.get("username")
     exclusions = await db.exclusions.find({
@@ -5436,317 +5637,116 @@ async def search_users(
     logger.info(f"🚫 Excluding {len(excluded_usernames)} blocked users + self + admins/moderators from search")
     logger.info(f"📋 FINAL QUERY before execution: {query}")
     
+    # Snapshot fast path: the default browse (gender/age/photo only, date or age sort)
+    # can be paged entirely from the viewer's precomputed candidate snapshot
+    from services.search_snapshot import SearchSnapshotService, SNAPSHOT_SORTS
+    viewer_gender = (current_user.get("gender") or "").strip().capitalize()
+    opposite_gender = {"Male": "Female", "Female": "Male"}.get(viewer_gender)
+    snapshot_eligible = (
+        cursor is None
+        and not profileId
+        and not (status_filter and is_privileged)
+        and sortBy in SNAPSHOT_SORTS
+        and opposite_gender is not None
+        and query.get("gender") == opposite_gender
+        and not any([
+            keyword.strip(), location.strip(), occupation.strip(), religion.strip(), caste.strip(),
+            eatingPreference.strip(), drinking.strip(), smoking.strip(), relationshipStatus.strip(),
+            bodyType.strip(), heightMin > 0, heightMax > 0, newlyAdded, daysBack > 0,
+            any(loc.strip() for loc in locations), any(occ.strip() for occ in occupations)
+        ])
+    )
+    
+    # Shared result cache key: everything that shapes the result set except the viewer's exclusions
+    cache_criteria = None
+    if not profileId and cursor is None:
+        cache_criteria = {
+            "gender": query.get("gender"),
+            "status": status_filter if (status_filter and is_privileged) else "active",
+            "keyword": keyword, "ageMin": ageMin, "ageMax": ageMax,
+            "heightMin": heightMin, "heightMax": heightMax,
+            "location": location, "locations": location_list, "occupations": occupation_list,
+            "religion": religion, "caste": caste, "eatingPreference": eatingPreference,
+            "drinking": drinking, "smoking": smoking, "relationshipStatus": relationshipStatus,
+            "bodyType": bodyType, "hasPhoto": hasPhoto, "newlyAdded": newlyAdded, "daysBack": daysBack,
+            "sort": [list(key) for key in sort]
+        }
+    
     try:
-        # Use aggregation pipeline if age filtering is needed (for dynamic calculation)
-        # Otherwise use simple find for better performance
-        if age_filter_min is not None or age_filter_max is not None:
-            from datetime import datetime
-            current_year = datetime.now().year
-            current_month = datetime.now().month
-            
-            # Build age filter conditions dynamically (avoid empty objects in $and)
-            age_conditions = [{"calculatedAge": {"$ne": None}}]  # Must have age data
-            if age_filter_min is not None:
-                age_conditions.append({"calculatedAge": {"$gte": age_filter_min}})
-            if age_filter_max is not None:
-                age_conditions.append({"calculatedAge": {"$lte": age_filter_max}})
-            
-            # Build aggregation pipeline
-            pipeline = [
-                # Stage 1: Match base query
-                {"$match": query},
-                
-                # Stage 1.5: Project lean fields for search results
-                {"$project": SEARCH_RESULT_PROJECTION},
-                
-                # Stage 2: Add calculated age field
-                {"$addFields": {
-                    "calculatedAge": {
-                        "$cond": {
-                            "if": {"$and": [
-                                {"$ne": ["$birthMonth", None]},
-                                {"$ne": ["$birthYear", None]}
-                            ]},
-                            "then": {
-                                # Calculate: current_year - birthYear, then subtract 1 if birthday hasn't occurred yet this year
-                                "$subtract": [
-                                    {"$subtract": [current_year, "$birthYear"]},
-                                    {
-                                        "$cond": {
-                                            # If current month is before birth month, subtract 1 from age
-                                            "if": {"$lt": [current_month, "$birthMonth"]},
-                                            "then": 1,
-                                            "else": 0
-                                        }
-                                    }
-                                ]
-                            },
-                            "else": None
-                        }
-                    }
-                }},
-                
-                # Stage 3: Filter by calculated age (STRICT - only users within age range)
-                {"$match": {"$and": age_conditions}},
-                
-                # Stage 4: Lookup L3V3L scores from pre-computed collection
-                {"$lookup": {
-                    "from": "l3v3l_scores",
-                    "let": {"targetUsername": "$username"},
-                    "pipeline": [
-                        {"$match": {
-                            "$expr": {
-                                "$and": [
-                                    {"$eq": ["$fromUsername", current_username]},
-                                    {"$eq": ["$toUsername", "$$targetUsername"]}
-                                ]
-                            }
-                        }},
-                        {"$project": {"score": 1, "level": 1, "_id": 0}}
-                    ],
-                    "as": "l3v3lMatch"
-                }},
-                
-                # Stage 5: Add matchScore field and hasPhoto flag from lookup result
-                {"$addFields": {
-                    "matchScore": {"$ifNull": [{"$arrayElemAt": ["$l3v3lMatch.score", 0]}, 0]},
-                    "compatibilityLevel": {"$ifNull": [{"$arrayElemAt": ["$l3v3lMatch.level", 0]}, None]},
-                    "_hasPhoto": {"$cond": {
-                        "if": {"$and": [
-                            {"$ne": ["$images", None]},
-                            {"$ne": ["$images", []]},
-                            {"$gt": [{"$size": {"$ifNull": ["$images", []]}}, 0]}
-                        ]},
-                        "then": 1,
-                        "else": 0
-                    }}
-                }},
-                
-                # Stage 6: Remove the lookup array (cleanup)
-                {"$project": {"l3v3lMatch": 0}},
-                
-                # Stage 7: Sort - profiles with photos first, then by user's chosen sort
-                {"$sort": {"_hasPhoto": -1, **dict(sort)}},
-                
-                # Stage 8: Facet for pagination and count
-                {"$facet": {
-                    "users": [
-                        {"$skip": skip},
-                        {"$limit": limit}
-                    ],
-                    "totalCount": [
-                        {"$count": "count"}
-                    ]
-                }}
-            ]
-            
-            # Execute aggregation
-            logger.info(f"🔍 Executing search with aggregation (dynamic age calculation), skip={skip}, limit={limit}")
-            
-            # 🔍 DEBUG: Log ALL users matching the base query (before pagination) when age filter is used
-            # if gender:
-            #     debug_cursor = db.users.find(query, {"username": 1, "gender": 1, "firstName": 1, "_id": 0})
-            #     debug_users = await debug_cursor.to_list(100)  # Limit to 100 for logging
-            #     logger.warning(f"🔍 DEBUG GENDER CHECK (with age filter) - Filter: gender='{gender.strip().capitalize()}' - Found {len(debug_users)} users matching query")
-            #     logger.warning(f"🔍 DEBUG QUERY: {query}")
-            #     if len(debug_users) == 0:
-            #         logger.error(f"🚨 NO USERS FOUND matching gender filter! Query: {query}")
-            #     else:
-            #         # Log first 20 users
-            #         for du in debug_users[:20]:
-            #             logger.warning(f" >>>>>>>>>>>  👤 {du.get('firstName', 'N/A')} ({du.get('username')}) - gender: '{du.get('gender')}'")
-            #         if len(debug_users) > 20:
-            #             logger.warning(f"   ... and {len(debug_users) - 20} more users")
-            #     # Check for mismatches
-            #     mismatches = [du for du in debug_users if du.get('gender') != gender.strip().capitalize()]
-            #     if mismatches:
-            #         logger.error(f"🚨 GENDER MISMATCH DETECTED! Expected '{gender.strip().capitalize()}' but found {len(mismatches)} mismatches:")
-            #         for m in mismatches[:10]:  # Log first 10 mismatches
-            #             logger.error(f"   ❌ {m.get('firstName', 'N/A')} ({m.get('username')}) has gender='{m.get('gender')}'")
-            
-            result = await db.users.aggregate(pipeline).to_list(1)
-            
-            if result and len(result) > 0:
-                users = result[0].get("users", [])
-                total_count = result[0].get("totalCount", [])
-                total = total_count[0]["count"] if total_count else 0
-                # logger.warning(f"📊 AGGREGATION RESULT: returned {len(users)} users, total={total}")
-                # if users:
-                #     # Log ALL returned users with their gender
-                #     logger.warning(f"📊 RETURNED USERS (checking gender):")
-                #     for u in users:
-                #         logger.warning(f"   👤 {u.get('firstName', 'N/A')} ({u.get('username')}) - gender: '{u.get('gender')}'")
-                #     # Log any gender mismatches for debugging
-                #     if gender:
-                #         mismatches = [u for u in users if u.get('gender') != gender.strip().capitalize()]
-                #         if mismatches:
-                #             logger.error(f"🚨 GENDER MISMATCH IN RESULTS! Expected '{gender.strip().capitalize()}' but found {len(mismatches)} wrong:")
-                #             for m in mismatches:
-                #                 logger.error(f"   ❌ {m.get('firstName', 'N/A')} ({m.get('username')}) has gender='{m.get('gender')}'")
-                #         else:
-                #             logger.warning(f"✅ All {len(users)} users have correct gender '{gender.strip().capitalize()}'")
-                # else:
-                #     logger.warning(f"📊 No users returned from aggregation")
-            else:
-                users = []
-                total = 0
+        # Sort and paginate on lean keys, then join L3V3L scores and cached
+        # profile cards for the returned page only
+        has_age_filter = age_filter_min is not None or age_filter_max is not None
+        projection = {"_id": 0, "username": 1}
+        
+        snapshot_page = None
+        next_cursor = None
+        if snapshot_eligible:
+            # Snapshot may lag the score job - settle users it hasn't caught up with yet
+            reconciled = await _reconcile_search_snapshot(db, query)
+            # Queued users' snapshot birth dates may be stale, so age filters/sorts go live
+            if reconciled is not None and not (reconciled[1] and (has_age_filter or sortBy == "age")):
+                stale_usernames, matching_usernames = reconciled
+                snapshot_page = await SearchSnapshotService(db).page(
+                    current_username,
+                    exclude_usernames=usernames_to_exclude + stale_usernames,
+                    age_min=age_filter_min,
+                    age_max=age_filter_max,
+                    has_photo=hasPhoto,
+                    sort_by=sortBy,
+                    sort_order=sortOrder,
+                    skip=skip,
+                    limit=limit,
+                    require_usernames=matching_usernames
+                )
+        
+        if snapshot_page is not None:
+            entries, total = snapshot_page
+            logger.info(f"🔍 Search served from snapshot, skip={skip}, limit={limit}, total={total}")
+            users = await _load_search_page(
+                db, current_username, [e["username"] for e in entries], projection,
+                scores={e["username"]: (e.get("matchScore"), e.get("level")) for e in entries}
+            )
+        elif cursor is not None:
+            logger.info(f"🔍 Executing keyset search (age filter: {has_age_filter}), limit={limit}")
+            page_usernames, next_cursor, total = await _search_cursor_page(
+                db, query, age_filter_min, age_filter_max, cursor_sort, cursor_after, limit
+            )
+            users = await _load_search_page(db, current_username, page_usernames, projection)
         else:
-            # No age filtering - use aggregation with L3V3L lookup
-            logger.info(f"🔍 Executing search with L3V3L lookup, query: {query}")
-            
-            # 🔍 DEBUG: Log ALL users matching the base query (before pagination)
-            # if gender:
-            #     debug_cursor = db.users.find(query, {"username": 1, "gender": 1, "firstName": 1, "_id": 0})
-            #     debug_users = await debug_cursor.to_list(100)  # Limit to 100 for logging
-            #     logger.warning(f"🔍 DEBUG GENDER CHECK - Filter: gender='{gender.strip().capitalize()}' - Found {len(debug_users)} users matching query")
-            #     logger.warning(f"🔍 DEBUG QUERY: {query}")
-            #     if len(debug_users) == 0:
-            #         logger.error(f"🚨 NO USERS FOUND matching gender filter! Query: {query}")
-            #     else:
-            #         # Log first 20 users
-            #         for du in debug_users[:20]:
-            #             logger.warning(f"   👤 {du.get('firstName', 'N/A')} ({du.get('username')}) - gender: '{du.get('gender')}'")
-            #         if len(debug_users) > 20:
-            #             logger.warning(f"   ... and {len(debug_users) - 20} more users")
-            #     # Check for mismatches
-            #     mismatches = [du for du in debug_users if du.get('gender') != gender.strip().capitalize()]
-            #     if mismatches:
-            #         logger.error(f"🚨 GENDER MISMATCH DETECTED! Expected '{gender.strip().capitalize()}' but found {len(mismatches)} mismatches:")
-            #         for m in mismatches[:10]:  # Log first 10 mismatches
-            #             logger.error(f"   ❌ {m.get('firstName', 'N/A')} ({m.get('username')}) has gender='{m.get('gender')}'")
-            
-            pipeline = [
-                {"$match": query},
-                {"$project": DASHBOARD_USER_PROJECTION},
-                # Lookup L3V3L scores
-                {"$lookup": {
-                    "from": "l3v3l_scores",
-                    "let": {"targetUsername": "$username"},
-                    "pipeline": [
-                        {"$match": {
-                            "$expr": {
-                                "$and": [
-                                    {"$eq": ["$fromUsername", current_username]},
-                                    {"$eq": ["$toUsername", "$$targetUsername"]}
-                                ]
-                            }
-                        }},
-                        {"$project": {"score": 1, "level": 1, "_id": 0}}
-                    ],
-                    "as": "l3v3lMatch"
-                }},
-                {"$addFields": {
-                    "matchScore": {"$ifNull": [{"$arrayElemAt": ["$l3v3lMatch.score", 0]}, 0]},
-                    "compatibilityLevel": {"$ifNull": [{"$arrayElemAt": ["$l3v3lMatch.level", 0]}, None]},
-                    "_hasPhoto": {"$cond": {
-                        "if": {"$and": [
-                            {"$ne": ["$images", None]},
-                            {"$ne": ["$images", []]},
-                            {"$gt": [{"$size": {"$ifNull": ["$images", []]}}, 0]}
-                        ]},
-                        "then": 1,
-                        "else": 0
-                    }}
-                }},
-                {"$project": {"l3v3lMatch": 0}},
-                {"$sort": {"_hasPhoto": -1, **dict(sort)}},
-                {"$facet": {
-                    "users": [{"$skip": skip}, {"$limit": limit}],
-                    "totalCount": [{"$count": "count"}]
-                }}
-            ]
-            
-            result = await db.users.aggregate(pipeline).to_list(1)
-            if result and len(result) > 0:
-                users = result[0].get("users", [])
-                total_count = result[0].get("totalCount", [])
-                total = total_count[0]["count"] if total_count else 0
+            cached_page = None
+            if cache_criteria is not None:
+                cached_page = await _search_cached_page(
+                    db, cache_criteria, query, usernames_to_exclude,
+                    age_filter_min, age_filter_max, sort, skip, limit
+                )
+            if cached_page is not None:
+                page_usernames, total = cached_page
+                logger.info(f"🔍 Search served from result cache, skip={skip}, limit={limit}, total={total}")
+                # Cached ids may predate a profile change - re-apply the live query to the page
+                users = await _load_search_page(db, current_username, page_usernames, projection, live_query=query)
             else:
-                users = []
-                total = 0
+                logger.info(f"🔍 Executing search (age filter: {has_age_filter}), skip={skip}, limit={limit}")
+                page_usernames, total = await _search_page_usernames(
+                    db, query, age_filter_min, age_filter_max, sort, skip, limit
+                )
+                users = await _load_search_page(db, current_username, page_usernames, projection)
 
         # Get profile picture visibility setting (once, outside loop)
         profile_pic_always_visible = await _get_profile_picture_always_visible(db)
         
         # Check if current user is admin (admins see ALL images)
         is_admin = _is_admin_user(current_user)
-        # logger.debug(f"🔍 Search by user {current_user.get('username')}: is_admin={is_admin}, profile_pic_always_visible={profile_pic_always_visible}")
         
-        # Remove sensitive data and decrypt PII
-        for i, user in enumerate(users):
-            user.pop("password", None)
-            user.pop("_id", None)
-            
-            # 🔓 DECRYPT PII fields
-            try:
-                encryptor = get_encryptor()
-                users[i] = encryptor.decrypt_user_pii(user)  # ✅ Assign back to list!
-            except Exception as decrypt_err:
-                logger.warning(f"⚠️ Decryption skipped for {user.get('username', 'unknown')}: {decrypt_err}")
-            
-            # Remove consent metadata (backend-only fields)
-            remove_consent_metadata(users[i])
-
-            # Get images from multiple possible fields (some users have profileImage, others have images array)
-            existing_images = users[i].get("images", [])
-            profile_image = users[i].get("profileImage")
-            
-            # Debug: Log raw image data from database (disabled for performance)
-            # logger.debug(f"🖼️ Search {users[i].get('username')}: raw images={existing_images}, profileImage={profile_image}")
-            
-            # If images array is empty but profileImage exists, use it
-            if not existing_images and profile_image:
-                existing_images = [profile_image]
-                # logger.debug(f"🖼️ Search {users[i].get('username')}: Using profileImage fallback")
-            
-            normalized_public = _compute_public_image_paths(existing_images, users[i].get("publicImages", []))
-            full_public_urls = [get_full_image_url(p) for p in normalized_public]
-            users[i]["publicImages"] = full_public_urls
-            
-            # Image visibility logic:
-            # 1. Admin users → see ALL images
-            # 2. profile_pic_always_visible=true → ALL users see avatar (first image)
-            # 3. Otherwise → only public images
-            
-            if is_admin and existing_images:
-                # Admin sees ALL images
-                users[i]["images"] = [get_full_image_url(img) for img in existing_images]
-                users[i]["profilePicVisible"] = True
-                users[i]["imagesMasked"] = False
-                # logger.debug(f"🖼️ Search {users[i].get('username')}: ADMIN - showing {len(users[i]['images'])} images")
-            elif profile_pic_always_visible and existing_images:
-                # Global setting: show profile picture (first image) to all logged-in users
-                profile_pic_url = get_full_image_url(existing_images[0])
-                if profile_pic_url not in full_public_urls:
-                    users[i]["images"] = [profile_pic_url] + full_public_urls
-                else:
-                    users[i]["images"] = full_public_urls if full_public_urls else [profile_pic_url]
-                users[i]["profilePicVisible"] = True
-                users[i]["imagesMasked"] = False
-                # logger.debug(f"🖼️ Search {users[i].get('username')}: GLOBAL SETTING - showing {len(users[i]['images'])} images")
-            else:
-                # Only public images
-                users[i]["images"] = full_public_urls
-                users[i]["imagesMasked"] = len(full_public_urls) == 0
-                # logger.debug(f"🖼️ Search {users[i].get('username')}: PUBLIC ONLY - showing {len(full_public_urls)} images")
-            
-            # Enrich with imageVisibility for frontend avatar display
-            users[i] = _enrich_user_with_image_visibility(users[i])
-            
-            # Calculate age dynamically from birthMonth and birthYear
-            from datetime import datetime
-            birth_month = users[i].get("birthMonth")
-            birth_year = users[i].get("birthYear")
-            if birth_month and birth_year:
-                current_year = datetime.now().year
-                current_month = datetime.now().month
-                age = current_year - birth_year
-                if current_month < birth_month:
-                    age -= 1
-                users[i]["age"] = age
-            elif users[i].get("calculatedAge") is not None:
-                # If age was calculated in aggregation, use it
-                users[i]["age"] = users[i]["calculatedAge"]
+        # Cached profile cards; the page query already applied the status filters
+        from services.profile_cards import get_profile_card_cache
+        cards = await get_profile_card_cache().get_cards(
+            db, [user["username"] for user in users],
+            is_admin=is_admin, profile_pic_always_visible=profile_pic_always_visible, active_only=False
+        )
+        users = [
+            {**cards[user["username"]], "matchScore": user["matchScore"], "compatibilityLevel": user["compatibilityLevel"]}
+            for user in users if user["username"] in cards
+        ]
 
         logger.info(f"✅ Search completed - found {len(users)} users (total: {total})")
         
@@ -5769,8 +5769,9 @@ async def search_users(
                 excluded_profile_username = excluded_user.get("username")
                 logger.info(f"🚫 Profile {profileId} found but excluded by user {current_username}")
         
-        # Log search activity (direct insert to bypass batch queue)
+        # Log search activity through the write-behind activity pipeline
         try:
+            from services.activity_logger import get_activity_logger
             from models.activity_models import ActivityType
             
             # Build search criteria metadata (exclude empty values)
@@ -5794,27 +5795,18 @@ async def search_users(
             if bodyType: search_criteria["bodyType"] = bodyType
             if newlyAdded: search_criteria["newlyAdded"] = newlyAdded
             
-            # Direct insert to activity_logs collection (bypass batch queue)
-            activity_doc = {
-                "username": current_user.get("username"),
-                "action_type": ActivityType.SEARCH_PERFORMED.value,
-                "target_username": None,
-                "metadata": {
-                    "criteria": search_criteria,
+            activity_logger = get_activity_logger()
+            await activity_logger.log_activity(
+                username=current_user.get("username"),
+                action_type=ActivityType.SEARCH_PERFORMED,
+                metadata={
+                    "criteria": search_criteria,
                     "results_count": len(users),
                     "total_matches": total,
                     "page": page
                 },
-                "ip_address": None,
-                "user_agent": None,
-                "page_url": "/search",
-                "referrer_url": None,
-                "session_id": None,
-                "timestamp": datetime.utcnow(),
-                "duration_ms": None,
-                "pii_logged": False
-            }
-            await db.activity_logs.insert_one(activity_doc)
+                page_url="/search"
+            )
             logger.info(f"📊 Logged search activity for {current_user.get('username')}")
         except Exception as log_err:
             logger.warning(f"⚠️ Failed to log search activity: {log_err}")
@@ -5826,6 +5818,8 @@ async def search_users(
             "limit": limit,
             "totalPages": (total + limit - 1) // limit
         }
+        if cursor is not None:
+            response["nextCursor"] = next_cursor
         
         # Add exclusion message if applicable
         if excluded_profile_message:
@@ -6534,19 +6528,33 @@ async def reset_password(
 @router.get("/favorites/{username}")
 async def get_favorites(
     username: str, 
+    cursor: Optional[str] = Query(None, description="Opt-in keyset pagination: empty for the first page, then the previous nextCursor"),
+    limit: int = Query(100, ge=1, le=100),
     current_user: dict = Depends(get_current_user),
     db = Depends(get_database)
 ):
     """Get user's favorites list - OPTIMIZED with field projection"""
+    from utils.pagination import after_cursor, split_page
+    
     # 🛑 Security Check: Only owner or admin can view favorites
     if current_user["username"] != username and current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to view these favorites")
         
     logger.info(f"📋 Getting favorites for {username}")
 
+    favorites_sort = [("displayOrder", 1), ("_id", 1)]
     try:
-        favorites_cursor = db.favorites.find({"userUsername": username}).sort("displayOrder", 1)
-        favorites = await favorites_cursor.to_list(100)
+        favorites_query = after_cursor({"userUsername": username}, favorites_sort, cursor, nullable=("displayOrder",))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        favorites_cursor = db.favorites.find(favorites_query).sort(favorites_sort)
+        if cursor is None:
+            favorites = await favorites_cursor.to_list(100)
+            next_cursor = None
+        else:
+            favorites, next_cursor = split_page(await favorites_cursor.to_list(limit + 1), limit, favorites_sort)
 
         # Get profile picture visibility setting
         profile_pic_always_visible = await _get_profile_picture_always_visible(db)
@@ -6554,62 +6562,24 @@ async def get_favorites(
         # Check if current user is admin (admins see ALL images)
         is_admin = _is_admin_user(current_user)
 
-        # OPTIMIZED: Batch fetch all users with $in query (fixes N+1)
-        favorite_usernames = [fav["favoriteUsername"] for fav in favorites]
-        users = await db.users.find(
-            {
-                "username": {"$in": favorite_usernames},
-                "accountStatus": "active"
-            },
-            DASHBOARD_USER_PROJECTION
-        ).to_list(100)
-        
-        # Create lookup dict for O(1) access
-        user_dict = {}
-        encryptor = get_encryptor()
-        for user in users:
-            try:
-                user = encryptor.decrypt_user_pii(user)
-            except Exception as decrypt_err:
-                logger.warning(f"⚠️ Decryption skipped for {user.get('username')}: {decrypt_err}")
-            user_dict[user["username"]] = user
+        # Cached profile cards (active users only), viewer rules applied per request
+        from services.profile_cards import get_profile_card_cache
+        cards = await get_profile_card_cache().get_cards(
+            db, [fav["favoriteUsername"] for fav in favorites],
+            is_admin=is_admin, profile_pic_always_visible=profile_pic_always_visible
+        )
         
-        # Process each favorite using the lookup dict
         favorite_users = []
         for fav in favorites:
-            user = user_dict.get(fav["favoriteUsername"])
+            user = cards.get(fav["favoriteUsername"])
             if not user:
                 continue
-            
-            remove_consent_metadata(user)
-            existing_images = user.get("images", [])
-            profile_image = user.get("profileImage")
-            
-            if not existing_images and profile_image:
-                existing_images = [profile_image]
-            
-            normalized_public = _compute_public_image_paths(existing_images, user.get("publicImages", []))
-            full_public_urls = [get_full_image_url(p) for p in normalized_public]
-            user["publicImages"] = full_public_urls
-            
-            if is_admin and existing_images:
-                user["images"] = [get_full_image_url(img) for img in existing_images]
-                user["profilePicVisible"] = True
-            elif profile_pic_always_visible and existing_images:
-                profile_pic_url = get_full_image_url(existing_images[0])
-                if profile_pic_url not in full_public_urls:
-                    user["images"] = [profile_pic_url] + full_public_urls
-                else:
-                    user["images"] = full_public_urls if full_public_urls else [profile_pic_url]
-                user["profilePicVisible"] = True
-            else:
-                user["images"] = full_public_urls
-            
-            user = _enrich_user_with_image_visibility(user)
             user["addedToFavoritesAt"] = fav["createdAt"]
             favorite_users.append(user)
 
         logger.info(f"✅ Found {len(favorite_users)} favorites for {username} (batch query)")
+        if cursor is not None:
+            return {"favorites": favorite_users, "nextCursor": next_cursor}
         return {"favorites": favorite_users}
     except Exception as e:
         logger.error(f"❌ Error fetching favorites: {e}", exc_info=True)
@@ -6720,81 +6690,57 @@ async def add_to_shortlist(
 @router.get("/shortlist/{username}")
 async def get_shortlist(
     username: str, 
+    cursor: Optional[str] = Query(None, description="Opt-in keyset pagination: empty for the first page, then the previous nextCursor"),
+    limit: int = Query(100, ge=1, le=100),
     current_user: dict = Depends(get_current_user),
     db = Depends(get_database)
 ):
     """Get user's shortlist - OPTIMIZED with field projection"""
+    from utils.pagination import after_cursor, split_page
+    
     # 🛑 Security Check
     if current_user["username"] != username and current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
 
     logger.info(f"📋 Getting shortlist for {username}")
 
+    shortlist_sort = [("displayOrder", 1), ("_id", 1)]
     try:
-        shortlist_cursor = db.shortlists.find({"userUsername": username}).sort("displayOrder", 1)
-        shortlist = await shortlist_cursor.to_list(100)
+        shortlist_query = after_cursor({"userUsername": username}, shortlist_sort, cursor, nullable=("displayOrder",))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        shortlist_cursor = db.shortlists.find(shortlist_query).sort(shortlist_sort)
+        if cursor is None:
+            shortlist = await shortlist_cursor.to_list(100)
+            next_cursor = None
+        else:
+            shortlist, next_cursor = split_page(await shortlist_cursor.to_list(limit + 1), limit, shortlist_sort)
 
         # Get profile picture visibility setting
         profile_pic_always_visible = await _get_profile_picture_always_visible(db)
         is_admin = _is_admin_user(current_user)
 
-        # OPTIMIZED: Batch fetch all users with $in query (fixes N+1)
-        shortlist_usernames = [item["shortlistedUsername"] for item in shortlist]
-        users = await db.users.find(
-            {
-                "username": {"$in": shortlist_usernames},
-                "accountStatus": "active"
-            },
-            DASHBOARD_USER_PROJECTION
-        ).to_list(100)
-        
-        # Create lookup dict for O(1) access
-        user_dict = {}
-        encryptor = get_encryptor()
-        for user in users:
-            try:
-                user = encryptor.decrypt_user_pii(user)
-            except Exception as decrypt_err:
-                logger.warning(f"⚠️ Decryption skipped for {user.get('username')}: {decrypt_err}")
-            user_dict[user["username"]] = user
+        # Cached profile cards (active users only), viewer rules applied per request
+        from services.profile_cards import get_profile_card_cache
+        cards = await get_profile_card_cache().get_cards(
+            db, [item["shortlistedUsername"] for item in shortlist],
+            is_admin=is_admin, profile_pic_always_visible=profile_pic_always_visible
+        )
         
-        # Process each shortlist item using the lookup dict
         shortlisted_users = []
         for item in shortlist:
-            user = user_dict.get(item["shortlistedUsername"])
+            user = cards.get(item["shortlistedUsername"])
             if not user:
                 continue
-            
-            remove_consent_metadata(user)
-            existing_images = user.get("images", [])
-            profile_image = user.get("profileImage")
-            
-            if not existing_images and profile_image:
-                existing_images = [profile_image]
-            
-            normalized_public = _compute_public_image_paths(existing_images, user.get("publicImages", []))
-            full_public_urls = [get_full_image_url(p) for p in normalized_public]
-            user["publicImages"] = full_public_urls
-            
-            if is_admin and existing_images:
-                user["images"] = [get_full_image_url(img) for img in existing_images]
-                user["profilePicVisible"] = True
-            elif profile_pic_always_visible and existing_images:
-                profile_pic_url = get_full_image_url(existing_images[0])
-                if profile_pic_url not in full_public_urls:
-                    user["images"] = [profile_pic_url] + full_public_urls
-                else:
-                    user["images"] = full_public_urls if full_public_urls else [profile_pic_url]
-                user["profilePicVisible"] = True
-            else:
-                user["images"] = full_public_urls
-            
-            user = _enrich_user_with_image_visibility(user)
             user["notes"] = item.get("notes")
             user["addedToShortlistAt"] = item["createdAt"]
             shortlisted_users.append(user)
 
         logger.info(f"✅ Found {len(shortlisted_users)} shortlisted users for {username} (batch query)")
+        if cursor is not None:
+            return {"shortlist": shortlisted_users, "nextCursor": next_cursor}
         return {"shortlist": shortlisted_users}
     except Exception as e:
         logger.error(f"❌ Error fetching shortlist: {e}", exc_info=True)
@@ -7165,6 +7111,8 @@ async def add_to_exclusions(
         cleanup_summary["messages_deleted"] = messages_result.deleted_count
         if messages_result.deleted_count > 0:
             logger.info(f"🗑️ Deleted {messages_result.deleted_count} messages between {username} ↔ {target_username}")
+            from services.conversation_summaries import refresh_conversation_summaries
+            await refresh_conversation_summaries(db, [(username, target_username)])
         
         # 2. CANCEL/REJECT ALL PENDING PII REQUESTS (Both directions)
         pii_requests_result = await db.pii_requests.update_many(
@@ -7342,57 +7290,18 @@ async def get_exclusions(
         profile_pic_always_visible = await _get_profile_picture_always_visible(db)
         is_admin = _is_admin_user(current_user)
 
-        # OPTIMIZED: Batch fetch all users with $in query (fixes N+1)
-        exclusion_usernames = [exc["excludedUsername"] for exc in exclusions]
-        users = await db.users.find(
-            {
-                "username": {"$in": exclusion_usernames},
-                "accountStatus": "active"
-            },
-            DASHBOARD_USER_PROJECTION
-        ).to_list(100)
-        
-        # Create lookup dict for O(1) access
-        user_dict = {}
-        encryptor = get_encryptor()
-        for user in users:
-            try:
-                user = encryptor.decrypt_user_pii(user)
-            except Exception as decrypt_err:
-                logger.warning(f"⚠️ Decryption skipped for {user.get('username')}: {decrypt_err}")
-            user_dict[user["username"]] = user
+        # Cached profile cards (active users only), viewer rules applied per request
+        from services.profile_cards import get_profile_card_cache
+        cards = await get_profile_card_cache().get_cards(
+            db, [exc["excludedUsername"] for exc in exclusions],
+            is_admin=is_admin, profile_pic_always_visible=profile_pic_always_visible
+        )
         
-        # Process each exclusion using the lookup dict
         excluded_users = []
         for exc in exclusions:
-            user = user_dict.get(exc["excludedUsername"])
+            user = cards.get(exc["excludedUsername"])
             if not user:
                 continue
-            
-            remove_consent_metadata(user)
-            existing_images = user.get("images", [])
-            profile_image = user.get("profileImage")
-            
-            if not existing_images and profile_image:
-                existing_images = [profile_image]
-            
-            normalized_public = _compute_public_image_paths(existing_images, user.get("publicImages", []))
-            full_public_urls = [get_full_image_url(p) for p in normalized_public]
-            user["publicImages"] = full_public_urls
-            
-            if is_admin and existing_images:
-                user["images"] = [get_full_image_url(img) for img in existing_images]
-                user["profilePicVisible"] = True
-            elif profile_pic_always_visible and existing_images:
-                profile_pic_url = get_full_image_url(existing_images[0])
-                if profile_pic_url not in full_public_urls:
-                    user["images"] = [profile_pic_url] + full_public_urls
-                else:
-                    user["images"] = full_public_urls if full_public_urls else [profile_pic_url]
-                user["profilePicVisible"] = True
-            else:
-                user["images"] = full_public_urls
-            
             user["excludedAt"] = exc.get("createdAt")
             excluded_users.append(user)
 
@@ -7674,126 +7583,55 @@ async def get_conversations_enhanced(
     is_admin = current_user.get("role") == "admin"
     
     try:
-        # Get unique conversations
-        # For non-admin users, filter out explicitly hidden messages (isVisible=False)
-        # But include messages where isVisible is True, null, or doesn't exist (old messages)
-        if not is_admin:
-            match_stage = {
-                "$and": [
-                    {"$or": [
-                        {"fromUsername": username},
-                        {"toUsername": username}
-                    ]},
-                    {"$or": [
-                        {"isVisible": {"$ne": False}},  # Include True, null, undefined
-                        {"isVisible": {"$exists": False}}  # Include old messages without field
-                    ]}
-                ]
-            }
-        else:
-            # Admin sees all messages
-            match_stage = {
-                "$or": [
-                    {"fromUsername": username},
-                    {"toUsername": username}
-                ]
-            }
+        from services.conversation_summaries import (
+            ConversationSummaryService, other_participant, unread_for
+        )
         
-        pipeline = [
-            {"$match": match_stage},
-            {
-                "$group": {
-                    "_id": {
-                        "$cond": [
-                            {"$eq": ["$fromUsername", username]},
-                            "$toUsername",
-                            "$fromUsername"
-                        ]
-                    },
-                    "lastMessage": {"$last": "$$ROOT"},
-                    "unreadCount": {
-                        "$sum": {
-                            "$cond": [
-                                {"$and": [
-                                    {"$eq": ["$toUsername", username]},
-                                    {"$eq": ["$isRead", False]}
-                                ]},
-                                1,
-                                0
-                            ]
-                        }
-                    }
-                }
-            },
-            {"$sort": {"lastMessage.createdAt": -1}}
-        ]
+        # One indexed read of the maintained per-pair summaries.
+        # Non-admins don't see messages hidden with isVisible=False.
+        summaries = await ConversationSummaryService(db).list_for_user(username, include_hidden=is_admin)
+        other_usernames = [other_participant(summary, username) for summary in summaries]
         
-        conversations = await db.messages.aggregate(pipeline).to_list(100)
+        # Visibility (exclusions in either direction) for every partner at once
+        blocked = set()
+        if other_usernames:
+            async for exclusion in db.exclusions.find(
+                {"$or": [
+                    {"userUsername": username, "excludedUsername": {"$in": other_usernames}},
+                    {"userUsername": {"$in": other_usernames}, "excludedUsername": username}
+                ]},
+                {"userUsername": 1, "excludedUsername": 1}
+            ):
+                blocked.add(exclusion["excludedUsername"] if exclusion["userUsername"] == username
+                            else exclusion["userUsername"])
+        
+        # Get profile picture visibility setting (same as favorites)
+        profile_pic_always_visible = await _get_profile_picture_always_visible(db)
+        
+        # Partner profile cards in one batched lookup
+        # Only show active users in conversations list for regular users
+        from services.profile_cards import get_profile_card_cache
+        cards = await get_profile_card_cache().get_cards(
+            db, [u for u in other_usernames if is_admin or u not in blocked],
+            is_admin=is_admin, profile_pic_always_visible=profile_pic_always_visible, active_only=not is_admin
+        )
         
         # Get user details and check visibility
         result = []
-        for conv in conversations:
-            other_username = conv["_id"]
-            
-            # Check visibility
-            is_visible = await check_message_visibility(username, other_username, db)
+        for summary, other_username in zip(summaries, other_usernames):
+            is_visible = other_username not in blocked
             if not is_visible and not is_admin:
                 logger.info(f"⚠️ Skipping conversation with {other_username} - not visible")
                 continue
             
-            # Only show active users in conversations list for regular users
-            user_query = {"username": other_username}
-            if not is_admin:
-                user_query["accountStatus"] = "active"
-                
-            user = await db.users.find_one(user_query)
+            user = cards.get(other_username)
             if not user:
                 logger.warning(f"⚠️ Skipping conversation with {other_username} - user not found or not active")
                 continue
             
-            # Build user profile
-            user.pop("password", None)
-            user["_id"] = str(user["_id"])
-            
-            # 🔓 DECRYPT PII fields
-            try:
-                encryptor = get_encryptor()
-                user = encryptor.decrypt_user_pii(user)
-            except Exception as decrypt_err:
-                logger.warning(f"⚠️ Decryption skipped for {other_username}: {decrypt_err}")
-            
-            # Get profile picture visibility setting (same as favorites)
-            profile_pic_always_visible = await _get_profile_picture_always_visible(db)
-            
-            # Image visibility logic (consistent with favorites endpoint)
-            existing_images = user.get("images", [])
-            profile_image = user.get("profileImage")
-            
-            # If images array is empty but profileImage exists, use it
-            if not existing_images and profile_image:
-                existing_images = [profile_image]
-            
-            normalized_public = _compute_public_image_paths(existing_images, user.get("publicImages", []))
-            full_public_urls = [get_full_image_url(p) for p in normalized_public]
-            user["publicImages"] = full_public_urls
-            
-            # Admin sees all images, profile_pic_always_visible shows avatar to all
-            if is_admin and existing_images:
-                user["images"] = [get_full_image_url(img) for img in existing_images]
-            elif profile_pic_always_visible and existing_images:
-                profile_pic_url = get_full_image_url(existing_images[0])
-                if profile_pic_url not in full_public_urls:
-                    user["images"] = [profile_pic_url] + full_public_urls
-                else:
-                    user["images"] = full_public_urls if full_public_urls else [profile_pic_url]
-            else:
-                user["images"] = full_public_urls
-            
-            # Enrich with imageVisibility for frontend avatar display
-            user = _enrich_user_with_image_visibility(user)
-            
             # Serialize datetime
-            last_msg_time = conv["lastMessage"]["createdAt"]
+            last_message = summary["lastMessage" if is_admin else "lastVisibleMessage"]
+            last_msg_time = last_message.get("createdAt")
             if isinstance(last_msg_time, datetime):
                 last_msg_time = last_msg_time.isoformat()
             
@@ -7802,9 +7640,9 @@ async def get_conversations_enhanced(
                 "userProfile": user,
                 # Legacy messages may carry a Fernet-encrypted content field
                 # from a removed encrypt-on-write path; new writes are plaintext.
-                "lastMessage": _maybe_decrypt_message(conv["lastMessage"].get("content", "")),
+                "lastMessage": _maybe_decrypt_message(last_message.get("content", "")),
                 "lastMessageTime": last_msg_time,
-                "unreadCount": conv["unreadCount"],
+                "unreadCount": unread_for(summary, username, include_hidden=is_admin),
                 "isVisible": is_visible
             }
             result.append(conv_data)
@@ -7979,7 +7817,7 @@ async def poll_messages(
     db = Depends(get_database)
 ):
     """Poll for new messages since a timestamp with validation and error handling"""
-    from redis_manager import get_redis_manager
+    from async_redis_manager import get_async_redis
     
     # 🛑 Security Check
     if current_user["username"] != username:
@@ -8009,10 +7847,10 @@ async def poll_messages(
                 logger.warning(f"⚠️ Invalid timestamp format: {since}, ignoring")
                 since = None
         
-        redis = get_redis_manager()
+        redis = get_async_redis()
         
         # Get new messages from Redis
-        new_messages = redis.get_new_messages_since(username, since, limit=limit)
+        new_messages = await redis.get_new_messages_since(username, since, limit=limit)
         
         if new_messages:
             logger.info(f"📬 Polling: '{username}' - found {len(new_messages)} new messages since {since}")
@@ -8088,11 +7926,13 @@ async def send_message(
     try:
         # Store in MongoDB
         await db.messages.insert_one(message)
+        from services.conversation_summaries import record_message_summary
+        await record_message_summary(db, message)
         
         # Send via Redis for real-time delivery
-        from redis_manager import get_redis_manager
-        redis = get_redis_manager()
-        redis.send_message(from_username, to_username, content.strip(), message_id)
+        from async_redis_manager import get_async_redis
+        redis = get_async_redis()
+        await redis.send_message(from_username, to_username, content.strip(), message_id)
         
         logger.info(f"✅ Message sent: {from_username} → {to_username} (MongoDB + Redis)")
         
@@ -8162,6 +8002,7 @@ async def get_messages(
 
         # Mark messages as read if user is recipient and log activity
         read_count = 0
+        read_from = set()
         for msg in messages:
             if msg["toUsername"] == username and not msg["isRead"]:
                 await db.messages.update_one(
@@ -8174,6 +8015,7 @@ async def get_messages(
                     }
                 )
                 read_count += 1
+                read_from.add(msg["fromUsername"])
                 
                 # Log MESSAGE_READ activity for each message marked as read
                 try:
@@ -8196,6 +8038,8 @@ async def get_messages(
 
         if read_count > 0:
             logger.info(f"✅ Marked {read_count} messages as read for {username}")
+            from services.conversation_summaries import refresh_conversation_summaries
+            await refresh_conversation_summaries(db, [(username, other) for other in read_from])
         logger.info(f"✅ Found {len(messages)} messages for {username}")
         return {"messages": messages}
     except Exception as e:
@@ -8305,7 +8149,7 @@ async def get_recent_conversations(
     if current_user["username"] != username and current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    from redis_manager import get_redis_manager
+    from async_redis_manager import get_async_redis
     logger.info(f"💬 Getting recent conversations for {username}")
 
     try:
@@ -8351,7 +8195,9 @@ async def get_recent_conversations(
         ]
 
         conversations = await db.messages.aggregate(pipeline).to_list(limit)
-        redis = get_redis_manager()
+        redis = get_async_redis()
+        # One pipelined round-trip for every conversation partner's presence
+        online_status = await redis.get_online_status([conv["_id"] for conv in conversations])
         
         # Get user details and online status for each conversation
         result = []
@@ -8366,15 +8212,10 @@ async def get_recent_conversations(
             user = await db.users.find_one(user_query)
             
             if user:
-                # 🔓 DECRYPT PII fields
-                try:
-                    encryptor = get_encryptor()
-                    user = encryptor.decrypt_user_pii(user)
-                except Exception as decrypt_err:
-                    logger.warning(f"⚠️ Decryption skipped for {other_username}: {decrypt_err}")
+                # Only name and avatar are returned - no PII to decrypt
                 
                 # Check online status
-                is_online = redis.is_user_online(other_username)
+                is_online = online_status.get(other_username, False)
                 
                 # Use first public image for avatar, fallback to profileImage or first image
                 existing_images = user.get("images", [])
@@ -8656,13 +8497,15 @@ async def send_message_enhanced(
     
     try:
         result = await db.messages.insert_one(message)
+        from services.conversation_summaries import record_message_summary
+        await record_message_summary(db, message)
         
         # Send via Redis for real-time delivery (only if message is visible)
         if is_visible:
-            from redis_manager import get_redis_manager
-            redis = get_redis_manager()
+            from async_redis_manager import get_async_redis
+            redis = get_async_redis()
             message_id = str(result.inserted_id)
-            redis.send_message(username, message_data.toUsername, message_data.content.strip(), message_id)
+            await redis.send_message(username, message_data.toUsername, message_data.content.strip(), message_id)
             logger.info(f"📡 Message sent via Redis for real-time delivery")
         
         # Convert to serializable format
@@ -8793,12 +8636,17 @@ async def get_conversation(
         messages = await messages_cursor.to_list(500)
         
         # Mark messages as read
+        marked_read = False
         for msg in messages:
             if msg["toUsername"] == username and not msg.get("isRead", False):
                 await db.messages.update_one(
                     {"_id": msg["_id"]},
                     {"$set": {"isRead": True, "readAt": datetime.utcnow()}}
                 )
+                marked_read = True
+        if marked_read:
+            from services.conversation_summaries import refresh_conversation_summaries
+            await refresh_conversation_summaries(db, [(username, other_username)])
         
         # Convert ObjectId to string + decrypt any legacy Fernet-encrypted content
         # (new sends store plaintext; old rows may still be encrypted).
@@ -8885,6 +8733,9 @@ async def delete_message(
         
         logger.info(f"✅ Message deleted successfully: {message_id}")
         
+        from services.conversation_summaries import refresh_conversation_summaries
+        await refresh_conversation_summaries(db, [(username, message.get("toUsername"))])
+        
         # Log activity
         try:
             activity_logger = get_activity_logger()
@@ -8933,6 +8784,9 @@ async def delete_conversation(
         
         logger.info(f"✅ Deleted {result.deleted_count} messages in conversation between {username} and {other_username}")
         
+        from services.conversation_summaries import refresh_conversation_summaries
+        await refresh_conversation_summaries(db, [(username, other_username)])
+        
         return {
             "success": True,
             "message": f"Conversation deleted successfully",
@@ -9458,16 +9312,13 @@ async def get_profile_viewers(username: str, db = Depends(get_database)):
             }
         ).to_list(100)
         
-        viewer_dict = {u["username"]: u for u in viewer_users}
+        # 🔓 DECRYPT PII fields - only location is returned, contact fields skip Fernet
+        try:
+            viewer_users = get_encryptor().decrypt_many(viewer_users, fields=("location",))
+        except Exception as decrypt_err:
+            logger.warning(f"⚠️ Decryption skipped for {len(viewer_users)} viewers: {decrypt_err}")
         
-        # 🔓 DECRYPT PII fields for all users
-        for user in viewer_users:
-            try:
-                encryptor = get_encryptor()
-                decrypted_user = encryptor.decrypt_user_pii(user)
-                viewer_dict[user["username"]] = decrypted_user
-            except Exception as decrypt_err:
-                logger.warning(f"⚠️ Decryption skipped for {user.get('username')}: {decrypt_err}")
+        viewer_dict = {u["username"]: u for u in viewer_users}
         
         result = []
         for viewer in viewers:
@@ -9506,7 +9357,7 @@ async def get_users_who_favorited_me(username: str, db = Depends(get_database)):
     
     try:
         # Get system settings
-        system_settings = await db.system_settings.find_one({}) or {}
+        system_settings = await settings_cache.get_document(db, "system_settings") or {}
         favorite_history_days = system_settings.get("favorite_history_days", 45)  # Default 45 days
         profile_pic_always_visible = system_settings.get("profile_picture_always_visible", True)
         
@@ -9522,74 +9373,19 @@ async def get_users_who_favorited_me(username: str, db = Depends(get_database)):
             "createdAt": {"$gte": cutoff_date}
         }).sort("createdAt", -1).to_list(100)
         
-        # Get user details - OPTIMIZED with field projection
-        user_usernames = [f["userUsername"] for f in favorites]
-        users = await db.users.find(
-            {
-                "username": {"$in": user_usernames},
-                "accountStatus": "active"  # Strictly active users only
-            },
-            DASHBOARD_USER_PROJECTION  # ✅ Only fetch needed fields
-        ).to_list(100)
-        
-        # 🔓 DECRYPT PII fields for all users
-        user_dict = {}
-        for user in users:
-            try:
-                encryptor = get_encryptor()
-                decrypted_user = encryptor.decrypt_user_pii(user)
-                user_dict[user["username"]] = decrypted_user
-            except Exception as decrypt_err:
-                logger.warning(f"⚠️ Decryption skipped for {user.get('username')}: {decrypt_err}")
-                user_dict[user["username"]] = user
+        # Cached profile cards (active users only)
+        from services.profile_cards import compact_card, get_profile_card_cache
+        cards = await get_profile_card_cache().get_cards(
+            db, [f["userUsername"] for f in favorites], profile_pic_always_visible=profile_pic_always_visible
+        )
         
         result = []
         for fav in favorites:
-            user_data = user_dict.get(fav["userUsername"])
-            if not user_data:
+            card = cards.get(fav["userUsername"])
+            if not card:
                 continue
-                
-            existing_images = user_data.get("images", [])
-            normalized_public = _compute_public_image_paths(existing_images, user_data.get("publicImages", []))
-            
-            # Apply profile picture visibility setting
-            if profile_pic_always_visible and existing_images:
-                profile_image = get_full_image_url(existing_images[0])
-            else:
-                first_public = normalized_public[0] if normalized_public else None
-                profile_image = get_full_image_url(first_public) if first_public else None
-            
-            # Build imageVisibility for frontend avatar display
-            image_visibility = user_data.get("imageVisibility")
-            if image_visibility:
-                iv_data = {
-                    "profilePic": get_full_image_url(image_visibility.get("profilePic")) if image_visibility.get("profilePic") else profile_image,
-                    "memberVisible": [get_full_image_url(img) for img in image_visibility.get("memberVisible", [])],
-                    "onRequest": [get_full_image_url(img) for img in image_visibility.get("onRequest", [])]
-                }
-            else:
-                iv_data = {
-                    "profilePic": profile_image,
-                    "memberVisible": [],
-                    "onRequest": []
-                }
-            
-            user_result = {
-                "username": fav["userUsername"],
-                "firstName": user_data.get("firstName"),
-                "lastName": user_data.get("lastName"),
-                "age": calculate_age(
-                    birthMonth=user_data.get("birthMonth"),
-                    birthYear=user_data.get("birthYear")
-                ),
-                "location": user_data.get("location"),
-                "occupation": user_data.get("occupation"),
-                "profileImage": profile_image,
-                "imageVisibility": iv_data,
-                "addedAt": safe_datetime_serialize(fav.get("createdAt"))
-            }
-            if profile_pic_always_visible and existing_images:
-                user_result["profilePicVisible"] = True
+            user_result = compact_card(card)
+            user_result["addedAt"] = safe_datetime_serialize(fav.get("createdAt"))
             result.append(user_result)
         
         logger.info(f"✅ Found {len(result)} users who favorited {username}")
@@ -9605,7 +9401,7 @@ async def get_users_who_shortlisted_me(username: str, db = Depends(get_database)
     
     try:
         # Get profile picture visibility setting
-        system_settings = await db.system_settings.find_one({}) or {}
+        system_settings = await settings_cache.get_document(db, "system_settings") or {}
         profile_pic_always_visible = system_settings.get("profile_picture_always_visible", True)
         
         # Find all shortlists where current user is the target
@@ -9613,74 +9409,19 @@ async def get_users_who_shortlisted_me(username: str, db = Depends(get_database)
             {"shortlistedUsername": username}
         ).sort("createdAt", -1).to_list(100)
         
-        # Get user details - OPTIMIZED with field projection
-        user_usernames = [s["userUsername"] for s in shortlists]
-        users = await db.users.find(
-            {
-                "username": {"$in": user_usernames},
-                "accountStatus": "active"  # Strictly active users only
-            },
-            DASHBOARD_USER_PROJECTION  # ✅ Only fetch needed fields
-        ).to_list(100)
-        
-        # 🔓 DECRYPT PII fields for all users
-        user_dict = {}
-        for user in users:
-            try:
-                encryptor = get_encryptor()
-                decrypted_user = encryptor.decrypt_user_pii(user)
-                user_dict[user["username"]] = decrypted_user
-            except Exception as decrypt_err:
-                logger.warning(f"⚠️ Decryption skipped for {user.get('username')}: {decrypt_err}")
-                user_dict[user["username"]] = user
+        # Cached profile cards (active users only)
+        from services.profile_cards import compact_card, get_profile_card_cache
+        cards = await get_profile_card_cache().get_cards(
+            db, [s["userUsername"] for s in shortlists], profile_pic_always_visible=profile_pic_always_visible
+        )
         
         result = []
         for shortlist in shortlists:
-            user_data = user_dict.get(shortlist["userUsername"])
-            if not user_data:
+            card = cards.get(shortlist["userUsername"])
+            if not card:
                 continue
-                
-            existing_images = user_data.get("images", [])
-            normalized_public = _compute_public_image_paths(existing_images, user_data.get("publicImages", []))
-            
-            # Apply profile picture visibility setting
-            if profile_pic_always_visible and existing_images:
-                profile_image = get_full_image_url(existing_images[0])
-            else:
-                first_public = normalized_public[0] if normalized_public else None
-                profile_image = get_full_image_url(first_public) if first_public else None
-            
-            # Build imageVisibility for frontend avatar display
-            image_visibility = user_data.get("imageVisibility")
-            if image_visibility:
-                iv_data = {
-                    "profilePic": get_full_image_url(image_visibility.get("profilePic")) if image_visibility.get("profilePic") else profile_image,
-                    "memberVisible": [get_full_image_url(img) for img in image_visibility.get("memberVisible", [])],
-                    "onRequest": [get_full_image_url(img) for img in image_visibility.get("onRequest", [])]
-                }
-            else:
-                iv_data = {
-                    "profilePic": profile_image,
-                    "memberVisible": [],
-                    "onRequest": []
-                }
-            
-            user_result = {
-                "username": shortlist["userUsername"],
-                "firstName": user_data.get("firstName"),
-                "lastName": user_data.get("lastName"),
-                "age": calculate_age(
-                    birthMonth=user_data.get("birthMonth"),
-                    birthYear=user_data.get("birthYear")
-                ),
-                "location": user_data.get("location"),
-                "occupation": user_data.get("occupation"),
-                "profileImage": profile_image,
-                "imageVisibility": iv_data,
-                "addedAt": safe_datetime_serialize(shortlist.get("createdAt"))
-            }
-            if profile_pic_always_visible and existing_images:
-                user_result["profilePicVisible"] = True
+            user_result = compact_card(card)
+            user_result["addedAt"] = safe_datetime_serialize(shortlist.get("createdAt"))
             result.append(user_result)
         
         logger.info(f"✅ Found {len(result)} users who shortlisted {username}")
@@ -9704,97 +9445,38 @@ async def track_profile_view(
     if profile_view.profileUsername == profile_view.viewedByUsername:
         return {"message": "Self-view not tracked"}
     
-    # Check if both users exist
-    profile_user = await db.users.find_one({"username": profile_view.profileUsername})
-    viewer_user = await db.users.find_one({"username": profile_view.viewedByUsername})
+    from services.profile_view_counter import get_profile_view_counter
+    view_counter = get_profile_view_counter()
     
-    if not profile_user:
+    # Check if both users exist (cached username set)
+    if not await view_counter.usernames.contains(db, profile_view.profileUsername):
         raise HTTPException(status_code=404, detail="Profile user not found")
-    if not viewer_user:
+    if not await view_counter.usernames.contains(db, profile_view.viewedByUsername):
         raise HTTPException(status_code=404, detail="Viewer user not found")
     
     try:
-        # Check if this user has viewed this profile before
-        existing_view = await db.profile_views.find_one({
-            "profileUsername": profile_view.profileUsername,
-            "viewedByUsername": profile_view.viewedByUsername
-        })
+        # One atomic upsert for a new pair; repeat views are buffered in Redis
+        recorded = await view_counter.record_view(db, profile_view.profileUsername, profile_view.viewedByUsername)
+        new_count = recorded.view_count
+        logger.info(f"✅ Profile view tracked: {profile_view.viewedByUsername} → {profile_view.profileUsername} ({new_count})")
         
-        if existing_view:
-            # Increment view count and update last viewed timestamp
-            await db.profile_views.update_one(
-                {"_id": existing_view["_id"]},
-                {
-                    "$set": {"lastViewedAt": datetime.utcnow()},
-                    "$inc": {"viewCount": 1}
-                }
+        # Log activity
+        try:
+            from services.activity_logger import get_activity_logger
+            from models.activity_models import ActivityType
+            activity_logger = get_activity_logger()
+            await activity_logger.log_activity(
+                username=profile_view.viewedByUsername,
+                action_type=ActivityType.PROFILE_VIEWED,
+                target_username=profile_view.profileUsername,
+                metadata={"view_count": new_count, "first_view": recorded.first_view},
+                ip_address=request.client.host if request.client else None
             )
-            new_count = existing_view.get("viewCount", 1) + 1
-            logger.info(f"✅ Incremented profile view count to {new_count}")
-            
-            # Log activity
-            try:
-                from services.activity_logger import get_activity_logger
-                from models.activity_models import ActivityType
-                activity_logger = get_activity_logger()
-                await activity_logger.log_activity(
-                    username=profile_view.viewedByUsername,
-                    action_type=ActivityType.PROFILE_VIEWED,
-                    target_username=profile_view.profileUsername,
-                    metadata={"view_count": new_count, "first_view": False},
-                    ip_address=request.client.host if request.client else None
-                )
-            except Exception as log_err:
-                logger.warning(f"⚠️ Failed to log activity: {log_err}")
-            
-            # Dispatch event for notifications (only on first view to avoid spam)
-            if new_count <= 3:  # Notify first 3 views only
-                try:
-                    from services.event_dispatcher import get_event_dispatcher, UserEventType
-                    dispatcher = await get_event_dispatcher(db)
-                    await dispatcher.dispatch(
-                        event_type=UserEventType.PROFILE_VIEWED,
-                        actor_username=profile_view.viewedByUsername,
-                        target_username=profile_view.profileUsername
-                    )
-                except Exception as dispatch_err:
-                    logger.warning(f"⚠️ Failed to dispatch profile view event: {dispatch_err}")
-            
-            return {
-                "message": "Profile view updated",
-                "viewCount": new_count,
-                "totalViews": new_count
-            }
-        else:
-            # Create new profile view record
-            view_data = {
-                "profileUsername": profile_view.profileUsername,
-                "viewedByUsername": profile_view.viewedByUsername,
-                "viewCount": 1,
-                "firstViewedAt": datetime.utcnow(),
-                "lastViewedAt": datetime.utcnow(),
-                "createdAt": datetime.utcnow()
-            }
-            
-            result = await db.profile_views.insert_one(view_data)
-            logger.info(f"✅ Profile view tracked: {profile_view.viewedByUsername} → {profile_view.profileUsername}")
-            
-            # Log activity
-            try:
-                from services.activity_logger import get_activity_logger
-                from models.activity_models import ActivityType
-                activity_logger = get_activity_logger()
-                await activity_logger.log_activity(
-                    username=profile_view.viewedByUsername,
-                    action_type=ActivityType.PROFILE_VIEWED,
-                    target_username=profile_view.profileUsername,
-                    metadata={"view_count": 1, "first_view": True},
-                    ip_address=request.client.host if request.client else None
-                )
-            except Exception as log_err:
-                logger.warning(f"⚠️ Failed to log activity: {log_err}")
-            
-            # Dispatch event for notifications (first view)
+        except Exception as log_err:
+            logger.warning(f"⚠️ Failed to log activity: {log_err}")
+        
+        # Dispatch event for notifications (first 3 views only, to avoid spam)
+        if new_count <= 3:
             try:
                 from services.event_dispatcher import get_event_dispatcher, UserEventType
                 dispatcher = await get_event_dispatcher(db)
@@ -9805,12 +9487,18 @@ async def track_profile_view(
                 )
             except Exception as dispatch_err:
                 logger.warning(f"⚠️ Failed to dispatch profile view event: {dispatch_err}")
-            
+        
+        if recorded.first_view:
             return {
                 "message": "Profile view tracked",
-                "id": str(result.inserted_id),
+                "id": recorded.view_id,
                 "viewCount": 1
             }
+        return {
+            "message": "Profile view updated",
+            "viewCount": new_count,
+            "totalViews": new_count
+        }
     
     except Exception as e:
         logger.error(f"❌ Error tracking profile view: {e}", exc_info=True)
@@ -9829,37 +9517,37 @@ async def get_viewer_profile_view_metrics(
     if viewer_username == username:
         return {"lastViewedAt": None, "viewCount": 0}
 
-    existing_view = await db.profile_views.find_one({
-        "profileUsername": username,
-        "viewedByUsername": viewer_username
-    })
-
-    if not existing_view:
-        return {"lastViewedAt": None, "viewCount": 0}
-
-    last_viewed_at = (
-        existing_view.get("lastViewedAt")
-        or existing_view.get("viewedAt")
-        or existing_view.get("createdAt")
-    )
+    # Stored metrics plus views still buffered in Redis
+    from services.profile_view_counter import get_profile_view_counter
+    metrics = await get_profile_view_counter().get_viewer_metrics(db, username, viewer_username)
 
     return {
-        "lastViewedAt": safe_datetime_serialize(last_viewed_at),
-        "viewCount": existing_view.get("viewCount", 0)
+        "lastViewedAt": safe_datetime_serialize(metrics["lastViewedAt"]),
+        "viewCount": metrics["viewCount"]
     }
 
 @router.get("/profile-views/{username}")
 async def get_profile_views(
     username: str,
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Opt-in keyset pagination: empty for the first page, then the previous nextCursor"),
     db = Depends(get_database)
 ):
     """Get list of users who viewed this profile (filtered by admin-configured days)"""
+    from utils.pagination import decode_cursor, keyset_match, split_page
+    
     logger.info(f"📊 Getting profile views for {username}")
     
+    # One row per viewer, most recent first (_id is the viewer username)
+    views_sort = [("lastViewedAt", -1), ("_id", -1)]
+    try:
+        views_after = decode_cursor(cursor, views_sort) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         # Get system settings for view history retention and profile picture visibility
-        system_settings = await db.system_settings.find_one({}) or {}
+        system_settings = await settings_cache.get_document(db, "system_settings") or {}
         view_history_days = system_settings.get("profile_view_history_days", 7)  # Default 7 days
         profile_pic_always_visible = system_settings.get("profile_picture_always_visible", True)
         
@@ -9869,61 +9557,61 @@ async def get_profile_views(
         
         logger.info(f"📅 Filtering views from last {view_history_days} days (since {cutoff_date.isoformat()})")
         
-        # Get profile views within the time window
-        all_views = await db.profile_views.find({
-            "profileUsername": username,
-            "$or": [
-                {"lastViewedAt": {"$gte": cutoff_date}},
-                {"viewedAt": {"$gte": cutoff_date}},
-                {"createdAt": {"$gte": cutoff_date}}
-            ]
+        # Consolidate duplicate views per viewer in the database
+        pipeline = [
+            {"$match": {
+                "profileUsername": username,
+                "$or": [
+                    {"lastViewedAt": {"$gte": cutoff_date}},
+                    {"viewedAt": {"$gte": cutoff_date}},
+                    {"createdAt": {"$gte": cutoff_date}}
+                ]
+            }},
+            {"$group": {
+                "_id": "$viewedByUsername",
+                "viewCount": {"$sum": {"$ifNull": ["$viewCount", 1]}},
+                "lastViewedAt": {"$max": {"$ifNull": ["$lastViewedAt", {"$ifNull": ["$viewedAt", "$createdAt"]}]}},
+                "firstViewedAt": {"$min": {"$ifNull": ["$firstViewedAt", "$createdAt"]}},
+                "id": {"$first": "$_id"}
+            }}
+        ]
+        if views_after is not None:
+            # Grouped values (no index to use either way); lastViewedAt may be null
+            pipeline.append({"$match": keyset_match(views_sort, views_after, nullable=("lastViewedAt", "_id"))})
+        page_size = limit + 1 if cursor is not None else limit
+        pipeline += [
+            {"$sort": dict(views_sort)},
+            # Drop inactive viewers before limiting so pages come back full
+            {"$lookup": {
+                "from": "users",
+                "let": {"viewer": "$_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$username", "$$viewer"]}, "accountStatus": "active"}},
+                    {"$project": {"_id": 1}}
+                ],
+                "as": "activeViewer"
+            }},
+            {"$match": {"activeViewer": {"$ne": []}}},
+            {"$limit": page_size},
+            {"$project": {"activeViewer": 0}}
+        ]
+        consolidated_views = await db.profile_views.aggregate(pipeline).to_list(page_size)
+        next_cursor = None
+        if cursor is not None:
+            consolidated_views, next_cursor = split_page(consolidated_views, limit, views_sort)
+        
+        # Batch fetch viewer details (strictly active users only)
+        viewers = await db.users.find({
+            "username": {"$in": [view["_id"] for view in consolidated_views]},
+            "accountStatus": "active"
         }).to_list(None)
+        viewers_by_username = {viewer["username"]: viewer for viewer in viewers}
         
-        # Group by viewer to consolidate duplicates
-        viewer_map = {}
-        for view in all_views:
-            viewer_username = view["viewedByUsername"]
-            
-            if viewer_username not in viewer_map:
-                # First time seeing this viewer
-                viewer_map[viewer_username] = {
-                    "viewedByUsername": viewer_username,
-                    "viewCount": view.get("viewCount", 1),
-                    "lastViewedAt": view.get("lastViewedAt", view.get("viewedAt", view.get("createdAt"))),
-                    "firstViewedAt": view.get("firstViewedAt", view.get("createdAt")),
-                    "id": view["_id"]
-                }
-            else:
-                # Duplicate viewer - consolidate
-                existing = viewer_map[viewer_username]
-                existing["viewCount"] += view.get("viewCount", 1)
-                
-                # Keep the most recent lastViewedAt
-                current_last = view.get("lastViewedAt", view.get("viewedAt", view.get("createdAt")))
-                if current_last > existing["lastViewedAt"]:
-                    existing["lastViewedAt"] = current_last
-                
-                # Keep the earliest firstViewedAt
-                current_first = view.get("firstViewedAt", view.get("createdAt"))
-                if current_first < existing["firstViewedAt"]:
-                    existing["firstViewedAt"] = current_first
-        
-        # Convert to list and sort by most recent
-        consolidated_views = sorted(
-            viewer_map.values(),
-            key=lambda x: x["lastViewedAt"],
-            reverse=True
-        )[:limit]
-        
-        # Get viewer details for each unique viewer
         result = []
         total_view_count = 0
         
         for view in consolidated_views:
-            viewer = await db.users.find_one({
-                "username": view["viewedByUsername"],
-                "accountStatus": "active"  # Strictly active users only
-            })
+            viewer = viewers_by_username.get(view["_id"])
             if viewer:
                 viewer.pop("password", None)
                 viewer["_id"] = str(viewer["_id"])
@@ -10010,12 +9698,15 @@ async def get_profile_views(
         total_views_all = total_result[0]["totalViews"] if total_result else 0
         
         logger.info(f"✅ Found {unique_viewers} unique viewers, {total_views_all} total views for {username}")
-        return {
+        response = {
             "views": result,
             "uniqueViewers": unique_viewers,
             "totalViews": total_views_all,
             "recentViews": len(result)
         }
+        if cursor is not None:
+            response["nextCursor"] = next_cursor
+        return response
     
     except Exception as e:
         logger.error(f"❌ Error fetching profile views: {e}", exc_info=True)
@@ -10030,8 +9721,11 @@ async def get_profile_view_count(
     logger.info(f"📈 Getting profile view count for {username}")
     
     try:
-        total_views = await db.profile_views.count_documents({"profileUsername": username})
-        unique_viewers = len(await db.profile_views.distinct("viewedByUsername", {"profileUsername": username}))
+        # Stored counts (rows without viewCount are single views) plus buffered views
+        from services.profile_view_counter import get_profile_view_counter
+        totals = await get_profile_view_counter().get_profile_totals(db, username)
+        total_views = totals["totalViews"]
+        unique_viewers = totals["uniqueViewers"]
         
         logger.info(f"✅ Profile view stats for {username}: {total_views} total, {unique_viewers} unique")
         return {
@@ -11353,13 +11047,7 @@ async def check_images_access(
         # =================================================================
         
         # Check database setting first, fallback to config.py
-        system_settings = await db.system_settings.find_one({"_id": "global"})
-        profile_pic_always_visible = True  # Default
-        if system_settings:
-            profile_pic_always_visible = system_settings.get("profile_picture_always_visible", True)
-        else:
-            # Fallback to config.py setting
-            profile_pic_always_visible = settings.profile_picture_always_visible
+        profile_pic_always_visible = await _get_profile_picture_always_visible(db)
         
         # Check each image's access status
         image_access_list = []
@@ -11435,10 +11123,10 @@ async def check_images_access(
 @router.get("/online-status/count")
 async def get_online_count():
     """Get count of currently online users"""
-    from redis_manager import get_redis_manager
+    from async_redis_manager import get_async_redis
 
-    redis = get_redis_manager()
-    users = redis.get_online_users()
+    redis = get_async_redis()
+    users = await redis.get_online_users()
     count = len(users)
     logger.info(f"Online users count: {count}")
     return {"onlineCount": count}
@@ -11458,10 +11146,10 @@ async def get_online_users(
     db = Depends(get_database)
 ):
     """Get list of currently online users with profile info"""
-    from redis_manager import get_redis_manager
+    from async_redis_manager import get_async_redis
     
-    redis = get_redis_manager()
-    usernames = redis.get_online_users()
+    redis = get_async_redis()
+    usernames = await redis.get_online_users()
     logger.info(f"Online usernames: {len(usernames)} - {usernames}")
     
     if not usernames:
@@ -11507,21 +11195,21 @@ async def get_online_users(
 @router.get("/online-status/{username}")
 async def check_user_online(username: str):
     """Check if specific user is online"""
-    from redis_manager import get_redis_manager
+    from async_redis_manager import get_async_redis
     
-    redis = get_redis_manager()
-    online = redis.is_user_online(username)
+    redis = get_async_redis()
+    online = await redis.is_user_online(username)
     logger.info(f"User '{username}' online status: {online}")
     return {"username": username, "isOnline": online}
 
 @router.post("/online-status/{username}/online")
 async def mark_user_online(username: str):
     """Mark user as online and broadcast to all clients"""
-    from redis_manager import get_redis_manager
+    from async_redis_manager import get_async_redis
     from websocket_manager import sio, broadcast_online_count
     
-    redis = get_redis_manager()
-    success = redis.set_user_online(username)
+    redis = get_async_redis()
+    success = await redis.set_user_online(username)
     
     if success:
         # Broadcast to all connected clients via WebSocket
@@ -11534,11 +11222,11 @@ async def mark_user_online(username: str):
 @router.post("/online-status/{username}/offline")
 async def mark_user_offline(username: str):
     """Mark user as offline and broadcast to all clients"""
-    from redis_manager import get_redis_manager
+    from async_redis_manager import get_async_redis
     from websocket_manager import sio, broadcast_online_count
     
-    redis = get_redis_manager()
-    success = redis.set_user_offline(username)
+    redis = get_async_redis()
+    success = await redis.set_user_offline(username)
     
     if success:
         # Broadcast to all connected clients via WebSocket
@@ -11551,10 +11239,10 @@ async def mark_user_offline(username: str):
 @router.post("/online-status/{username}/refresh")
 async def refresh_user_online(username: str):
     """Refresh user's online status (heartbeat)"""
-    from redis_manager import get_redis_manager
+    from async_redis_manager import get_async_redis
     
-    redis = get_redis_manager()
-    success = redis.refresh_user_online(username)
+    redis = get_async_redis()
+    success = await redis.refresh_user_online(username)
     return {"username": username, "refreshed": success}
 
 # ==================== ROLE CONFIGURATION ====================
@@ -11565,8 +11253,8 @@ async def get_role_config(db = Depends(get_database)):
     logger.info("📋 Getting role configuration")
     
     try:
-        # Get from database or return defaults
-        config = await db.role_config.find_one({"_id": "default"})
+        # Get from database (via the settings cache) or return defaults
+        config = await settings_cache.get(db, "role_config")
         
         if not config:
             # Return default configuration
@@ -11652,6 +11340,7 @@ async def update_role_config(
             config,
             upsert=True
         )
+        await settings_cache.invalidate(db, "role_config")
         
         logger.info(f"✅ Role configuration updated by {username}")
         return {"message": "Role configuration updated successfully"}
@@ -12504,8 +12193,7 @@ async def update_ticket_status(
         # Set deletion timestamp if ticket is resolved or closed
         if status in ["resolved", "closed"]:
             # Get system settings for delete delay
-            settings = await db.system_settings.find_one({"_id": "global"})
-            delete_days = settings.get("ticket_delete_days", 30) if settings else 30
+            delete_days = await settings_cache.get_value(db, "system_settings", "ticket_delete_days", 30)
             
             if delete_days == 0:
                 # Immediate deletion - set to now
@@ -12716,7 +12404,7 @@ async def get_system_settings(db = Depends(get_database)):
     logger.info("📋 Loading system settings")
     
     try:
-        settings = await db.system_settings.find_one({"_id": "global"})
+        settings = await settings_cache.get_document(db, "system_settings")
         
         if not settings:
             # Return defaults if no settings exist
@@ -12767,6 +12455,7 @@ async def update_system_settings(
             },
             upsert=True
         )
+        await settings_cache.invalidate(db, "system_settings")
         
         logger.info("✅ System settings updated")
         return {"message": "Settings saved successfully"}
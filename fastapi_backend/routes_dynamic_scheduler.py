@@ -10,6 +10,7 @@ from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from database import get_database
+from config import settings
 from auth.jwt_auth import get_current_user_dependency as get_current_user
 from services.job_registry import JobRegistryService
 from services.job_executor import JobExecutor
@@ -312,6 +313,17 @@ async def run_job_manually(
     
     username = current_user.get("username")
     try:
+        if settings.scheduler_mode == "enqueue":
+            # The job worker picks the request up on its next poll
+            registry = JobRegistryService(db)
+            if not await registry.request_run(job_id, triggered_by=f"manual:{username}"):
+                raise HTTPException(status_code=404, detail="Job not found or disabled")
+            return {
+                "success": True,
+                "message": "Job queued for execution",
+                "execution": None
+            }
+        
         executor = JobExecutor(db)
         execution = await executor.execute_job_by_id(job_id, triggered_by=f"manual:{username}")
         
@@ -1,6 +1,12 @@
 # fastapi_backend/services/activity_logger.py
 import logging
+import os
+import random
+import tempfile
+from pathlib import Path
+from bson import json_util
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError
 from models.activity_models import (
     ActivityLog, ActivityType, ActivityLogFilter, 
     ActivityStats, ActivityLogCreate
@@ -8,21 +14,55 @@ from models.activity_models import (
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import asyncio
-from collections import defaultdict
+from collections import defaultdict, deque
 import json
 
 logger = logging.getLogger(__name__)
 
+# Write-behind pipeline limits
+BUFFER_CAPACITY = 10000           # Activities held in memory before spilling to disk
+MAX_RETRIES = 3                   # insert_many retries per batch before spilling it
+RETRY_BASE_DELAY = 0.5            # seconds, doubled per attempt with +/-50% jitter
+SPILL_PATH = os.getenv("ACTIVITY_SPILL_PATH", os.path.join(tempfile.gettempdir(), "activity_logs_spill.jsonl"))
+SPILL_MAX_BYTES = 50 * 1024 * 1024
+
 class ActivityLogger:
-    """Service for logging user activities with batch processing and privacy controls"""
+    """
+    Service for logging user activities with batch processing and privacy controls
+
+    Writes go through a write-behind pipeline: log_activity() only appends to a
+    bounded in-memory buffer and never waits on MongoDB. A background writer
+    flushes batches with unordered insert_many and jittered retries; batches
+    that still fail are appended to an on-disk spill file, which is replayed
+    once the database accepts writes again (including after a restart).
+    Documents get their _id on the first attempt, so retries and replays
+    that hit already-inserted documents are treated as success.
+    """
     
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(self, db: AsyncIOMotorDatabase, spill_path: Optional[str] = None):
         self.db = db
         self.collection = db.activity_logs
-        self.batch_queue = []
         self.batch_size = 100
         self.batch_timeout = 5  # seconds
+        self.buffer_capacity = BUFFER_CAPACITY
+        self.buffer: deque = deque()
+        self.spill_path = Path(spill_path or SPILL_PATH)
+        self.spill_max_bytes = SPILL_MAX_BYTES
+        self.max_retries = MAX_RETRIES
+        self.db_available = True
+        self.counters = {
+            "logged": 0,
+            "written": 0,
+            "retries": 0,
+            "failed_batches": 0,
+            "spilled": 0,
+            "overflowed": 0,
+            "replayed": 0,
+            "dropped": 0,
+        }
         self._flush_task = None
+        self._flush_event = asyncio.Event()
+        self._spill_lock = asyncio.Lock()
         
     async def initialize(self):
         """Initialize the activity logger and create indexes"""
@@ -51,19 +91,28 @@ class ActivityLogger:
             )
             
             logger.info("✅ Activity logger initialized with indexes")
-            
-            # Start periodic flush task
-            self._flush_task = asyncio.create_task(self._periodic_flush())
-            
         except Exception as e:
             logger.error(f"❌ Error initializing activity logger: {e}")
+        
+        # Start the background writer even if index creation failed (DB may come back)
+        self._flush_task = asyncio.create_task(self._run_writer())
     
-    async def _periodic_flush(self):
-        """Periodically flush batch queue"""
+    async def _run_writer(self):
+        """Flush when a batch fills up or every batch_timeout seconds, then replay any spill"""
         while True:
-            await asyncio.sleep(self.batch_timeout)
-            if self.batch_queue:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.batch_timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            try:
                 await self._flush_batch()
+                if self.db_available:
+                    await self._replay_spill()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Activity log writer error: {e}", exc_info=True)
     
     async def log_activity(
         self,
@@ -101,29 +150,135 @@ class ActivityLogger:
             pii_logged=pii_logged
         )
         
-        # Add to batch queue
-        self.batch_queue.append(activity.dict(by_alias=True, exclude={'id'}))
+        # Buffer full (DB slow or down): move the oldest batch to the spill file
+        if len(self.buffer) >= self.buffer_capacity:
+            overflow = [self.buffer.popleft() for _ in range(min(self.batch_size, len(self.buffer)))]
+            self.counters["overflowed"] += len(overflow)
+            await self._spill(overflow)
+        
+        self.buffer.append(activity.dict(by_alias=True, exclude={'id'}))
+        self.counters["logged"] += 1
         
-        # Flush if batch is full
-        if len(self.batch_queue) >= self.batch_size:
-            await self._flush_batch()
+        # Wake the writer if a batch is ready
+        if len(self.buffer) >= self.batch_size:
+            self._flush_event.set()
     
     async def _flush_batch(self):
-        """Flush batch queue to database"""
-        if not self.batch_queue:
+        """
+        Write buffered activities in batches
+        
+        Stops at the first batch that still fails after retries: it is spilled to
+        disk and the rest stays buffered until the next flush.
+        """
+        while self.buffer:
+            batch = [self.buffer.popleft() for _ in range(min(self.batch_size, len(self.buffer)))]
+            if await self._insert_with_retry(batch):
+                self.counters["written"] += len(batch)
+                logger.debug(f"✅ Flushed {len(batch)} activity logs to database")
+                continue
+            self.counters["failed_batches"] += 1
+            await self._spill(batch)
             return
-        
+    
+    async def _insert_with_retry(self, batch: List[Dict[str, Any]]) -> bool:
+        """Unordered insert_many with jittered exponential backoff; updates db_available"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+                self.db_available = True
+                return True
+            except BulkWriteError as e:
+                # Duplicate _ids are documents a previous attempt already wrote
+                errors = e.details.get("writeErrors", [])
+                if errors and all(err.get("code") == 11000 for err in errors):
+                    self.db_available = True
+                    return True
+                error = e
+            except Exception as e:
+                error = e
+            if attempt < self.max_retries:
+                self.counters["retries"] += 1
+                await asyncio.sleep(RETRY_BASE_DELAY * (2 ** attempt) * random.uniform(0.5, 1.5))
+        logger.error(f"❌ Error flushing activity logs after {self.max_retries} retries: {error}")
+        self.db_available = False
+        return False
+    
+    async def _spill(self, batch: List[Dict[str, Any]], requeue: bool = False):
+        """Append activities to the spill file (dropped if the file is at its size cap)"""
+        if not batch:
+            return
+        lines = "".join(json_util.dumps(doc) + "\n" for doc in batch)
+        async with self._spill_lock:
+            try:
+                size = self.spill_path.stat().st_size if self.spill_path.exists() else 0
+                if size + len(lines) > self.spill_max_bytes:
+                    self.counters["dropped"] += len(batch)
+                    logger.warning(f"⚠️ Activity spill file full, dropped {len(batch)} activities")
+                    return
+                await asyncio.to_thread(self._append_lines, lines)
+                if not requeue:
+                    self.counters["spilled"] += len(batch)
+            except Exception as e:
+                self.counters["dropped"] += len(batch)
+                logger.error(f"❌ Failed to spill {len(batch)} activities to {self.spill_path}: {e}")
+    
+    def _append_lines(self, lines: str):
+        self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.spill_path, "a", encoding="utf-8") as spill_file:
+            spill_file.write(lines)
+            spill_file.flush()
+            os.fsync(spill_file.fileno())
+    
+    async def _replay_spill(self):
+        """
+        Insert spilled activities; whatever can't be written yet goes back to the spill file
+        
+        The spill file is renamed before replaying so new spills (and request
+        paths waiting on the lock) never wait on database writes.
+        """
+        replay_path = self.spill_path.with_name(self.spill_path.name + ".replay")
+        async with self._spill_lock:
+            # A leftover .replay file is from a replay interrupted by a crash
+            if not replay_path.exists():
+                if not self.spill_path.exists():
+                    return
+                self.spill_path.rename(replay_path)
+        
+        text = await asyncio.to_thread(replay_path.read_text, "utf-8")
+        docs = []
+        for line in text.splitlines():
+            try:
+                docs.append(json_util.loads(line))
+            except Exception:
+                self.counters["dropped"] += 1  # torn write from a crash
+        
+        written = 0
+        for i in range(0, len(docs), self.batch_size):
+            if not await self._insert_with_retry(docs[i:i + self.batch_size]):
+                break
+            written = min(i + self.batch_size, len(docs))
+        
+        remaining = docs[written:]
+        if remaining:
+            await self._spill(remaining, requeue=True)
+        replay_path.unlink()
+        self.counters["replayed"] += written
+        if written:
+            logger.info(f"✅ Replayed {written} spilled activity logs ({len(remaining)} still pending)")
+    
+    def get_pipeline_stats(self) -> Dict[str, Any]:
+        """Buffer, spill and counter snapshot for health reporting"""
         try:
-            batch_to_insert = self.batch_queue.copy()
-            self.batch_queue.clear()
-            
-            if batch_to_insert:
-                await self.collection.insert_many(batch_to_insert)
-                logger.debug(f"✅ Flushed {len(batch_to_insert)} activity logs to database")
-        except Exception as e:
-            logger.error(f"❌ Error flushing activity logs: {e}")
-            # Re-add to queue if failed
-            self.batch_queue.extend(batch_to_insert)
+            spill_bytes = self.spill_path.stat().st_size if self.spill_path.exists() else 0
+        except OSError:
+            spill_bytes = 0
+        return {
+            "db_available": self.db_available,
+            "buffered": len(self.buffer),
+            "buffer_capacity": self.buffer_capacity,
+            "spill_bytes": spill_bytes,
+            **self.counters,
+        }
     
     @staticmethod
     def _mask_ip(ip_address: str) -> str:
@@ -333,8 +488,10 @@ class ActivityLogger:
         """Cleanup resources"""
         if self._flush_task:
             self._flush_task.cancel()
-        # Final flush
+        # Final flush; anything the DB doesn't take is kept in the spill file for the next start
         await self._flush_batch()
+        await self._spill(list(self.buffer))
+        self.buffer.clear()
 
 # Global instance
 activity_logger: Optional[ActivityLogger] = None
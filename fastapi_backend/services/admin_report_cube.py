@@ -0,0 +1,546 @@
+"""
+Admin Report Cube
+Pre-aggregated admin dashboard data in the `admin_report_cube` collection
+
+The admin reports (routers/admin_reports.py, routers/inactive_users_report.py)
+used to run their breakdowns against db.users on every dashboard load. Each
+breakdown is now a cell keyed by (dimension set, date bucket):
+
+    _id: "<dimension>:<gender>|<bucket>"    e.g. "location:female|current"
+                                                 "acquisition:all|2025-09"
+
+- Point-in-time breakdowns (age, location, profession, summary, inactivity)
+  live in the "current" bucket and are rebuilt by the daily platform stats
+  snapshot job
+- Member acquisition has one bucket per approval month. The daily job only
+  re-scans the months that can still change (yesterday's and today's) and the
+  monthly aggregation job closes out the previous month, so older months are
+  never scanned again
+
+Cells hold the rows exactly as the endpoints return them, plus `refreshedAt`,
+which is surfaced as the response's freshness timestamp. A missing or stale
+cell (fresh deploy, or the jobs stopped running) is computed on read and
+stored, so the endpoints never depend on the jobs to return data.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CUBE_COLLECTION = "admin_report_cube"
+CURRENT_BUCKET = "current"
+GENDER_FILTERS = ("all", "male", "female")
+GROUPED_DIMENSIONS = ("age", "location", "profession")
+MAX_CELL_AGE = timedelta(hours=36)  # one missed daily run is tolerated
+
+MAX_USERS_PER_GROUP = 100
+MAX_RESULTS_PER_REPORT = 50
+MIN_AGE = 18
+MAX_AGE = 79
+
+_MONTH_LABELS = [
+    "", "Jan", "Feb", "Mar", "Apr", "May", "Jun",
+    "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"
+]
+
+
+def normalize_gender(gender: Optional[str]) -> str:
+    """Cell gender key: male, female or all"""
+    gender = (gender or "").lower()
+    return gender if gender in ("male", "female") else "all"
+
+
+def cell_id(dimension: str, gender: Optional[str] = None, bucket: str = CURRENT_BUCKET) -> str:
+    return f"{dimension}:{normalize_gender(gender)}|{bucket}"
+
+
+def month_bucket(when: datetime) -> str:
+    return f"{when.year:04d}-{when.month:02d}"
+
+
+def gender_match(gender: Optional[str]) -> Dict[str, Any]:
+    """Active users, optionally restricted to one gender (case-insensitive)"""
+    match_query = {"accountStatus": "active"}
+    gender = normalize_gender(gender)
+    if gender != "all":
+        match_query["gender"] = {"$regex": f"^{gender}$", "$options": "i"}
+    return match_query
+
+
+def age_range_label(group_start: int) -> str:
+    """18-19, then 3-year groups from 20 (last one capped at MAX_AGE)"""
+    if group_start == MIN_AGE:
+        return "18-19"
+    return f"{group_start}-{min(group_start + 2, MAX_AGE)}"
+
+
+def _gender_count(gender: str) -> Dict[str, Any]:
+    """$group accumulator counting one (case-insensitive) gender"""
+    return {"$sum": {"$cond": [{"$eq": [{"$toLower": {"$ifNull": ["$gender", ""]}}, gender]}, 1, 0]}}
+
+
+def _grouped_pipeline(stages: List[Dict[str, Any]],
+                      group_id: Any,
+                      group_fields: Optional[Dict[str, Any]] = None,
+                      user_fields: Optional[Dict[str, Any]] = None,
+                      sort: Optional[Dict[str, int]] = None,
+                      limit: int = MAX_RESULTS_PER_REPORT) -> List[Dict[str, Any]]:
+    """
+    `stages` followed by one $group over every remaining user: counts by
+    gender plus up to MAX_USERS_PER_GROUP user summaries per group
+
+    Args:
+        group_fields: Extra $group accumulators, carried through to the output
+        user_fields: Extra fields for each user summary
+    """
+    group_fields = group_fields or {}
+    user_summary = {
+        "profileId": "$profileId",
+        "username": "$username",
+        "firstName": "$firstName",
+        "lastName": "$lastName",
+        "gender": "$gender",
+        **(user_fields or {})
+    }
+    return stages + [
+        {"$group": {
+            "_id": group_id,
+            "count": {"$sum": 1},
+            "maleCount": _gender_count("male"),
+            "femaleCount": _gender_count("female"),
+            "users": {"$push": user_summary},
+            **group_fields
+        }},
+        {"$sort": sort or {"count": -1, "_id": 1}},
+        {"$limit": limit},
+        {"$project": {
+            "count": 1,
+            "maleCount": 1,
+            "femaleCount": 1,
+            "users": {"$slice": ["$users", MAX_USERS_PER_GROUP]},
+            **{field: 1 for field in group_fields}
+        }}
+    ]
+
+
+def _user_summary(user: Dict[str, Any], with_occupation: bool) -> Dict[str, Any]:
+    summary = {
+        "profileId": user.get("profileId", ""),
+        "username": user.get("username", ""),
+        "firstName": user.get("firstName", ""),
+        "lastName": user.get("lastName", ""),
+        "gender": user.get("gender") or None,
+    }
+    if with_occupation:
+        summary["occupation"] = user.get("occupation")
+    return summary
+
+
+def _group_row(group: Dict[str, Any], key_field: str, key: Any, with_occupation: bool = True) -> Dict[str, Any]:
+    """Report row in the shape the charts expect"""
+    return {
+        key_field: key,
+        "count": group["count"],
+        "maleCount": group["maleCount"],
+        "femaleCount": group["femaleCount"],
+        "users": [_user_summary(user, with_occupation) for user in group["users"]]
+    }
+
+
+def _age_stages(now: datetime) -> List[Dict[str, Any]]:
+    """Compute calculatedAge from birthYear/birthMonth and bucket it into ageGroup"""
+    return [
+        {"$addFields": {
+            "calculatedAge": {
+                "$cond": {
+                    "if": {
+                        "$and": [
+                            {"$ne": ["$birthYear", None]},
+                            {"$gt": ["$birthYear", 0]}
+                        ]
+                    },
+                    "then": {
+                        "$subtract": [
+                            {"$subtract": [now.year, "$birthYear"]},
+                            {
+                                "$cond": {
+                                    "if": {
+                                        "$and": [
+                                            {"$ne": ["$birthMonth", None]},
+                                            {"$lt": [now.month, "$birthMonth"]}
+                                        ]
+                                    },
+                                    "then": 1,
+                                    "else": 0
+                                }
+                            }
+                        ]
+                    },
+                    "else": None
+                }
+            }
+        }},
+        {"$match": {"calculatedAge": {"$ne": None, "$gte": MIN_AGE, "$lte": MAX_AGE}}},
+        {"$addFields": {
+            # 18-19, then 3-year groups starting at 20
+            "ageGroup": {
+                "$cond": [
+                    {"$lte": ["$calculatedAge", 19]},
+                    MIN_AGE,
+                    {"$add": [20, {"$multiply": [3, {"$floor": {"$divide": [{"$subtract": ["$calculatedAge", 20]}, 3]}}]}]}
+                ]
+            }
+        }}
+    ]
+
+
+def _parse_datetime(value) -> Optional[datetime]:
+    """Naive datetime from a datetime or ISO string (None if unparseable)"""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None) if value.tzinfo else value
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            return parsed.replace(tzinfo=None) if parsed.tzinfo else parsed
+        except (ValueError, TypeError):
+            return None
+    return None
+
+
+class AdminReportCube:
+    """Reads and refreshes admin_report_cube cells"""
+
+    def __init__(self, db):
+        self.db = db
+        self.collection = db[CUBE_COLLECTION]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("dimension", 1), ("gender", 1), ("bucket", 1)])
+
+    async def _store(self, dimension: str, gender: str, bucket: str, data: Any,
+                     source: str, **extra) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        cell = {
+            "_id": cell_id(dimension, gender, bucket),
+            "dimension": dimension,
+            "gender": normalize_gender(gender),
+            "bucket": bucket,
+            "data": data,
+            "source": source,
+            # BSON dates are millisecond precision; match what later reads return
+            "refreshedAt": now.replace(microsecond=now.microsecond // 1000 * 1000),
+            **extra
+        }
+        await self.collection.replace_one({"_id": cell["_id"]}, cell, upsert=True)
+        return cell
+
+    # ------------------------------------------------------------------
+    # Computation (the only code that scans db.users)
+    # ------------------------------------------------------------------
+
+    async def compute_grouped(self, dimension: str, gender: Optional[str] = None,
+                              now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Rows for the age, location or profession report"""
+        match_query = gender_match(gender)
+
+        if dimension == "age":
+            pipeline = _grouped_pipeline(
+                [{"$match": match_query}] + _age_stages(now or datetime.now()),
+                "$ageGroup", sort={"_id": 1}, limit=100
+            )
+        elif dimension == "location":
+            # Derived location facet - no decryption (services/report_facets.py)
+            match_query["locationFacet.key"] = {"$type": "string"}
+            pipeline = _grouped_pipeline(
+                [{"$match": match_query}],
+                "$locationFacet.key",
+                group_fields={"location": {"$first": "$locationFacet.label"}}
+            )
+        elif dimension == "profession":
+            # Users not yet backfilled count as Other
+            pipeline = _grouped_pipeline(
+                [{"$match": match_query}],
+                {"$ifNull": ["$professionFacet.category", "Other"]},
+                user_fields={"occupation": {"$ifNull": ["$professionFacet.title", "Other"]}}
+            )
+        else:
+            raise ValueError(f"Unknown report dimension: {dimension}")
+
+        groups = await self.db.users.aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+        rows = []
+        for group in groups:
+            if dimension == "age":
+                row = _group_row(group, "ageGroup", int(group["_id"]))
+                row["ageRange"] = age_range_label(row["ageGroup"])
+            elif dimension == "location":
+                row = _group_row(group, "location", group["location"])
+            else:
+                row = _group_row(group, "profession", group["_id"])
+                row["group"] = group["_id"]
+            rows.append(row)
+        return rows
+
+    async def compute_summary(self) -> Dict[str, int]:
+        pipeline = [
+            {"$match": {"accountStatus": "active"}},
+            {"$group": {
+                "_id": {"$toLower": {"$ifNull": ["$gender", "other"]}},
+                "count": {"$sum": 1}
+            }}
+        ]
+        counts = {"male": 0, "female": 0, "other": 0}
+        for result in await self.db.users.aggregate(pipeline).to_list(None):
+            key = result["_id"] if result["_id"] in counts else "other"
+            counts[key] += result["count"]
+        return {
+            "maleCount": counts["male"],
+            "femaleCount": counts["female"],
+            "otherCount": counts["other"],
+            "totalCount": sum(counts.values())
+        }
+
+    async def compute_inactivity(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Inactivity buckets by days since updatedAt, for /inactive-users/summary"""
+        now = now or datetime.utcnow()
+        cursor = self.db.users.find(
+            {"accountStatus": "active", "updatedAt": {"$exists": True, "$ne": None}},
+            {"updatedAt": 1, "gender": 1, "_id": 0}
+        )
+
+        total_active = inactive_15_30 = inactive_30_60 = inactive_60_plus = 0
+        never_logged_in = total_days = max_days = 0
+        gender_counts: Dict[str, int] = {}
+        async for user in cursor:
+            total_active += 1
+            updated_at = _parse_datetime(user.get("updatedAt"))
+            if updated_at is None:
+                days = 999
+                never_logged_in += 1
+            else:
+                days = (now - updated_at).days
+
+            total_days += days
+            max_days = max(max_days, days)
+            if 15 <= days < 30:
+                inactive_15_30 += 1
+            elif 30 <= days < 60:
+                inactive_30_60 += 1
+            elif days >= 60:
+                inactive_60_plus += 1
+
+            # Gender breakdown for inactive users (15+ days)
+            if days >= 15:
+                g = user.get("gender") or "Unknown"
+                gender_counts[g] = gender_counts.get(g, 0) + 1
+
+        return {
+            "summary": {
+                "totalActive": total_active,
+                "inactive15_30": inactive_15_30,
+                "inactive30_60": inactive_30_60,
+                "inactive60_plus": inactive_60_plus,
+                "neverLoggedIn": never_logged_in,
+                "avgDaysInactive": round(total_days / total_active, 1) if total_active else 0,
+                "maxDaysInactive": max_days
+            },
+            "genderBreakdown": gender_counts
+        }
+
+    async def compute_acquisition(self, gender: Optional[str] = None,
+                                  months: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Member acquisition rows by approval month ("YYYY-MM" -> row)
+
+        Args:
+            months: Only scan these months; None scans every approval
+        """
+        months = sorted(set(months)) if months is not None else None
+        if months is not None and not months:
+            return {}
+
+        approved = {"$type": "date"}
+        if months is not None:
+            first_year, first_month = (int(p) for p in months[0].split("-"))
+            last_year, last_month = (int(p) for p in months[-1].split("-"))
+            approved["$gte"] = datetime(first_year, first_month, 1)
+            approved["$lt"] = datetime(last_year + last_month // 12, last_month % 12 + 1, 1)
+
+        pipeline = [
+            {"$match": {**gender_match(gender), "adminApprovedAt": approved}},
+            {"$group": {
+                "_id": {"year": {"$year": "$adminApprovedAt"}, "month": {"$month": "$adminApprovedAt"}},
+                "count": {"$sum": 1},
+                "maleCount": _gender_count("male"),
+                "femaleCount": _gender_count("female"),
+                "users": {"$push": {
+                    "profileId": "$profileId",
+                    "username": "$username",
+                    "firstName": "$firstName",
+                    "lastName": "$lastName",
+                    "gender": "$gender"
+                }}
+            }},
+            {"$project": {
+                "count": 1,
+                "maleCount": 1,
+                "femaleCount": 1,
+                "users": {"$slice": ["$users", MAX_USERS_PER_GROUP]}
+            }}
+        ]
+        groups = await self.db.users.aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+        # Legacy ISO-string approvals are few; bucket them here rather than
+        # coercing every document with $dateFromString
+        legacy = self.db.users.find(
+            {**gender_match(gender), "adminApprovedAt": {"$type": "string", "$ne": ""}},
+            {"adminApprovedAt": 1, "profileId": 1, "username": 1, "firstName": 1, "lastName": 1, "gender": 1}
+        )
+        async for user in legacy:
+            approved_at = _parse_datetime(user["adminApprovedAt"])
+            if approved_at is None:
+                continue
+            gender_key = (user.get("gender") or "").lower()
+            groups.append({
+                "_id": {"year": approved_at.year, "month": approved_at.month},
+                "count": 1,
+                "maleCount": int(gender_key == "male"),
+                "femaleCount": int(gender_key == "female"),
+                "users": [user]
+            })
+
+        rows: Dict[str, Dict[str, Any]] = {}
+        for item in groups:
+            key = item["_id"] or {}
+            y, m = key.get("year"), key.get("month")
+            if not y or not m or m < 1 or m > 12:
+                continue
+            period = f"{y:04d}-{m:02d}"
+            if months is not None and period not in months:
+                continue
+            row = rows.setdefault(period, {
+                "period": period,
+                "periodLabel": f"{_MONTH_LABELS[m]} {y}",
+                "year": y,
+                "month": m,
+                "count": 0,
+                "maleCount": 0,
+                "femaleCount": 0,
+                "users": []
+            })
+            row["count"] += item.get("count", 0)
+            row["maleCount"] += item.get("maleCount", 0)
+            row["femaleCount"] += item.get("femaleCount", 0)
+            room = MAX_USERS_PER_GROUP - len(row["users"])
+            row["users"] += [_user_summary(user, False) for user in (item.get("users") or [])[:room]]
+        return rows
+
+    # ------------------------------------------------------------------
+    # Refresh (jobs, or on read when a cell is missing/stale)
+    # ------------------------------------------------------------------
+
+    async def refresh_current(self, dimension: str, gender: Optional[str] = None,
+                              source: str = "on_demand", now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Recompute one point-in-time cell"""
+        if dimension == "summary":
+            data = await self.compute_summary()
+        elif dimension == "inactivity":
+            data = await self.compute_inactivity(now)
+        else:
+            data = await self.compute_grouped(dimension, gender, now)
+        return await self._store(dimension, gender, CURRENT_BUCKET, data, source)
+
+    async def refresh_acquisition(self, gender: Optional[str] = None, months: Optional[Iterable[str]] = None,
+                                  source: str = "on_demand", closed: bool = False) -> int:
+        """
+        Recompute acquisition cells for `months` (every month when None)
+
+        The current month's cell is always written, even when empty, since its
+        refreshedAt is the acquisition report's freshness timestamp.
+        """
+        current = month_bucket(datetime.utcnow())
+        rows = await self.compute_acquisition(gender, months)
+
+        buckets = set(months) if months is not None else set(rows) | {current}
+        if months is None:
+            # Full rebuild: drop months that no longer have approvals
+            await self.collection.delete_many({
+                "dimension": "acquisition", "gender": normalize_gender(gender),
+                "bucket": {"$nin": sorted(buckets)}
+            })
+        for bucket in buckets:
+            await self._store("acquisition", gender, bucket, rows.get(bucket), source,
+                              closed=closed and bucket != current)
+        return len(buckets)
+
+    async def refresh_daily(self, day: datetime, source: str = "daily_snapshot") -> Dict[str, int]:
+        """
+        Daily snapshot: rebuild point-in-time cells and the acquisition
+        months that can still change (the snapshot day's and the current one)
+        """
+        cells = 0
+        for dimension in GROUPED_DIMENSIONS:
+            for gender in GENDER_FILTERS:
+                await self.refresh_current(dimension, gender, source)
+                cells += 1
+        for dimension in ("summary", "inactivity"):
+            await self.refresh_current(dimension, "all", source)
+            cells += 1
+
+        open_months = {month_bucket(day), month_bucket(datetime.utcnow())}
+        for gender in GENDER_FILTERS:
+            cells += await self.refresh_acquisition(gender, open_months, source)
+        return {"cubeCellsRefreshed": cells}
+
+    async def close_month(self, month: str, source: str = "monthly_aggregation") -> int:
+        """Final recompute of a finished month's acquisition cells"""
+        cells = 0
+        for gender in GENDER_FILTERS:
+            cells += await self.refresh_acquisition(gender, [month], source, closed=True)
+        return cells
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _is_fresh(cell: Optional[Dict[str, Any]]) -> bool:
+        return bool(cell) and datetime.utcnow() - cell["refreshedAt"] <= MAX_CELL_AGE
+
+    async def get_current(self, dimension: str, gender: Optional[str] = None,
+                          refresh: bool = False) -> Dict[str, Any]:
+        """Point-in-time cell, computed now if missing, stale or `refresh`"""
+        cell = None if refresh else await self.collection.find_one({"_id": cell_id(dimension, gender)})
+        if not self._is_fresh(cell):
+            cell = await self.refresh_current(dimension, gender)
+        return cell
+
+    async def get_acquisition(self, gender: Optional[str] = None, year: Optional[int] = None,
+                              refresh: bool = False) -> Tuple[List[Dict[str, Any]], datetime]:
+        """
+        Acquisition rows (oldest month first) and the freshness timestamp
+
+        With no cells yet (or `refresh`) every month is rebuilt; when only the
+        current month is stale just the open months are re-scanned.
+        """
+        gender = normalize_gender(gender)
+        now = datetime.utcnow()
+        current = await self.collection.find_one({"_id": cell_id("acquisition", gender, month_bucket(now))})
+        if refresh or current is None:
+            await self.refresh_acquisition(gender)
+        elif not self._is_fresh(current):
+            await self.refresh_acquisition(gender, {month_bucket(now - timedelta(days=1)), month_bucket(now)})
+
+        query = {"dimension": "acquisition", "gender": gender, "data": {"$ne": None}}
+        if year is not None:
+            query["bucket"] = {"$regex": f"^{year:04d}-"}
+        cells = await self.collection.find(query).sort("bucket", 1).to_list(None)
+        freshness = await self.collection.find_one({"_id": cell_id("acquisition", gender, month_bucket(now))})
+        return [cell["data"] for cell in cells], freshness["refreshedAt"]
+
+    async def get_acquisition_years(self, refresh: bool = False) -> Tuple[List[int], datetime]:
+        """Distinct approval years, newest first"""
+        rows, refreshed_at = await self.get_acquisition("all", refresh=refresh)
+        return sorted({row["year"] for row in rows}, reverse=True), refreshed_at
@@ -0,0 +1,269 @@
+"""
+Conversation Summary Service
+One document per user pair summarizing their `messages` thread
+
+GET /messages/conversations used to $group every message the user ever sent
+or received (with an unsorted `$last`) on each call. The
+`conversation_summaries` collection keeps, per pair:
+
+- lastMessage / lastMessageAt: newest message, any visibility (admin view)
+- lastVisibleMessage / lastVisibleMessageAt: newest message not hidden
+  with isVisible=False (member view)
+- unread / unreadVisible: per-recipient counts of isRead=False messages
+
+Sends update the summary incrementally (record_message). Reads and deletes
+rebuild the pair from its messages (refresh_pair), which is a single
+indexed query. A user with messages but no summaries yet (not backfilled)
+is rebuilt on first access; migrations/backfill_conversation_summaries.py
+fills the collection up front.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_COLLECTION = "conversation_summaries"
+CONVERSATION_LIST_LIMIT = 100
+BATCH_SIZE = 500
+
+MESSAGE_PROJECTION = {
+    "fromUsername": 1, "toUsername": 1, "content": 1, "createdAt": 1, "isRead": 1, "isVisible": 1
+}
+
+
+def pair_id(username1: str, username2: str) -> str:
+    """Summary _id for a user pair (order independent)"""
+    return ":".join(sorted([username1, username2]))
+
+
+def message_time(value: Any) -> Optional[datetime]:
+    """createdAt as a naive UTC datetime (legacy rows store ISO strings)"""
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _message_entry(message: Dict[str, Any], created: Optional[datetime]) -> Dict[str, Any]:
+    return {
+        "id": str(message.get("_id", "")),
+        "fromUsername": message.get("fromUsername"),
+        "toUsername": message.get("toUsername"),
+        "content": message.get("content", ""),
+        "createdAt": created,
+    }
+
+
+def empty_summary(username1: str, username2: str) -> Dict[str, Any]:
+    participants = sorted([username1, username2])
+    return {
+        "_id": pair_id(username1, username2),
+        "participants": participants,
+        "lastMessage": None,
+        "lastMessageAt": None,
+        "lastVisibleMessage": None,
+        "lastVisibleMessageAt": None,
+        "unread": {u: 0 for u in participants},
+        "unreadVisible": {u: 0 for u in participants},
+    }
+
+
+def fold_message(summary: Dict[str, Any], message: Dict[str, Any]) -> None:
+    """Apply one message to an in-memory summary (any order)"""
+    created = message_time(message.get("createdAt"))
+    visible = message.get("isVisible") is not False
+    recipient = message.get("toUsername")
+
+    # Same rule as the old $group: only an explicit isRead=False counts
+    if message.get("isRead") is False and recipient in summary["unread"]:
+        summary["unread"][recipient] += 1
+        if visible:
+            summary["unreadVisible"][recipient] += 1
+
+    for field, applies in (("lastMessage", True), ("lastVisibleMessage", visible)):
+        latest = summary[f"{field}At"]
+        if applies and (summary[field] is None or (created and (latest is None or created >= latest))):
+            summary[field] = _message_entry(message, created)
+            summary[f"{field}At"] = created
+
+
+def summarize_messages(messages: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Summaries keyed by pair id for any stream of messages"""
+    summaries: Dict[str, Dict[str, Any]] = {}
+    for message in messages:
+        sender, recipient = message.get("fromUsername"), message.get("toUsername")
+        if not sender or not recipient:
+            continue
+        key = pair_id(sender, recipient)
+        if key not in summaries:
+            summaries[key] = empty_summary(sender, recipient)
+        fold_message(summaries[key], message)
+    return summaries
+
+
+class ConversationSummaryService:
+    """Reads and maintains the conversation_summaries collection"""
+
+    def __init__(self, db):
+        self.db = db
+        self.collection = db[SUMMARY_COLLECTION]
+
+    async def ensure_indexes(self):
+        """Per-user listing indexes, plus the messages indexes used for pair/user rebuilds"""
+        await self.collection.create_index([("participants", 1), ("lastVisibleMessageAt", -1)])
+        await self.collection.create_index([("participants", 1), ("lastMessageAt", -1)])
+        await self.db.messages.create_index([("fromUsername", 1), ("toUsername", 1)])
+        await self.db.messages.create_index([("toUsername", 1)])
+
+    async def list_for_user(
+        self,
+        username: str,
+        include_hidden: bool = False,
+        limit: int = CONVERSATION_LIST_LIMIT
+    ) -> List[Dict[str, Any]]:
+        """
+        A user's conversations, newest first
+
+        Args:
+            include_hidden: Admin view - count messages hidden with isVisible=False
+        """
+        sort_field = "lastMessageAt" if include_hidden else "lastVisibleMessageAt"
+        query = {"participants": username}
+        if not include_hidden:
+            query["lastVisibleMessage"] = {"$ne": None}
+
+        summaries = await self.collection.find(query).sort(sort_field, -1).to_list(limit)
+        if not summaries and await self._has_messages(username):
+            # Not backfilled yet: build this user's summaries once
+            await self.rebuild_user(username)
+            summaries = await self.collection.find(query).sort(sort_field, -1).to_list(limit)
+        return summaries
+
+    async def _has_messages(self, username: str) -> bool:
+        for field in ("fromUsername", "toUsername"):
+            if await self.db.messages.find_one({field: username}, {"_id": 1}):
+                return True
+        return False
+
+    async def record_message(self, message: Dict[str, Any]) -> None:
+        """Apply a newly stored message to its pair's summary (one round trip)"""
+        sender, recipient = message["fromUsername"], message["toUsername"]
+        key = pair_id(sender, recipient)
+        created = message_time(message.get("createdAt")) or datetime.utcnow()
+        entry = _message_entry(message, created)
+        visible = message.get("isVisible") is not False
+        participants = sorted([sender, recipient])
+
+        increments = {}
+        if message.get("isRead") is False:
+            increments[f"unread.{recipient}"] = 1
+            if visible:
+                increments[f"unreadVisible.{recipient}"] = 1
+
+        upsert: Dict[str, Any] = {
+            "$setOnInsert": {"participants": participants},
+            "$set": {"updatedAt": datetime.utcnow()},
+        }
+        if increments:
+            upsert["$inc"] = increments
+
+        ops = [UpdateOne({"_id": key}, upsert, upsert=True)]
+        # Only move lastMessage forward: a late write of an older message is ignored
+        fields = ["lastMessage"] + (["lastVisibleMessage"] if visible else [])
+        for field in fields:
+            ops.append(UpdateOne(
+                {"_id": key, "$or": [{f"{field}At": None}, {f"{field}At": {"$lte": created}}]},
+                {"$set": {field: entry, f"{field}At": created}},
+            ))
+        await self.collection.bulk_write(ops, ordered=True)
+
+    async def refresh_pair(self, username1: str, username2: str) -> Optional[Dict[str, Any]]:
+        """Rebuild one pair's summary from its messages (removed when none are left)"""
+        messages = self.db.messages.find(
+            {"$or": [
+                {"fromUsername": username1, "toUsername": username2},
+                {"fromUsername": username2, "toUsername": username1},
+            ]},
+            MESSAGE_PROJECTION,
+        )
+        summary = empty_summary(username1, username2)
+        found = False
+        async for message in messages:
+            fold_message(summary, message)
+            found = True
+
+        if not found:
+            await self.collection.delete_one({"_id": summary["_id"]})
+            return None
+        summary["updatedAt"] = datetime.utcnow()
+        await self.collection.replace_one({"_id": summary["_id"]}, summary, upsert=True)
+        return summary
+
+    async def rebuild_user(self, username: str) -> int:
+        """Rebuild every summary involving `username`; returns the number written"""
+        messages = self.db.messages.find(
+            {"$or": [{"fromUsername": username}, {"toUsername": username}]},
+            MESSAGE_PROJECTION,
+        )
+        summaries = summarize_messages([m async for m in messages])
+        existing = await self.collection.find({"participants": username}, {"_id": 1}).to_list(None)
+
+        now = datetime.utcnow()
+        ops: list = [DeleteOne({"_id": doc["_id"]}) for doc in existing if doc["_id"] not in summaries]
+        ops += [ReplaceOne({"_id": key}, {**s, "updatedAt": now}, upsert=True) for key, s in summaries.items()]
+        for start in range(0, len(ops), BATCH_SIZE):
+            await self.collection.bulk_write(ops[start:start + BATCH_SIZE], ordered=False)
+        return len(summaries)
+
+    async def remove_user(self, username: str) -> int:
+        """Drop every summary involving a deleted user"""
+        result = await self.collection.delete_many({"participants": username})
+        return result.deleted_count
+
+
+def unread_for(summary: Dict[str, Any], username: str, include_hidden: bool = False) -> int:
+    counts = summary.get("unread" if include_hidden else "unreadVisible") or {}
+    return counts.get(username, 0)
+
+
+def other_participant(summary: Dict[str, Any], username: str) -> str:
+    participants = summary["participants"]
+    return participants[1] if participants[0] == username else participants[0]
+
+
+async def record_message_summary(db, message: Dict[str, Any]) -> None:
+    """Best-effort helper for send paths - never raises"""
+    try:
+        await ConversationSummaryService(db).record_message(message)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to update conversation summary: {e}")
+
+
+async def refresh_conversation_summaries(db, pairs: Iterable[Tuple[str, str]]) -> None:
+    """Best-effort helper for read/delete paths - rebuilds the given pairs, never raises"""
+    service = ConversationSummaryService(db)
+    for username1, username2 in {tuple(sorted(pair)) for pair in pairs}:
+        try:
+            await service.refresh_pair(username1, username2)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to refresh conversation summary {username1}/{username2}: {e}")
+
+
+async def remove_user_conversation_summaries(db, username: str) -> None:
+    """Best-effort helper for account deletion - never raises"""
+    try:
+        await ConversationSummaryService(db).remove_user(username)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to remove conversation summaries for {username}: {e}")
@@ -0,0 +1,306 @@
+"""
+Email Delivery Engine
+Concurrent batch delivery for the email notification queue
+
+send_email() handles one message at a time: one Resend request (spaced by
+the process-wide rate limit) and, on fallback, a fresh SMTP connection with
+STARTTLS and login per message. For a queue batch of hundreds of emails the
+engine instead:
+
+- Sends through Resend's batch endpoint (up to RESEND_BATCH_SIZE emails per
+  request) under the same shared token bucket as send_email()
+- Falls back to a bounded pool of SMTP workers, each holding one persistent
+  connection for the whole batch and throttled by a per-provider bucket
+- Runs every blocking provider call in a worker thread, off the event loop
+
+Provider selection and credentials follow email_sender.py (EMAIL_PROVIDER,
+RESEND_API_KEY, SMTP_* env vars, then config.py).
+"""
+
+import asyncio
+import logging
+import os
+import smtplib
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from config import settings
+from services.email_sender import (
+    TokenBucket,
+    _RESEND_MAX_RETRIES,
+    _RESEND_RETRY_BASE_DELAY,
+    _build_smtp_message,
+    _is_rate_limit_error,
+    _plain_text,
+    _resend_bucket,
+    _resend_config,
+    _smtp_config,
+)
+
+logger = logging.getLogger(__name__)
+
+RESEND_BATCH_SIZE = 100  # Resend batch endpoint limit
+SMTP_TIMEOUT_SECONDS = 30
+
+
+@dataclass
+class OutgoingEmail:
+    """One message to deliver; `key` identifies it in the results (e.g. notification id)"""
+    key: str
+    to_email: str
+    subject: str
+    html_content: str
+    text_content: Optional[str] = None
+
+
+@dataclass
+class DeliveryResult:
+    success: bool
+    provider: Optional[str] = None
+    error: Optional[str] = None
+    resend_error: Optional[str] = None
+
+
+class SMTPConnection:
+    """
+    One persistent SMTP session, used from a single worker thread at a time
+
+    Connects lazily, and reconnects once if the server dropped the session
+    (idle timeout, max messages per connection).
+    """
+
+    def __init__(self, config: Dict[str, Any], timeout: float = SMTP_TIMEOUT_SECONDS):
+        self.config = config
+        self.timeout = timeout
+        self._server: Optional[smtplib.SMTP] = None
+        self.connects = 0
+        self.sent = 0
+
+    def _connect(self):
+        server = smtplib.SMTP(self.config["host"], self.config["port"], timeout=self.timeout)
+        try:
+            server.ehlo()
+            if server.has_extn("starttls"):
+                server.starttls()
+                server.ehlo()
+            if self.config.get("user") and self.config.get("password"):
+                server.login(self.config["user"], self.config["password"])
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        self.connects += 1
+
+    def send(self, sender: str, to_email: str, message: str):
+        for attempt in range(2):
+            if self._server is None:
+                self._connect()
+            try:
+                self._server.sendmail(sender, [to_email], message)
+                self.sent += 1
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                self.close()
+                if attempt:
+                    raise
+                logger.debug(f"📧 [email_delivery] SMTP session dropped, reconnecting: {e}")
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+
+
+class EmailDeliveryEngine:
+    """
+    Delivers a batch of emails concurrently (Resend batch first, SMTP pool fallback)
+
+    Usage:
+        engine = EmailDeliveryEngine()
+        try:
+            results = await engine.deliver(emails)
+        finally:
+            await engine.close()
+    """
+
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        workers: Optional[int] = None,
+        smtp_rate: Optional[float] = None,
+        smtp_config: Optional[Dict[str, Any]] = None
+    ):
+        self.provider = (provider or os.environ.get("EMAIL_PROVIDER", "resend")).lower()
+        self.workers = max(1, workers or settings.email_delivery_workers)
+        smtp_rate = settings.email_smtp_rate_per_second if smtp_rate is None else smtp_rate
+        # 0 = unthrottled (local relay / sink)
+        self._smtp_bucket = TokenBucket(rate=smtp_rate, capacity=self.workers) if smtp_rate else None
+        # Explicit config (e.g. a local relay) may skip auth; the default config requires it
+        self._require_auth = smtp_config is None
+        # Resolved on first SMTP use, so Resend-only setups never read SMTP settings
+        self._smtp_config = smtp_config
+        self._connections: List[SMTPConnection] = []
+        self._stats = {"resend_requests": 0, "resend_sent": 0, "smtp_sent": 0, "failed": 0, "seconds": 0.0}
+
+    async def deliver(self, emails: List[OutgoingEmail]) -> Dict[str, DeliveryResult]:
+        """Deliver every email; returns one DeliveryResult per OutgoingEmail.key"""
+        started = time.monotonic()
+        for email in emails:
+            if not email.text_content:
+                email.text_content = _plain_text(email.html_content)
+
+        results: Dict[str, DeliveryResult] = {}
+        pending = emails
+        if self.provider == "resend":
+            pending = await self._deliver_via_resend(emails, results)
+            if pending:
+                logger.info(f"📧 [email_delivery] {len(pending)} emails falling back to SMTP")
+        if pending:
+            await self._deliver_via_smtp(pending, results)
+
+        self._stats["failed"] += sum(1 for r in results.values() if not r.success)
+        self._stats["seconds"] += time.monotonic() - started
+        return results
+
+    # ------------------------------------------------------------------
+    # Resend
+    # ------------------------------------------------------------------
+
+    async def _deliver_via_resend(self, emails: List[OutgoingEmail], results: Dict[str, DeliveryResult]) -> List[OutgoingEmail]:
+        """Send through Resend; returns the emails that still need the SMTP fallback"""
+        try:
+            import resend
+            config = _resend_config()
+        except Exception as e:
+            logger.error(f"⚠️ [email_delivery] Resend setup failed: {e}")
+            return emails
+        if not config:
+            logger.warning("📧 [email_delivery] Resend API key not configured - using SMTP")
+            return emails
+        resend.api_key = config["api_key"]
+
+        fallback = []
+        batch_api = getattr(resend, "Batch", None)
+        for i in range(0, len(emails), RESEND_BATCH_SIZE if batch_api else 1):
+            chunk = emails[i:i + RESEND_BATCH_SIZE] if batch_api else emails[i:i + 1]
+            params = [
+                {
+                    "from": config["from"],
+                    "to": [email.to_email],
+                    "subject": email.subject,
+                    "html": email.html_content,
+                    "text": email.text_content,
+                }
+                for email in chunk
+            ]
+            if batch_api:
+                call, payload = batch_api.send, params
+            else:
+                call, payload = resend.Emails.send, params[0]
+
+            error = await self._call_resend(call, payload)
+            for email in chunk:
+                if error is None:
+                    results[email.key] = DeliveryResult(success=True, provider="resend")
+                else:
+                    results[email.key] = DeliveryResult(success=False, resend_error=error)
+                    fallback.append(email)
+            if error is None:
+                self._stats["resend_sent"] += len(chunk)
+        return fallback
+
+    async def _call_resend(self, call, payload) -> Optional[str]:
+        """One Resend request with 429 backoff; returns the error message or None"""
+        for attempt in range(_RESEND_MAX_RETRIES):
+            await _resend_bucket.acquire()
+            self._stats["resend_requests"] += 1
+            try:
+                await asyncio.to_thread(call, payload)
+                return None
+            except Exception as e:
+                if _is_rate_limit_error(e) and attempt < _RESEND_MAX_RETRIES - 1:
+                    backoff = _RESEND_RETRY_BASE_DELAY * (2 ** attempt)
+                    logger.warning(f"📧 [email_delivery] Resend 429 rate limit, retrying in {backoff}s")
+                    await asyncio.sleep(backoff)
+                    continue
+                logger.error(f"⚠️ [email_delivery] Resend FAILED: {e}")
+                return str(e)
+        return "Resend rate limit retries exhausted"
+
+    @property
+    def smtp_config(self) -> Dict[str, Any]:
+        if self._smtp_config is None:
+            self._smtp_config = _smtp_config()
+        return self._smtp_config
+
+    # ------------------------------------------------------------------
+    # SMTP
+    # ------------------------------------------------------------------
+
+    async def _deliver_via_smtp(self, emails: List[OutgoingEmail], results: Dict[str, DeliveryResult]):
+        config = self.smtp_config
+        if self._require_auth and (not config.get("user") or not config.get("password")):
+            for email in emails:
+                self._record_smtp(results, email, error="SMTP credentials not configured")
+            return
+        # Gmail requires the SMTP user as the envelope/From address
+        sender = config.get("user") or config.get("from_email") or getattr(settings, "from_email", None) or "noreply@l3v3lmatches.com"
+        from_name = config.get("from_name") or "L3V3L MATCHES"
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for email in emails:
+            queue.put_nowait(email)
+
+        async def worker(connection: SMTPConnection):
+            while True:
+                try:
+                    email = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                if self._smtp_bucket:
+                    await self._smtp_bucket.acquire()
+                message = _build_smtp_message(
+                    email.to_email, email.subject, email.html_content, email.text_content, sender, from_name
+                ).as_string()
+                try:
+                    await asyncio.to_thread(connection.send, sender, email.to_email, message)
+                    self._record_smtp(results, email)
+                except Exception as e:
+                    logger.error(f"❌ [email_delivery] SMTP FAILED for {email.to_email}: {e}")
+                    self._record_smtp(results, email, error=str(e))
+
+        if not self._connections:
+            self._connections = [SMTPConnection(config) for _ in range(self.workers)]
+        active = self._connections[:min(self.workers, len(emails))]
+        await asyncio.gather(*(worker(connection) for connection in active))
+
+    def _record_smtp(self, results: Dict[str, DeliveryResult], email: OutgoingEmail, error: Optional[str] = None):
+        previous = results.get(email.key)
+        resend_error = previous.resend_error if previous else None
+        if error is None:
+            self._stats["smtp_sent"] += 1
+            results[email.key] = DeliveryResult(success=True, provider="smtp", resend_error=resend_error)
+        else:
+            results[email.key] = DeliveryResult(success=False, provider="smtp", error=error, resend_error=resend_error)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def close(self):
+        """Close the persistent SMTP connections"""
+        await asyncio.gather(*(asyncio.to_thread(connection.close) for connection in self._connections))
+
+    def get_stats(self) -> Dict[str, Any]:
+        delivered = self._stats["resend_sent"] + self._stats["smtp_sent"]
+        seconds = self._stats["seconds"]
+        return {
+            **self._stats,
+            "smtp_connections": sum(connection.connects for connection in self._connections),
+            "per_second": round(delivered / seconds, 1) if seconds else None,
+        }
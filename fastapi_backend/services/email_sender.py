@@ -7,54 +7,121 @@ Includes rate limiting to stay under Resend's 2 req/sec limit.
 
 import smtplib
 import os
+import re
 import logging
 import asyncio
 import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from typing import Any, Dict, Optional
 from config import settings
 logger = logging.getLogger(__name__)
 
 # Rate limiting for Resend API (2 requests per second max)
-_last_resend_call = 0.0
 _RESEND_MIN_INTERVAL = 1.1  # 1100ms between calls = ~0.9 req/sec (safely under 2/sec limit)
-_resend_lock = asyncio.Lock()  # Lock to prevent concurrent rate limit issues
 _RESEND_MAX_RETRIES = 3  # Max retries on 429 rate limit errors
 _RESEND_RETRY_BASE_DELAY = 2.0  # Base delay in seconds for exponential backoff
 
 
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, bursts of up to `capacity`
+    
+    Waiters are served in arrival order; a provider's bucket is shared by
+    every sender in the process (single emails and the delivery engine).
+    """
+    
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self, tokens: float = 1.0):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+_resend_bucket = TokenBucket(rate=1 / _RESEND_MIN_INTERVAL)
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    error_str = str(error).lower()
+    return '429' in error_str or 'rate limit' in error_str or 'too many' in error_str
+
+
+def _plain_text(html_content: str) -> str:
+    """Strip HTML tags for the plain text part"""
+    return re.sub(r'<[^>]+>', '', html_content)
+
+
+def _resend_config() -> Optional[Dict[str, str]]:
+    """Resend API key and From header, or None when no key is configured"""
+    from utils.gcp_secrets import get_secret
+    
+    # Try multiple sources for the API key: env var, GCP Secret Manager, settings
+    resend_api_key = (
+        os.environ.get("RESEND_API_KEY")
+        or get_secret("RESEND_API_KEY")
+        or getattr(settings, 'resend_api_key', None)
+    )
+    if not resend_api_key:
+        return None
+    
+    from_email = (os.environ.get("FROM_EMAIL") or getattr(settings, 'from_email', 'noreply@l3v3lmatches.com')).strip()
+    from_name = (os.environ.get("FROM_NAME") or getattr(settings, 'from_name', 'L3V3L MATCHES')).strip()
+    return {"api_key": resend_api_key, "from": f"{from_name} <{from_email}>"}
+
+
+def _smtp_config() -> Dict[str, Any]:
+    """SMTP connection settings (env vars override config.py)"""
+    smtp_user = (os.environ.get("SMTP_USER") or getattr(settings, 'smtp_user', None))
+    return {
+        "host": (os.environ.get("SMTP_HOST") or getattr(settings, 'smtp_host', None) or 'smtp.gmail.com').strip(),
+        "port": int(os.environ.get("SMTP_PORT") or getattr(settings, 'smtp_port', None) or 587),
+        "user": smtp_user.strip() if smtp_user else None,
+        "password": os.environ.get("SMTP_PASSWORD") or getattr(settings, 'smtp_password', None),
+        "from_name": (os.environ.get("FROM_NAME") or getattr(settings, 'from_name', None) or 'L3V3L MATCHES').strip(),
+    }
+
+
+def _build_smtp_message(to_email: str, subject: str, html_content: str, text_content: str,
+                        sender: str, from_name: str) -> MIMEMultipart:
+    """Multipart message sent from `sender` (Gmail requires the SMTP user as From)"""
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = f"{from_name} (Do Not Reply) <{sender}>"
+    msg['To'] = to_email
+    msg['Reply-To'] = f"No Reply <{sender}>"
+    msg['X-Auto-Response-Suppress'] = 'All'
+    msg['Auto-Submitted'] = 'auto-generated'
+    
+    msg.attach(MIMEText(text_content, 'plain'))
+    msg.attach(MIMEText(html_content, 'html'))
+    return msg
+
+
 async def _send_via_resend(to_email: str, subject: str, html_content: str, text_content: str) -> bool:
     """Try to send email via Resend API with rate limiting and retry on 429"""
-    global _last_resend_call
-    
     try:
         import resend
-        from utils.gcp_secrets import get_secret
-        
-        # Try multiple sources for the API key: env var, GCP Secret Manager, settings
-        resend_api_key = os.environ.get("RESEND_API_KEY")
-        key_source = "env"
         
-        if not resend_api_key:
-            resend_api_key = get_secret("RESEND_API_KEY")
-            key_source = "gcp_secret"
-        
-        if not resend_api_key:
-            resend_api_key = getattr(settings, 'resend_api_key', None)
-            key_source = "settings"
-        
-        if not resend_api_key:
+        config = _resend_config()
+        if not config:
             logger.warning("📧 [email_sender] Resend API key not configured in env, GCP secrets, or settings - skipping Resend")
             return False
         
-        resend.api_key = resend_api_key
-        from_email_raw = os.environ.get("FROM_EMAIL") or getattr(settings, 'from_email', 'noreply@l3v3lmatches.com')
-        from_name_raw = os.environ.get("FROM_NAME") or getattr(settings, 'from_name', 'L3V3L MATCHES')
-        from_email = from_email_raw.strip()
-        from_name = from_name_raw.strip()
-        
+        resend.api_key = config["api_key"]
         params = {
-            "from": f"{from_name} <{from_email}>",
+            "from": config["from"],
             "to": [to_email],
             "subject": subject,
             "html": html_content,
@@ -64,30 +131,17 @@ async def _send_via_resend(to_email: str, subject: str, html_content: str, text_
         # Retry loop with exponential backoff for 429 rate limit errors
         for attempt in range(_RESEND_MAX_RETRIES):
             try:
-                # Use lock to ensure rate limiting works across concurrent requests
-                async with _resend_lock:
-                    # Rate limiting: wait if we're calling too fast
-                    now = time.time()
-                    elapsed = now - _last_resend_call
-                    if elapsed < _RESEND_MIN_INTERVAL:
-                        wait_time = _RESEND_MIN_INTERVAL - elapsed
-                        logger.debug(f"📧 [email_sender] Rate limiting: waiting {wait_time:.2f}s before Resend call")
-                        await asyncio.sleep(wait_time)
-                    
-                    # Update timestamp BEFORE send to ensure spacing even on failure
-                    _last_resend_call = time.time()
-                    
-                    logger.debug(f"📧 [email_sender] Attempting Resend to {to_email} (attempt {attempt + 1}/{_RESEND_MAX_RETRIES})")
-                    
-                    response = resend.Emails.send(params)
+                # Shared bucket keeps every Resend caller in this process under the limit
+                await _resend_bucket.acquire()
+                logger.debug(f"📧 [email_sender] Attempting Resend to {to_email} (attempt {attempt + 1}/{_RESEND_MAX_RETRIES})")
+                response = await asyncio.to_thread(resend.Emails.send, params)
                 
                 logger.info(f"✅ Resend success to {to_email}: {response}")
                 return True
                 
             except Exception as e:
-                error_str = str(e).lower()
                 # Check if this is a 429 rate limit error - retry with backoff
-                if '429' in error_str or 'rate limit' in error_str or 'too many' in error_str:
+                if _is_rate_limit_error(e):
                     if attempt < _RESEND_MAX_RETRIES - 1:
                         backoff = _RESEND_RETRY_BASE_DELAY * (2 ** attempt)  # 2s, 4s, 8s
                         logger.warning(f"📧 [email_sender] Resend 429 rate limit for {to_email}, retrying in {backoff}s (attempt {attempt + 1}/{_RESEND_MAX_RETRIES})")
@@ -108,38 +162,27 @@ async def _send_via_resend(to_email: str, subject: str, html_content: str, text_
         return False
 
 
+def _smtp_send_once(config: Dict[str, Any], to_email: str, message: str):
+    with smtplib.SMTP(config["host"], config["port"]) as server:
+        server.starttls()
+        server.login(config["user"], config["password"])
+        # Use sendmail() with explicit recipient to ensure To: header is respected
+        server.sendmail(config["user"], [to_email], message)
+
+
 async def _send_via_smtp(to_email: str, subject: str, html_content: str, text_content: str) -> bool:
-    """Send email via SMTP (fallback)"""
-    smtp_host = (os.environ.get("SMTP_HOST") or getattr(settings, 'smtp_host', 'smtp.gmail.com')).strip()
-    smtp_port = int(os.environ.get("SMTP_PORT") or getattr(settings, 'smtp_port', 587))
-    smtp_user = (os.environ.get("SMTP_USER") or getattr(settings, 'smtp_user', None))
-    smtp_user = smtp_user.strip() if smtp_user else None
-    smtp_password = os.environ.get("SMTP_PASSWORD") or getattr(settings, 'smtp_password', None)
-    from_name = (os.environ.get("FROM_NAME") or getattr(settings, 'from_name', 'L3V3L MATCHES')).strip()
+    """Send email via SMTP (fallback) - one connection per call; bulk senders use services/email_delivery.py"""
+    config = _smtp_config()
     
-    if not smtp_user or not smtp_password:
+    if not config["user"] or not config["password"]:
         raise Exception("SMTP credentials not configured")
     
-    logger.debug(f"📧 [email_sender] Sending via SMTP ({smtp_user}) to {to_email}")
-    logger.info(f"📧 Sending via SMTP ({smtp_user}) to {to_email}")
+    logger.debug(f"📧 [email_sender] Sending via SMTP ({config['user']}) to {to_email}")
+    logger.info(f"📧 Sending via SMTP ({config['user']}) to {to_email}")
     
-    # Create email - use SMTP_USER as from address (Gmail requires this)
-    msg = MIMEMultipart('alternative')
-    msg['Subject'] = subject
-    msg['From'] = f"{from_name} (Do Not Reply) <{smtp_user}>"
-    msg['To'] = to_email
-    msg['Reply-To'] = f"No Reply <{smtp_user}>"
-    msg['X-Auto-Response-Suppress'] = 'All'
-    msg['Auto-Submitted'] = 'auto-generated'
-    
-    msg.attach(MIMEText(text_content, 'plain'))
-    msg.attach(MIMEText(html_content, 'html'))
-    
-    with smtplib.SMTP(smtp_host, smtp_port) as server:
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        # Use sendmail() with explicit recipient to ensure To: header is respected
-        server.sendmail(smtp_user, [to_email], msg.as_string())
+    msg = _build_smtp_message(to_email, subject, html_content, text_content, config["user"], config["from_name"])
+    # Blocking connect/STARTTLS/login run off the event loop
+    await asyncio.to_thread(_smtp_send_once, config, to_email, msg.as_string())
     
     logger.debug(f"✅ [email_sender] SMTP SUCCESS to {to_email}")
     logger.info(f"✅ SMTP success to {to_email}")
@@ -217,9 +260,7 @@ async def send_email(
         dict with keys: success, provider, resend_attempted, resend_error, smtp_attempted, smtp_error
     """
     if not text_content:
-        # Strip HTML tags for plain text version
-        import re
-        text_content = re.sub(r'<[^>]+>', '', html_content)
+        text_content = _plain_text(html_content)
     
     return await _send_email_with_fallback(to_email, subject, html_content, text_content)
 
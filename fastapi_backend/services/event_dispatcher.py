@@ -6,12 +6,13 @@ Production-ready with error handling, retry logic, and comprehensive logging
 import json
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from datetime import datetime, date
 from enum import Enum
 
 from bson import ObjectId
 
+from config import settings
 from redis_manager import get_redis_manager
 from services.notification_service import NotificationService
 
@@ -78,10 +79,75 @@ class UserEventType(str, Enum):
     SUSPICIOUS_LOGIN = "suspicious_login"
 
 
+# Interest events whose notifications can be coalesced per recipient
+COALESCED_EVENTS = {
+    UserEventType.PROFILE_VIEWED: {
+        "trigger": "profile_view",
+        "privacy": "hideProfileViews",
+        "digest": "batchProfileViews",
+        "summary": "viewed your profile",
+    },
+    UserEventType.FAVORITE_ADDED: {
+        "trigger": "favorited",
+        "privacy": "hideFavorites",
+        "digest": "batchFavorites",
+        "summary": "added you to their favorites",
+    },
+    UserEventType.SHORTLIST_ADDED: {
+        "trigger": "shortlist_added",
+        "privacy": "hideShortlist",
+        "digest": "batchShortlists",
+        "summary": "shortlisted you",
+    },
+}
+# Removal events that withdraw a still-buffered add
+COALESCED_REMOVALS = {
+    UserEventType.FAVORITE_REMOVED: UserEventType.FAVORITE_ADDED,
+    UserEventType.SHORTLIST_REMOVED: UserEventType.SHORTLIST_ADDED,
+}
+MAX_BUFFERED_EVENTS = 5000      # Flush early past this many buffered events
+MAX_COALESCED_MATCHES = 10      # Actors listed in a coalesced notification
+
+# Default digest settings (daily digest ON for all users)
+DEFAULT_DIGEST_SETTINGS = {
+    "enabled": True,
+    "batchFavorites": True,
+    "batchShortlists": True,
+    "batchProfileViews": True,
+    "batchPiiRequests": True,
+    "batchNewMatches": True
+}
+
+
+def digest_batches(prefs: Optional[Dict], batch_type: str) -> bool:
+    """True if `prefs` (notification_preferences doc) batch `batch_type` into the daily digest"""
+    if not prefs:
+        # No preferences = use defaults (batch to digest)
+        return DEFAULT_DIGEST_SETTINGS.get(batch_type, True)
+    digest_settings = prefs.get("digestSettings", {})
+    # Digest explicitly disabled = send immediately
+    if not digest_settings.get("enabled", True):
+        return False
+    return digest_settings.get(batch_type, True)
+
+
+def privacy_hides(prefs: Optional[Dict], actor: Optional[Dict], privacy_type: str) -> bool:
+    """True if the actor's `privacy_type` setting hides the action (premium roles only)"""
+    if not prefs or not prefs.get("privacySettings", {}).get(privacy_type, False):
+        return False
+    # Only premium users can use privacy features
+    return bool(actor) and actor.get("role_name", "free_user") != "free_user"
+
+
 class EventDispatcher:
     """
     Enterprise-grade Event Dispatcher
     Handles all user events, publishes to Redis, queues notifications
+
+    With `event_coalesce_window_seconds` set, profile-view/favorite/shortlist
+    notifications are not queued per event: events are buffered for the
+    window, grouped by (recipient, event type), and each group is resolved
+    with batched $in lookups and queued as one notification.
     """
     
     def __init__(self, db, cache_service=None):
@@ -99,6 +165,16 @@ class EventDispatcher:
         # Initialize default handlers
         self._register_default_handlers()
         
+        # Coalescing buffer: (target, event type) -> actor -> latest event_data
+        self.coalesce_window = settings.event_coalesce_window_seconds or 0
+        self._coalesce_buffer: Dict[Tuple[str, UserEventType], Dict[str, Dict]] = {}
+        self._coalesce_task: Optional[asyncio.Task] = None
+        self._coalesced_handlers = {
+            UserEventType.PROFILE_VIEWED: self._handle_profile_viewed,
+            UserEventType.FAVORITE_ADDED: self._handle_favorite_added,
+            UserEventType.SHORTLIST_ADDED: self._handle_shortlist_added,
+        }
+        
     def _register_default_handlers(self):
         """Register default event handlers for notifications"""
         # Favorites
@@ -143,6 +219,40 @@ class EventDispatcher:
         
         # Security
         self.register_handler(UserEventType.SUSPICIOUS_LOGIN, self._handle_suspicious_login)
+        
+        # L3V3L score maintenance (profile/status changes dirty the score matrix)
+        for event_type in (
+            UserEventType.PROFILE_UPDATED,
+            UserEventType.USER_APPROVED,
+            UserEventType.USER_PAUSED,
+            UserEventType.USER_SUSPENDED,
+            UserEventType.USER_BANNED,
+        ):
+            self.register_handler(event_type, self._handle_l3v3l_scores_dirty)
+        
+        # Search result cache (any visibility or profile change can alter result sets)
+        for event_type in (
+            UserEventType.PROFILE_UPDATED,
+            UserEventType.USER_APPROVED,
+            UserEventType.USER_PAUSED,
+            UserEventType.USER_SUSPENDED,
+            UserEventType.USER_UNSUSPENDED,
+            UserEventType.USER_BANNED,
+            UserEventType.USER_UNBANNED,
+        ):
+            self.register_handler(event_type, self._handle_search_cache_invalidate)
+        
+        # Cached auth user documents (status/profile changes made on someone's behalf)
+        for event_type in (
+            UserEventType.PROFILE_UPDATED,
+            UserEventType.USER_APPROVED,
+            UserEventType.USER_PAUSED,
+            UserEventType.USER_SUSPENDED,
+            UserEventType.USER_UNSUSPENDED,
+            UserEventType.USER_BANNED,
+            UserEventType.USER_UNBANNED,
+        ):
+            self.register_handler(event_type, self._handle_auth_user_invalidate)
     
     def register_handler(self, event_type: UserEventType, handler: Callable):
         """Register a handler for an event type"""
@@ -245,6 +355,8 @@ class EventDispatcher:
             
             # Execute registered handlers asynchronously
             handlers = self.handlers.get(event_type, [])
+            if self.coalesce_window > 0:
+                handlers = self._buffer_for_coalescing(event_type, event_data, handlers)
             if handlers:
                 # Run all handlers in parallel with error isolation
                 tasks = [
@@ -252,7 +364,7 @@ class EventDispatcher:
                     for handler in handlers
                 ]
                 await asyncio.gather(*tasks, return_exceptions=True)
-            else:
+            elif event_type not in self._coalesced_handlers:
                 logger.warning(f"⚠️ No handlers registered for {event_type}")
             
             logger.info(f"✅ Event dispatched successfully: {event_type.value}")
@@ -278,6 +390,173 @@ class EventDispatcher:
                 exc_info=True
             )
     
+    # ============================================
+    # Notification Coalescing
+    # ============================================
+    
+    def _buffer_for_coalescing(self, event_type: UserEventType, event_data: Dict,
+                               handlers: List[Callable]) -> List[Callable]:
+        """
+        Buffer a coalescable event (or withdraw a buffered one on removal)
+        
+        Returns:
+            The handlers still to run now (the notification handler is replaced
+            by the coalesced flush)
+        """
+        actor, target = event_data.get("actor"), event_data.get("target")
+        if not actor or not target:
+            return handlers
+        
+        if event_type in COALESCED_REMOVALS:
+            pending = self._coalesce_buffer.get((target, COALESCED_REMOVALS[event_type]))
+            if pending:
+                pending.pop(actor, None)
+            return handlers
+        
+        notification_handler = self._coalesced_handlers.get(event_type)
+        if notification_handler is None:
+            return handlers
+        
+        # Latest event per actor, most recent actor last
+        pending = self._coalesce_buffer.setdefault((target, event_type), {})
+        pending.pop(actor, None)
+        pending[actor] = event_data
+        
+        if sum(len(actors) for actors in self._coalesce_buffer.values()) >= MAX_BUFFERED_EVENTS:
+            asyncio.create_task(self.flush_coalesced())
+        elif self._coalesce_task is None or self._coalesce_task.done():
+            self._coalesce_task = asyncio.create_task(self._flush_after_window())
+        
+        return [handler for handler in handlers if handler != notification_handler]
+    
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.coalesce_window)
+        await self.flush_coalesced()
+    
+    async def flush_coalesced(self) -> int:
+        """
+        Queue one notification per buffered (recipient, event type) group
+        
+        Returns:
+            Number of notifications queued
+        """
+        groups, self._coalesce_buffer = self._coalesce_buffer, {}
+        groups = {key: list(actors.values()) for key, actors in groups.items() if actors}
+        if not groups:
+            return 0
+        try:
+            return await self.dispatch_bulk(groups)
+        except Exception as e:
+            logger.error(f"❌ Error flushing {len(groups)} coalesced notification group(s): {e}", exc_info=True)
+            return 0
+    
+    async def dispatch_bulk(self, groups: Dict[Tuple[str, UserEventType], List[Dict]]) -> int:
+        """
+        Resolve and queue coalesced interest notifications
+        
+        Preferences, privacy flags and user profiles for every actor and
+        recipient are loaded with one $in query each, instead of the per-event
+        lookups the single-event handlers make.
+        
+        Args:
+            groups: (target username, event type) -> event_data list, oldest first
+        
+        Returns:
+            Number of notifications queued
+        """
+        usernames = {target for target, _ in groups}
+        usernames.update(event["actor"] for events in groups.values() for event in events)
+        usernames = list(usernames)
+        
+        prefs = {
+            doc["username"]: doc
+            async for doc in self.db.notification_preferences.find({"username": {"$in": usernames}})
+        }
+        users = await self.db.users.find(
+            {"username": {"$in": usernames}},
+            {"username": 1, "firstName": 1, "lastName": 1, "profileId": 1, "location": 1,
+             "occupation": 1, "education": 1, "birthMonth": 1, "birthYear": 1, "role_name": 1}
+        ).to_list(None)
+        try:
+            from crypto_utils import get_encryptor
+            users = get_encryptor().decrypt_many(users, fields=("location",))
+        except Exception as e:
+            logger.warning(f"Failed to decrypt PII: {e}")
+        users = {user["username"]: user for user in users}
+        
+        queued = 0
+        for (target_username, event_type), events in groups.items():
+            config = COALESCED_EVENTS[event_type]
+            if digest_batches(prefs.get(target_username), config["digest"]):
+                logger.info(f"📬 Skipping immediate '{config['trigger']}' notification for {target_username} - will be included in daily digest")
+                continue
+            
+            target = users.get(target_username)
+            if not target:
+                logger.warning(f"Target user {target_username} not found")
+                continue
+            
+            actors = [
+                event["actor"] for event in events
+                if event["actor"] in users
+                and not privacy_hides(prefs.get(event["actor"]), users[event["actor"]], config["privacy"])
+            ]
+            if not actors:
+                continue
+            
+            result = await self.notification_service.queue_notification(
+                username=target_username,
+                trigger=config["trigger"],
+                channels=["email", "push"],
+                template_data=self._coalesced_template_data(event_type, target, [users[a] for a in actors])
+            )
+            if result:
+                queued += 1
+                logger.info(f"📧 Queued '{config['trigger']}' notification for {target_username} ({len(actors)} coalesced)")
+        
+        return queued
+    
+    @staticmethod
+    def _coalesced_template_data(event_type: UserEventType, target: Dict, actors: List[Dict]) -> Dict[str, Any]:
+        """
+        Template data for a coalesced notification (actors oldest first)
+        
+        A single actor gets the same data as the per-event handler. With
+        several, `match` is the latest actor with firstName reading e.g.
+        "Priya and 4 others", so existing "{match.firstName} viewed your
+        profile" templates still read naturally; `count`, `matches` and
+        `summary` are available to templates that want them.
+        """
+        def match_data(actor: Dict) -> Dict[str, Any]:
+            return {
+                "firstName": actor.get("firstName") or actor["username"],
+                "lastName": actor.get("lastName", ""),
+                "username": actor["username"],
+                "profileId": actor.get("profileId", ""),
+                "location": actor.get("location", ""),
+                "occupation": actor.get("occupation", ""),
+                "education": actor.get("education", ""),
+                "age": calculate_age(actor.get("birthMonth"), actor.get("birthYear"))
+            }
+        
+        template_data = {
+            "match": match_data(actors[-1]),
+            "recipient": {
+                "firstName": target.get("firstName") or target["username"],
+                "lastName": target.get("lastName", ""),
+                "username": target["username"],
+                "profileId": target.get("profileId", "")
+            }
+        }
+        count = len(actors)
+        if count > 1:
+            others = count - 1
+            template_data["match"]["firstName"] += f" and {others} {'other' if others == 1 else 'others'}"
+            template_data["count"] = count
+            template_data["matches"] = [match_data(actor) for actor in reversed(actors[-MAX_COALESCED_MATCHES:])]
+            template_data["summary"] = f"{count} people {COALESCED_EVENTS[event_type]['summary']}"
+        return template_data
+    
     # ============================================
     # Privacy Settings Helper
     # ============================================
@@ -298,32 +577,7 @@ class EventDispatcher:
             # Get target's notification preferences
             prefs = await self.db.notification_preferences.find_one({"username": target_username})
             
-            # Default digest settings (daily digest ON for all users)
-            default_digest = {
-                "enabled": True,
-                "batchFavorites": True,
-                "batchShortlists": True,
-                "batchProfileViews": True,
-                "batchPiiRequests": True,
-                "batchNewMatches": True
-            }
-            
-            if not prefs:
-                # No preferences = use defaults (batch to digest)
-                should_batch = default_digest.get(batch_type, True)
-                if should_batch:
-                    logger.info(f"📬 Batching notification for {target_username} (no prefs) - using default digest")
-                return should_batch
-            
-            digest_settings = prefs.get("digestSettings", {})
-            
-            # Check if digest is enabled (default True)
-            if not digest_settings.get("enabled", True):
-                return False  # Digest explicitly disabled = send immediately
-            
-            # Check if this specific type should be batched (default True)
-            should_batch = digest_settings.get(batch_type, True)
-            
+            should_batch = digest_batches(prefs, batch_type)
             if should_batch:
                 logger.info(f"📬 Batching notification for {target_username} - {batch_type} enabled in digest settings")
             
@@ -466,7 +720,8 @@ class EventDispatcher:
                 "username": target,
                 "trigger": "favorited",
                 "status": {"$in": ["pending", "scheduled"]},
-                "templateData.match.username": actor
+                "templateData.match.username": actor,
+                "templateData.count": {"$exists": False}  # Coalesced notifications name other actors too
             })
             
             if result.deleted_count > 0:
@@ -609,7 +864,8 @@ class EventDispatcher:
                 "username": target,
                 "trigger": "shortlist_added",
                 "status": {"$in": ["pending", "scheduled"]},
-                "templateData.match.username": actor
+                "templateData.match.username": actor,
+                "templateData.count": {"$exists": False}  # Coalesced notifications name other actors too
             })
             
             if result.deleted_count > 0:
@@ -1516,6 +1772,41 @@ class EventDispatcher:
         """Handle profile_updated event - No notification (routine activity)"""
         logger.debug(f"📝 Profile updated: {event_data.get('actor')}")
     
+    async def _handle_l3v3l_scores_dirty(self, event_data: Dict):
+        """Mark the affected user's L3V3L scores for incremental recomputation"""
+        try:
+            from services.l3v3l_score_maintenance import L3V3LScoreMaintainer, SCORED_FIELDS
+            
+            username = event_data.get("target") or event_data.get("actor")
+            event_type = event_data.get("event_type")
+            fields_updated = event_data.get("metadata", {}).get("fields_updated")
+            
+            # Edits that don't touch any scored field leave the matrix valid
+            if event_type == UserEventType.PROFILE_UPDATED.value and fields_updated \
+                    and not SCORED_FIELDS.intersection(fields_updated):
+                return
+            
+            await L3V3LScoreMaintainer(self.db).mark_dirty(username, event_type)
+            
+        except Exception as e:
+            logger.error(f"❌ Error marking L3V3L scores dirty: {e}", exc_info=True)
+    
+    async def _handle_search_cache_invalidate(self, event_data: Dict):
+        """Retire cached /search result sets after a profile or visibility change"""
+        try:
+            from services.search_cache import SearchResultCache
+            
+            await SearchResultCache().invalidate(event_data.get("event_type"))
+            
+        except Exception as e:
+            logger.error(f"❌ Error invalidating search cache: {e}", exc_info=True)
+    
+    async def _handle_auth_user_invalidate(self, event_data: Dict):
+        """Drop the affected user's cached auth document"""
+        from auth.auth_context import invalidate_user
+        
+        await invalidate_user(event_data.get("target") or event_data.get("actor"))
+    
     async def _handle_pii_revoked(self, event_data: Dict):
         """Handle pii_revoked event"""
         try:
@@ -1554,6 +1845,12 @@ class EventDispatcher:
 _event_dispatcher = None
 
 
+async def flush_event_dispatcher() -> None:
+    """Queue any buffered coalesced notifications (app shutdown)"""
+    if _event_dispatcher is not None:
+        await _event_dispatcher.flush_coalesced()
+
+
 async def get_event_dispatcher(db, cache_service=None) -> EventDispatcher:
     """Get or create event dispatcher instance"""
     global _event_dispatcher
@@ -10,6 +10,7 @@ from bson import ObjectId
 import asyncio
 import logging
 import traceback
+from concurrent.futures import Executor
 
 from job_templates.base import JobExecutionContext, JobResult
 from job_templates.registry import get_template_registry
@@ -17,13 +18,66 @@ from job_templates.registry import get_template_registry
 logger = logging.getLogger(__name__)
 
 
+def _execute_template_in_process(
+    template_type: str,
+    job_id: str,
+    job_name: str,
+    parameters: Dict[str, Any],
+    triggered_by: str,
+    execution_id: Optional[str]
+):
+    """
+    Run a cpu_bound template's execute() in a process-pool worker
+    
+    The child has its own event loop and MongoDB client. Returns the JobResult
+    and the context logs so the parent can record them.
+    """
+    return asyncio.run(_execute_template(
+        template_type, job_id, job_name, parameters, triggered_by, execution_id
+    ))
+
+
+async def _execute_template(template_type, job_id, job_name, parameters, triggered_by, execution_id):
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from config import settings
+    from job_templates.registry import initialize_templates
+    
+    registry = get_template_registry()
+    if not registry.exists(template_type):
+        initialize_templates()
+    template = registry.get(template_type)
+    
+    client = AsyncIOMotorClient(settings.mongodb_url, serverSelectionTimeoutMS=5000)
+    try:
+        context = JobExecutionContext(
+            job_id=job_id,
+            job_name=job_name,
+            parameters=parameters,
+            db=client[settings.database_name],
+            triggered_by=triggered_by,
+            execution_id=execution_id
+        )
+        result = await template.execute(context)
+        return result, context.logs
+    finally:
+        client.close()
+
+
 class JobExecutor:
     """Executes dynamic jobs with templates"""
     
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        process_pool: Optional[Executor] = None,
+        execution_host: Optional[str] = None
+    ):
         self.db = db
         self.executions_collection = db.job_executions
         self.template_registry = get_template_registry()
+        # When set, cpu_bound templates execute in this pool instead of the event loop
+        self.process_pool = process_pool
+        self.execution_host = execution_host or "server-01"
     
     async def execute_job(
         self,
@@ -86,7 +140,7 @@ class JobExecutor:
             
             try:
                 result = await asyncio.wait_for(
-                    template.execute(context),
+                    self._run_template(template, context),
                     timeout=timeout_seconds
                 )
             except asyncio.TimeoutError:
@@ -140,6 +194,26 @@ class JobExecutor:
             
             return await self._get_execution_record(execution_id)
     
+    async def _run_template(self, template, context: JobExecutionContext) -> JobResult:
+        """Run template.execute() inline, or in the process pool for cpu_bound templates"""
+        if not (self.process_pool and getattr(template, "cpu_bound", False)):
+            return await template.execute(context)
+        
+        # A timeout abandons the future; the pool worker finishes the run on its own
+        loop = asyncio.get_running_loop()
+        result, logs = await loop.run_in_executor(
+            self.process_pool,
+            _execute_template_in_process,
+            template.template_type,
+            context.job_id,
+            context.job_name,
+            context.parameters,
+            context.triggered_by,
+            context.execution_id
+        )
+        context.logs.extend(logs)
+        return result
+    
     async def _create_execution_record(
         self,
         job: Dict[str, Any],
@@ -158,7 +232,7 @@ class JobExecutor:
             "error": None,
             "logs": [],
             "triggered_by": triggered_by,
-            "execution_host": "server-01"  # Could get actual hostname
+            "execution_host": self.execution_host
         }
         
         result = await self.executions_collection.insert_one(execution_doc)
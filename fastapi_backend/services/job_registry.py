@@ -253,6 +253,96 @@ class JobRegistryService:
         jobs = await self.jobs_collection.find(query).to_list(length=None)
         return [self._serialize_job(job) for job in jobs]
     
+    async def claim_next_job(
+        self,
+        owner: str,
+        lease_seconds: int,
+        exclude_ids: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Atomically claim one due job under a lease
+        
+        A job is claimable when it is enabled, due (or has a pending manual
+        run request) and has no live lease. Across instances only one claimer
+        wins; a crashed owner's lease expires and the job becomes claimable again.
+        
+        Args:
+            owner: Worker identity recorded on the lease
+            lease_seconds: Lease length; the owner must renew before expiry
+            exclude_ids: Jobs not to claim (e.g. already run in this pass)
+            
+        Returns:
+            Claimed job document (with `triggered_by`) or None
+        """
+        now = datetime.utcnow()
+        query = {
+            "enabled": True,
+            "$and": [
+                {"$or": [{"nextRunAt": {"$lte": now}}, {"runRequestedAt": {"$ne": None}}]},
+                {"$or": [{"lease": None}, {"lease.expiresAt": {"$lte": now}}]}
+            ]
+        }
+        if exclude_ids:
+            query["_id"] = {"$nin": [ObjectId(job_id) for job_id in exclude_ids]}
+        
+        job_doc = await self.jobs_collection.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "lease": {
+                        "owner": owner,
+                        "claimedAt": now,
+                        "heartbeatAt": now,
+                        "expiresAt": now + timedelta(seconds=lease_seconds)
+                    }
+                },
+                "$unset": {"runRequestedAt": "", "runRequestedBy": ""}
+            },
+            sort=[("nextRunAt", 1)],
+            return_document=ReturnDocument.BEFORE
+        )
+        if not job_doc:
+            return None
+        
+        triggered_by = job_doc.pop("runRequestedBy", None) or "scheduler"
+        job_doc.pop("runRequestedAt", None)
+        job_doc.pop("lease", None)  # Pre-claim (expired) lease, if any
+        job = self._serialize_job(job_doc)
+        job["triggered_by"] = triggered_by
+        return job
+    
+    async def renew_lease(self, job_id: str, owner: str, lease_seconds: int) -> bool:
+        """Extend a held lease (heartbeat); False if the lease was lost"""
+        now = datetime.utcnow()
+        result = await self.jobs_collection.update_one(
+            {"_id": ObjectId(job_id), "lease.owner": owner},
+            {"$set": {
+                "lease.heartbeatAt": now,
+                "lease.expiresAt": now + timedelta(seconds=lease_seconds)
+            }}
+        )
+        return result.matched_count > 0
+    
+    async def release_lease(self, job_id: str, owner: str):
+        """Drop a held lease after execution"""
+        await self.jobs_collection.update_one(
+            {"_id": ObjectId(job_id), "lease.owner": owner},
+            {"$unset": {"lease": ""}}
+        )
+    
+    async def request_run(self, job_id: str, triggered_by: str) -> bool:
+        """
+        Queue a manual run for the job worker
+        
+        Returns:
+            False if the job does not exist or is disabled
+        """
+        result = await self.jobs_collection.update_one(
+            {"_id": ObjectId(job_id), "enabled": True},
+            {"$set": {"runRequestedAt": datetime.utcnow(), "runRequestedBy": triggered_by}}
+        )
+        return result.matched_count > 0
+    
     async def update_job_after_execution(
         self,
         job_id: str,
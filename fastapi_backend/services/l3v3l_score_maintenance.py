@@ -0,0 +1,229 @@
+"""
+L3V3L Score Maintenance Service
+Incremental upkeep of the l3v3l_scores matrix driven by profile-change events
+
+Instead of rebuilding every pair, changed users are marked dirty in
+`l3v3l_dirty_users` (by EventDispatcher handlers and status-change paths) and
+the L3V3L Score Calculator job (incremental mode) recomputes only their rows
+(user -> everyone) and columns (everyone -> user). Users who are no longer
+active have both directions deleted.
+
+The per-viewer /search snapshots (services.search_snapshot) are updated in
+the same pass, so search never sees a score the matrix doesn't have.
+
+Each dirty document carries a monotonically increasing `dirtyVersion`; a user
+is marked clean only if its version did not move while it was being
+processed, so a restart resumes exactly where the previous run stopped.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import DeleteMany, UpdateOne
+
+from services.search_snapshot import SearchSnapshotService
+
+logger = logging.getLogger(__name__)
+
+DIRTY_COLLECTION = "l3v3l_dirty_users"
+WRITE_BATCH_SIZE = 500
+
+# Profile fields read by L3V3LMatchingEngine - edits to anything else don't change scores
+SCORED_FIELDS = frozenset({
+    "gender", "familyValues", "partnerPreference", "aboutMe", "languagesSpoken",
+    "countryOfOrigin", "countryOfResidence", "state", "location", "citizenshipStatus",
+    "partnerCriteria", "birthMonth", "birthYear", "dateOfBirth", "height",
+    "educationHistory", "education", "religion", "eatingPreference", "familyType",
+    "motherTongue", "workExperience", "workLocation", "caste", "castePreference",
+    "accountStatus",
+})
+
+
+class L3V3LScoreMaintainer:
+    """Tracks dirty users and recomputes their L3V3L score rows/columns in both directions"""
+
+    def __init__(self, db):
+        self.db = db
+        self.dirty = db[DIRTY_COLLECTION]
+        self.snapshots = SearchSnapshotService(db)
+
+    async def ensure_indexes(self):
+        """Create indexes used by the dirty queue"""
+        await self.dirty.create_index([("pending", 1), ("dirtyAt", 1)])
+
+    async def mark_dirty(self, username: str, reason: str = "profile_updated") -> None:
+        """Flag a user's scores for recomputation (idempotent, safe to call from request paths)"""
+        if not username:
+            return
+        await self.dirty.update_one(
+            {"_id": username},
+            {
+                "$set": {"pending": True, "dirtyAt": datetime.utcnow(), "reason": reason},
+                "$inc": {"dirtyVersion": 1}
+            },
+            upsert=True
+        )
+        logger.debug(f"🦋 L3V3L scores marked dirty for {username} ({reason})")
+
+    async def mark_changed_since(self, since: datetime) -> int:
+        """Mark users whose profile timestamps moved since `since` (catches writes that bypass events)"""
+        cursor = self.db.users.find(
+            {"$or": [
+                {"createdAt": {"$gte": since}},
+                {"updatedAt": {"$gte": since}},
+                {"profileUpdatedAt": {"$gte": since}}
+            ]},
+            {"username": 1}
+        )
+        count = 0
+        async for user in cursor:
+            await self.mark_dirty(user["username"], "timestamp")
+            count += 1
+        return count
+
+    async def mark_orphaned_scores(self, active_usernames: set) -> int:
+        """Mark users who still own scores but are no longer in the active pool"""
+        scored = await self.db.l3v3l_scores.distinct("fromUsername")
+        orphaned = [username for username in scored if username not in active_usernames]
+        for username in orphaned:
+            await self.mark_dirty(username, "inactive")
+        return len(orphaned)
+
+    async def get_pending(self, limit: int) -> List[Dict[str, Any]]:
+        """Oldest-first dirty users still waiting to be processed"""
+        return await self.dirty.find({"pending": True}).sort("dirtyAt", 1).to_list(limit)
+
+    async def get_pending_usernames(self, limit: int) -> Optional[List[str]]:
+        """Usernames still waiting to be processed, or None when more than `limit` are queued"""
+        docs = await self.dirty.find({"pending": True}, {"_id": 1}).to_list(limit + 1)
+        if len(docs) > limit:
+            return None
+        return [doc["_id"] for doc in docs]
+
+    async def process_pending(
+        self,
+        pool: Dict[str, Any],
+        limit: int = 500,
+        log: Optional[Callable[[str, str], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Recompute rows and columns for up to `limit` dirty users
+
+        Args:
+            pool: Encoded active pool from L3V3LScoreCalculatorTemplate._load_scoring_pool
+            limit: Maximum dirty users to process in this run
+            log: Optional (level, message) logger, e.g. JobExecutionContext.log
+
+        Returns:
+            Summary counts for the job result
+        """
+        from l3v3l_matching_engine import matching_engine
+
+        log = log or (lambda level, message: logger.log(getattr(logging, level, logging.INFO), message))
+        pending = await self.get_pending(limit)
+
+        processed = 0
+        scores_written = 0
+        users_dropped = 0
+        errors = []
+        done = set()  # Pool indices handled this run - their pairs with later users are already written
+
+        for doc in pending:
+            username = doc["_id"]
+            try:
+                user_index = pool["index"].get(username)
+                if user_index is None:
+                    deleted = await self._drop_scores(username)
+                    users_dropped += 1
+                    log("INFO", f"   ✓ {username}: inactive, removed {deleted} scores")
+                else:
+                    user = pool["users"][user_index]
+                    opposite_gender = "Female" if user["gender"] == "Male" else "Male"
+                    opposite = [i for i in pool["byGender"][opposite_gender] if i != user_index]
+                    others = [i for i in opposite if i not in done]
+
+                    # The row is always complete (it also replaces the user's search snapshot);
+                    # the column skips users already processed this run, whose rows covered it
+                    row = matching_engine.score_encoded(pool["features"], user_index, opposite, include_reasons=False)
+                    column = matching_engine.score_column(pool["features"], user_index, others, include_reasons=False)
+
+                    now = datetime.utcnow()
+                    valid = [pool["users"][i]["username"] for i in opposite]
+                    other_names = [pool["users"][i]["username"] for i in others]
+                    ops = [self._upsert(username, name, result, now) for name, result in zip(valid, row)]
+                    ops += [self._upsert(name, username, result, now) for name, result in zip(other_names, column)]
+
+                    # Pairs that no longer exist (e.g. gender changed) must not linger
+                    ops.append(DeleteMany({"fromUsername": username, "toUsername": {"$nin": valid}}))
+                    ops.append(DeleteMany({"toUsername": username, "fromUsername": {"$nin": valid}}))
+
+                    await self._write(ops)
+
+                    await self.snapshots.replace(username, [pool["users"][i] for i in opposite], row)
+                    snapshot_ops = []
+                    for other, result in zip((pool["users"][i] for i in others), column):
+                        snapshot_ops += self.snapshots.upsert_candidate_ops(other["username"], user, result)
+                    await self.snapshots.write(snapshot_ops)
+                    await self.snapshots.remove_candidate(username, keep_viewers=valid)
+
+                    scores_written += len(row) + len(column)
+                    done.add(user_index)
+                    log("INFO", f"   ✓ {username}: {len(row)} row + {len(column)} column scores")
+
+                await self._mark_clean(username, doc.get("dirtyVersion", 0))
+                processed += 1
+            except Exception as e:
+                errors.append(f"{username}: {str(e)}")
+                log("ERROR", f"❌ Error for {username}: {e}")
+
+        return {
+            "usersProcessed": processed,
+            "usersDropped": users_dropped,
+            "totalScoresCalculated": scores_written,
+            "remaining": await self.dirty.count_documents({"pending": True}),
+            "errorCount": len(errors),
+            "errors": errors[:10]
+        }
+
+    async def _mark_clean(self, username: str, version: int) -> None:
+        """Advance the watermark unless the user was re-dirtied while being processed"""
+        await self.dirty.update_one(
+            {"_id": username, "dirtyVersion": version},
+            {"$set": {"pending": False, "cleanVersion": version, "cleanAt": datetime.utcnow()}}
+        )
+
+    async def _drop_scores(self, username: str) -> int:
+        """Delete both directions of an inactive user's scores (and their search snapshot entries)"""
+        await self.snapshots.remove_viewer(username)
+        result = await self.db.l3v3l_scores.delete_many(
+            {"$or": [{"fromUsername": username}, {"toUsername": username}]}
+        )
+        return result.deleted_count
+
+    @staticmethod
+    def _upsert(from_username: str, to_username: str, result: Dict[str, Any], now: datetime) -> UpdateOne:
+        return UpdateOne(
+            {"fromUsername": from_username, "toUsername": to_username},
+            {"$set": {
+                "fromUsername": from_username,
+                "toUsername": to_username,
+                "score": result["total_score"],
+                "level": result["compatibility_level"],
+                "breakdown": result.get("component_scores", {}),
+                "calculatedAt": now
+            }},
+            upsert=True
+        )
+
+    async def _write(self, ops: list) -> None:
+        for i in range(0, len(ops), WRITE_BATCH_SIZE):
+            await self.db.l3v3l_scores.bulk_write(ops[i:i + WRITE_BATCH_SIZE], ordered=False)
+
+
+async def mark_l3v3l_dirty(db, username: str, reason: str) -> None:
+    """Best-effort helper for request paths - never raises"""
+    try:
+        await L3V3LScoreMaintainer(db).mark_dirty(username, reason)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to mark L3V3L scores dirty for {username}: {e}")
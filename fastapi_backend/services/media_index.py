@@ -0,0 +1,207 @@
+"""
+Media Index Service
+Filename -> owner lookup for protected media serving
+
+`/media/{filename}` used to find an image's owner with an $or of unanchored
+regexes over six user fields, i.e. a users collection scan per <img> request.
+The `media_index` collection holds one document per stored filename with the
+owner and everything the access check needs (visibility bucket, legacy public
+and profile-picture flags), and an in-process LRU sits in front of it.
+
+The index is rebuilt per owner from the user document whenever photos are
+uploaded, deleted, reordered or their visibility changes, so callers never
+have to compute entries themselves - they just call `sync_user_media`.
+A miss falls back to the legacy scan in the route and re-syncs the owner,
+so users whose photos were written by other paths heal on first access.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from pymongo import DeleteOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+MEDIA_INDEX_COLLECTION = "media_index"
+LRU_MAX_ENTRIES = 10000
+LRU_TTL_SECONDS = 60  # bounds staleness across instances that didn't do the write
+
+# User fields that can reference an uploaded file
+MEDIA_USER_PROJECTION = {
+    "username": 1, "images": 1, "publicImages": 1, "profileImage": 1, "imageVisibility": 1
+}
+
+_VISIBILITY_BUCKETS = ("memberVisible", "onRequest")
+
+
+def media_filename(url_or_path: Optional[str]) -> str:
+    """Bare filename of any stored image URL/path format (query string stripped)"""
+    if not url_or_path or not isinstance(url_or_path, str):
+        return ""
+    return url_or_path.split("?")[0].split("/")[-1]
+
+
+def build_media_entries(user: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Index entries for every file referenced by a user document
+
+    Flags mirror the access rules in get_protected_media:
+    - bucket: imageVisibility bucket (profilePic/memberVisible/onRequest) or None
+    - isPublic: listed in legacy publicImages
+    - isProfilePic: profilePic bucket, or images[0] when imageVisibility is not set
+    """
+    username = user.get("username")
+    if not username:
+        return {}
+
+    visibility = user.get("imageVisibility") or {}
+    images = user.get("images") or []
+    public = {media_filename(p) for p in user.get("publicImages") or []}
+
+    buckets: Dict[str, str] = {}
+    profile_pic = media_filename(visibility.get("profilePic"))
+    if profile_pic:
+        buckets[profile_pic] = "profilePic"
+    for bucket in _VISIBILITY_BUCKETS:
+        for img in visibility.get(bucket) or []:
+            buckets.setdefault(media_filename(img), bucket)
+    buckets.pop("", None)
+
+    legacy_profile_pic = media_filename(images[0]) if images and not visibility else ""
+
+    filenames = [media_filename(img) for img in images]
+    filenames += list(public) + list(buckets) + [media_filename(user.get("profileImage"))]
+
+    entries = {}
+    for filename in filenames:
+        if not filename or filename in entries:
+            continue
+        bucket = buckets.get(filename)
+        entries[filename] = {
+            "_id": filename,
+            "owner": username,
+            "bucket": bucket,
+            "isPublic": filename in public,
+            "isProfilePic": bucket == "profilePic" or filename == legacy_profile_pic,
+        }
+    return entries
+
+
+class MediaIndexLRU:
+    """Small TTL-bounded LRU of filename -> index entry"""
+
+    def __init__(self, max_entries: int = LRU_MAX_ENTRIES, ttl_seconds: int = LRU_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        cached = self._entries.get(filename)
+        if not cached:
+            return None
+        entry, expires_at = cached
+        if expires_at <= time.time():
+            self._entries.pop(filename, None)
+            return None
+        self._entries.move_to_end(filename)
+        return entry
+
+    def put(self, filename: str, entry: Dict[str, Any]) -> None:
+        self._entries[filename] = (entry, time.time() + self.ttl_seconds)
+        self._entries.move_to_end(filename)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, filenames: Iterable[str]) -> None:
+        for filename in filenames:
+            self._entries.pop(filename, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+media_lru = MediaIndexLRU()
+
+
+class MediaIndexService:
+    """Reads and maintains the media_index collection"""
+
+    def __init__(self, db, lru: MediaIndexLRU = media_lru):
+        self.db = db
+        self.collection = db[MEDIA_INDEX_COLLECTION]
+        self.lru = lru
+
+    async def ensure_indexes(self):
+        """Owner index used when a user's entries are rebuilt or removed"""
+        await self.collection.create_index([("owner", 1)])
+
+    async def lookup(self, filename: str) -> Optional[Dict[str, Any]]:
+        """Index entry for `filename` (LRU first), or None if it isn't indexed"""
+        entry = self.lru.get(filename)
+        if entry is not None:
+            return entry
+        entry = await self.collection.find_one({"_id": filename})
+        if entry:
+            self.lru.put(filename, entry)
+        return entry
+
+    async def sync_user(self, user: Dict[str, Any]) -> int:
+        """
+        Make the index match a user document: upsert its files, drop files it no longer references
+
+        Returns:
+            Number of files indexed for the user
+        """
+        username = user.get("username")
+        if not username:
+            return 0
+        entries = build_media_entries(user)
+        now = datetime.utcnow()
+
+        stale = await self.collection.find(
+            {"owner": username, "_id": {"$nin": list(entries)}}, {"_id": 1}
+        ).to_list(None)
+        ops = [DeleteOne({"_id": doc["_id"], "owner": username}) for doc in stale]
+        ops += [
+            UpdateOne({"_id": filename}, {"$set": {**entry, "updatedAt": now}}, upsert=True)
+            for filename, entry in entries.items()
+        ]
+        if ops:
+            await self.collection.bulk_write(ops, ordered=False)
+
+        self.lru.discard([doc["_id"] for doc in stale])
+        self.lru.discard(entries)
+        return len(entries)
+
+    async def remove_owner(self, username: str) -> int:
+        """Drop every entry owned by a deleted user"""
+        filenames = [
+            doc["_id"] for doc in await self.collection.find({"owner": username}, {"_id": 1}).to_list(None)
+        ]
+        if filenames:
+            await self.collection.delete_many({"owner": username})
+            self.lru.discard(filenames)
+        return len(filenames)
+
+
+async def sync_user_media(db, username: str) -> None:
+    """Best-effort helper for request paths - rebuilds one user's entries, never raises"""
+    try:
+        user = await db.users.find_one({"username": username}, MEDIA_USER_PROJECTION)
+        if user:
+            await MediaIndexService(db).sync_user(user)
+        else:
+            await MediaIndexService(db).remove_owner(username)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to sync media index for {username}: {e}")
+
+
+async def remove_user_media(db, username: str) -> None:
+    """Best-effort helper for account deletion - never raises"""
+    try:
+        await MediaIndexService(db).remove_owner(username)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to remove media index entries for {username}: {e}")
@@ -74,19 +74,14 @@ async def get_conversations(
     exclude_group_name: Optional[str] = None,
 ) -> Tuple[List[Dict[str, Any]], int]:
     """Get paginated conversations for a user, sorted by last message time."""
-    try:
-        from redis_manager import get_redis_manager
-        redis = get_redis_manager()
-        group_suffix = exclude_group_name or "all"
-        cache_key = f"conversation_list:{username}:{page}:{group_suffix}"
-        cached = redis.redis_client.get(cache_key)
-        if cached:
-            import json
-            data = json.loads(cached)
-            logger.debug(f"✅ Cache hit for conversation list: {cache_key}")
-            return data["conversations"], data["total"]
-    except Exception as e:
-        logger.warning(f"⚠️ Redis cache check failed: {e}")
+    from async_redis_manager import get_async_redis
+    redis = get_async_redis()
+    group_suffix = exclude_group_name or "all"
+    cache_key = f"conversation_list:{username}:{page}:{group_suffix}"
+    data = await redis.cache_get(cache_key)
+    if data:
+        logger.debug(f"✅ Cache hit for conversation list: {cache_key}")
+        return data["conversations"], data["total"]
     
     query: Dict[str, Any] = {"participants.username": username}
     if exclude_group_name:
@@ -121,18 +116,10 @@ async def get_conversations(
         for conv in conversations:
             conv["unreadCount"] = unread_by_conv.get(str(conv["_id"]), 0)
 
-    try:
-        from redis_manager import get_redis_manager
-        redis = get_redis_manager()
-        from fastapi.encoders import jsonable_encoder
-        import json
-        group_suffix = exclude_group_name or "all"
-        cache_key = f"conversation_list:{username}:{page}:{group_suffix}"
-        payload = jsonable_encoder({"conversations": conversations, "total": total})
-        redis.redis_client.setex(cache_key, 30, json.dumps(payload))
+    from fastapi.encoders import jsonable_encoder
+    payload = jsonable_encoder({"conversations": conversations, "total": total})
+    if await redis.cache_set(cache_key, payload, 30):
         logger.debug(f"💾 Cached conversation list: {cache_key}")
-    except Exception as e:
-        logger.warning(f"⚠️ Failed to cache conversation list: {e}")
 
     return conversations, total
 
@@ -435,6 +422,7 @@ async def register_device(
             },
             upsert=True,
         )
+        await _invalidate_device_tokens(username)
 
     logger.info(f"📱 Device token registered for {username} ({platform})")
     return True
@@ -450,6 +438,8 @@ async def unregister_device(
         {"username": username},
         {"$pull": {"tokens": {"token": token}}},
     )
+    if result.modified_count > 0:
+        await _invalidate_device_tokens(username)
     return result.modified_count > 0
 
 
@@ -464,6 +454,51 @@ async def get_device_tokens(
     return [t["token"] for t in doc["tokens"]]
 
 
+DEVICE_TOKENS_CACHE_TTL = 300
+
+
+async def get_device_tokens_many(
+    db: AsyncIOMotorDatabase,
+    usernames: List[str],
+) -> Dict[str, List[str]]:
+    """
+    Get FCM tokens for many users: one MGET against the Redis cache, then a
+    single `$in` query for the misses, written back in one pipeline.
+    Users without tokens map to [] (cached too, so they stay cheap).
+    """
+    from async_redis_manager import get_async_redis
+
+    usernames = list(dict.fromkeys(u for u in usernames if u))
+    if not usernames:
+        return {}
+
+    redis = get_async_redis()
+    cached = await redis.cache_get_many([f"device_tokens:{u}" for u in usernames])
+    tokens = {u: cached[f"device_tokens:{u}"] for u in usernames if f"device_tokens:{u}" in cached}
+
+    missing = [u for u in usernames if u not in tokens]
+    if missing:
+        fetched = {u: [] for u in missing}
+        cursor = db.messenger_device_tokens.find(
+            {"username": {"$in": missing}},
+            {"_id": 0, "username": 1, "tokens.token": 1},
+        )
+        async for doc in cursor:
+            fetched[doc["username"]] = [t["token"] for t in doc.get("tokens") or [] if t.get("token")]
+        await redis.cache_set_many(
+            {f"device_tokens:{u}": user_tokens for u, user_tokens in fetched.items()},
+            DEVICE_TOKENS_CACHE_TTL,
+        )
+        tokens.update(fetched)
+
+    return tokens
+
+
+async def _invalidate_device_tokens(username: str):
+    from async_redis_manager import get_async_redis
+    await get_async_redis().cache_delete(f"device_tokens:{username}")
+
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
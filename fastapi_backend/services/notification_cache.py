@@ -10,6 +10,8 @@ from datetime import datetime, timedelta
 import redis.asyncio as redis
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
+from services.template_engine import compiled_templates
+
 logger = logging.getLogger(__name__)
 
 class NotificationCacheService:
@@ -143,7 +145,7 @@ class NotificationCacheService:
                         await self.redis_client.setex(
                             cache_key, 
                             86400,  # 24 hours TTL for templates
-                            json.dumps(template)
+                            json.dumps(template, default=str)
                         )
                         logger.debug(f"💾 Cached notification template: {trigger}")
                     except Exception as e:
@@ -159,6 +161,7 @@ class NotificationCacheService:
     async def invalidate_notification_template(self, trigger: str):
         """Invalidate cached notification template"""
         cache_key = f"notification_template:{trigger}"
+        compiled_templates.invalidate(trigger)
         
         if self.redis_client:
             try:
@@ -169,6 +172,7 @@ class NotificationCacheService:
     
     async def invalidate_all_templates(self):
         """Invalidate all cached templates"""
+        compiled_templates.invalidate()
         if self.redis_client:
             try:
                 pattern = "notification_template:*"
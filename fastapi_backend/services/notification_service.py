@@ -4,10 +4,9 @@ Handles notification queue management, template rendering, and delivery
 """
 
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Hashable
 from pymongo.database import Database
 from fastapi import HTTPException
-import re
 import pytz
 import logging
 
@@ -24,6 +23,13 @@ from models.notification_models import (
     NotificationStatus,
     QuietHours
 )
+from services.template_engine import compiled_templates
+
+# Old-schema queue fields that are folded into the new schema on rewrite
+LEGACY_QUEUE_FIELDS = frozenset({
+    "recipientUsername", "channel", "type", "message", "title",
+    "senderUsername", "senderName", "metadata"
+})
 
 
 class NotificationService:
@@ -230,32 +236,24 @@ class NotificationService:
         
         return NotificationQueueItem(**queue_item_dict)
     
-    async def get_pending_notifications(
-        self,
-        channel: Optional[NotificationChannel] = None,
-        limit: int = 100
-    ) -> List[NotificationQueueItem]:
-        """
-        Get pending notifications ready to send (respects retry delays).
-        Uses atomic find_one_and_update to prevent race conditions when
-        multiple job instances run simultaneously.
-        """
+    async def ensure_queue_indexes(self):
+        """Indexes behind claim_pending_notifications"""
+        await self.queue_collection.create_index(
+            [("status", 1), ("scheduledFor", 1), ("nextRetryAt", 1), ("channels", 1)],
+            name="claim_eligibility"
+        )
+        await self.queue_collection.create_index("claimToken", sparse=True)
+    
+    @staticmethod
+    def _claimable_query(channel: Optional[NotificationChannel] = None) -> Dict[str, Any]:
+        """Pending notifications whose scheduled/retry time has been reached"""
+        now = datetime.utcnow()
         query = {
             "status": {"$in": [NotificationStatus.PENDING, NotificationStatus.SCHEDULED, "queued"]},
             "$and": [
-                {
-                    "$or": [
-                        {"scheduledFor": None},
-                        {"scheduledFor": {"$lte": datetime.utcnow()}}
-                    ]
-                },
-                {
-                    "$or": [
-                        {"nextRetryAt": None},  # First attempt
-                        {"nextRetryAt": {"$exists": False}},  # Legacy records
-                        {"nextRetryAt": {"$lte": datetime.utcnow()}}  # Retry time reached
-                    ]
-                }
+                # None also matches missing fields (legacy records)
+                {"$or": [{"scheduledFor": None}, {"scheduledFor": {"$lte": now}}]},
+                {"$or": [{"nextRetryAt": None}, {"nextRetryAt": {"$lte": now}}]}
             ]
         }
         
@@ -265,68 +263,131 @@ class NotificationService:
             channel_value = channel.value if hasattr(channel, 'value') else channel
             query["$and"].append({
                 "$or": [
-                    {"channels": {"$in": [channel_value]}},  # New schema
-                    {"channel": channel_value}                # Old schema
+                    {"channels": channel_value},  # New schema
+                    {"channel": channel_value}    # Old schema
                 ]
             })
+        return query
+    
+    @staticmethod
+    def _normalize_legacy_queue_doc(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        New-schema version of an old-schema queue document, or None if `doc`
+        already uses the new schema
         
-        notifications = []
+        Old schema: recipientUsername, channel (singular), type, message
+        New schema: username, channels (list), trigger, templateData
+        """
+        if "recipientUsername" not in doc and ("channel" not in doc or "channels" in doc):
+            return None
+        # Fields outside the legacy mapping (nextRetryAt, claim fields, ...) survive the rewrite
+        carried = {key: value for key, value in doc.items() if key not in LEGACY_QUEUE_FIELDS}
+        return {
+            **carried,
+            "_id": doc.get("_id"),
+            "username": doc.get("recipientUsername", doc.get("username", "unknown")),
+            "trigger": doc.get("trigger", doc.get("type", "new_message")),
+            "priority": doc.get("priority", "medium"),
+            "channels": [doc.get("channel")] if "channel" in doc else doc.get("channels", ["email"]),
+            "templateData": doc.get("templateData", doc.get("metadata", {
+                "title": doc.get("title", ""),
+                "message": doc.get("message", ""),
+                "senderUsername": doc.get("senderUsername", ""),
+                "senderName": doc.get("senderName", ""),
+                "match": {"firstName": doc.get("senderName", ""), "username": doc.get("senderUsername", "")}
+            })),
+            "status": doc.get("status", "pending"),
+            "scheduledFor": doc.get("scheduledFor"),
+            "attempts": doc.get("attempts", 0),
+            "lastAttempt": doc.get("lastAttempt"),
+            "error": doc.get("error"),
+            "createdAt": doc.get("createdAt"),
+            "updatedAt": doc.get("updatedAt")
+        }
+    
+    async def claim_pending_notifications(
+        self,
+        channel: Optional[NotificationChannel] = None,
+        limit: int = 100
+    ) -> List[NotificationQueueItem]:
+        """
+        Atomically claim up to `limit` pending notifications ready to send
+        (respects retry delays)
+        
+        Candidate ids are read in one query, then a single update_many stamps a
+        unique claim token on those still eligible - the eligibility filter is
+        re-checked per document, so two workers can never claim the same one -
+        and the claimed documents are fetched back by token. Candidates lost to
+        a concurrent worker are topped up for a few rounds.
         
-        # Atomically claim notifications one by one to prevent race conditions
-        for _ in range(limit):
-            # find_one_and_update is atomic - only one process can claim each notification
-            doc = await self.queue_collection.find_one_and_update(
-                query,
+        Old-schema documents are rewritten in the new schema with one
+        bulk_write, so each is normalized only once.
+        """
+        from bson import ObjectId
+        from pymongo import ReplaceOne
+        
+        token = str(ObjectId())
+        query = self._claimable_query(channel)
+        claimed = 0
+        
+        for _ in range(3):
+            wanted = limit - claimed
+            if wanted <= 0:
+                break
+            candidates = await self.queue_collection.find(query, {"_id": 1}).limit(wanted).to_list(wanted)
+            if not candidates:
+                break
+            result = await self.queue_collection.update_many(
+                {**query, "_id": {"$in": [doc["_id"] for doc in candidates]}},
                 {
                     "$set": {
                         "status": NotificationStatus.PROCESSING,
-                        "processingStartedAt": datetime.utcnow()
+                        "processingStartedAt": datetime.utcnow(),
+                        "claimToken": token
                     }
-                },
-                return_document=True  # Return the updated document
-            )
-            
-            if not doc:
-                break  # No more pending notifications
-            
-            # Convert ObjectId to string for JSON serialization
-            if "_id" in doc:
-                doc["_id"] = str(doc["_id"])
-            
-            # Transform old-schema documents to match new Pydantic model
-            # Old schema: recipientUsername, channel (singular), type, message
-            # New schema: username, channels (list), trigger, templateData
-            if "recipientUsername" in doc or ("channel" in doc and "channels" not in doc):
-                doc = {
-                    "_id": doc.get("_id"),
-                    "username": doc.get("recipientUsername", doc.get("username", "unknown")),
-                    "trigger": doc.get("trigger", doc.get("type", "new_message")),
-                    "priority": doc.get("priority", "medium"),
-                    "channels": [doc.get("channel")] if "channel" in doc else doc.get("channels", ["email"]),
-                    "templateData": doc.get("templateData", doc.get("metadata", {
-                        "title": doc.get("title", ""),
-                        "message": doc.get("message", ""),
-                        "senderUsername": doc.get("senderUsername", ""),
-                        "senderName": doc.get("senderName", ""),
-                        "match": {"firstName": doc.get("senderName", ""), "username": doc.get("senderUsername", "")}
-                    })),
-                    "status": doc.get("status", "pending"),
-                    "scheduledFor": doc.get("scheduledFor"),
-                    "attempts": doc.get("attempts", 0),
-                    "lastAttempt": doc.get("lastAttempt"),
-                    "error": doc.get("error"),
-                    "createdAt": doc.get("createdAt"),
-                    "updatedAt": doc.get("updatedAt")
                 }
+            )
+            claimed += result.modified_count
+            if result.modified_count == len(candidates):
+                break  # No contention; the queue may just have fewer than `limit`
+        
+        if not claimed:
+            return []
+        
+        docs = await self.queue_collection.find({"claimToken": token}).to_list(None)
+        
+        legacy_rewrites = []
+        notifications = []
+        for doc in docs:
+            normalized = self._normalize_legacy_queue_doc(doc)
+            if normalized is not None:
+                legacy_rewrites.append(ReplaceOne({"_id": doc["_id"]}, normalized))
             
+            # Convert ObjectId to string for JSON serialization (on a copy - the
+            # replacement document must keep the stored ObjectId _id)
+            doc = {**(normalized or doc), "_id": str(doc["_id"])}
             try:
                 notifications.append(NotificationQueueItem(**doc))
             except Exception as parse_err:
                 logger.warning(f"⚠️ Skipping unparseable notification {doc.get('_id')}: {parse_err}")
-                continue
+        
+        if legacy_rewrites:
+            try:
+                await self.queue_collection.bulk_write(legacy_rewrites, ordered=False)
+                logger.info(f"🔄 Normalized {len(legacy_rewrites)} legacy notification queue records")
+            except Exception as e:
+                logger.warning(f"⚠️ Legacy notification normalization failed (will retry next claim): {e}")
         
         return notifications
     
+    async def get_pending_notifications(
+        self,
+        channel: Optional[NotificationChannel] = None,
+        limit: int = 100
+    ) -> List[NotificationQueueItem]:
+        """Alias of claim_pending_notifications (claims what it returns)"""
+        return await self.claim_pending_notifications(channel, limit)
+    
     async def reset_stuck_processing(self, timeout_minutes: int = 10) -> int:
         """
         Reset notifications stuck in PROCESSING state (job crashed).
@@ -444,160 +505,17 @@ class NotificationService:
     def render_template(
         self,
         template: str,
-        variables: Dict[str, Any]
+        variables: Dict[str, Any],
+        cache_key: Optional[Hashable] = None
     ) -> str:
-        """Render template with variables (supports both {{var}} and {var} syntax)"""
-        result = template
-        
-        # Replace {{variable}} and {variable} with values
-        for key, value in variables.items():
-            # Support nested keys like {{match.firstName}} or {match.firstName}
-            if isinstance(value, dict):
-                for nested_key, nested_value in value.items():
-                    # Handle dot notation: {key.nested}
-                    double_brace_dot = f"{{{{{key}.{nested_key}}}}}"  # {{key.nested}}
-                    single_brace_dot = f"{{{key}.{nested_key}}}"       # {key.nested}
-                    
-                    # Handle underscore notation: {key_nested}
-                    double_brace_underscore = f"{{{{{key}_{nested_key}}}}}"  # {{key_nested}}
-                    single_brace_underscore = f"{{{key}_{nested_key}}}"       # {key_nested}
-                    
-                    str_value = str(nested_value) if nested_value is not None else ""
-                    result = result.replace(double_brace_dot, str_value)
-                    result = result.replace(single_brace_dot, str_value)
-                    result = result.replace(double_brace_underscore, str_value)
-                    result = result.replace(single_brace_underscore, str_value)
-            else:
-                # Handle both double and single brace syntax
-                double_brace = f"{{{{{key}}}}}"  # {{key}}
-                single_brace = f"{{{key}}}"       # {key}
-                
-                str_value = str(value) if value is not None else ""
-                result = result.replace(double_brace, str_value)
-                result = result.replace(single_brace, str_value)
-        
-        # Handle for loops {% for item in list %}...{% endfor %}
-        result = self._process_for_loops(result, variables)
-        
-        # Handle conditional blocks {% if condition %}...{% endif %}
-        result = self._process_conditionals(result, variables)
-        
-        return result
-    
-    def _process_for_loops(self, template: str, variables: Dict[str, Any]) -> str:
-        """Process {% for item in list %}...{% endfor %} loops"""
-        
-        # Pattern to match for loops: {% for item in collection %}...{% endfor %}
-        for_pattern = r'\{%\s*for\s+(\w+)\s+in\s+(\w+(?:\.\w+)*)\s*%\}(.*?)\{%\s*endfor\s*%\}'
-        
-        def process_loop(match):
-            item_name = match.group(1)  # e.g., "msg"
-            collection_path = match.group(2)  # e.g., "activity.new_messages"
-            loop_content = match.group(3)  # Content inside the loop
-            
-            # Get the collection from variables
-            collection = self._get_nested_value(variables, collection_path)
-            
-            if not collection or not isinstance(collection, list):
-                return ''  # No items or not a list
-            
-            result_parts = []
-            for item in collection:
-                # Render the loop content for each item
-                item_content = loop_content
-                
-                if isinstance(item, dict):
-                    # Replace {item.key} and {{item.key}} patterns
-                    for key, value in item.items():
-                        double_brace = f"{{{{{item_name}.{key}}}}}"
-                        single_brace = f"{{{item_name}.{key}}}"
-                        str_value = str(value) if value is not None else ""
-                        item_content = item_content.replace(double_brace, str_value)
-                        item_content = item_content.replace(single_brace, str_value)
-                else:
-                    # Simple value replacement
-                    double_brace = f"{{{{{item_name}}}}}"
-                    single_brace = f"{{{item_name}}}"
-                    str_value = str(item) if item is not None else ""
-                    item_content = item_content.replace(double_brace, str_value)
-                    item_content = item_content.replace(single_brace, str_value)
-                
-                result_parts.append(item_content)
-            
-            return ''.join(result_parts)
-        
-        # Process all for loops (may need multiple passes for nested loops)
-        max_iterations = 5
-        for _ in range(max_iterations):
-            new_template = re.sub(for_pattern, process_loop, template, flags=re.DOTALL)
-            if new_template == template:
-                break
-            template = new_template
-        
-        return template
-    
-    def _process_conditionals(self, template: str, variables: Dict[str, Any]) -> str:
-        """Process {% if %} conditional blocks"""
-        
-        # First, handle simple truthiness checks: {% if variable %}
-        simple_pattern = r'\{%\s*if\s+(\w+(?:\.\w+)*)\s*%\}(.*?)\{%\s*endif\s*%\}'
-        
-        def evaluate_simple(match):
-            var_path = match.group(1)
-            content = match.group(2)
-            
-            # Get variable value
-            var_value = self._get_nested_value(variables, var_path)
-            
-            # Check truthiness (not None, not empty string, not False)
-            if var_value and var_value != '':
-                return content
-            return ''
-        
-        template = re.sub(simple_pattern, evaluate_simple, template, flags=re.DOTALL)
-        
-        # Then handle comparison conditionals: {% if variable >= value %}
-        comparison_pattern = r'\{%\s*if\s+(\w+(?:\.\w+)*)\s*([><=!]+)\s*(\w+)\s*%\}(.*?)\{%\s*endif\s*%\}'
-        
-        def evaluate_comparison(match):
-            var_path = match.group(1)
-            operator = match.group(2)
-            value = match.group(3)
-            content = match.group(4)
-            
-            # Get variable value
-            var_value = self._get_nested_value(variables, var_path)
-            
-            # Evaluate condition
-            try:
-                if operator == '>=':
-                    if float(var_value) >= float(value):
-                        return content
-                elif operator == '>':
-                    if float(var_value) > float(value):
-                        return content
-                elif operator == '==':
-                    if str(var_value) == str(value):
-                        return content
-            except:
-                pass
-            
-            return ''
-        
-        template = re.sub(comparison_pattern, evaluate_comparison, template, flags=re.DOTALL)
+        """
+        Render template with variables (supports both {{var}} and {var} syntax)
         
-        return template
-    
-    def _get_nested_value(self, data: Dict[str, Any], path: str) -> Any:
-        """Get nested dictionary value from path like 'match.firstName'"""
-        keys = path.split('.')
-        value = data
-        for key in keys:
-            if isinstance(value, dict):
-                value = value.get(key)
-            else:
-                return None
-        return value
+        The template is compiled once and cached; pass `cache_key` (see
+        template_cache_key) to key it by (trigger, version, field) instead of
+        by its source text.
+        """
+        return compiled_templates.get(template, cache_key).render(variables)
     
     # ============================================
     # Logging & Analytics
@@ -11,6 +11,8 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from services.notification_service import NotificationService
+from services.l3v3l_score_maintenance import mark_l3v3l_dirty
+from services.search_cache import invalidate_search_cache
 from models.notification_models import (
     NotificationTrigger,
     NotificationChannel,
@@ -83,6 +85,10 @@ class PauseService:
                 "message": "Failed to pause account. User not found."
             }
         
+        # Paused users leave the L3V3L score matrix (scores dropped by the incremental job)
+        await mark_l3v3l_dirty(self.db, username, "user_paused")
+        await invalidate_search_cache("user_paused")
+        
         # Send pause confirmation notification
         try:
             await self.notification_service.enqueue_notification(
@@ -167,6 +173,10 @@ class PauseService:
                 "message": "Account is already active"
             }
         
+        # Rejoin the L3V3L score matrix on the next incremental run
+        await mark_l3v3l_dirty(self.db, username, "user_unpaused")
+        await invalidate_search_cache("user_unpaused")
+        
         # Send unpause notification
         try:
             await self.notification_service.enqueue_notification(
@@ -0,0 +1,452 @@
+"""
+Profile Cards
+One serializer for the profile cards shown in lists (search, favorites,
+shortlist, conversations, "who favorited me")
+
+Each list endpoint used to rebuild every card from the user document: decrypt,
+strip consent metadata, normalize public image paths, build media URLs,
+apply the profile-picture rules, enrich imageVisibility and compute the age.
+Everything that depends only on the profile is now built once per user as a
+card fragment and cached - in an in-process LRU, then in Redis - and only
+what depends on the viewer or the current date is applied per response
+(render_card):
+
+- Admin viewers see every image
+- profile_picture_always_visible puts the profile picture first
+- Age is computed from birthMonth/birthYear
+
+accountStatus is not cached: the username lookup that filters the page also
+returns it, so status changes and deleted accounts show up immediately.
+
+Fragments are plain JSON (dates as ISO strings) and never contain contact PII;
+only `location` is decrypted. Profile and photo edits call
+invalidate_profile_card(). Other instances' LRUs expire after
+LRU_TTL_SECONDS, Redis entries after REDIS_TTL_SECONDS.
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from config import settings
+from crypto_utils import get_encryptor
+from utils import get_full_image_url
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "profile_card:"
+REDIS_TTL_SECONDS = 600
+LRU_MAX_ENTRIES = 5000
+LRU_TTL_SECONDS = 60  # bounds staleness across instances that didn't do the write
+
+# Fields a card carries (contact PII and per-viewer scores are left out)
+CARD_PROJECTION = {
+    "_id": 0,
+    "username": 1,
+    "profileId": 1,
+    "firstName": 1,
+    "lastName": 1,
+    "age": 1,
+    "birthMonth": 1,
+    "birthYear": 1,
+    "dateOfBirth": 1,
+    "gender": 1,
+    "location": 1,
+    "region": 1,
+    "city": 1,
+    "occupation": 1,
+    "education": 1,
+    "educationHistory": 1,
+    "workExperience": 1,
+    "bio": 1,
+    "tagline": 1,
+    "aboutMe": 1,
+    "about": 1,
+    "description": 1,
+    "aboutYou": 1,
+    "profileImage": 1,
+    "images": 1,
+    "publicImages": 1,
+    "imageVisibility": 1,
+    "lastActive": 1,
+    "onlineStatus": 1,
+    "height": 1,
+    "heightInches": 1,
+    "religion": 1,
+    "eatingPreference": 1,
+    "bodyType": 1,
+    "lookingFor": 1,
+    "partnerPreferences": 1,
+    "partnerPreference": 1,
+    "partnerCriteria": 1,
+    "profileCreatedBy": 1,
+    "createdAt": 1,
+    "adminApprovedAt": 1,
+    "contributionPopupDisabledByAdmin": 1,
+    "badges": 1,
+    "promoCode": 1,
+    "referredByInfo": 1,
+    "invitedBy": 1,
+    "role_name": 1,
+    "role": 1,
+}
+
+# Backend-only consent fields, never shown to the frontend
+CONSENT_FIELDS = (
+    "agreedToAge", "agreedToTerms", "agreedToPrivacy", "agreedToGuidelines",
+    "agreedToDataProcessing", "agreedToMarketing",
+    "termsAgreedAt", "privacyAgreedAt",
+    "consentIpAddress", "consentUserAgent",
+)
+
+
+def remove_consent_metadata(user_dict):
+    """Remove consent-related metadata fields (backend-only, not shown to frontend)"""
+    for field in CONSENT_FIELDS:
+        user_dict.pop(field, None)
+    return user_dict
+
+
+def extract_image_path(url_or_path: str) -> str:
+    if not url_or_path:
+        return ''
+    if isinstance(url_or_path, str) and url_or_path.startswith('http'):
+        parsed = urlparse(url_or_path)
+        return parsed.path
+    if isinstance(url_or_path, str) and url_or_path.startswith('uploads/'):
+        return '/' + url_or_path
+    if isinstance(url_or_path, str) and not url_or_path.startswith('/') and url_or_path.startswith(f"{settings.upload_dir}/"):
+        return '/' + url_or_path
+    return url_or_path
+
+
+def compute_public_image_paths(existing_images: List[str], public_images: List[str]) -> List[str]:
+    normalized_images = {extract_image_path(img) for img in (existing_images or []) if img}
+    normalized_public = [extract_image_path(img) for img in (public_images or []) if img]
+    return [p for p in normalized_public if p in normalized_images]
+
+
+def card_age(card: Dict[str, Any]) -> Optional[int]:
+    """Age from birthMonth/birthYear, else the stored age"""
+    birth_month, birth_year = card.get("birthMonth"), card.get("birthYear")
+    if birth_month and birth_year:
+        today = date.today()
+        return today.year - birth_year - (1 if today.month < birth_month else 0)
+    return card.get("age")
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def build_card_fragment(user: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Viewer-independent card for one (location-decrypted) user document
+
+    `_imageUrls` holds every photo URL (profileImage when images is empty)
+    for render_card; `publicImages` and a present imageVisibility are
+    converted to media URLs.
+    """
+    # Whitelisted fields only (consent metadata and contact PII never get in)
+    card = {field: user[field] for field in CARD_PROJECTION if field != "_id" and field in user}
+
+    existing_images = user.get("images") or []
+    if not existing_images and user.get("profileImage"):
+        existing_images = [user["profileImage"]]
+    card["_imageUrls"] = [url for url in (get_full_image_url(img) for img in existing_images) if url]
+    card["publicImages"] = [
+        get_full_image_url(p) for p in compute_public_image_paths(existing_images, user.get("publicImages", []))
+    ]
+    card.pop("images", None)
+
+    image_visibility = user.get("imageVisibility")
+    if image_visibility:
+        card["imageVisibility"] = {
+            "profilePic": get_full_image_url(image_visibility.get("profilePic")) if image_visibility.get("profilePic") else None,
+            "memberVisible": [get_full_image_url(img) for img in image_visibility.get("memberVisible", [])],
+            "onRequest": [get_full_image_url(img) for img in image_visibility.get("onRequest", [])]
+        }
+    else:
+        card.pop("imageVisibility", None)
+
+    # Same shape whether served from the LRU or from Redis
+    return json.loads(json.dumps(card, default=_json_default))
+
+
+def render_card(fragment: Dict[str, Any], is_admin: bool = False,
+                profile_pic_always_visible: bool = True) -> Dict[str, Any]:
+    """
+    Response card for one viewer
+
+    Image visibility:
+    1. Admin viewers see ALL images
+    2. profile_picture_always_visible -> the profile picture (first image) plus public images
+    3. Otherwise only public images
+
+    Returns a new top-level dict; nested values are shared with the cached
+    fragment and must not be mutated.
+    """
+    card = {key: value for key, value in fragment.items() if not key.startswith("_")}
+    all_urls = fragment.get("_imageUrls") or []
+    public_urls = fragment.get("publicImages") or []
+
+    if is_admin and all_urls:
+        card["images"] = list(all_urls)
+        card["profilePicVisible"] = True
+        card["imagesMasked"] = False
+    elif profile_pic_always_visible and all_urls:
+        profile_pic_url = all_urls[0]
+        if profile_pic_url not in public_urls:
+            card["images"] = [profile_pic_url] + public_urls
+        else:
+            card["images"] = list(public_urls)
+        card["profilePicVisible"] = True
+        card["imagesMasked"] = False
+    else:
+        card["images"] = list(public_urls)
+        card["imagesMasked"] = len(public_urls) == 0
+
+    # Legacy fallback: imageVisibility from the visible images
+    if "imageVisibility" not in card and card["images"]:
+        card["imageVisibility"] = {
+            "profilePic": card["images"][0],
+            "memberVisible": card["images"][1:],
+            "onRequest": []
+        }
+
+    card["age"] = card_age(card)
+    return card
+
+
+def compact_card(card: Dict[str, Any]) -> Dict[str, Any]:
+    """Avatar-sized summary of a rendered card ("who favorited/shortlisted me" lists)"""
+    # Profile picture when always visible, else the first public image
+    profile_image = card["images"][0] if card.get("images") else None
+    image_visibility = card.get("imageVisibility") or {}
+    compact = {
+        "username": card["username"],
+        "firstName": card.get("firstName"),
+        "lastName": card.get("lastName"),
+        "age": card.get("age"),
+        "location": card.get("location"),
+        "occupation": card.get("occupation"),
+        "profileImage": profile_image,
+        "imageVisibility": {
+            "profilePic": image_visibility.get("profilePic") or profile_image,
+            "memberVisible": image_visibility.get("memberVisible", []),
+            "onRequest": image_visibility.get("onRequest", [])
+        },
+    }
+    if card.get("profilePicVisible"):
+        compact["profilePicVisible"] = True
+    return compact
+
+
+class ProfileCardLRU:
+    """Small TTL-bounded LRU of username -> card fragment"""
+
+    def __init__(self, max_entries: int = LRU_MAX_ENTRIES, ttl_seconds: int = LRU_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, username: str) -> Optional[Dict[str, Any]]:
+        cached = self._entries.get(username)
+        if not cached:
+            return None
+        fragment, expires_at = cached
+        if expires_at <= time.time():
+            self._entries.pop(username, None)
+            return None
+        self._entries.move_to_end(username)
+        return fragment
+
+    def put(self, username: str, fragment: Dict[str, Any]) -> None:
+        self._entries[username] = (fragment, time.time() + self.ttl_seconds)
+        self._entries.move_to_end(username)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, usernames: Iterable[str]) -> None:
+        for username in usernames:
+            self._entries.pop(username, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class CardGenerations:
+    """
+    Bounded LRU of username -> invalidation generation
+
+    Generations come from one increasing clock. An evicted username reads as
+    the highest generation evicted so far, so a load that raced an
+    invalidation still sees a changed value after the entry is gone.
+    """
+
+    def __init__(self, max_entries: int = LRU_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._clock = 0
+        self._floor = 0
+
+    def get(self, username: str) -> int:
+        return self._entries.get(username, self._floor)
+
+    def bump(self, username: str) -> None:
+        self._clock += 1
+        self._entries[username] = self._clock
+        self._entries.move_to_end(username)
+        while len(self._entries) > self.max_entries:
+            _, generation = self._entries.popitem(last=False)
+            self._floor = max(self._floor, generation)
+
+
+class ProfileCardCache:
+    """Card fragments by username: LRU, then Redis, then one batched users query"""
+
+    def __init__(self, lru: Optional[ProfileCardLRU] = None, redis_client=None):
+        self.lru = lru or ProfileCardLRU()
+        self._redis = redis_client
+        # Bumped per username on invalidation so a load racing an edit isn't cached
+        self._generations = CardGenerations()
+        self._counters = {"lru_hits": 0, "redis_hits": 0, "loads": 0, "invalidations": 0}
+
+    @property
+    def redis(self):
+        """Explicit client, else the shared one (None while Redis is down)"""
+        if self._redis is not None:
+            return self._redis
+        from async_redis_manager import async_redis_manager
+        return async_redis_manager.redis_client
+
+    async def get_cards(
+        self,
+        db,
+        usernames: List[str],
+        is_admin: bool = False,
+        profile_pic_always_visible: bool = True,
+        active_only: bool = True
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Rendered cards for existing users (inactive ones dropped when active_only)
+
+        Returns:
+            {username: card}; callers keep their own ordering
+        """
+        if not usernames:
+            return {}
+        status_query: Dict[str, Any] = {"username": {"$in": list(usernames)}}
+        if active_only:
+            status_query["accountStatus"] = "active"
+        statuses = {
+            doc["username"]: doc.get("accountStatus")
+            async for doc in db.users.find(status_query, {"_id": 0, "username": 1, "accountStatus": 1})
+        }
+
+        fragments = await self.get_fragments(db, list(statuses))
+        cards = {}
+        for username, fragment in fragments.items():
+            card = render_card(fragment, is_admin=is_admin, profile_pic_always_visible=profile_pic_always_visible)
+            card["accountStatus"] = statuses[username]
+            cards[username] = card
+        return cards
+
+    async def get_fragments(self, db, usernames: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Cached fragments, loading the misses with one query"""
+        fragments: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for username in usernames:
+            fragment = self.lru.get(username)
+            if fragment is not None:
+                fragments[username] = fragment
+                self._counters["lru_hits"] += 1
+            else:
+                missing.append(username)
+
+        redis = self.redis
+        if missing and redis is not None:
+            try:
+                cached = await redis.mget([f"{REDIS_KEY_PREFIX}{username}" for username in missing])
+                still_missing = []
+                for username, raw in zip(missing, cached):
+                    if raw:
+                        fragment = json.loads(raw)
+                        fragments[username] = fragment
+                        self.lru.put(username, fragment)
+                        self._counters["redis_hits"] += 1
+                    else:
+                        still_missing.append(username)
+                missing = still_missing
+            except Exception as e:
+                logger.warning(f"⚠️ Profile card Redis read failed, loading from MongoDB: {e}")
+
+        if missing:
+            fragments.update(await self._load(db, missing))
+        return fragments
+
+    async def _load(self, db, usernames: List[str]) -> Dict[str, Dict[str, Any]]:
+        generations = {username: self._generations.get(username) for username in usernames}
+        users = await db.users.find({"username": {"$in": usernames}}, CARD_PROJECTION).to_list(len(usernames))
+        # 🔓 Cards show location only; contact fields are dropped, not decrypted
+        try:
+            users = get_encryptor().decrypt_many(users, fields=("location",))
+        except Exception as decrypt_err:
+            logger.warning(f"⚠️ Decryption skipped for {len(users)} profile cards: {decrypt_err}")
+            for user in users:
+                user.pop("location", None)
+
+        fragments = {user["username"]: build_card_fragment(user) for user in users}
+        self._counters["loads"] += len(fragments)
+
+        fresh = {
+            username: fragment for username, fragment in fragments.items()
+            if self._generations.get(username) == generations[username]
+        }
+        for username, fragment in fresh.items():
+            self.lru.put(username, fragment)
+        redis = self.redis
+        if fresh and redis is not None:
+            try:
+                pipe = redis.pipeline(transaction=False)
+                for username, fragment in fresh.items():
+                    pipe.set(f"{REDIS_KEY_PREFIX}{username}", json.dumps(fragment), ex=REDIS_TTL_SECONDS)
+                await pipe.execute()
+            except Exception as e:
+                logger.warning(f"⚠️ Profile card Redis write failed: {e}")
+        return fragments
+
+    async def invalidate(self, usernames: Iterable[str]) -> None:
+        usernames = list(usernames)
+        for username in usernames:
+            self._generations.bump(username)
+        self.lru.discard(usernames)
+        self._counters["invalidations"] += len(usernames)
+        redis = self.redis
+        if usernames and redis is not None:
+            await redis.delete(*(f"{REDIS_KEY_PREFIX}{username}" for username in usernames))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._counters, "lru_entries": len(self.lru._entries)}
+
+
+profile_card_cache = ProfileCardCache()
+
+
+def get_profile_card_cache() -> ProfileCardCache:
+    """Get the process-wide profile card cache"""
+    return profile_card_cache
+
+
+async def invalidate_profile_card(username: str) -> None:
+    """Best-effort helper for profile/photo edits and account deletion - never raises"""
+    try:
+        await profile_card_cache.invalidate([username])
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to invalidate profile card for {username}: {e}")
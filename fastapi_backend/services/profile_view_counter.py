@@ -0,0 +1,438 @@
+"""
+Profile View Counter
+Atomic, buffered per-(profile, viewer) view counts
+
+Every profile open used to load both user documents, then find_one +
+update_one/insert_one on profile_views (two concurrent first views created
+duplicate rows). Now:
+
+- Existence checks hit a process-local username set (refreshed every
+  USERNAME_SET_REFRESH_SECONDS; misses fall through to an indexed lookup)
+- A pair's first view is one atomic upsert ($inc / $setOnInsert) on the
+  unique (profileUsername, viewedByUsername) index
+- Repeat views of a known pair only bump Redis hashes; a background task
+  moves the pending increments into Mongo every FLUSH_INTERVAL_SECONDS with
+  one bulk_write ($inc viewCount, $max lastViewedAt)
+- Readers add the still-pending increments to the stored counts
+
+Without Redis every view is an atomic upsert. Redis keys:
+    profile_views:known:<profileUsername>
+                            viewer -> viewCount as last written to Mongo
+                            (expires KNOWN_TTL_SECONDS after the profile's last view)
+    profile_views:pending   pair -> increments not yet in Mongo
+    profile_views:last      pair -> epoch seconds of the latest buffered view
+    profile_views:totals    profileUsername -> pending increments (all viewers)
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+KNOWN_KEY_PREFIX = "profile_views:known:"
+PENDING_KEY = "profile_views:pending"
+LAST_VIEWED_KEY = "profile_views:last"
+PENDING_TOTALS_KEY = "profile_views:totals"
+BUFFER_KEYS = (PENDING_KEY, LAST_VIEWED_KEY, PENDING_TOTALS_KEY)
+
+FLUSH_INTERVAL_SECONDS = 10
+USERNAME_SET_REFRESH_SECONDS = 300
+KNOWN_TTL_SECONDS = 7 * 24 * 3600
+PAIR_SEPARATOR = "\x1f"
+UNIQUE_INDEX_NAME = "profile_viewer_unique"
+
+
+def _pair(profile_username: str, viewer_username: str) -> str:
+    return f"{profile_username}{PAIR_SEPARATOR}{viewer_username}"
+
+
+def _known_key(profile_username: str) -> str:
+    return f"{KNOWN_KEY_PREFIX}{profile_username}"
+
+
+@dataclass
+class RecordedView:
+    view_count: int
+    first_view: bool
+    view_id: Optional[str] = None
+
+
+class UsernameSet:
+    """Existing usernames, loaded once and refreshed in the background of reads"""
+
+    def __init__(self, refresh_seconds: float = USERNAME_SET_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._usernames: Set[str] = set()
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def _load(self, db):
+        usernames = set()
+        async for user in db.users.find({}, {"username": 1, "_id": 0}):
+            if user.get("username"):
+                usernames.add(user["username"])
+        self._usernames = usernames
+        self._loaded_at = time.monotonic()
+
+    async def contains(self, db, username: str) -> bool:
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_seconds:
+            async with self._lock:
+                if self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_seconds:
+                    await self._load(db)
+        if username in self._usernames:
+            return True
+        # Registered since the last load
+        if await db.users.find_one({"username": username}, {"_id": 1}):
+            self._usernames.add(username)
+            return True
+        return False
+
+    def discard(self, username: str):
+        self._usernames.discard(username)
+
+
+class ProfileViewCounter:
+    """Records profile views and serves their counts (see module docstring)"""
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self.usernames = UsernameSet()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._db = None
+        self._counters = {"upserts": 0, "buffered": 0, "flushed": 0, "flushes": 0}
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self, db, redis_client=None):
+        self._db = db
+        # Buffering only while a flusher runs
+        self.redis = redis_client
+        if self.redis is not None and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._run_flusher())
+        try:
+            await self.ensure_indexes(db)
+        except Exception as e:
+            logger.warning(f"⚠️ Profile view unique index not created (non-critical): {e}")
+        logger.info(f"✅ Profile view counter started (Redis buffering {'on' if self.redis is not None else 'off'})")
+
+    async def stop(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._flush_task = None
+        if self._db is not None and self.redis is not None:
+            try:
+                await self.flush(self._db)
+            except Exception as e:
+                logger.warning(f"⚠️ Final profile view flush failed: {e}")
+        # Later views (during shutdown) write through
+        self.redis = None
+
+    async def _run_flusher(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+            try:
+                await self.flush(self._db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Profile view flush failed (retrying next interval): {e}")
+
+    async def _create_unique_index(self, db):
+        # Partial: rows written by the legacy /views endpoint have no profileUsername
+        await db.profile_views.create_index(
+            [("profileUsername", 1), ("viewedByUsername", 1)],
+            unique=True,
+            name=UNIQUE_INDEX_NAME,
+            partialFilterExpression={"profileUsername": {"$exists": True}, "viewedByUsername": {"$exists": True}},
+        )
+
+    async def ensure_indexes(self, db):
+        """Unique pair index (legacy duplicate rows are merged first)"""
+        try:
+            await self._create_unique_index(db)
+        except (DuplicateKeyError, OperationFailure) as e:
+            if isinstance(e, OperationFailure) and e.code not in (11000, 11001):
+                raise
+            merged = await self.merge_duplicate_views(db)
+            logger.info(f"🔧 Merged {merged} duplicate profile view rows before creating the unique index")
+            await self._create_unique_index(db)
+
+    async def merge_duplicate_views(self, db) -> int:
+        """Collapse rows sharing a (profile, viewer) pair into the oldest one; returns rows removed"""
+        removed = 0
+        pipeline = [
+            {"$match": {"profileUsername": {"$exists": True}, "viewedByUsername": {"$exists": True}}},
+            {"$group": {
+                "_id": {"profile": "$profileUsername", "viewer": "$viewedByUsername"},
+                "ids": {"$push": "$_id"},
+                "viewCount": {"$sum": {"$ifNull": ["$viewCount", 1]}},
+                "firstViewedAt": {"$min": {"$ifNull": ["$firstViewedAt", "$createdAt"]}},
+                "lastViewedAt": {"$max": {"$ifNull": ["$lastViewedAt", {"$ifNull": ["$viewedAt", "$createdAt"]}]}},
+                "rows": {"$sum": 1},
+            }},
+            {"$match": {"rows": {"$gt": 1}}},
+        ]
+        async for group in db.profile_views.aggregate(pipeline, allowDiskUse=True):
+            keep, *extra = sorted(group["ids"])
+            await db.profile_views.update_one({"_id": keep}, {"$set": {
+                "viewCount": group["viewCount"],
+                "firstViewedAt": group["firstViewedAt"],
+                "lastViewedAt": group["lastViewedAt"],
+            }})
+            result = await db.profile_views.delete_many({"_id": {"$in": extra}})
+            removed += result.deleted_count
+        return removed
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    async def record_view(self, db, profile_username: str, viewer_username: str) -> RecordedView:
+        """Count one view; buffered in Redis once the pair exists in Mongo"""
+        pair = _pair(profile_username, viewer_username)
+        now = datetime.utcnow()
+
+        if self.redis is not None:
+            try:
+                known = await self.redis.hget(_known_key(profile_username), viewer_username)
+                if known is not None:
+                    pipe = self.redis.pipeline(transaction=True)
+                    pipe.hincrby(PENDING_KEY, pair, 1)
+                    pipe.hset(LAST_VIEWED_KEY, pair, now.timestamp())
+                    pipe.hincrby(PENDING_TOTALS_KEY, profile_username, 1)
+                    # Keeps the known count alive until this view is flushed
+                    pipe.expire(_known_key(profile_username), KNOWN_TTL_SECONDS)
+                    pending, _, _, _ = await pipe.execute()
+                    self._counters["buffered"] += 1
+                    return RecordedView(view_count=int(known) + int(pending), first_view=False)
+            except Exception as e:
+                logger.warning(f"⚠️ Profile view buffer unavailable, writing through: {e}")
+
+        for attempt in range(2):
+            try:
+                doc = await db.profile_views.find_one_and_update(
+                    {"profileUsername": profile_username, "viewedByUsername": viewer_username},
+                    {
+                        "$inc": {"viewCount": 1},
+                        "$set": {"lastViewedAt": now},
+                        "$setOnInsert": {"firstViewedAt": now, "createdAt": now},
+                    },
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                    projection={"viewCount": 1},
+                )
+                break
+            except DuplicateKeyError:
+                # Lost an insert race for the same pair; the retry matches the winner's row
+                if attempt:
+                    raise
+        self._counters["upserts"] += 1
+        view_count = doc.get("viewCount", 1)
+
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.hset(_known_key(profile_username), viewer_username, view_count)
+                pipe.expire(_known_key(profile_username), KNOWN_TTL_SECONDS)
+                await pipe.execute()
+            except Exception:
+                pass
+        return RecordedView(view_count=view_count, first_view=view_count == 1, view_id=str(doc["_id"]))
+
+    async def flush(self, db) -> int:
+        """Move pending Redis increments into Mongo; returns the views flushed"""
+        if self.redis is None or not await self.redis.exists(PENDING_KEY):
+            return 0
+
+        # Claim the buffer atomically; concurrent flushers (other instances) get nothing
+        suffix = uuid.uuid4().hex
+        claimed = {key: f"{key}:flushing:{suffix}" for key in BUFFER_KEYS}
+        pipe = self.redis.pipeline(transaction=True)
+        for key, claimed_key in claimed.items():
+            pipe.rename(key, claimed_key)
+        results = await pipe.execute(raise_on_error=False)
+        if isinstance(results[0], Exception):
+            return 0
+
+        pending = await self.redis.hgetall(claimed[PENDING_KEY])
+        last_viewed = await self.redis.hgetall(claimed[LAST_VIEWED_KEY]) if not isinstance(results[1], Exception) else {}
+
+        pairs = list(pending)
+        operations = []
+        for pair in pairs:
+            increment = pending[pair]
+            profile_username, viewer_username = pair.split(PAIR_SEPARATOR, 1)
+            update: Dict[str, Any] = {"$inc": {"viewCount": int(increment)}}
+            if pair in last_viewed:
+                update["$max"] = {"lastViewedAt": datetime.utcfromtimestamp(float(last_viewed[pair]))}
+            # No upsert: a pair deleted since (account deletion) stays deleted
+            operations.append(UpdateOne(
+                {"profileUsername": profile_username, "viewedByUsername": viewer_username}, update
+            ))
+        missing: Set[str] = set()
+        if operations:
+            try:
+                result = await db.profile_views.bulk_write(operations, ordered=False)
+            except Exception as e:
+                # Unordered: only the reported writes failed; otherwise assume none landed
+                if isinstance(e, BulkWriteError):
+                    failed = {pairs[error["index"]] for error in e.details.get("writeErrors", [])}
+                else:
+                    failed = set(pairs)
+                await self._requeue(claimed, pending, last_viewed, failed)
+                raise
+            if result.matched_count < len(operations):
+                missing = await self._missing_pairs(db, pairs)
+
+        pipe = self.redis.pipeline(transaction=False)
+        for pair, increment in pending.items():
+            self._advance_known(pipe, pair, increment, pair in missing)
+        pipe.delete(*claimed.values())
+        await pipe.execute()
+        if missing:
+            logger.info(f"👁️ Dropped {len(missing)} buffered profile view pairs whose rows were deleted")
+
+        flushed = sum(int(increment) for increment in pending.values())
+        self._counters["flushed"] += flushed
+        self._counters["flushes"] += 1
+        logger.debug(f"👁️ Flushed {flushed} buffered profile views ({len(operations)} pairs)")
+        return flushed
+
+    async def _requeue(self, claimed: Dict[str, str], pending: Dict[str, str],
+                       last_viewed: Dict[str, str], failed: Set[str]):
+        """Merge a claimed buffer back into the live keys after a failed flush"""
+        pipe = self.redis.pipeline(transaction=True)
+        for pair, increment in pending.items():
+            if pair in failed:
+                pipe.hincrby(PENDING_KEY, pair, int(increment))
+                pipe.hincrby(PENDING_TOTALS_KEY, pair.split(PAIR_SEPARATOR, 1)[0], int(increment))
+                if pair in last_viewed:
+                    # A view buffered since the claim is newer; keep it
+                    pipe.hsetnx(LAST_VIEWED_KEY, pair, last_viewed[pair])
+            else:
+                self._advance_known(pipe, pair, increment)
+        pipe.delete(*claimed.values())
+        await pipe.execute()
+        requeued = sum(int(pending[pair]) for pair in failed)
+        logger.warning(f"⚠️ Requeued {requeued} buffered profile views after a failed flush")
+
+    @staticmethod
+    def _advance_known(pipe, pair: str, increment: str, deleted: bool = False):
+        """Queue the known-count update for a flushed pair (dropped when its row is gone)"""
+        profile_username, viewer_username = pair.split(PAIR_SEPARATOR, 1)
+        if deleted:
+            # The next view upserts (and re-learns) the pair
+            pipe.hdel(_known_key(profile_username), viewer_username)
+        else:
+            pipe.hincrby(_known_key(profile_username), viewer_username, int(increment))
+
+    async def _missing_pairs(self, db, pairs) -> Set[str]:
+        """Flushed pairs whose profile_views row no longer exists (deleted since it was buffered)"""
+        split = [pair.split(PAIR_SEPARATOR, 1) for pair in pairs]
+        rows = db.profile_views.find(
+            {"$or": [{"profileUsername": profile, "viewedByUsername": viewer} for profile, viewer in split]},
+            {"profileUsername": 1, "viewedByUsername": 1, "_id": 0}
+        )
+        existing = {_pair(row["profileUsername"], row["viewedByUsername"]) async for row in rows}
+        return set(pairs) - existing
+
+    async def forget_user(self, db, username: str):
+        """
+        Drop a deleted user from the username set and their known pairs from Redis
+
+        Call before the user's profile_views rows are deleted: the rows name the
+        profiles whose hashes list the user as a viewer.
+        """
+        self.usernames.discard(username)
+        if self.redis is None:
+            return
+        try:
+            profiles = await db.profile_views.distinct("profileUsername", {"viewedByUsername": username})
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.delete(_known_key(username))
+            for profile_username in profiles:
+                pipe.hdel(_known_key(profile_username), username)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to clear known profile views for {username}: {e}")
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    async def _pending(self, key: str, field: str) -> int:
+        if self.redis is None:
+            return 0
+        try:
+            value = await self.redis.hget(key, field)
+        except Exception:
+            return 0
+        return int(value) if value else 0
+
+    async def get_viewer_metrics(self, db, profile_username: str, viewer_username: str) -> Dict[str, Any]:
+        """A viewer's count and latest view of one profile, including pending views"""
+        view = await db.profile_views.find_one({
+            "profileUsername": profile_username,
+            "viewedByUsername": viewer_username
+        })
+        if not view:
+            return {"lastViewedAt": None, "viewCount": 0}
+
+        pair = _pair(profile_username, viewer_username)
+        last_viewed_at = view.get("lastViewedAt") or view.get("viewedAt") or view.get("createdAt")
+        if self.redis is not None:
+            try:
+                buffered_at = await self.redis.hget(LAST_VIEWED_KEY, pair)
+                if buffered_at:
+                    buffered_at = datetime.utcfromtimestamp(float(buffered_at))
+                    if not last_viewed_at or buffered_at > last_viewed_at:
+                        last_viewed_at = buffered_at
+            except Exception:
+                pass
+
+        return {
+            "lastViewedAt": last_viewed_at,
+            "viewCount": view.get("viewCount", 1) + await self._pending(PENDING_KEY, pair),
+        }
+
+    async def get_profile_totals(self, db, profile_username: str) -> Dict[str, int]:
+        """Total views (stored + pending) and unique viewers of a profile"""
+        result = await db.profile_views.aggregate([
+            {"$match": {"profileUsername": profile_username}},
+            {"$group": {
+                "_id": None,
+                "totalViews": {"$sum": {"$ifNull": ["$viewCount", 1]}},
+                "viewers": {"$addToSet": "$viewedByUsername"},
+            }},
+            {"$project": {"totalViews": 1, "uniqueViewers": {"$size": "$viewers"}}},
+        ]).to_list(1)
+        stored = result[0] if result else {"totalViews": 0, "uniqueViewers": 0}
+        return {
+            "totalViews": stored["totalViews"] + await self._pending(PENDING_TOTALS_KEY, profile_username),
+            "uniqueViewers": stored["uniqueViewers"],
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._counters, "buffering": self.redis is not None}
+
+
+profile_view_counter = ProfileViewCounter()
+
+
+def get_profile_view_counter() -> ProfileViewCounter:
+    """Get the process-wide profile view counter"""
+    return profile_view_counter
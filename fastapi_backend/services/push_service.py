@@ -3,6 +3,7 @@ Push Notification Service
 Handles Firebase Cloud Messaging (FCM) integration for push notifications
 """
 
+import asyncio
 import os
 import json
 import logging
@@ -11,6 +12,9 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# FCM accepts at most 500 tokens per multicast request
+MULTICAST_BATCH_SIZE = 500
+
 # Firebase Admin SDK
 try:
     import firebase_admin
@@ -161,7 +165,7 @@ class PushNotificationService:
         Send push notification to multiple device tokens (multicast)
         
         Args:
-            tokens: List of FCM device tokens (max 500)
+            tokens: List of FCM device tokens (sent in batches of 500)
             title: Notification title
             body: Notification message body
             data: Additional data payload (optional)
@@ -187,11 +191,6 @@ class PushNotificationService:
                 "failedTokens": []
             }
         
-        # FCM limits multicast to 500 tokens
-        if len(tokens) > 500:
-            logger.warning(f"Too many tokens ({len(tokens)}), splitting into batches")
-            tokens = tokens[:500]
-        
         try:
             # Build notification
             notification = messaging.Notification(
@@ -199,72 +198,94 @@ class PushNotificationService:
                 body=body,
                 image=image_url if image_url else None
             )
-            
-            # Build multicast message
-            message = messaging.MulticastMessage(
-                tokens=tokens,
-                notification=notification,
-                data=data or {},
-                android=messaging.AndroidConfig(
-                    priority='high',
-                    notification=messaging.AndroidNotification(
-                        icon='notification_icon',
-                        color='#4285F4',
-                        sound='default'
-                    )
-                ),
-                apns=messaging.APNSConfig(
-                    payload=messaging.APNSPayload(
-                        aps=messaging.Aps(
-                            sound='default',
-                            badge=1
-                        )
-                    )
-                ),
-                webpush=messaging.WebpushConfig(
-                    notification=messaging.WebpushNotification(
-                        icon='https://l3v3lmatches.com/logo192.png',
-                        badge='https://l3v3lmatches.com/logo192.png'
+            android = messaging.AndroidConfig(
+                priority='high',
+                notification=messaging.AndroidNotification(
+                    icon='notification_icon',
+                    color='#4285F4',
+                    sound='default'
+                )
+            )
+            apns = messaging.APNSConfig(
+                payload=messaging.APNSPayload(
+                    aps=messaging.Aps(
+                        sound='default',
+                        badge=1
                     )
                 )
             )
+            webpush = messaging.WebpushConfig(
+                notification=messaging.WebpushNotification(
+                    icon='https://l3v3lmatches.com/logo192.png',
+                    badge='https://l3v3lmatches.com/logo192.png'
+                )
+            )
+        except Exception as e:
+            logger.error(f"Failed to build multicast notification: {type(e).__name__}: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "successCount": 0,
+                "failureCount": len(tokens)
+            }
+        
+        success_count = 0
+        failure_count = 0
+        failed_tokens = []
+        errors = []
+        
+        # FCM limits multicast to 500 tokens, so send in chunks of that size
+        for start in range(0, len(tokens), MULTICAST_BATCH_SIZE):
+            batch = tokens[start:start + MULTICAST_BATCH_SIZE]
+            try:
+                # Build multicast message
+                message = messaging.MulticastMessage(
+                    tokens=batch,
+                    notification=notification,
+                    data=data or {},
+                    android=android,
+                    apns=apns,
+                    webpush=webpush
+                )
+                
+                # Send using send_each_for_multicast (replaces deprecated send_multicast)
+                # This uses the newer FCM v1 API instead of the deprecated batch endpoint.
+                # The SDK call is blocking, so keep it off the event loop.
+                response = await asyncio.to_thread(messaging.send_each_for_multicast, message)
+            except Exception as e:
+                logger.error(f"Failed to send multicast notification: {type(e).__name__}: {e}")
+                import traceback
+                logger.error(f"Traceback: {traceback.format_exc()}")
+                errors.append(str(e))
+                failure_count += len(batch)
+                continue
             
-            # Send using send_each_for_multicast (replaces deprecated send_multicast)
-            # This uses the newer FCM v1 API instead of the deprecated batch endpoint
-            response = messaging.send_each_for_multicast(message)
+            success_count += response.success_count
+            failure_count += response.failure_count
             
             # Collect failed tokens
-            failed_tokens = []
             if response.failure_count > 0:
                 for idx, result in enumerate(response.responses):
                     if not result.success:
                         failed_tokens.append({
-                            "token": tokens[idx],
+                            "token": batch[idx],
                             "error": str(result.exception) if result.exception else "Unknown error"
                         })
-            
-            logger.info(
-                f"✅ Multicast sent - Success: {response.success_count}, "
-                f"Failed: {response.failure_count}"
-            )
-            
-            return {
-                "success": response.success_count > 0,
-                "successCount": response.success_count,
-                "failureCount": response.failure_count,
-                "failedTokens": failed_tokens
-            }
-            
-        except Exception as e:
-            logger.error(f"Failed to send multicast notification: {type(e).__name__}: {e}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            return {
-                "success": False,
-                "error": str(e),
-                "successCount": 0,
-                "failureCount": len(tokens)
-            }
+        
+        logger.info(
+            f"✅ Multicast sent - Success: {success_count}, "
+            f"Failed: {failure_count} ({len(tokens)} tokens)"
+        )
+        
+        result = {
+            "success": success_count > 0,
+            "successCount": success_count,
+            "failureCount": failure_count,
+            "failedTokens": failed_tokens
+        }
+        if errors:
+            result["error"] = errors[0]
+        return result
     
     async def send_to_topic(
         self,
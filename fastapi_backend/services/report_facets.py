@@ -0,0 +1,219 @@
+"""
+Report Facets
+Derived, non-sensitive user fields that admin reports can $group on
+
+`location` is Fernet-encrypted, and the profession category is a regex match
+over `occupation`/`workExperience`, so the by-location and by-profession
+reports used to load users into Python (capped at 1,000) and decrypt or
+categorize them one by one. Each user document now carries:
+
+- locationFacet: {"city", "state", "country", "key", "label"} - normalized
+  city name, state code (US two-letter code when known) and country code,
+  with `key` as the grouping id ("boston|ma|us") and `label` for display
+- professionFacet: {"category", "title"} - report category and the text it
+  was derived from
+
+Both are computed from plaintext at registration and profile update
+(facet_updates) and backfilled by migrations/backfill_report_facets.py.
+"""
+
+import json
+import logging
+import re
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+US_STATES = {
+    "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas", "CA": "California",
+    "CO": "Colorado", "CT": "Connecticut", "DE": "Delaware", "FL": "Florida", "GA": "Georgia",
+    "HI": "Hawaii", "ID": "Idaho", "IL": "Illinois", "IN": "Indiana", "IA": "Iowa",
+    "KS": "Kansas", "KY": "Kentucky", "LA": "Louisiana", "ME": "Maine", "MD": "Maryland",
+    "MA": "Massachusetts", "MI": "Michigan", "MN": "Minnesota", "MS": "Mississippi",
+    "MO": "Missouri", "MT": "Montana", "NE": "Nebraska", "NV": "Nevada", "NH": "New Hampshire",
+    "NJ": "New Jersey", "NM": "New Mexico", "NY": "New York", "NC": "North Carolina",
+    "ND": "North Dakota", "OH": "Ohio", "OK": "Oklahoma", "OR": "Oregon", "PA": "Pennsylvania",
+    "RI": "Rhode Island", "SC": "South Carolina", "SD": "South Dakota", "TN": "Tennessee",
+    "TX": "Texas", "UT": "Utah", "VT": "Vermont", "VA": "Virginia", "WA": "Washington",
+    "WV": "West Virginia", "WI": "Wisconsin", "WY": "Wyoming", "DC": "DC",
+}
+_STATE_CODES = {name.lower(): code for code, name in US_STATES.items()}
+
+_COUNTRY_ALIASES = {
+    "usa": "US", "u.s.": "US", "u.s.a.": "US", "united states": "US", "united states of america": "US",
+    "india": "IN", "canada": "CA", "uk": "GB", "united kingdom": "GB",
+}
+
+# Pre-compiled regex patterns for profession categorization (first match wins)
+PROFESSION_PATTERNS = {
+    "Physicians & Doctors": re.compile(r"doctor|physician|medical|surgeon|pediatrician|dentist|optometrist|anesthesia|residency|fellowship", re.IGNORECASE),
+    "Technology & Software": re.compile(r"software|developer|programmer|tech|biotech", re.IGNORECASE),
+    "IT & Infrastructure": re.compile(r"it|support|system|network|admin|information technology", re.IGNORECASE),
+    "Data & Analytics": re.compile(r"data|analyst|science|analytics|research scientist|quant", re.IGNORECASE),
+    "Management & Leadership": re.compile(r"manager|management|lead|director|vice president|relationship manager", re.IGNORECASE),
+    "Consulting": re.compile(r"consultant|consulting|advisor", re.IGNORECASE),
+    "Engineering": re.compile(r"engineer|engineering|mechanical|civil|product manager", re.IGNORECASE),
+    "Education": re.compile(r"teacher|professor|education|academic|student|medical student", re.IGNORECASE),
+    "Sales & Marketing": re.compile(r"sales|marketing|business|revenue|human resources|hr", re.IGNORECASE),
+    "Finance & Accounting": re.compile(r"finance|financial|accounting|banking", re.IGNORECASE),
+    "Legal": re.compile(r"legal|lawyer|attorney|paralegal", re.IGNORECASE),
+    "Healthcare": re.compile(r"nurse|healthcare|pharmacist|physical therapy|therapy|patient|optometrist", re.IGNORECASE),
+    "Creative & Design": re.compile(r"design|creative|artist|writer|marketing", re.IGNORECASE),
+    "Other Services": re.compile(r"transportation|dept of transportation|non profit", re.IGNORECASE)
+}
+
+# Plaintext user fields the facets are derived from
+FACET_SOURCE_FIELDS = ("location", "state", "countryOfResidence", "occupation", "workExperience")
+
+
+def normalize_state(value: Optional[str]) -> Optional[str]:
+    """US two-letter code when recognizable, otherwise the title-cased name"""
+    if not value or not str(value).strip():
+        return None
+    value = str(value).strip()
+    if value.upper() in US_STATES:
+        return value.upper()
+    return _STATE_CODES.get(value.lower(), value.title())
+
+
+def normalize_country(value: Optional[str]) -> Optional[str]:
+    if not value or not str(value).strip():
+        return None
+    value = str(value).strip()
+    alias = _COUNTRY_ALIASES.get(value.lower())
+    if alias:
+        return alias
+    return value.upper() if len(value) <= 3 else value.title()
+
+
+def build_location_facet(
+    location: Optional[str],
+    state: Optional[str] = None,
+    country: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Facet for a plaintext location ("Boston, MA", "Pune, Maharashtra, India")
+
+    Args:
+        location: Decrypted location string
+        state: Profile `state` field, used when the location has no state part
+        country: Profile `countryOfResidence`, used when the location has no country part
+    """
+    if not location or not isinstance(location, str) or not location.strip():
+        return None
+    parts = [p.strip() for p in location.split(",") if p.strip()]
+    if not parts:
+        return None
+
+    city = parts[0].title()
+    state_code = normalize_state(parts[1] if len(parts) > 1 else state)
+    country_code = normalize_country(parts[2] if len(parts) > 2 else country)
+    if country_code is None and state_code in US_STATES:
+        country_code = "US"
+
+    label = ", ".join(p for p in (city, state_code) if p)
+    if country_code and country_code != "US":
+        label = f"{label}, {country_code}"
+    return {
+        "city": city,
+        "state": state_code,
+        "country": country_code,
+        "key": "|".join((p or "").lower() for p in (city, state_code, country_code)),
+        "label": label,
+    }
+
+
+def categorize_profession(profession_text: Optional[str]) -> str:
+    """Report category for an occupation/position string"""
+    if not profession_text or profession_text.strip() == "":
+        return "Other"
+
+    profession_lower = profession_text.lower()
+    for category, pattern in PROFESSION_PATTERNS.items():
+        if pattern.search(profession_lower):
+            return category
+    return "Other"
+
+
+def profession_text(user: Dict[str, Any]) -> str:
+    """Occupation, or the first workExperience entry's position/description/company"""
+    text = user.get("occupation", "")
+
+    if not text or text.strip() == "":
+        work_experience = user.get("workExperience", [])
+        if work_experience and len(work_experience) > 0:
+            try:
+                if isinstance(work_experience, str):
+                    work_exp = json.loads(work_experience)
+                else:
+                    work_exp = work_experience
+
+                if work_exp and len(work_exp) > 0:
+                    first_job = work_exp[0]
+                    text = (
+                        first_job.get("position", "") or
+                        first_job.get("description", "") or
+                        first_job.get("company", "")
+                    )
+                    if text is None:
+                        text = ""
+            except Exception as e:
+                logger.debug(f"Error parsing workExperience for user {user.get('username')}: {e}")
+                text = ""
+
+    return text or "Other"
+
+
+def build_profession_facet(user: Dict[str, Any]) -> Dict[str, str]:
+    title = profession_text(user)
+    return {"category": categorize_profession(title), "title": title}
+
+
+def _stored_location(current: Dict[str, Any]) -> Optional[str]:
+    """Plaintext of a user document's (encrypted) location; None if it can't be read"""
+    location = current.get("location")
+    if not location:
+        return None
+    try:
+        from crypto_utils import get_encryptor
+        return get_encryptor().decrypt(location)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not decrypt location for facet rebuild: {e}")
+        return None
+
+
+def facet_updates(changes: Dict[str, Any], current: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    $set fields for the facets affected by a profile write
+
+    Args:
+        changes: Plaintext fields being written (before PII encryption)
+        current: Existing user document, for fields the write doesn't touch
+            (its encrypted `location` is decrypted only when state or country
+            change without it)
+    """
+    current = current or {}
+    updates: Dict[str, Any] = {}
+
+    location_changed = "location" in changes
+    if location_changed or "state" in changes or "countryOfResidence" in changes:
+        # State/country-only writes rebuild from the stored location (left alone if unreadable)
+        location = changes.get("location") if location_changed else _stored_location(current)
+        if location_changed or location:
+            updates["locationFacet"] = build_location_facet(
+                location,
+                state=changes.get("state", current.get("state")),
+                country=changes.get("countryOfResidence", current.get("countryOfResidence")),
+            )
+    if "occupation" in changes or "workExperience" in changes:
+        updates["professionFacet"] = build_profession_facet({
+            "occupation": changes.get("occupation", current.get("occupation")),
+            "workExperience": changes.get("workExperience", current.get("workExperience")),
+        })
+    return updates
+
+
+async def ensure_facet_indexes(db):
+    """Indexes backing the $group reports"""
+    await db.users.create_index([("accountStatus", 1), ("locationFacet.key", 1)])
+    await db.users.create_index([("accountStatus", 1), ("professionFacet.category", 1)])
@@ -0,0 +1,133 @@
+"""
+Search Result Cache
+Redis cache of ordered /search candidate lists keyed by normalized criteria
+
+The same criteria (mostly saved searches) run for many different viewers, so
+the ordered username list for a criteria set is shared: it is stored once
+without any viewer-specific conditions, and each request post-filters its own
+exclusions and self before paginating. Pages are still joined against the
+live query, so a stale entry can never surface a paused or changed profile.
+
+Invalidation is a single INCR of a generation counter: every entry records
+the generation it was filled under, and an entry from an older generation is
+a miss. Profile approvals, pauses, status changes and scored-field updates bump
+it. A lookup reads the counter and the entry with one MGET on the async Redis
+client, so the event loop never blocks on Redis.
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from async_redis_manager import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_PREFIX = "search_cache:"
+GENERATION_KEY = f"{SEARCH_CACHE_PREFIX}generation"
+SEARCH_CACHE_TTL = 300          # 5 minutes
+MAX_CACHED_IDS = 5000           # Larger result sets are paginated in Mongo instead
+UNCACHEABLE = "__uncacheable__"
+
+
+def normalize_criteria(criteria: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop empty values and canonicalize strings/lists so equivalent searches share a key"""
+    normalized = {}
+    for name, value in criteria.items():
+        if isinstance(value, str):
+            value = value.strip().lower()
+        elif isinstance(value, (list, tuple, set)):
+            value = sorted({str(v).strip().lower() for v in value if str(v).strip()})
+        if value in (None, "", [], 0, False):
+            continue
+        normalized[name] = value
+    return normalized
+
+
+@dataclass
+class CachedSearch:
+    """Result of a cache lookup"""
+    generation: str                     # Pass back to store() when filling a miss
+    usernames: Optional[List[str]]      # Ordered usernames, or None on a miss
+    uncacheable: bool = False           # A previous fill found the result set too large
+
+
+class SearchResultCache:
+    """Best-effort cache: every Redis failure degrades to a cache miss"""
+
+    def __init__(self, redis_manager=None):
+        self.redis = redis_manager or get_async_redis()
+
+    @property
+    def client(self):
+        return self.redis.redis_client
+
+    @property
+    def available(self) -> bool:
+        return self.client is not None
+
+    @staticmethod
+    def _key(criteria: Dict[str, Any]) -> str:
+        payload = json.dumps(normalize_criteria(criteria), sort_keys=True, default=str)
+        return f"{SEARCH_CACHE_PREFIX}{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+    async def lookup(self, criteria: Dict[str, Any]) -> Optional[CachedSearch]:
+        """
+        Current generation and cached ordered usernames for `criteria` (one round trip)
+
+        Returns:
+            CachedSearch ([] usernames for a cached empty result), or None when
+            Redis is unavailable
+        """
+        if not self.client:
+            return None
+        try:
+            generation, cached = await self.client.mget([GENERATION_KEY, self._key(criteria)])
+        except Exception as e:
+            logger.warning(f"⚠️ Search cache get failed: {e}")
+            return None
+        generation = generation or "0"
+        if cached is None:
+            return CachedSearch(generation, None)
+        cached_generation, _, body = cached.partition("\n")
+        if cached_generation != generation:
+            return CachedSearch(generation, None)
+        if body == UNCACHEABLE:
+            return CachedSearch(generation, None, uncacheable=True)
+        return CachedSearch(generation, body.split("\n") if body else [])
+
+    async def store(self, criteria: Dict[str, Any], generation: str, usernames: Optional[List[str]]) -> None:
+        """
+        Store ordered usernames filled under `generation` (None marks the criteria
+        as too large to cache)
+
+        Using the generation read before the fill means an invalidation that
+        lands mid-fill leaves the entry already stale.
+        """
+        if not self.client:
+            return
+        body = UNCACHEABLE if usernames is None else "\n".join(usernames)
+        try:
+            await self.client.setex(self._key(criteria), SEARCH_CACHE_TTL, f"{generation}\n{body}")
+        except Exception as e:
+            logger.warning(f"⚠️ Search cache set failed: {e}")
+
+    async def invalidate(self, reason: str = "") -> None:
+        """Retire every cached result set by bumping the generation"""
+        if not self.client:
+            return
+        try:
+            await self.client.incr(GENERATION_KEY)
+            logger.debug(f"🔍 Search cache invalidated ({reason})")
+        except Exception as e:
+            logger.warning(f"⚠️ Search cache invalidation failed: {e}")
+
+
+async def invalidate_search_cache(reason: str) -> None:
+    """Best-effort helper for request paths - never raises"""
+    try:
+        await SearchResultCache().invalidate(reason)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to invalidate search cache: {e}")
@@ -0,0 +1,242 @@
+"""
+Search Snapshot Service
+Per-viewer materialized candidate list for /search
+
+Each active viewer gets one document in `l3v3l_search_snapshots` holding a
+compact array of the candidates they can see, with everything /search needs
+to filter, sort and paginate (matchScore, level, hasPhoto, createdAt,
+birthYear/Month). The L3V3L score job keeps it in sync with l3v3l_scores:
+full rows are replaced when a viewer is scored, single entries are upserted
+when a candidate's column is recomputed and pulled when a candidate leaves
+the active pool. Photo edits update hasPhoto across snapshots directly, since
+images are not scored.
+
+Users still waiting in the score job's dirty queue may differ from their
+entries; search reconciles them against the live query before paging (see
+page()'s require_usernames) so pages and totals come from one filtered set.
+
+Search pages a snapshot server-side and joins full profile fields only for
+the returned usernames, so the hot path no longer joins l3v3l_scores for
+every matched user.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_COLLECTION = "l3v3l_search_snapshots"
+WRITE_BATCH_SIZE = 500
+
+# Search falls back to the live query when more dirty users than this are queued
+MAX_PENDING_RECONCILE = 500
+
+# Roles hidden from search results (mirrors the role exclusion in search_users)
+_HIDDEN_ROLES = {"admin", "moderator"}
+
+# sortBy -> snapshot sort keys (username keeps pagination stable)
+SNAPSHOT_SORTS = {
+    "newest": [("createdAt", -1), ("username", -1)],
+    "oldest": [("createdAt", 1), ("username", 1)],
+    "age": [("birthYear", -1), ("birthMonth", -1), ("username", -1)],
+}
+
+
+def is_searchable(candidate: dict) -> bool:
+    """Whether a candidate may appear in other users' search results"""
+    role = str(candidate.get("role") or "").lower()
+    role_name = str(candidate.get("role_name") or "").lower()
+    return role not in _HIDDEN_ROLES and role_name not in _HIDDEN_ROLES
+
+
+def has_photo_flag(images: Any) -> int:
+    """Stored users.hasPhoto value (1/0) for an images list; search sorts photos first on it"""
+    return 1 if isinstance(images, list) and len(images) > 0 else 0
+
+
+async def ensure_user_search_indexes(db):
+    """Index backing the default /search order (photos first, newest, _id tiebreak)"""
+    await db.users.create_index([("hasPhoto", -1), ("createdAt", -1), ("_id", -1)])
+
+
+async def backfill_has_photo(db, only_missing: bool = True) -> int:
+    """
+    Set users.hasPhoto from images server-side; returns the number of users updated
+
+    Keyset search compares hasPhoto with plain range operators, so a user
+    without the field would fall out of cursor pages until this runs.
+    """
+    query = {"hasPhoto": {"$exists": False}} if only_missing else {}
+    result = await db.users.update_many(query, [{"$set": {"hasPhoto": {"$cond": {
+        "if": {"$gt": [{"$size": {"$ifNull": ["$images", []]}}, 0]},
+        "then": 1,
+        "else": 0
+    }}}}])
+    return result.modified_count
+
+
+def build_entry(candidate: dict, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact snapshot entry for one scored candidate"""
+    return {
+        "username": candidate["username"],
+        "matchScore": result["total_score"],
+        "level": result["compatibility_level"],
+        "hasPhoto": has_photo_flag(candidate.get("images")),
+        "createdAt": candidate.get("createdAt"),
+        "birthYear": candidate.get("birthYear"),
+        "birthMonth": candidate.get("birthMonth"),
+    }
+
+
+class SearchSnapshotService:
+    """Maintains and pages per-viewer search snapshots"""
+
+    def __init__(self, db):
+        self.db = db
+        self.collection = db[SNAPSHOT_COLLECTION]
+
+    async def ensure_indexes(self):
+        """Create indexes used when a candidate is updated or removed across snapshots"""
+        await self.collection.create_index([("candidates.username", 1)])
+
+    async def replace(self, viewer: str, candidates: List[dict], results: List[Dict[str, Any]]) -> None:
+        """Replace a viewer's whole snapshot (results aligned with candidates)"""
+        entries = [
+            build_entry(candidate, result)
+            for candidate, result in zip(candidates, results)
+            if is_searchable(candidate)
+        ]
+        await self.collection.replace_one(
+            {"_id": viewer},
+            {"candidates": entries, "updatedAt": datetime.utcnow()},
+            upsert=True
+        )
+
+    def upsert_candidate_ops(self, viewer: str, candidate: dict, result: Dict[str, Any]) -> List[UpdateOne]:
+        """Bulk ops that set (or add) one candidate in an existing viewer snapshot"""
+        if not is_searchable(candidate):
+            return [self.pull_candidate_op(viewer, candidate["username"])]
+        entry = build_entry(candidate, result)
+        username = entry["username"]
+        return [
+            UpdateOne(
+                {"_id": viewer, "candidates.username": username},
+                {"$set": {"candidates.$": entry}}
+            ),
+            UpdateOne(
+                {"_id": viewer, "candidates.username": {"$ne": username}},
+                {"$push": {"candidates": entry}}
+            ),
+        ]
+
+    async def set_candidate_photo(self, username: str, has_photo: int) -> None:
+        """Update one candidate's hasPhoto in every snapshot that lists them"""
+        await self.collection.update_many(
+            {"candidates.username": username},
+            {"$set": {"candidates.$[c].hasPhoto": has_photo}},
+            array_filters=[{"c.username": username}]
+        )
+
+    @staticmethod
+    def pull_candidate_op(viewer: str, username: str) -> UpdateOne:
+        return UpdateOne({"_id": viewer}, {"$pull": {"candidates": {"username": username}}})
+
+    async def remove_candidate(self, username: str, keep_viewers: Optional[List[str]] = None) -> None:
+        """Pull a candidate from every snapshot (except keep_viewers)"""
+        query: Dict[str, Any] = {"candidates.username": username}
+        if keep_viewers is not None:
+            query["_id"] = {"$nin": keep_viewers}
+        await self.collection.update_many(query, {"$pull": {"candidates": {"username": username}}})
+
+    async def remove_viewer(self, username: str) -> None:
+        """Drop a user's own snapshot and their entry in everyone else's"""
+        await self.collection.delete_one({"_id": username})
+        await self.remove_candidate(username)
+
+    async def write(self, ops: List[UpdateOne]) -> None:
+        for i in range(0, len(ops), WRITE_BATCH_SIZE):
+            await self.collection.bulk_write(ops[i:i + WRITE_BATCH_SIZE], ordered=True)
+
+    async def page(
+        self,
+        viewer: str,
+        exclude_usernames: List[str],
+        age_min: Optional[int] = None,
+        age_max: Optional[int] = None,
+        has_photo: bool = False,
+        sort_by: str = "newest",
+        sort_order: str = "desc",
+        skip: int = 0,
+        limit: int = 20,
+        require_usernames: Optional[List[str]] = None
+    ) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """
+        Filter, sort and paginate a viewer's snapshot server-side
+
+        require_usernames: users known to match the live query; a snapshot
+                           missing any of them (e.g. approved since it was
+                           built) is incomplete
+
+        Returns:
+            (page entries, total) or None when the viewer has no complete snapshot
+        """
+        snapshot_query: Dict[str, Any] = {"_id": viewer}
+        if require_usernames:
+            snapshot_query["candidates.username"] = {"$all": require_usernames}
+        if not await self.collection.count_documents(snapshot_query, limit=1):
+            return None
+
+        conditions: List[Dict[str, Any]] = [{"username": {"$nin": exclude_usernames}}]
+        if has_photo:
+            conditions.append({"hasPhoto": 1})
+
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": {"_id": viewer}},
+            {"$unwind": "$candidates"},
+            {"$replaceRoot": {"newRoot": "$candidates"}},
+        ]
+        if age_min is not None or age_max is not None:
+            now = datetime.now()
+            pipeline.append({"$addFields": {"calculatedAge": {"$cond": {
+                "if": {"$and": [{"$ne": ["$birthMonth", None]}, {"$ne": ["$birthYear", None]}]},
+                "then": {"$subtract": [
+                    {"$subtract": [now.year, "$birthYear"]},
+                    {"$cond": {"if": {"$lt": [now.month, "$birthMonth"]}, "then": 1, "else": 0}}
+                ]},
+                "else": None
+            }}}})
+            conditions.append({"calculatedAge": {"$ne": None}})
+            if age_min is not None:
+                conditions.append({"calculatedAge": {"$gte": age_min}})
+            if age_max is not None:
+                conditions.append({"calculatedAge": {"$lte": age_max}})
+
+        sort = SNAPSHOT_SORTS.get(sort_by, SNAPSHOT_SORTS["newest"])
+        if sort_order == "asc":
+            sort = [(field, 1) for field, _ in sort]
+
+        pipeline += [
+            {"$match": {"$and": conditions}},
+            {"$sort": {"hasPhoto": -1, **dict(sort)}},
+            {"$facet": {
+                "users": [{"$skip": skip}, {"$limit": limit}],
+                "totalCount": [{"$count": "count"}]
+            }}
+        ]
+
+        result = await self.collection.aggregate(pipeline).to_list(1)
+        if not result:
+            return [], 0
+        total_count = result[0].get("totalCount", [])
+        return result[0].get("users", []), total_count[0]["count"] if total_count else 0
+
+
+async def sync_candidate_photo(db, username: str, images: Any) -> None:
+    """Best-effort helper for photo edit paths - never raises"""
+    try:
+        await SearchSnapshotService(db).set_candidate_photo(username, has_photo_flag(images))
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to sync search snapshot photo flag for {username}: {e}")
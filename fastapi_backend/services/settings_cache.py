@@ -0,0 +1,240 @@
+"""
+Settings Cache
+Process-local cache of global configuration documents shared across instances
+
+System settings, role config and site settings are read on hot paths (every
+/search, conversation list item and /media request) but change only when an
+admin saves them. Each document is loaded once per process and served from
+memory:
+
+- Every save goes through `invalidate()`, which bumps the document's counter
+  in `settings_versions`, drops the local copy and publishes the new version
+  on the `settings:invalidate` Redis channel
+- One pub/sub listener per process drops its copy when a newer version is
+  announced, so every instance reloads within a second of a save
+- Without a live listener (Redis down or reconnecting) entries are checked
+  against their Mongo version counter every FALLBACK_CHECK_SECONDS instead
+
+Missing documents are cached too (as None), so absent settings cost nothing.
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "settings:invalidate"
+VERSIONS_COLLECTION = "settings_versions"
+FALLBACK_CHECK_SECONDS = 30
+RECONNECT_MAX_BACKOFF_SECONDS = 30
+
+# Cache name -> (collection, document _id)
+SETTINGS_SOURCES = {
+    "system_settings": ("system_settings", "global"),
+    "role_config": ("role_config", "default"),
+    "site_settings": ("site_settings", "site_settings"),
+}
+
+
+class SettingsCache:
+    """In-memory settings documents, invalidated by version counter and pub/sub"""
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Bumped on every local drop so a load racing an invalidation is discarded
+        self._generations: Dict[str, int] = {name: 0 for name in SETTINGS_SOURCES}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._listener_task: Optional[asyncio.Task] = None
+        self._listener_connected = False
+        self._counters = {"hits": 0, "loads": 0, "invalidations": 0, "listener_reconnects": 0}
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self, db, redis_client=None):
+        """Preload every document and, with Redis, start the invalidation listener"""
+        for name in SETTINGS_SOURCES:
+            try:
+                await self.get(db, name)
+            except Exception as e:
+                logger.warning(f"⚠️ Settings cache preload failed for {name}: {e}")
+        if redis_client is not None and self._listener_task is None:
+            self._listener_task = asyncio.create_task(self._run_listener(redis_client))
+        logger.info(f"✅ Settings cache loaded ({len(self._entries)} documents, "
+                    f"pub/sub invalidation {'on' if redis_client is not None else 'off'})")
+
+    async def stop(self):
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener_task = None
+        self._listener_connected = False
+
+    async def _run_listener(self, redis_client):
+        """Drop local entries announced on INVALIDATION_CHANNEL, reconnecting with backoff"""
+        backoff = 1
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                if self._counters["listener_reconnects"]:
+                    # Saves made while disconnected were never announced
+                    self.clear()
+                self._listener_connected = True
+                backoff = 1
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._on_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Settings cache listener error, reconnecting in {backoff}s: {e}")
+            finally:
+                self._listener_connected = False
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            self._counters["listener_reconnects"] += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_BACKOFF_SECONDS)
+
+    def _on_message(self, data: str):
+        try:
+            payload = json.loads(data)
+            name, version = payload["name"], int(payload["version"])
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+            logger.warning(f"⚠️ Ignoring malformed settings invalidation: {data!r}")
+            return
+        entry = self._entries.get(name)
+        if entry is None or entry["version"] < version:
+            self._drop(name)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    async def get_document(self, db, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Cached document (None if it does not exist)
+
+        The returned dict is shared: read it, never mutate it. Use get() for a
+        private copy.
+        """
+        entry = self._entries.get(name)
+        if entry is not None and not self._listener_connected \
+                and time.monotonic() - entry["checkedAt"] > FALLBACK_CHECK_SECONDS:
+            entry = await self._verify(db, name, entry)
+        if entry is not None:
+            self._counters["hits"] += 1
+            return entry["doc"]
+
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = await self._load(db, name)
+        return entry["doc"]
+
+    async def get(self, db, name: str) -> Optional[Dict[str, Any]]:
+        """Private (deep) copy of the cached document"""
+        return copy.deepcopy(await self.get_document(db, name))
+
+    async def get_value(self, db, name: str, key: str, default: Any = None) -> Any:
+        doc = await self.get_document(db, name)
+        return doc.get(key, default) if doc else default
+
+    async def _current_version(self, db, name: str) -> int:
+        version_doc = await db[VERSIONS_COLLECTION].find_one({"_id": name})
+        return version_doc.get("version", 0) if version_doc else 0
+
+    async def _load(self, db, name: str) -> Dict[str, Any]:
+        collection, doc_id = SETTINGS_SOURCES[name]
+        generation = self._generations[name]
+        version = await self._current_version(db, name)
+        doc = await db[collection].find_one({"_id": doc_id})
+        if doc is None and name == "system_settings":
+            # Some deployments stored the global settings without the "global" _id
+            doc = await db[collection].find_one({})
+
+        entry = {"doc": doc, "version": version, "checkedAt": time.monotonic()}
+        self._counters["loads"] += 1
+        if self._generations[name] == generation:
+            self._entries[name] = entry
+        return entry
+
+    async def _verify(self, db, name: str, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Fallback freshness check: keep the entry if its version is still current"""
+        try:
+            version = await self._current_version(db, name)
+        except Exception as e:
+            logger.warning(f"⚠️ Settings version check failed for {name}: {e}")
+            return entry
+        if version == entry["version"]:
+            entry["checkedAt"] = time.monotonic()
+            return entry
+        self._drop(name)
+        return None
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def _drop(self, name: str):
+        self._generations[name] = self._generations.get(name, 0) + 1
+        self._entries.pop(name, None)
+
+    def clear(self):
+        for name in list(self._entries):
+            self._drop(name)
+
+    async def invalidate(self, db, name: str) -> int:
+        """
+        Call after saving a settings document: bumps its version, drops the
+        local copy and tells the other instances
+
+        Returns:
+            The new version
+        """
+        version_doc = await db[VERSIONS_COLLECTION].find_one_and_update(
+            {"_id": name},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        version = version_doc["version"]
+        self._drop(name)
+        self._counters["invalidations"] += 1
+
+        from async_redis_manager import async_redis_manager
+        if async_redis_manager.redis_client is not None:
+            await async_redis_manager.publish(
+                INVALIDATION_CHANNEL, json.dumps({"name": name, "version": version})
+            )
+        logger.info(f"🔄 Settings cache invalidated: {name} v{version}")
+        return version
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._counters,
+            "cached": sorted(self._entries),
+            "listenerConnected": self._listener_connected,
+        }
+
+
+settings_cache = SettingsCache()
+
+
+def get_settings_cache() -> SettingsCache:
+    """Get the process-wide settings cache"""
+    return settings_cache
@@ -9,6 +9,8 @@ from datetime import datetime, timezone
 from typing import Dict, Any, Optional
 import logging
 
+from services.settings_cache import settings_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,7 +23,8 @@ class SiteSettingsService:
     
     async def get_settings(self) -> Dict[str, Any]:
         """Get all site settings, creating defaults if not exists"""
-        settings = await self.collection.find_one({"_id": "site_settings"})
+        # Private copy: callers edit the plans list in place before saving
+        settings = await settings_cache.get(self.db, "site_settings")
         
         if not settings:
             # Create default settings
@@ -89,6 +92,7 @@ class SiteSettingsService:
         }
         
         await self.collection.insert_one(default_settings)
+        await settings_cache.invalidate(self.db, "site_settings")
         logger.info("Created default site settings")
         return default_settings
     
@@ -122,6 +126,7 @@ class SiteSettingsService:
             },
             upsert=True
         )
+        await settings_cache.invalidate(self.db, "site_settings")
         
         logger.info(f"Membership config updated by {updated_by}")
         return await self.get_membership_config()
@@ -151,6 +156,7 @@ class SiteSettingsService:
                 }
             }
         )
+        await settings_cache.invalidate(self.db, "site_settings")
         
         logger.info(f"Plan '{plan['id']}' added by {updated_by}")
         return plan
@@ -186,6 +192,7 @@ class SiteSettingsService:
                 }
             }
         )
+        await settings_cache.invalidate(self.db, "site_settings")
         
         logger.info(f"Plan '{plan_id}' updated by {updated_by}")
         return updated_plan
@@ -211,6 +218,7 @@ class SiteSettingsService:
                 }
             }
         )
+        await settings_cache.invalidate(self.db, "site_settings")
         
         logger.info(f"Plan '{plan_id}' deleted by {updated_by}")
         return True
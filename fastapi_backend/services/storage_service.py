@@ -1,18 +1,39 @@
 # fastapi_backend/services/storage_service.py
 """
 Storage service that supports both local filesystem and Google Cloud Storage
+
+Uploaded photos are stored once at full size (max 1600px) plus pre-resized
+variants (see IMAGE_VARIANTS) next to the original, so list views can fetch
+a thumbnail instead of the full upload.
 """
+import asyncio
 import logging
 import uuid
 import os
 import io
 from pathlib import Path
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Optional
 from fastapi import UploadFile
 from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+# Pre-resized variants generated at upload time: name -> max width/height (px)
+IMAGE_VARIANTS = {
+    "thumb": 240,   # avatars, messenger lists
+    "card": 640,    # search/dashboard cards
+}
+COMPRESSIBLE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp']
+STREAM_CHUNK_SIZE = 256 * 1024
+
+
+def variant_filename(filename: str, variant: Optional[str] = None) -> str:
+    """Stored filename of a variant (abc.jpg + thumb -> abc_thumb.jpg); original when variant is None"""
+    if not variant:
+        return filename
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}_{variant}{ext}"
+
 
 class StorageService:
     """Unified storage service for local and cloud storage"""
@@ -94,7 +115,7 @@ class StorageService:
         original_size_mb = len(content) / (1024 * 1024)
         
         # Compress image if it's a common image format
-        if file_extension in ['.jpg', '.jpeg', '.png', '.webp']:
+        if file_extension in COMPRESSIBLE_EXTENSIONS:
             try:
                 content = self._compress_image(content, file_extension)
                 new_size_mb = len(content) / (1024 * 1024)
@@ -111,9 +132,104 @@ class StorageService:
         logger.info(f"📤 Uploading {unique_filename} ({file_size_mb:.2f}MB) to {storage_type} storage")
         
         if self.use_gcs:
-            return await self._save_to_gcs(unique_filename, content, folder, file_size_mb)
+            saved_path = await self._save_to_gcs(unique_filename, content, folder, file_size_mb)
+        else:
+            saved_path = await self._save_to_local(unique_filename, content, folder, file_size_mb)
+        
+        if file_extension in COMPRESSIBLE_EXTENSIONS:
+            await self.save_variants(unique_filename, content, folder)
+        
+        return saved_path
+
+    async def save_variants(self, filename: str, content: bytes, folder: str = "uploads") -> int:
+        """
+        Generate and store every IMAGE_VARIANTS size for an image (best-effort)
+        
+        Args:
+            filename: Stored filename of the original
+            content: Original image bytes
+            folder: Folder/prefix the original lives in
+            
+        Returns:
+            Number of variants written
+        """
+        extension = Path(filename).suffix.lower()
+        written = 0
+        for variant, max_size in IMAGE_VARIANTS.items():
+            try:
+                data = self._compress_image(content, extension, max_size=max_size)
+                await self._write_bytes(variant_filename(filename, variant), data, folder)
+                written += 1
+            except Exception as e:
+                logger.warning(f"⚠️ Could not create {variant} variant for {filename}: {e}")
+        return written
+
+    async def _write_bytes(self, filename: str, content: bytes, folder: str) -> None:
+        """Write raw bytes to the active backend (no fallback, no logging of sizes)"""
+        if self.use_gcs:
+            blob = self.gcs_bucket.blob(f"{folder}/{filename}")
+            await asyncio.to_thread(blob.upload_from_string, content, content_type="image/jpeg")
+        else:
+            import aiofiles
+            from config import settings
+            upload_dir = Path(settings.upload_dir)
+            upload_dir.mkdir(exist_ok=True)
+            async with aiofiles.open(upload_dir / filename, 'wb') as out_file:
+                await out_file.write(content)
+
+    async def stat_media(self, filename: str, variant: Optional[str] = None, folder: str = "uploads") -> Optional[Dict[str, Any]]:
+        """
+        Locate a stored file and describe it for conditional responses
+        
+        Falls back to the original when the requested variant doesn't exist
+        (uploads from before variants were generated). The lookups (GCS metadata
+        requests or disk stats) run in a worker thread.
+        
+        Returns:
+            {"filename", "size", "etag", "blob"} or None if the original is missing.
+            etag is a strong validator: the GCS object generation, or mtime+size locally.
+        """
+        return await asyncio.to_thread(self._locate_media, filename, variant, folder)
+
+    def _locate_media(self, filename: str, variant: Optional[str], folder: str) -> Optional[Dict[str, Any]]:
+        candidates = [variant_filename(filename, variant), filename] if variant else [filename]
+        for name in candidates:
+            if self.use_gcs:
+                blob = self.gcs_bucket.get_blob(f"{folder}/{name}")
+                if blob is not None:
+                    return {"filename": name, "size": blob.size, "etag": f'"{blob.generation}"', "blob": blob}
+            else:
+                from config import settings
+                path = Path(settings.upload_dir) / name
+                if path.is_file():
+                    st = path.stat()
+                    return {"filename": name, "size": st.st_size, "etag": f'"{st.st_mtime_ns:x}-{st.st_size:x}"', "path": path}
+        return None
+
+    async def stream_media(self, media: Dict[str, Any], chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Yield a file located by stat_media in chunks instead of loading it whole"""
+        if "blob" in media:
+            reader = await asyncio.to_thread(media["blob"].open, "rb", chunk_size=chunk_size)
+            try:
+                while True:
+                    chunk = await asyncio.to_thread(reader.read, chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                reader.close()
         else:
-            return await self._save_to_local(unique_filename, content, folder, file_size_mb)
+            import aiofiles
+            async with aiofiles.open(media["path"], 'rb') as in_file:
+                while True:
+                    chunk = await in_file.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+
+    async def read_media(self, media: Dict[str, Any]) -> bytes:
+        """Whole contents of a file located by stat_media (for format conversion)"""
+        return b"".join([chunk async for chunk in self.stream_media(media)])
 
     def generate_signed_url(self, filename: str, folder: str = "uploads", expiration_minutes: int = 15) -> Optional[str]:
         """
@@ -160,10 +276,10 @@ class StorageService:
             logger.error(f"❌ Failed to generate signed URL for {filename}: {e}")
             return None
 
-    def _compress_image(self, content: bytes, extension: str) -> bytes:
+    def _compress_image(self, content: bytes, extension: str, max_size: int = 1600) -> bytes:
         """
         Resize and compress image to reduce storage and network egress costs
-        Target: Max width/height 1600px, quality 80
+        Target: Max width/height 1600px (or max_size for variants), quality 80
         """
         img = Image.open(io.BytesIO(content))
         
@@ -172,7 +288,6 @@ class StorageService:
             img = img.convert('RGB')
             
         # 1. Resize if too large (1600px is plenty for web profiles)
-        max_size = 1600
         if img.width > max_size or img.height > max_size:
             ratio = min(max_size / img.width, max_size / img.height)
             new_size = (int(img.width * ratio), int(img.height * ratio))
@@ -201,7 +316,7 @@ class StorageService:
             blob = self.gcs_bucket.blob(blob_path)
             
             # Upload file
-            blob.upload_from_string(content, content_type="image/jpeg")
+            await asyncio.to_thread(blob.upload_from_string, content, content_type="image/jpeg")
 
             logger.info(f"✅ File uploaded to GCS: {blob_path} ({file_size_mb:.2f}MB)")
 
@@ -272,9 +387,7 @@ class StorageService:
                 logger.warning(f"⚠️ Invalid GCS path: {public_url}")
                 return False
 
-            blob = self.gcs_bucket.blob(blob_path)
-            blob.delete()
-            
+            await asyncio.to_thread(self._delete_gcs_blobs, blob_path)
             logger.info(f"✅ File deleted from GCS: {blob_path}")
             return True
             
@@ -282,6 +395,14 @@ class StorageService:
             logger.error(f"❌ GCS delete failed: {e}")
             return False
     
+    def _delete_gcs_blobs(self, blob_path: str) -> None:
+        """Delete an object and its variants (blocking GCS calls; run in a thread)"""
+        self.gcs_bucket.blob(blob_path).delete()
+        for variant in IMAGE_VARIANTS:
+            variant_blob = self.gcs_bucket.blob(variant_filename(blob_path, variant))
+            if variant_blob.exists():
+                variant_blob.delete()
+    
     async def _delete_from_local(self, file_path: str) -> bool:
         """Delete file from local filesystem"""
         try:
@@ -293,6 +414,10 @@ class StorageService:
             
             if full_path.exists():
                 full_path.unlink()
+                for variant in IMAGE_VARIANTS:
+                    variant_path = Path(settings.upload_dir) / variant_filename(filename, variant)
+                    if variant_path.exists():
+                        variant_path.unlink()
                 logger.info(f"✅ File deleted locally: {filename}")
                 return True
             else:
@@ -335,14 +460,15 @@ class StorageService:
         blob_path = f"{folder}/{filename}"
         blob = self.gcs_bucket.blob(blob_path)
         
-        content = blob.download_as_bytes()
+        content = await asyncio.to_thread(blob.download_as_bytes)
         logger.info(f"🔄 Downloaded {blob_path} ({len(content)} bytes) for rotation")
         
         rotated = self._rotate_image_bytes(content, degrees)
         
         blob.cache_control = "no-cache, no-store, must-revalidate"
-        blob.upload_from_string(rotated, content_type="image/jpeg")
+        await asyncio.to_thread(blob.upload_from_string, rotated, content_type="image/jpeg")
         logger.info(f"✅ Rotated {blob_path} by {degrees}° and re-uploaded")
+        await self.save_variants(filename, rotated, folder)
         return True
     
     async def _rotate_local(self, filename: str, degrees: int) -> bool:
@@ -361,6 +487,7 @@ class StorageService:
         
         full_path.write_bytes(rotated)
         logger.info(f"✅ Rotated {full_path} by {degrees}° and saved")
+        await self.save_variants(filename, rotated)
         return True
     
     def _rotate_image_bytes(self, content: bytes, degrees: int) -> bytes:
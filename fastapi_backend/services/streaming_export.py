@@ -0,0 +1,209 @@
+"""
+Streaming Export
+Bounded-memory collection export shared by the backup and data export jobs
+
+Documents are read from Motor cursors in batches, encoded as NDJSON (MongoDB
+relaxed Extended JSON, so ObjectIds and dates survive a restore) or CSV, and
+written through a gzip stream. At most one batch per collection is held in
+memory; compression and file/network writes run in a worker thread.
+
+Sinks:
+- open_local_sink(path): a local file (development, tests, non-Cloud Run)
+- open_gcs_sink(bucket, blob_path): a GCS resumable upload sent in
+  UPLOAD_CHUNK_BYTES chunks, so nothing touches the (in-memory) Cloud Run disk
+
+Backup archive format (`.ndjson.gz`): one line per document,
+`{"collection": <name>, "document": <extended JSON>}`. Collections are
+exported in parallel, so their lines interleave; restore_backup.py streams the
+file back with insert_many batches per collection.
+"""
+
+import asyncio
+import csv
+import gzip
+import io
+import json
+import logging
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from bson import json_util
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CONCURRENCY = 3
+UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024  # GCS resumable chunks must be multiples of 256 KB
+
+BACKUP_ARCHIVE_SUFFIX = ".ndjson.gz"
+
+
+def encode_document(doc: Dict[str, Any]) -> str:
+    """One document as relaxed Extended JSON (round-trips through json_util.loads)"""
+    return json_util.dumps(doc, json_options=json_util.RELAXED_JSON_OPTIONS)
+
+
+# ----------------------------------------------------------------------
+# Sinks
+# ----------------------------------------------------------------------
+
+class _CountingWriter(io.RawIOBase):
+    """Passes compressed bytes through to the sink and counts them"""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.bytes_written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._raw.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._raw.close()
+        super().close()
+
+
+def open_local_sink(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return open(path, "wb")
+
+
+def open_gcs_sink(bucket_name: str, blob_path: str, chunk_size: int = UPLOAD_CHUNK_BYTES,
+                  content_type: str = "application/gzip"):
+    """Writable GCS resumable upload; each chunk is sent as soon as it fills"""
+    from google.cloud import storage
+    blob = storage.Client().bucket(bucket_name).blob(blob_path, chunk_size=chunk_size)
+    return blob.open("wb", content_type=content_type, ignore_flush=True)
+
+
+class GzipStreamWriter:
+    """
+    Gzip stream over a binary sink, safe to share between export tasks
+
+    Each write_chunk() call lands contiguously; blocking compression and
+    I/O run in a worker thread.
+    """
+
+    def __init__(self, raw):
+        self._counter = _CountingWriter(raw)
+        self._gzip = gzip.GzipFile(fileobj=self._counter, mode="wb")
+        self._lock = asyncio.Lock()
+
+    @property
+    def bytes_written(self) -> int:
+        """Compressed bytes handed to the sink so far"""
+        return self._counter.bytes_written
+
+    async def write_chunk(self, data: bytes):
+        async with self._lock:
+            await asyncio.to_thread(self._gzip.write, data)
+
+    async def close(self):
+        def _close():
+            self._gzip.close()
+            self._counter.close()
+        async with self._lock:
+            await asyncio.to_thread(_close)
+
+
+# ----------------------------------------------------------------------
+# Export
+# ----------------------------------------------------------------------
+
+async def iter_batches(cursor, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Documents from a Motor cursor, batch_size at a time"""
+    batch = []
+    async for doc in cursor.batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def write_ndjson(cursor, writer: GzipStreamWriter, batch_size: int = EXPORT_BATCH_SIZE,
+                       wrap: Optional[Callable[[str], str]] = None) -> int:
+    """Stream a cursor as NDJSON; `wrap` turns each encoded document into its output line"""
+    count = 0
+    async for batch in iter_batches(cursor, batch_size):
+        lines = [encode_document(doc) for doc in batch]
+        if wrap:
+            lines = [wrap(line) for line in lines]
+        await writer.write_chunk(("\n".join(lines) + "\n").encode("utf-8"))
+        count += len(batch)
+    return count
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json_util.dumps(value, json_options=json_util.RELAXED_JSON_OPTIONS)
+    return "" if value is None else str(value)
+
+
+async def write_csv(cursor, writer: GzipStreamWriter, columns: Optional[List[str]] = None,
+                    batch_size: int = EXPORT_BATCH_SIZE) -> Tuple[int, int]:
+    """
+    Stream a cursor as CSV (nested values as JSON)
+
+    The header is `columns` or, without a projection, the sorted keys of the
+    first batch. Returns (rows, fields_dropped): fields that first appear
+    after the header was written are left out and counted.
+    """
+    count = 0
+    dropped = 0
+    async for batch in iter_batches(cursor, batch_size):
+        buffer = io.StringIO()
+        csv_writer = csv.writer(buffer)
+        if columns is None:
+            columns = sorted({key for doc in batch for key in doc})
+        if count == 0:
+            csv_writer.writerow(columns)
+        known = set(columns)
+        for doc in batch:
+            dropped += sum(1 for key in doc if key not in known)
+            csv_writer.writerow([_csv_value(doc.get(column)) for column in columns])
+        await writer.write_chunk(buffer.getvalue().encode("utf-8"))
+        count += len(batch)
+    return count, dropped
+
+
+async def export_collections(
+    db,
+    collection_names: Iterable[str],
+    writer: GzipStreamWriter,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    concurrency: int = EXPORT_CONCURRENCY,
+    on_collection_done: Optional[Callable[[str, int, Optional[Exception]], None]] = None
+) -> Dict[str, int]:
+    """
+    Stream whole collections into one backup archive, `concurrency` at a time
+
+    Returns:
+        Documents written per collection (failed collections are reported
+        through on_collection_done and left out)
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    counts: Dict[str, int] = {}
+
+    async def export_one(name: str):
+        async with semaphore:
+            prefix = '{"collection": ' + json.dumps(name) + ', "document": '
+            try:
+                counts[name] = await write_ndjson(
+                    db[name].find({}), writer, batch_size, wrap=lambda line: f"{prefix}{line}}}"
+                )
+                error = None
+            except Exception as e:
+                error = e
+            if on_collection_done:
+                on_collection_done(name, counts.get(name, 0), error)
+
+    await asyncio.gather(*(export_one(name) for name in collection_names))
+    return counts
+
@@ -0,0 +1,281 @@
+"""
+Notification Template Engine
+Compiles notification templates once and renders them in a single pass
+
+Supported syntax:
+- {{var}} / {var}, with dotted paths ({{match.firstName}}) and the flattened
+  underscore form of nested keys ({match_firstName})
+- {% for item in list %}...{% endfor %} (optionally sliced: list[:5])
+- {% if var %}...[{% else %}...]{% endif %} and {% if var >= 5 %}...{% endif %}
+  (>=, >, <=, < compare numerically; ==, != compare as strings)
+
+Placeholders that don't resolve (or resolve to a dict) are left in the output
+verbatim, as are tags that don't parse. Loop variables are scoped to their
+loop body, so `{% for user in ... %}` is not shadowed by a top-level `user`.
+"""
+
+import logging
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMPILED_CACHE_SIZE = 256
+
+_TOKEN_RE = re.compile(
+    r"\{%\s*(?P<tag>[^%]*?)\s*%\}"
+    r"|\{\{(?P<dvar>[\w.]+)\}\}"
+    r"|\{(?P<svar>[\w.]+)\}"
+)
+_FOR_RE = re.compile(r"for\s+(\w+)\s+in\s+(\w+(?:\.\w+)*)(?:\[\s*(-?\d*)\s*:\s*(-?\d*)\s*\])?$")
+_IF_RE = re.compile(r"if\s+(\w+(?:\.\w+)*)(?:\s*(>=|<=|==|!=|>|<)\s*(\w+))?$")
+
+# Node kinds
+_TEXT, _VAR, _FOR, _IF = range(4)
+
+_MISSING = object()
+
+
+def _var_node(name: str, raw: str) -> tuple:
+    """Placeholder node: dotted path plus flattened `key_nested` alternatives"""
+    path = tuple(name.split("."))
+    alternatives = ()
+    if len(path) == 1 and "_" in name:
+        parts = name.split("_")
+        alternatives = tuple(
+            ("_".join(parts[:i]), "_".join(parts[i:])) for i in range(1, len(parts))
+        )
+    return (_VAR, path, raw, alternatives)
+
+
+def _parse(source: str) -> list:
+    """Parse template source into a node tree"""
+    root: list = []
+    # Open blocks: (node, children, opening tag text, else-tag text)
+    stack: List[list] = []
+    children = root
+
+    pos = 0
+    for match in _TOKEN_RE.finditer(source):
+        if match.start() > pos:
+            children.append((_TEXT, source[pos:match.start()]))
+        pos = match.end()
+        raw = match.group(0)
+
+        tag = match.group("tag")
+        if tag is None:
+            children.append(_var_node(match.group("dvar") or match.group("svar"), raw))
+            continue
+
+        for_match = _FOR_RE.match(tag)
+        if_match = _IF_RE.match(tag) if not for_match else None
+        if for_match:
+            item, path, start, stop = for_match.groups()
+            body: list = []
+            node = [_FOR, item, tuple(path.split(".")), _slice(start, stop), body, []]
+            stack.append([node, body, raw, None])
+            children = body
+        elif if_match:
+            path, operator, value = if_match.groups()
+            body = []
+            node = [_IF, tuple(path.split(".")), operator, value, body, []]
+            stack.append([node, body, raw, None])
+            children = body
+        elif tag == "else" and stack and stack[-1][0][0] == _IF and stack[-1][3] is None:
+            block = stack[-1]
+            block[3] = raw
+            block[1] = block[0][5]
+            children = block[1]
+        elif (tag == "endfor" and stack and stack[-1][0][0] == _FOR) or \
+                (tag == "endif" and stack and stack[-1][0][0] == _IF):
+            node = stack.pop()[0]
+            children = stack[-1][1] if stack else root
+            children.append(tuple(node))
+        else:
+            children.append((_TEXT, raw))
+
+    if pos < len(source):
+        children.append((_TEXT, source[pos:]))
+
+    while stack:
+        block = stack.pop()
+        node = block[0]
+        # Restore "<open tag>body[<else tag>else-body]" as literal content
+        restored = [(_TEXT, block[2])] + node[4]
+        if block[3] is not None:
+            restored += [(_TEXT, block[3])] + node[5]
+        children = stack[-1][1] if stack else root
+        children.extend(restored)
+
+    return _merge_text(root)
+
+
+def _slice(start: Optional[str], stop: Optional[str]) -> Optional[slice]:
+    if start is None and stop is None:
+        return None
+    return slice(int(start) if start else None, int(stop) if stop else None)
+
+
+def _merge_text(nodes: list) -> list:
+    """Join adjacent text nodes and recurse into block bodies"""
+    merged: list = []
+    for node in nodes:
+        if node[0] == _FOR:
+            node = node[:4] + (_merge_text(node[4]),) + node[5:]
+        elif node[0] == _IF:
+            node = node[:4] + (_merge_text(node[4]), _merge_text(node[5]))
+        if node[0] == _TEXT and merged and merged[-1][0] == _TEXT:
+            merged[-1] = (_TEXT, merged[-1][1] + node[1])
+        else:
+            merged.append(node)
+    return merged
+
+
+def _lookup(path: Tuple[str, ...], scopes: list) -> Any:
+    head = path[0]
+    for scope in reversed(scopes):
+        if head in scope:
+            value = scope[head]
+            break
+    else:
+        return _MISSING
+    for key in path[1:]:
+        if isinstance(value, dict) and key in value:
+            value = value[key]
+        else:
+            return _MISSING
+    return value
+
+
+def _condition(node: tuple, scopes: list) -> bool:
+    _, path, operator, expected, _, _ = node
+    value = _lookup(path, scopes)
+    if value is _MISSING:
+        value = None
+    if operator is None:
+        return bool(value) and value != ''
+    try:
+        if operator == '==':
+            return str(value) == expected
+        if operator == '!=':
+            return str(value) != expected
+        left, right = float(value), float(expected)
+    except (TypeError, ValueError):
+        return False
+    if operator == '>=':
+        return left >= right
+    if operator == '>':
+        return left > right
+    if operator == '<=':
+        return left <= right
+    return left < right
+
+
+def _render(nodes: list, scopes: list, out: list):
+    for node in nodes:
+        kind = node[0]
+        if kind == _TEXT:
+            out.append(node[1])
+        elif kind == _VAR:
+            value = _lookup(node[1], scopes)
+            if value is _MISSING:
+                for alternative in node[3]:
+                    value = _lookup(alternative, scopes)
+                    if value is not _MISSING:
+                        break
+            if value is _MISSING or isinstance(value, dict):
+                out.append(node[2])
+            elif value is not None:
+                out.append(value if isinstance(value, str) else str(value))
+        elif kind == _FOR:
+            _, item_name, path, window, body, _ = node
+            collection = _lookup(path, scopes)
+            if not collection or not isinstance(collection, list):
+                continue
+            if window is not None:
+                collection = collection[window]
+            frame: Dict[str, Any] = {}
+            scopes.append(frame)
+            for item in collection:
+                frame[item_name] = item
+                _render(body, scopes, out)
+            scopes.pop()
+        else:
+            _render(node[4] if _condition(node, scopes) else node[5], scopes, out)
+
+
+class CompiledTemplate:
+    """A parsed template; render() is a single walk over the node tree"""
+
+    __slots__ = ("source", "_nodes")
+
+    def __init__(self, source: str):
+        self.source = source
+        self._nodes = _parse(source)
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        out: List[str] = []
+        _render(self._nodes, [variables or {}], out)
+        return "".join(out)
+
+
+def compile_template(source: str) -> CompiledTemplate:
+    """Compile template source (uncached)"""
+    return CompiledTemplate(source or "")
+
+
+class CompiledTemplateCache:
+    """
+    Bounded LRU of compiled templates
+
+    Keys are usually (trigger, version, field) from template_cache_key();
+    without a key the source text itself is the key. A hit whose source no
+    longer matches (template edited without a version bump) is recompiled.
+    """
+
+    def __init__(self, max_entries: int = COMPILED_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CompiledTemplate]" = OrderedDict()
+        self.hits = 0
+        self.compiles = 0
+
+    def get(self, source: str, key: Optional[Hashable] = None) -> CompiledTemplate:
+        source = source or ""
+        key = source if key is None else key
+        compiled = self._entries.get(key)
+        if compiled is not None and (compiled.source is source or compiled.source == source):
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return compiled
+
+        compiled = CompiledTemplate(source)
+        self.compiles += 1
+        self._entries[key] = compiled
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return compiled
+
+    def invalidate(self, trigger: Optional[str] = None):
+        """Drop compiled templates for one trigger, or everything"""
+        if trigger is None:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if isinstance(k, tuple) and k and k[0] == trigger]:
+            del self._entries[key]
+
+
+def template_version(template: Dict[str, Any]) -> str:
+    """Version marker of a notification_templates document"""
+    version = template.get("version") or template.get("updatedAt") or template.get("_id") or ""
+    return version.isoformat() if hasattr(version, "isoformat") else str(version)
+
+
+def template_cache_key(template: Dict[str, Any], field: str) -> Tuple[str, str, str]:
+    """Compiled-template cache key: (trigger, template version, field)"""
+    return (template.get("trigger", ""), template_version(template), field)
+
+
+# Process-wide cache shared by NotificationService and NotificationCacheService
+compiled_templates = CompiledTemplateCache()
@@ -2,20 +2,46 @@
 """
 Server-Sent Events (SSE) manager for real-time messaging
 Uses Redis pub/sub for message broadcasting
+
+One async pub/sub connection per process pattern-subscribes to `messages:*`
+and fans each message out to the per-user queues in `active_connections`, so
+open streams cost a bounded queue each instead of a Redis client and a
+polling loop. Queues are bounded: a consumer that falls behind is dropped
+(its stream ends and the browser's EventSource reconnects) rather than
+letting memory grow or slowing delivery to everyone else.
+
+Without Redis, messages published in this process are still delivered to
+local streams.
 """
 
 import asyncio
 import json
 import logging
 import os
+import time
+from collections import deque
 from datetime import datetime
-from typing import AsyncGenerator, Dict, Set
-import redis
+from typing import Any, AsyncGenerator, Dict, Optional, Set
+import redis.asyncio as redis
 from fastapi import HTTPException
 from sse_starlette.sse import EventSourceResponse
 
 logger = logging.getLogger(__name__)
 
+CHANNEL_PREFIX = "messages:"
+QUEUE_MAX_SIZE = 100            # Pending events per stream before the consumer is dropped
+HEARTBEAT_INTERVAL_SECONDS = 30
+LATENCY_SAMPLES = 1000
+RECONNECT_MAX_BACKOFF_SECONDS = 30
+
+
+def _percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
 class SSEManager:
     def __init__(self):
         self.redis_client = None
@@ -23,65 +49,145 @@ class SSEManager:
         self.active_connections: Dict[str, Set[asyncio.Queue]] = {}
         # Use environment variable for Redis URL (supports Docker container names)
         self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-        
+        self._listener_task: Optional[asyncio.Task] = None
+        self._listener_connected = False
+        self._fanout_ms = deque(maxlen=LATENCY_SAMPLES)
+        self._delivery_ms = deque(maxlen=LATENCY_SAMPLES)
+        self._counters = {
+            "messages_received": 0,
+            "events_enqueued": 0,
+            "consumers_dropped": 0,
+            "listener_reconnects": 0,
+        }
+
     async def initialize(self):
-        """Initialize Redis connection for pub/sub"""
+        """Connect to Redis and start the shared pub/sub listener"""
         try:
-            # Parse Redis URL from environment variable
-            # Format: redis://host:port or redis://localhost:6379
-            redis_url = self.redis_url.replace('redis://', '')
-            if ':' in redis_url:
-                host, port = redis_url.split(':')
-                port = int(port)
-            else:
-                host = redis_url
-                port = 6379
-            
-            # Use standard Redis client for simplicity
-            self.redis_client = redis.Redis(
-                host=host,
-                port=port,
-                decode_responses=True
-            )
-            self.redis_client.ping()
-            logger.info("✅ SSE Manager initialized with Redis")
+            self.redis_client = redis.from_url(self.redis_url, decode_responses=True)
+            await self.redis_client.ping()
+            self._listener_task = asyncio.create_task(self._run_listener())
+            logger.info("✅ SSE Manager initialized with Redis (shared pub/sub on messages:*)")
         except Exception as e:
             logger.error(f"❌ Failed to initialize SSE Manager: {e}")
-            
+            self.redis_client = None
+
     async def close(self):
-        """Close Redis connections"""
+        """Stop the listener, end open streams and close Redis connections"""
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener_task = None
+        for queues in list(self.active_connections.values()):
+            for queue in list(queues):
+                self._drop(queue, count=False)
         if self.redis_client:
-            self.redis_client.close()
-            
+            await self.redis_client.aclose()
+            self.redis_client = None
+
+    async def _run_listener(self):
+        """
+        Pattern-subscribe to every user channel and fan messages out locally
+
+        Reconnects with exponential backoff if the pub/sub connection fails.
+        """
+        backoff = 1
+        while True:
+            self.pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await self.pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                self._listener_connected = True
+                backoff = 1
+                async for message in self.pubsub.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    self._fan_out(channel[len(CHANNEL_PREFIX):], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ SSE pub/sub listener error, reconnecting in {backoff}s: {e}")
+            finally:
+                self._listener_connected = False
+                try:
+                    await self.pubsub.aclose()
+                except Exception:
+                    pass
+            self._counters["listener_reconnects"] += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_BACKOFF_SECONDS)
+
+    @staticmethod
+    def _build_event(data: str) -> Dict[str, Any]:
+        """SSE event for a raw pub/sub payload"""
+        try:
+            msg_data = json.loads(data)
+        except (json.JSONDecodeError, TypeError):
+            # Send raw message if not JSON
+            return {"event": "message", "data": data}
+
+        msg_type = msg_data.get('type') if isinstance(msg_data, dict) else None
+        if msg_type == 'new_message':
+            return {"event": "new_message", "data": json.dumps(msg_data)}
+        if msg_type == 'unread_update':
+            return {"event": "unread_update"}
+        return {"event": "message", "data": data}
+
+    def _fan_out(self, username: str, data: str) -> int:
+        """
+        Enqueue one pub/sub payload on every open stream of `username`
+
+        Never awaits: a full queue means the consumer is too slow and it is
+        dropped instead of blocking the listener.
+
+        Returns:
+            Number of streams the event was delivered to
+        """
+        self._counters["messages_received"] += 1
+        queues = self.active_connections.get(username)
+        if not queues:
+            return 0
+
+        started = time.perf_counter()
+        event = self._build_event(data)
+        enqueued_at = time.monotonic()
+        delivered = 0
+        for queue in list(queues):
+            try:
+                queue.put_nowait((enqueued_at, event))
+                delivered += 1
+            except asyncio.QueueFull:
+                logger.warning(f"⚠️ Dropping slow SSE consumer for '{username}' ({queue.qsize()} events pending)")
+                self._drop(queue)
+        self._counters["events_enqueued"] += delivered
+        self._fanout_ms.append((time.perf_counter() - started) * 1000)
+        return delivered
+
+    def _drop(self, queue: asyncio.Queue, count: bool = True):
+        """Discard a consumer's backlog and signal its stream to end"""
+        for queues in self.active_connections.values():
+            queues.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)  # Disconnect signal
+        if count:
+            self._counters["consumers_dropped"] += 1
+
     async def subscribe_to_user_channel(self, username: str) -> AsyncGenerator:
         """
         Subscribe to a user's message channel for SSE streaming
         """
-        queue = asyncio.Queue()
-        
-        # Add queue to active connections
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_MAX_SIZE)
+
+        # Add queue to active connections (the shared listener fans out to it)
         if username not in self.active_connections:
             self.active_connections[username] = set()
         self.active_connections[username].add(queue)
-        
-        # Subscribe to Redis channel for this user
-        channel_name = f"messages:{username}"
-        
+        logger.info(f"📡 User '{username}' subscribed to SSE channel")
+
         try:
-            # Create a new Redis client for this connection using parsed config
-            redis_url = self.redis_url.replace('redis://', '')
-            if ':' in redis_url:
-                host, port = redis_url.split(':')
-                port = int(port)
-            else:
-                host = redis_url
-                port = 6379
-            redis_sub = redis.Redis(host=host, port=port, decode_responses=True)
-            pubsub = redis_sub.pubsub()
-            pubsub.subscribe(channel_name)
-            
-            logger.info(f"📡 User '{username}' subscribed to SSE channel")
-            
             # Send initial connection event
             yield {
                 "event": "connected",
@@ -90,41 +196,26 @@ class SSEManager:
                     "timestamp": datetime.utcnow().isoformat()
                 })
             }
-            
-            # Start listening for messages
-            asyncio.create_task(self._listen_to_redis(pubsub, queue, username))
-            
-            # Send heartbeat every 30 seconds
-            heartbeat_task = asyncio.create_task(self._send_heartbeat(queue))
-            
+
             # Stream events from queue
-            try:
-                while True:
-                    # Wait for messages with timeout
-                    try:
-                        message = await asyncio.wait_for(queue.get(), timeout=60)
-                        if message is None:  # Disconnect signal
-                            break
-                        yield message
-                    except asyncio.TimeoutError:
-                        # Send heartbeat on timeout
-                        yield {
-                            "event": "heartbeat",
-                            "data": json.dumps({
-                                "type": "heartbeat",
-                                "timestamp": datetime.utcnow().isoformat()
-                            })
-                        }
-            finally:
-                # Cleanup
-                heartbeat_task.cancel()
-                pubsub.unsubscribe(channel_name)
-                pubsub.close()
-                redis_sub.close()
-                
-        except Exception as e:
-            logger.error(f"❌ SSE error for user '{username}': {e}")
-            raise
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    # Send heartbeat when idle to keep the connection alive
+                    yield {
+                        "event": "heartbeat",
+                        "data": json.dumps({
+                            "type": "heartbeat",
+                            "timestamp": datetime.utcnow().isoformat()
+                        })
+                    }
+                    continue
+                if item is None:  # Disconnect signal
+                    break
+                enqueued_at, event = item
+                self._delivery_ms.append((time.monotonic() - enqueued_at) * 1000)
+                yield event
         finally:
             # Remove queue from active connections
             if username in self.active_connections:
@@ -132,97 +223,45 @@ class SSEManager:
                 if not self.active_connections[username]:
                     del self.active_connections[username]
             logger.info(f"🔌 User '{username}' disconnected from SSE")
-            
-    async def _listen_to_redis(self, pubsub, queue: asyncio.Queue, username: str):
-        """
-        Listen to Redis pub/sub and forward messages to SSE queue
-        """
-        try:
-            # Use get_message with timeout for non-blocking
-            while True:
-                message = pubsub.get_message(timeout=0.1)
-                if message and message['type'] == 'message':
-                    data = message['data']
-                    logger.info(f"📬 Received Redis message for '{username}': {data[:100]}...")
-                    
-                    try:
-                        # Parse the message
-                        msg_data = json.loads(data)
-                        
-                        # Create SSE event based on message type
-                        if msg_data.get('type') == 'new_message':
-                            event = {
-                                "event": "new_message",
-                                "data": json.dumps(msg_data)
-                            }
-                        elif msg_data.get('type') == 'unread_update':
-                            event = {
-                                "event": "unread_update",
-                            }
-                        else:
-                            event = {
-                                "event": "message",
-                                "data": data
-                            }
-                        await queue.put(event)
-                    except json.JSONDecodeError:
-                        # Send raw message if not JSON
-                        event = {
-                            "event": "message",
-                            "data": data
-                        }
-                        await queue.put(event)
-                # Add small sleep to prevent blocking
-                await asyncio.sleep(0.1)
-                        
-        except Exception as e:
-            logger.error(f"❌ Error in Redis listener for '{username}': {e}")
-            await queue.put(None)  # Signal disconnect
-            
-    async def _send_heartbeat(self, queue: asyncio.Queue):
-        """
-        Send periodic heartbeat to keep connection alive
-        """
-        try:
-            while True:
-                await asyncio.sleep(30)
-                heartbeat = {
-                    "event": "heartbeat",
-                    "data": json.dumps({
-                        "type": "heartbeat",
-                        "timestamp": datetime.utcnow().isoformat()
-                    })
-                }
-                await queue.put(heartbeat)
-        except asyncio.CancelledError:
-            pass
-            
+
     async def publish_message(self, username: str, message_data: dict):
         """
         Publish a message to a user's channel
         """
+        channel_name = f"{CHANNEL_PREFIX}{username}"
+        message = json.dumps(message_data)
         try:
-            channel_name = f"messages:{username}"
-            message = json.dumps(message_data)
-            
-            # Use a separate Redis client for publishing
-            redis_url = self.redis_url.replace('redis://', '')
-            if ':' in redis_url:
-                host, port = redis_url.split(':')
-                port = int(port)
+            if self.redis_client:
+                await self.redis_client.publish(channel_name, message)
+                logger.info(f"📤 Published message to channel '{channel_name}'")
             else:
-                host = redis_url
-                port = 6379
-            redis_pub = redis.Redis(host=host, port=port, decode_responses=True)
-            redis_pub.publish(channel_name, message)
-            redis_pub.close()
-            
-            logger.info(f"📤 Published message to channel '{channel_name}'")
+                # No Redis: deliver to streams held by this process only
+                self._fan_out(username, message)
+                logger.info(f"📤 Delivered message locally for '{username}' (Redis unavailable)")
             return True
         except Exception as e:
             logger.error(f"❌ Failed to publish message: {e}")
             return False
-            
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Connection counts, counters and fan-out/delivery latency (ms) for this process"""
+        return {
+            "redis_connected": self._listener_connected,
+            "users": len(self.active_connections),
+            "connections": sum(len(queues) for queues in self.active_connections.values()),
+            **self._counters,
+            "fanout_latency_ms": {
+                "p50": round(_percentile(self._fanout_ms, 0.50), 3),
+                "p95": round(_percentile(self._fanout_ms, 0.95), 3),
+                "max": round(max(self._fanout_ms, default=0.0), 3),
+            },
+            "delivery_latency_ms": {
+                "p50": round(_percentile(self._delivery_ms, 0.50), 3),
+                "p95": round(_percentile(self._delivery_ms, 0.95), 3),
+                "max": round(max(self._delivery_ms, default=0.0), 3),
+            },
+        }
+
     async def broadcast_new_message(self, sender: str, recipient: str, message: str, message_id: str):
         """
         Broadcast a new message notification to the recipient
@@ -235,7 +274,7 @@ class SSEManager:
             "timestamp": datetime.utcnow().isoformat()
         }
         return await self.publish_message(recipient, message_data)
-        
+
     async def broadcast_unread_update(self, username: str, sender: str, count: int):
         """
         Broadcast unread count update to a user
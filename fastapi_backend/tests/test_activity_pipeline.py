@@ -0,0 +1,87 @@
+"""
+Tests for the ActivityLogger write-behind pipeline (services/activity_logger.py).
+"""
+import pytest
+
+import services.activity_logger as activity_module
+from models.activity_models import ActivityType
+from services.activity_logger import ActivityLogger
+
+
+class FlakyCollection:
+    """activity_logs stand-in that fails while `down` is set"""
+
+    def __init__(self):
+        self.down = False
+        self.docs = {}
+
+    async def insert_many(self, docs, ordered=True):
+        if self.down:
+            raise ConnectionError("database unavailable")
+        for doc in docs:
+            doc.setdefault("_id", len(self.docs))
+            self.docs[doc["_id"]] = doc
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.setattr(activity_module, "RETRY_BASE_DELAY", 0)
+    activity_logger = ActivityLogger(db=type("DB", (), {"activity_logs": None})(), spill_path=str(tmp_path / "spill.jsonl"))
+    activity_logger.collection = FlakyCollection()
+    activity_logger.batch_size = 2
+    activity_logger.buffer_capacity = 4
+    return activity_logger
+
+
+async def _log(activity_logger, n):
+    for i in range(n):
+        await activity_logger.log_activity(username=f"user{i}", action_type=ActivityType.SEARCH_PERFORMED)
+
+
+class TestWriteBehind:
+    """Logging never waits on the database; flushes write in batches"""
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_buffered_activities(self, pipeline):
+        await _log(pipeline, 3)
+        assert len(pipeline.collection.docs) == 0
+
+        await pipeline._flush_batch()
+        assert len(pipeline.collection.docs) == 3
+        assert pipeline.get_pipeline_stats()["written"] == 3
+
+
+class TestSpillover:
+    """Outages spill to disk, stay bounded in memory and replay on recovery"""
+
+    @pytest.mark.asyncio
+    async def test_outage_spills_and_replays(self, pipeline):
+        pipeline.collection.down = True
+        await _log(pipeline, 7)
+
+        # Buffer is bounded: the oldest batches overflowed to disk
+        stats = pipeline.get_pipeline_stats()
+        assert stats["buffered"] <= pipeline.buffer_capacity
+        assert stats["overflowed"] == 4
+
+        await pipeline._flush_batch()
+        stats = pipeline.get_pipeline_stats()
+        assert not stats["db_available"]
+        assert stats["failed_batches"] == 1
+        assert stats["spill_bytes"] > 0
+
+        pipeline.collection.down = False
+        await pipeline._flush_batch()
+        await pipeline._replay_spill()
+
+        assert sorted(doc["username"] for doc in pipeline.collection.docs.values()) == sorted(f"user{i}" for i in range(7))
+        assert pipeline.get_pipeline_stats()["spill_bytes"] == 0
+
+    @pytest.mark.asyncio
+    async def test_spill_cap_counts_drops(self, pipeline):
+        pipeline.spill_max_bytes = 10
+        pipeline.collection.down = True
+        await _log(pipeline, 2)
+
+        await pipeline._flush_batch()
+        assert pipeline.get_pipeline_stats()["dropped"] == 2
@@ -0,0 +1,173 @@
+"""
+Tests for the pre-aggregated admin report cube (services/admin_report_cube.py)
+and the platform stats jobs that maintain it.
+"""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from job_templates.base import JobExecutionContext
+from job_templates.daily_platform_stats_snapshot import PlatformStatsDailySnapshotTemplate
+from job_templates.monthly_platform_stats_aggregation import PlatformStatsMonthlyAggregationTemplate
+from routers.admin_reports import get_by_location_report, get_member_acquisition_report, get_summary_report
+from routers.inactive_users_report import get_inactive_users_summary
+from services.admin_report_cube import MAX_CELL_AGE, AdminReportCube, cell_id, month_bucket
+from services.report_facets import facet_updates
+
+ADMIN = {"username": "admin", "role": "admin"}
+
+
+def _user(i, location="Boston, MA", gender="Male", approved=None, updated=None):
+    user = {
+        "username": f"user{i}",
+        "profileId": f"p{i}",
+        "firstName": f"First{i}",
+        "lastName": "Last",
+        "gender": gender,
+        "accountStatus": "active",
+        "birthYear": 1995,
+        "location": location,
+        "occupation": "Engineer",
+        "adminApprovedAt": approved,
+        "updatedAt": updated,
+    }
+    user.update(facet_updates(user))
+    return user
+
+
+def _context(db):
+    return JobExecutionContext(job_id="job", job_name="stats", parameters={}, db=db)
+
+
+class TestCurrentCells:
+    """Point-in-time breakdowns are read from their cell"""
+
+    @pytest.mark.asyncio
+    async def test_missing_cell_is_built_then_served(self, test_db):
+        await test_db.users.insert_many([_user(1), _user(2, gender="Female")])
+
+        first = await get_by_location_report(gender=None, refresh=False, current_user=ADMIN, db=test_db)
+        assert first.totalCount == 2
+        assert first.refreshedAt is not None
+        assert await test_db.admin_report_cube.find_one({"_id": cell_id("location", None)})
+
+        # Served from the cube until the next refresh
+        await test_db.users.insert_one(_user(3))
+        cached = await get_by_location_report(gender=None, refresh=False, current_user=ADMIN, db=test_db)
+        assert cached.totalCount == 2
+        assert cached.refreshedAt == first.refreshedAt
+
+        refreshed = await get_by_location_report(gender=None, refresh=True, current_user=ADMIN, db=test_db)
+        assert refreshed.totalCount == 3
+
+    @pytest.mark.asyncio
+    async def test_stale_cell_is_recomputed(self, test_db):
+        await test_db.users.insert_many([_user(1), _user(2, gender="Female"), _user(3, gender="other")])
+        summary = await get_summary_report(refresh=False, current_user=ADMIN, db=test_db)
+        assert summary.summary == {"maleCount": 1, "femaleCount": 1, "otherCount": 1, "totalCount": 3}
+
+        await test_db.users.insert_one(_user(4))
+        await test_db.admin_report_cube.update_one(
+            {"_id": cell_id("summary")},
+            {"$set": {"refreshedAt": datetime.utcnow() - MAX_CELL_AGE - timedelta(minutes=1)}}
+        )
+        summary = await get_summary_report(refresh=False, current_user=ADMIN, db=test_db)
+        assert summary.summary["totalCount"] == 4
+
+    @pytest.mark.asyncio
+    async def test_inactivity_summary(self, test_db):
+        now = datetime.utcnow()
+        await test_db.users.insert_many([
+            _user(1, updated=now - timedelta(days=20)),
+            _user(2, gender="Female", updated=(now - timedelta(days=70)).isoformat()),
+            _user(3, updated=now),
+        ])
+        result = await get_inactive_users_summary(refresh=False, current_user=ADMIN, db=test_db)
+        assert result["summary"]["totalActive"] == 3
+        assert (result["summary"]["inactive15_30"], result["summary"]["inactive60_plus"]) == (1, 1)
+        assert result["genderBreakdown"] == {"Male": 1, "Female": 1}
+        assert result["refreshedAt"] == result["lastUpdated"]
+
+
+class TestAcquisitionAndJobs:
+    """Monthly buckets are only re-scanned while they can change"""
+
+    @pytest.mark.asyncio
+    async def test_acquisition_buckets_and_years(self, test_db):
+        now = datetime.utcnow()
+        await test_db.users.insert_many([
+            _user(1, approved=datetime(2024, 12, 5)),
+            _user(2, gender="Female", approved="2025-03-10T08:00:00"),
+            _user(3, approved=now),
+        ])
+
+        report = await get_member_acquisition_report(gender=None, year=None, refresh=False,
+                                                     current_user=ADMIN, db=test_db)
+        assert [r["period"] for r in report.data] == ["2024-12", "2025-03", month_bucket(now)]
+        assert report.data[0]["periodLabel"] == "Dec 2024"
+        assert report.refreshedAt is not None
+
+        females = await get_member_acquisition_report(gender="female", year=2025, refresh=False,
+                                                      current_user=ADMIN, db=test_db)
+        assert [(r["period"], r["femaleCount"]) for r in females.data] == [("2025-03", 1)]
+
+        years, _ = await AdminReportCube(test_db).get_acquisition_years()
+        assert years == sorted({2024, 2025, now.year}, reverse=True)
+
+    @pytest.mark.asyncio
+    async def test_jobs_refresh_only_open_months(self, test_db):
+        now = datetime.utcnow()
+        await test_db.users.insert_many([_user(1, approved=datetime(2024, 12, 5)), _user(2, approved=now)])
+        cube = AdminReportCube(test_db)
+        await cube.get_acquisition()
+
+        # A late change to a closed month is not picked up by the daily job...
+        await test_db.users.insert_many([_user(3, approved=datetime(2024, 12, 6)), _user(4, approved=now)])
+        result = await PlatformStatsDailySnapshotTemplate().execute(_context(test_db))
+        assert result.status == "success" and not result.warnings
+        assert result.details["cubeCellsRefreshed"] > 0
+
+        rows, _ = await cube.get_acquisition()
+        assert {r["period"]: r["count"] for r in rows} == {"2024-12": 1, month_bucket(now): 2}
+        assert await test_db.admin_report_cube.count_documents({"dimension": "age"}) == 3
+
+        # ...only by closing that month (or an explicit refresh)
+        assert await cube.close_month("2024-12") == 3
+        rows, _ = await cube.get_acquisition()
+        assert rows[0]["count"] == 2
+        assert (await test_db.admin_report_cube.find_one({"_id": cell_id("acquisition", None, "2024-12")}))["closed"]
+
+        result = await PlatformStatsMonthlyAggregationTemplate().execute(_context(test_db))
+        assert result.status == "success"
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_benchmark_dashboard_load(self, test_db):
+        """Live aggregation on every dashboard load vs reading the cube cells"""
+        cities = ["Boston, MA", "Austin, TX", "Seattle, WA", "Columbus, OH", "Denver, CO"]
+        await test_db.users.insert_many([
+            _user(i, cities[i % 5], gender="Female" if i % 2 else "Male",
+                  approved=datetime(2024, 1 + i % 12, 1))
+            for i in range(3000)
+        ])
+        cube = AdminReportCube(test_db)
+
+        start = time.perf_counter()
+        for _ in range(5):
+            for dimension in ("age", "location", "profession"):
+                await cube.compute_grouped(dimension)
+            await cube.compute_acquisition()
+        live_seconds = (time.perf_counter() - start) / 5
+
+        await cube.refresh_daily(datetime.utcnow() - timedelta(days=1))
+        await cube.get_acquisition()
+        start = time.perf_counter()
+        for _ in range(5):
+            for dimension in ("age", "location", "profession"):
+                await cube.get_current(dimension)
+            await cube.get_acquisition()
+        cube_seconds = (time.perf_counter() - start) / 5
+
+        print(f"\n3000 users, 4 reports: live {live_seconds * 1000:.1f}ms, cube {cube_seconds * 1000:.1f}ms")
+        assert cube_seconds < live_seconds
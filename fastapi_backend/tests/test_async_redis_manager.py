@@ -0,0 +1,190 @@
+"""
+Tests for the non-blocking Redis facade (async_redis_manager.py).
+"""
+import asyncio
+import time
+
+import pytest
+
+from async_redis_manager import AsyncRedisManager
+from redis_manager import RedisManager
+
+LATENCY = 0.005
+
+
+class MockStore:
+    """In-memory key space shared by the sync and async mocks"""
+
+    def __init__(self):
+        self.values = {}
+        self.zsets = {}
+        self.round_trips = 0
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+        return True
+
+    def exists(self, key):
+        return int(key in self.values)
+
+    def delete(self, *keys):
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+    def zadd(self, name, mapping):
+        self.zsets.setdefault(name, {}).update(mapping)
+        return len(mapping)
+
+    def zrange(self, name, start, end):
+        return sorted(self.zsets.get(name, {}), key=self.zsets.get(name, {}).get)
+
+    def zrem(self, name, *members):
+        return sum(self.zsets.get(name, {}).pop(member, None) is not None for member in members)
+
+
+class MockPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    async def execute(self):
+        await self.client.round_trip()
+        return [getattr(self.client.store, name)(*args) for name, args in self.commands]
+
+
+class MockAsyncRedis:
+    """Async client with a simulated network round trip per command"""
+
+    def __init__(self, store: MockStore, latency: float = 0):
+        self.store = store
+        self.latency = latency
+
+    async def round_trip(self):
+        self.store.round_trips += 1
+        await asyncio.sleep(self.latency)
+
+    def pipeline(self, transaction=False):
+        return MockPipeline(self)
+
+    def __getattr__(self, name):
+        async def command(*args):
+            await self.round_trip()
+            return getattr(self.store, name)(*args)
+        return command
+
+
+class MockSyncRedis:
+    """Sync client: the round trip blocks the calling thread"""
+
+    def __init__(self, store: MockStore, latency: float = 0):
+        self.store = store
+        self.latency = latency
+
+    def __getattr__(self, name):
+        def command(*args):
+            self.store.round_trips += 1
+            time.sleep(self.latency)
+            return getattr(self.store, name)(*args)
+        return command
+
+
+def _manager(store: MockStore, latency: float = 0) -> AsyncRedisManager:
+    manager = AsyncRedisManager()
+    manager.redis_client = MockAsyncRedis(store, latency)
+    return manager
+
+
+class TestAsyncRedisManager:
+    """Presence and cache operations batch their round trips"""
+
+    @pytest.mark.asyncio
+    async def test_presence_is_pipelined(self):
+        store = MockStore()
+        redis = _manager(store)
+
+        assert await redis.set_user_online("alice")
+        assert await redis.set_user_online("bob")
+        assert store.round_trips == 2
+
+        store.values.pop(f"{redis.ONLINE_PREFIX}bob")  # TTL lapsed
+        assert await redis.get_online_status(["alice", "bob", "carol"]) == {
+            "alice": True, "bob": False, "carol": False
+        }
+        assert await redis.get_online_users() == ["alice"]
+        assert "bob" not in store.zsets[redis.ONLINE_SET]
+
+    @pytest.mark.asyncio
+    async def test_cache_many_round_trip(self):
+        store = MockStore()
+        redis = _manager(store)
+
+        assert await redis.cache_set_many({"p:alice": {"firstName": "Alice"}, "p:bob": {"firstName": "Bob"}}, 300)
+        store.values["p:broken"] = "{not json"
+        store.round_trips = 0
+
+        found = await redis.cache_get_many(["p:alice", "p:bob", "p:broken", "p:carol"])
+        assert found == {"p:alice": {"firstName": "Alice"}, "p:bob": {"firstName": "Bob"}}
+        assert store.round_trips == 1
+
+    @pytest.mark.asyncio
+    async def test_disconnected_returns_neutral_values(self):
+        redis = AsyncRedisManager()
+        assert await redis.set_user_online("alice") is False
+        assert await redis.get_online_status(["alice"]) == {"alice": False}
+        assert await redis.get_online_users() == []
+        assert await redis.cache_get("key") is None
+        assert await redis.cache_get_many(["key"]) == {}
+        assert await redis.send_message("alice", "bob", "hi") is False
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_benchmark_event_loop_lag_during_connect_storm(self):
+        """200 concurrent socket connects: sync calls stall the loop, async ones don't"""
+        users = [f"user{i}" for i in range(200)]
+
+        async def max_loop_lag(connect) -> float:
+            lag = 0.0
+            done = asyncio.Event()
+
+            async def probe():
+                nonlocal lag
+                while not done.is_set():
+                    start = time.perf_counter()
+                    await asyncio.sleep(0)
+                    lag = max(lag, time.perf_counter() - start)
+
+            probe_task = asyncio.create_task(probe())
+            await asyncio.gather(*(connect(username) for username in users))
+            done.set()
+            await probe_task
+            return lag
+
+        sync_redis = RedisManager()
+        sync_redis.redis_client = MockSyncRedis(MockStore(), LATENCY)
+
+        async def sync_connect(username):
+            sync_redis.set_user_online(username)
+
+        async_redis = _manager(MockStore(), LATENCY)
+
+        start = time.perf_counter()
+        sync_lag = await max_loop_lag(sync_connect)
+        sync_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        async_lag = await max_loop_lag(async_redis.set_user_online)
+        async_seconds = time.perf_counter() - start
+
+        print(f"\n{len(users)} connects: sync {sync_seconds:.3f}s (max loop lag {sync_lag * 1000:.1f}ms), "
+              f"async {async_seconds:.3f}s (max loop lag {async_lag * 1000:.1f}ms)")
+        assert async_redis.redis_client.store.round_trips == len(users)
+        assert async_lag < sync_lag
+        assert async_seconds < sync_seconds
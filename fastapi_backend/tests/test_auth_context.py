@@ -0,0 +1,201 @@
+"""
+Tests for the per-request auth context and cached user lookups (auth/auth_context.py).
+"""
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.requests import Request
+from starlette.responses import Response
+
+from auth.auth_context import invalidate_user, user_cache
+from auth.jwt_auth import JWTManager, get_current_user_dependency, get_username_query
+from middleware.auth_context import auth_context_middleware
+from middleware.rate_limiter import _get_user_or_ip
+
+
+class CountingDB:
+    """Wraps the test database and counts users.find_one round trips"""
+
+    def __init__(self, db):
+        self.db = db
+        self.find_one_calls = 0
+        outer = self
+
+        class Users:
+            def __getattr__(self, name):
+                return getattr(db.users, name)
+
+            async def find_one(self, *args, **kwargs):
+                outer.find_one_calls += 1
+                return await db.users.find_one(*args, **kwargs)
+
+        self.users = Users()
+
+
+def _request(token=None, method="GET") -> Request:
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return Request({
+        "type": "http", "method": method, "path": "/api/users/profile",
+        "headers": headers, "query_string": b"", "client": ("10.0.0.1", 1234),
+    })
+
+
+@pytest.fixture
+def counting_db(test_db, monkeypatch):
+    user_cache.clear()
+    db = CountingDB(test_db)
+    monkeypatch.setattr("database.get_database", lambda: db)
+    return db
+
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    calls = []
+    original = JWTManager.decode_token
+
+    def counting_decode(token):
+        calls.append(token)
+        return original(token)
+
+    monkeypatch.setattr(JWTManager, "decode_token", staticmethod(counting_decode))
+    return calls
+
+
+async def _authenticate(request: Request):
+    """What one authenticated request does: rate-limit key, then the auth dependency"""
+    _get_user_or_ip(request)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=request.headers["authorization"][7:])
+    return await get_current_user_dependency(request, credentials)
+
+
+class TestAuthContext:
+    """One decode and at most one user lookup per request"""
+
+    @pytest.mark.asyncio
+    async def test_decode_once_per_request(self, counting_db, decode_calls):
+        await counting_db.db.users.insert_one({"username": "alice", "accountStatus": "active"})
+        token = JWTManager.create_access_token({"sub": "alice"})
+        request = _request(token)
+
+        assert _get_user_or_ip(request) == "user:alice"
+        user = await _authenticate(request)
+
+        assert user["username"] == "alice"
+        assert len(decode_calls) == 1
+        assert counting_db.find_one_calls == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_token(self, counting_db):
+        request = _request("not-a-jwt")
+        assert _get_user_or_ip(request) == "10.0.0.1"
+        with pytest.raises(HTTPException) as exc:
+            await _authenticate(request)
+        assert exc.value.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_case_insensitive_lookup_and_missing_user(self, counting_db):
+        await counting_db.db.users.insert_one({"username": "Bob"})
+        user = await _authenticate(_request(JWTManager.create_access_token({"sub": "bob"})))
+        assert user["username"] == "Bob"
+
+        with pytest.raises(HTTPException) as exc:
+            await _authenticate(_request(JWTManager.create_access_token({"sub": "ghost"})))
+        assert exc.value.detail == "User not found"
+
+
+class TestUserCache:
+    """User documents are reused across requests until invalidated"""
+
+    @pytest.mark.asyncio
+    async def test_cached_across_requests_and_copies(self, counting_db):
+        await counting_db.db.users.insert_one({"username": "alice", "role_name": "free_user"})
+        token = JWTManager.create_access_token({"sub": "alice"})
+
+        first = await _authenticate(_request(token))
+        first["role_name"] = "mutated by a handler"
+        second = await _authenticate(_request(token))
+
+        assert counting_db.find_one_calls == 1
+        assert second["role_name"] == "free_user"
+
+        await counting_db.db.users.update_one({"username": "alice"}, {"$set": {"role_name": "admin"}})
+        await invalidate_user("ALICE")
+        assert (await _authenticate(_request(token)))["role_name"] == "admin"
+        assert counting_db.find_one_calls == 2
+
+    @pytest.mark.asyncio
+    async def test_secrets_are_not_cached(self, counting_db):
+        await counting_db.db.users.insert_one({
+            "username": "alice",
+            "password": "hash",
+            "security": {"password_hash": "hash", "password_history": ["old"], "failed_login_attempts": 0},
+            "mfa": {"mfa_enabled": True, "mfa_secret": "totp", "mfa_backup_codes": ["code"]},
+            "emailVerificationToken": "token",
+        })
+        token = JWTManager.create_access_token({"sub": "alice"})
+
+        user = await _authenticate(_request(token))
+        assert "password" not in user and "emailVerificationToken" not in user
+        assert user["security"] == {"failed_login_attempts": 0}
+        assert user["mfa"] == {"mfa_enabled": True}
+        assert (await counting_db.db.users.find_one({"username": "alice"}))["mfa"]["mfa_secret"] == "totp"
+
+    @pytest.mark.asyncio
+    async def test_successful_write_invalidates_caller(self, counting_db):
+        await counting_db.db.users.insert_one({"username": "alice"})
+        token = JWTManager.create_access_token({"sub": "alice"})
+
+        for method, status_code, expected_lookups in (("GET", 200, 1), ("PUT", 400, 1), ("PUT", 200, 2)):
+            request = _request(token, method)
+
+            async def call_next(request):
+                await _authenticate(request)
+                return Response(status_code=status_code)
+
+            await auth_context_middleware(request, call_next)
+            await _authenticate(_request(token))
+            assert counting_db.find_one_calls == expected_lookups
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_benchmark_authenticated_requests(self, counting_db, decode_calls):
+        """DB round trips and auth CPU per authenticated request, before and after"""
+        await counting_db.db.users.insert_many([{"username": f"user{i}"} for i in range(20)])
+        tokens = [JWTManager.create_access_token({"sub": f"user{i % 20}"}) for i in range(400)]
+
+        async def legacy_authenticate(request: Request):
+            # Previous flow: the limiter and the dependency each decode the
+            # token, then the dependency loads the user (regex fallback on miss)
+            token = request.headers["authorization"][7:]
+            JWTManager.decode_token(token)
+            payload = JWTManager.decode_token(token)
+            JWTManager.verify_token_type(payload, "access")
+            JWTManager.is_token_expired(payload)
+            user = await counting_db.users.find_one({"username": payload["sub"]})
+            if user is None:
+                user = await counting_db.users.find_one(get_username_query(payload["sub"]))
+            return user
+
+        start = time.perf_counter()
+        for token in tokens:
+            await legacy_authenticate(_request(token))
+        legacy_seconds = time.perf_counter() - start
+        legacy_lookups, legacy_decodes = counting_db.find_one_calls, len(decode_calls)
+
+        counting_db.find_one_calls = 0
+        decode_calls.clear()
+        start = time.perf_counter()
+        for token in tokens:
+            await _authenticate(_request(token))
+        context_seconds = time.perf_counter() - start
+
+        n = len(tokens)
+        print(f"\n{n} authenticated requests: before {legacy_lookups / n:.2f} DB lookups, "
+              f"{legacy_decodes / n:.1f} decodes, {legacy_seconds * 1e6 / n:.0f}us each; "
+              f"after {counting_db.find_one_calls / n:.2f} DB lookups, {len(decode_calls) / n:.1f} decodes, "
+              f"{context_seconds * 1e6 / n:.0f}us each")
+        assert len(decode_calls) == n
+        assert counting_db.find_one_calls == 20
+        assert context_seconds < legacy_seconds
@@ -0,0 +1,164 @@
+"""
+Tests for the per-pair conversation summaries (services/conversation_summaries.py).
+"""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.conversation_summaries import (
+    ConversationSummaryService,
+    other_participant,
+    pair_id,
+    refresh_conversation_summaries,
+    remove_user_conversation_summaries,
+    summarize_messages,
+    unread_for,
+)
+
+BASE_TIME = datetime(2025, 1, 1, 12, 0, 0)
+
+
+def _message(sender, recipient, minutes, content="hi", is_read=False, is_visible=True):
+    return {
+        "fromUsername": sender,
+        "toUsername": recipient,
+        "content": content,
+        "createdAt": BASE_TIME + timedelta(minutes=minutes),
+        "isRead": is_read,
+        "isVisible": is_visible,
+    }
+
+
+async def _send(db, message):
+    """What the send endpoints do: store the message, then record it"""
+    await db.messages.insert_one(message)
+    await ConversationSummaryService(db).record_message(message)
+
+
+class TestRecordMessage:
+    """Sends update the pair summary incrementally"""
+
+    @pytest.mark.asyncio
+    async def test_last_message_and_unread_counts(self, test_db):
+        await _send(test_db, _message("alice", "bob", 1, "first"))
+        await _send(test_db, _message("bob", "alice", 2, "reply"))
+        await _send(test_db, _message("alice", "bob", 3, "again"))
+
+        summaries = await ConversationSummaryService(test_db).list_for_user("bob")
+        assert len(summaries) == 1
+        summary = summaries[0]
+        assert summary["_id"] == pair_id("bob", "alice") == "alice:bob"
+        assert other_participant(summary, "bob") == "alice"
+        assert summary["lastVisibleMessage"]["content"] == "again"
+        assert unread_for(summary, "bob") == 2
+        assert unread_for(summary, "alice") == 1
+
+    @pytest.mark.asyncio
+    async def test_older_message_does_not_replace_newer(self, test_db):
+        await _send(test_db, _message("alice", "bob", 10, "newer"))
+        # Legacy form POST stores createdAt as an ISO string
+        legacy = _message("bob", "alice", 5, "older")
+        legacy["createdAt"] = legacy["createdAt"].isoformat()
+        await _send(test_db, legacy)
+
+        summary = (await ConversationSummaryService(test_db).list_for_user("alice"))[0]
+        assert summary["lastMessage"]["content"] == "newer"
+        assert unread_for(summary, "alice") == 1
+
+    @pytest.mark.asyncio
+    async def test_hidden_messages_only_in_admin_view(self, test_db):
+        await _send(test_db, _message("alice", "bob", 1, "visible"))
+        await _send(test_db, _message("alice", "bob", 2, "hidden", is_visible=False))
+        await _send(test_db, _message("carol", "bob", 3, "hidden only", is_visible=False))
+
+        service = ConversationSummaryService(test_db)
+        member_view = await service.list_for_user("bob")
+        assert [other_participant(s, "bob") for s in member_view] == ["alice"]
+        assert member_view[0]["lastVisibleMessage"]["content"] == "visible"
+        assert unread_for(member_view[0], "bob") == 1
+
+        admin_view = await service.list_for_user("bob", include_hidden=True)
+        assert [other_participant(s, "bob") for s in admin_view] == ["carol", "alice"]
+        assert admin_view[1]["lastMessage"]["content"] == "hidden"
+        assert unread_for(admin_view[1], "bob", include_hidden=True) == 2
+
+
+class TestRefreshAndRebuild:
+    """Reads, deletes and un-backfilled users are rebuilt from messages"""
+
+    @pytest.mark.asyncio
+    async def test_read_and_delete_refresh_the_pair(self, test_db):
+        for i in range(3):
+            await _send(test_db, _message("alice", "bob", i, f"m{i}"))
+
+        await test_db.messages.update_many({"toUsername": "bob"}, {"$set": {"isRead": True}})
+        await refresh_conversation_summaries(test_db, [("bob", "alice")])
+        service = ConversationSummaryService(test_db)
+        assert unread_for((await service.list_for_user("bob"))[0], "bob") == 0
+
+        await test_db.messages.delete_one({"content": "m2"})
+        await refresh_conversation_summaries(test_db, [("alice", "bob")])
+        assert (await service.list_for_user("bob"))[0]["lastMessage"]["content"] == "m1"
+
+        await test_db.messages.delete_many({})
+        await refresh_conversation_summaries(test_db, [("alice", "bob")])
+        assert await service.list_for_user("bob") == []
+
+    @pytest.mark.asyncio
+    async def test_lazy_rebuild_matches_incremental(self, test_db):
+        messages = [
+            _message("alice", "bob", 1), _message("bob", "alice", 2, is_read=True),
+            _message("carol", "alice", 3, is_visible=False), _message("alice", "dave", 4, "latest"),
+        ]
+        await test_db.messages.insert_many([dict(m) for m in messages])
+
+        # No summaries yet (pre-backfill data): built on first listing
+        summaries = await ConversationSummaryService(test_db).list_for_user("alice", include_hidden=True)
+        assert [other_participant(s, "alice") for s in summaries] == ["dave", "carol", "bob"]
+        assert unread_for(summaries[1], "alice", include_hidden=True) == 1
+        assert unread_for(summaries[1], "alice") == 0
+
+        expected = summarize_messages(messages)
+        assert summaries[0]["lastMessage"]["content"] == expected["alice:dave"]["lastMessage"]["content"]
+
+        await remove_user_conversation_summaries(test_db, "alice")
+        assert await test_db.conversation_summaries.count_documents({}) == 0
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_benchmark_conversation_list(self, test_db):
+        """Legacy $group over all of a user's messages vs reading the summaries"""
+        messages = [
+            _message("alice" if i % 2 else f"user{i % 50}", f"user{i % 50}" if i % 2 else "alice", i)
+            for i in range(5000)
+        ]
+        await test_db.messages.insert_many(messages)
+        service = ConversationSummaryService(test_db)
+        await service.rebuild_user("alice")
+
+        pipeline = [
+            {"$match": {"$or": [{"fromUsername": "alice"}, {"toUsername": "alice"}]}},
+            {"$sort": {"createdAt": -1}},
+            {"$group": {
+                "_id": {"$cond": [{"$eq": ["$fromUsername", "alice"]}, "$toUsername", "$fromUsername"]},
+                "lastMessage": {"$first": "$content"},
+                "lastMessageTime": {"$first": "$createdAt"},
+            }},
+            {"$sort": {"lastMessageTime": -1}},
+        ]
+
+        start = time.perf_counter()
+        for _ in range(5):
+            legacy = await test_db.messages.aggregate(pipeline).to_list(None)
+        legacy_seconds = (time.perf_counter() - start) / 5
+
+        start = time.perf_counter()
+        for _ in range(5):
+            summaries = await service.list_for_user("alice")
+        summary_seconds = (time.perf_counter() - start) / 5
+
+        print(f"\n{len(messages)} messages, {len(summaries)} conversations: "
+              f"$group {legacy_seconds * 1000:.1f}ms, summaries {summary_seconds * 1000:.1f}ms")
+        assert len(summaries) == len(legacy) == 50
+        assert summary_seconds < legacy_seconds
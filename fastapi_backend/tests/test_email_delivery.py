@@ -0,0 +1,201 @@
+"""
+Tests for the concurrent email delivery engine (services/email_delivery.py).
+SMTP delivery runs against a local sink so throughput can be measured.
+"""
+import socketserver
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+import services.email_delivery as email_delivery
+from services.email_delivery import EmailDeliveryEngine, OutgoingEmail
+from services.email_sender import TokenBucket
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server session: accepts every message and records it"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 sink ESMTP")
+        recipients = []
+        messages = 0
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 sink")
+            elif command.startswith(("MAIL", "RSET", "NOOP")):
+                recipients = []
+                self.reply("250 OK")
+            elif command.startswith("RCPT"):
+                recipients.append(line.decode().split(":", 1)[1].strip(" <>\r\n"))
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.received.extend(recipients)
+                self.reply("250 OK queued")
+                messages += 1
+                if messages == self.server.max_messages_per_session:
+                    return  # Drop the session, like a provider's per-connection limit
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPSinkHandler)
+        self.connections = 0
+        self.received = []
+        self.max_messages_per_session = None
+        self.lock = threading.Lock()
+
+
+@pytest.fixture
+def smtp_sink():
+    sink = SMTPSink()
+    thread = threading.Thread(target=sink.serve_forever, daemon=True)
+    thread.start()
+    yield sink
+    sink.shutdown()
+    sink.server_close()
+
+
+def _sink_config(sink):
+    return {"host": "127.0.0.1", "port": sink.server_address[1], "user": None, "password": None,
+            "from_name": "Test", "from_email": "noreply@test.com"}
+
+
+def _emails(count):
+    return [OutgoingEmail(key=str(i), to_email=f"user{i}@test.com", subject=f"Hello {i}",
+                          html_content=f"<p>Message {i}</p>") for i in range(count)]
+
+
+class TestTokenBucket:
+
+    @pytest.mark.asyncio
+    async def test_rate_is_enforced_after_burst(self):
+        bucket = TokenBucket(rate=50, capacity=5)
+        started = time.monotonic()
+        for _ in range(10):
+            await bucket.acquire()
+        # 5 from the burst, 5 more at 50/s
+        assert time.monotonic() - started >= 0.09
+
+
+class TestSMTPDelivery:
+
+    @pytest.mark.asyncio
+    async def test_batch_reuses_persistent_connections(self, smtp_sink):
+        engine = EmailDeliveryEngine(provider="smtp", workers=4, smtp_rate=0, smtp_config=_sink_config(smtp_sink))
+        try:
+            results = await engine.deliver(_emails(200))
+        finally:
+            await engine.close()
+
+        assert all(r.success and r.provider == "smtp" for r in results.values())
+        assert sorted(smtp_sink.received) == sorted(f"user{i}@test.com" for i in range(200))
+        # One session per worker for the whole batch, not one per message
+        assert smtp_sink.connections == 4
+        stats = engine.get_stats()
+        assert stats["smtp_sent"] == 200 and stats["smtp_connections"] == 4
+        print(f"\nSMTP sink throughput: {stats['per_second']} emails/s")
+
+    @pytest.mark.asyncio
+    async def test_smtp_rate_limit(self, smtp_sink):
+        engine = EmailDeliveryEngine(provider="smtp", workers=2, smtp_rate=20, smtp_config=_sink_config(smtp_sink))
+        started = time.monotonic()
+        try:
+            await engine.deliver(_emails(6))
+        finally:
+            await engine.close()
+        # 2-token burst, then 4 more at 20/s
+        assert time.monotonic() - started >= 0.18
+
+    @pytest.mark.asyncio
+    async def test_reconnects_after_server_drops_session(self, smtp_sink):
+        smtp_sink.max_messages_per_session = 3
+        engine = EmailDeliveryEngine(provider="smtp", workers=1, smtp_rate=0, smtp_config=_sink_config(smtp_sink))
+        try:
+            results = await engine.deliver(_emails(7))
+        finally:
+            await engine.close()
+        assert all(r.success for r in results.values())
+        assert len(smtp_sink.received) == 7
+        assert smtp_sink.connections == 3
+
+    @pytest.mark.asyncio
+    async def test_default_config_requires_credentials(self):
+        with patch.object(email_delivery, "_smtp_config", return_value={"host": "smtp.test", "port": 587, "user": None,
+                                                                          "password": None, "from_name": "Test"}):
+            engine = EmailDeliveryEngine(provider="smtp", workers=1, smtp_rate=0)
+            results = await engine.deliver(_emails(1))
+        assert results["0"].success is False
+        assert results["0"].error == "SMTP credentials not configured"
+
+
+class TestResendDelivery:
+
+    @pytest.fixture(autouse=True)
+    def fast_resend_bucket(self, monkeypatch):
+        monkeypatch.setattr(email_delivery, "_resend_bucket", TokenBucket(rate=1000, capacity=10))
+        monkeypatch.setattr(email_delivery, "_resend_config", lambda: {"api_key": "test", "from": "Test <a@test.com>"})
+        monkeypatch.setattr(email_delivery, "_RESEND_RETRY_BASE_DELAY", 0.01)
+
+    @pytest.mark.asyncio
+    async def test_uses_batch_endpoint(self):
+        with patch("resend.Batch.send") as batch_send:
+            engine = EmailDeliveryEngine(provider="resend", workers=1, smtp_rate=0)
+            results = await engine.deliver(_emails(250))
+
+        assert batch_send.call_count == 3  # 100 + 100 + 50
+        assert len(batch_send.call_args_list[0].args[0]) == 100
+        assert all(r.success and r.provider == "resend" for r in results.values())
+        assert engine.get_stats()["resend_requests"] == 3
+
+    @pytest.mark.asyncio
+    async def test_retries_rate_limit_then_succeeds(self):
+        with patch("resend.Batch.send", side_effect=[Exception("429 Too Many Requests"), {"data": []}]) as batch_send:
+            engine = EmailDeliveryEngine(provider="resend", workers=1, smtp_rate=0)
+            results = await engine.deliver(_emails(3))
+        assert batch_send.call_count == 2
+        assert all(r.provider == "resend" for r in results.values())
+
+    @pytest.mark.asyncio
+    async def test_resend_only_setup_never_reads_smtp_settings(self):
+        with patch("resend.Batch.send"), \
+                patch.object(email_delivery, "_smtp_config", side_effect=AssertionError("SMTP config read")):
+            engine = EmailDeliveryEngine(provider="resend", workers=2, smtp_rate=0)
+            results = await engine.deliver(_emails(3))
+            await engine.close()
+        assert all(r.success for r in results.values())
+        assert engine.get_stats()["smtp_connections"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_falls_back_to_smtp(self, smtp_sink):
+        with patch("resend.Batch.send", side_effect=Exception("invalid from address")):
+            engine = EmailDeliveryEngine(provider="resend", workers=2, smtp_rate=0, smtp_config=_sink_config(smtp_sink))
+            try:
+                results = await engine.deliver(_emails(5))
+            finally:
+                await engine.close()
+
+        assert all(r.success and r.provider == "smtp" for r in results.values())
+        assert results["0"].resend_error == "invalid from address"
+        assert len(smtp_sink.received) == 5
@@ -0,0 +1,122 @@
+"""
+Tests for coalesced interest notifications in EventDispatcher
+(profile views / favorites / shortlists grouped per recipient).
+"""
+import asyncio
+
+import pytest
+
+from services.event_dispatcher import EventDispatcher, UserEventType, digest_batches, privacy_hides
+
+IMMEDIATE = {"digestSettings": {"enabled": False}}
+
+
+class RecordingNotifications:
+    def __init__(self):
+        self.queued = []
+
+    async def queue_notification(self, **kwargs):
+        self.queued.append(kwargs)
+        return True
+
+
+def _user(username, **extra):
+    return {"username": username, "firstName": username.title(), "profileId": f"p-{username}", **extra}
+
+
+@pytest.fixture
+def dispatcher(test_db):
+    dispatcher = EventDispatcher(test_db)
+    dispatcher.notification_service = RecordingNotifications()
+    dispatcher.coalesce_window = 60  # Flushed explicitly by the tests
+    return dispatcher
+
+
+class TestPreferenceHelpers:
+
+    def test_digest_defaults_to_batching(self):
+        assert digest_batches(None, "batchProfileViews") is True
+        assert digest_batches(IMMEDIATE, "batchProfileViews") is False
+        assert digest_batches({"digestSettings": {"batchFavorites": False}}, "batchFavorites") is False
+
+    def test_privacy_requires_premium_role(self):
+        prefs = {"privacySettings": {"hideProfileViews": True}}
+        assert privacy_hides(prefs, {"role_name": "premium_user"}, "hideProfileViews") is True
+        assert privacy_hides(prefs, {"role_name": "free_user"}, "hideProfileViews") is False
+        assert privacy_hides(None, {"role_name": "premium_user"}, "hideProfileViews") is False
+
+
+class TestCoalescedDispatch:
+
+    @pytest.mark.asyncio
+    async def test_views_coalesce_into_one_notification(self, test_db, dispatcher):
+        viewers = [f"viewer{i}" for i in range(5)]
+        await test_db.users.insert_many([_user("target")] + [_user(v) for v in viewers])
+        await test_db.notification_preferences.insert_one({"username": "target", **IMMEDIATE})
+
+        for viewer in viewers + ["viewer0"]:  # repeat views count once
+            await dispatcher.dispatch(UserEventType.PROFILE_VIEWED, viewer, "target")
+        assert dispatcher.notification_service.queued == []
+
+        assert await dispatcher.flush_coalesced() == 1
+        [notification] = dispatcher.notification_service.queued
+        data = notification["template_data"]
+        assert notification["trigger"] == "profile_view"
+        assert data["count"] == 5
+        assert data["summary"] == "5 people viewed your profile"
+        # Most recent actor leads
+        assert data["match"]["username"] == "viewer0"
+        assert data["match"]["firstName"] == "Viewer0 and 4 others"
+        assert [m["username"] for m in data["matches"]][:2] == ["viewer0", "viewer4"]
+        dispatcher._coalesce_task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_single_actor_keeps_per_event_shape(self, test_db, dispatcher):
+        await test_db.users.insert_many([_user("target"), _user("fan")])
+        await test_db.notification_preferences.insert_one({"username": "target", **IMMEDIATE})
+
+        await dispatcher.dispatch(UserEventType.FAVORITE_ADDED, "fan", "target")
+        await dispatcher.flush_coalesced()
+
+        [notification] = dispatcher.notification_service.queued
+        assert notification["trigger"] == "favorited"
+        assert notification["template_data"]["match"]["firstName"] == "Fan"
+        assert "count" not in notification["template_data"]
+        dispatcher._coalesce_task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_privacy_digest_and_removals_are_respected(self, test_db, dispatcher):
+        await test_db.users.insert_many([
+            _user("target"), _user("digest_user"), _user("hidden", role_name="premium_user"),
+            _user("fickle"), _user("fan"),
+        ])
+        await test_db.notification_preferences.insert_many([
+            {"username": "target", **IMMEDIATE},
+            {"username": "hidden", "privacySettings": {"hideFavorites": True}},
+        ])
+
+        await dispatcher.dispatch(UserEventType.FAVORITE_ADDED, "hidden", "target")
+        await dispatcher.dispatch(UserEventType.FAVORITE_ADDED, "fickle", "target")
+        await dispatcher.dispatch(UserEventType.FAVORITE_REMOVED, "fickle", "target")
+        await dispatcher.dispatch(UserEventType.FAVORITE_ADDED, "fan", "target")
+        await dispatcher.dispatch(UserEventType.SHORTLIST_ADDED, "fan", "digest_user")  # default: digest
+        await dispatcher.flush_coalesced()
+
+        [notification] = dispatcher.notification_service.queued
+        assert notification["username"] == "target"
+        assert notification["template_data"]["match"]["username"] == "fan"
+        assert "count" not in notification["template_data"]
+        dispatcher._coalesce_task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_window_flushes_automatically(self, test_db, dispatcher):
+        dispatcher.coalesce_window = 0.01
+        await test_db.users.insert_many([_user("target"), _user("a"), _user("b")])
+        await test_db.notification_preferences.insert_one({"username": "target", **IMMEDIATE})
+
+        await dispatcher.dispatch(UserEventType.SHORTLIST_ADDED, "a", "target")
+        await dispatcher.dispatch(UserEventType.SHORTLIST_ADDED, "b", "target")
+        await asyncio.sleep(0.1)
+
+        [notification] = dispatcher.notification_service.queued
+        assert notification["template_data"]["summary"] == "2 people shortlisted you"
@@ -0,0 +1,90 @@
+"""
+Tests for lease-based claiming of dynamic jobs (job_worker.py, JobRegistryService).
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from job_worker import JobWorker
+from services.job_registry import JobRegistryService
+
+
+async def _add_job(db, name, due=True, **fields):
+    offset = timedelta(minutes=-1 if due else 10)
+    doc = {
+        "name": name,
+        "template_type": "test_scheduler",
+        "parameters": {},
+        "schedule": {"type": "interval", "interval_seconds": 3600},
+        "enabled": True,
+        "nextRunAt": datetime.utcnow() + offset,
+        **fields,
+    }
+    result = await db.dynamic_jobs.insert_one(doc)
+    return str(result.inserted_id)
+
+
+class TestLeaseClaiming:
+    """Only one claimer wins a due job until its lease expires"""
+
+    @pytest.mark.asyncio
+    async def test_claim_is_exclusive_until_lease_expires(self, test_db):
+        registry = JobRegistryService(test_db)
+        job_id = await _add_job(test_db, "digest")
+        await _add_job(test_db, "later", due=False)
+
+        claimed = await registry.claim_next_job("worker-a", lease_seconds=60)
+        assert claimed["_id"] == job_id
+        assert await registry.claim_next_job("worker-b", lease_seconds=60) is None
+
+        # Worker A died: once its lease lapses the job is claimable again
+        await test_db.dynamic_jobs.update_one(
+            {"name": "digest"}, {"$set": {"lease.expiresAt": datetime.utcnow() - timedelta(seconds=1)}}
+        )
+        assert (await registry.claim_next_job("worker-b", lease_seconds=60))["_id"] == job_id
+        assert not await registry.renew_lease(job_id, "worker-a", 60)
+
+        await registry.release_lease(job_id, "worker-b")
+        assert "lease" not in await test_db.dynamic_jobs.find_one({"name": "digest"})
+
+    @pytest.mark.asyncio
+    async def test_manual_run_request_is_claimed_once(self, test_db):
+        registry = JobRegistryService(test_db)
+        job_id = await _add_job(test_db, "export", due=False)
+
+        assert await registry.request_run(job_id, triggered_by="manual:admin")
+        claimed = await registry.claim_next_job("worker-a", lease_seconds=60)
+        assert claimed["triggered_by"] == "manual:admin"
+
+        await registry.release_lease(job_id, "worker-a")
+        assert await registry.claim_next_job("worker-a", lease_seconds=60) is None
+
+
+class TestJobWorker:
+    """Due jobs run concurrently, once per pass, and leases are released"""
+
+    @pytest.mark.asyncio
+    async def test_run_due_jobs(self, test_db):
+        for name in ("a", "b", "c"):
+            await _add_job(test_db, name)
+        await _add_job(test_db, "disabled", enabled=False)
+
+        worker = JobWorker(test_db, concurrency=2, lease_seconds=60)
+        active, peak, ran = 0, 0, []
+
+        async def fake_execute(job, triggered_by="scheduler"):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            ran.append(job["name"])
+            active -= 1
+
+        worker.executor.execute_job = fake_execute
+        assert await worker.run_due_jobs() == 3
+
+        assert sorted(ran) == ["a", "b", "c"]
+        assert peak == 2
+        jobs = await test_db.dynamic_jobs.find({"enabled": True}).to_list(None)
+        assert all("lease" not in job and job["nextRunAt"] > datetime.utcnow() for job in jobs)
@@ -0,0 +1,159 @@
+"""
+Tests for the vectorized L3V3L batch scorer (L3V3LMatchingEngine.score_many).
+"""
+import random
+import time
+
+import pytest
+
+from l3v3l_matching_engine import L3V3LMatchingEngine
+
+
+def _random_profile(rng: random.Random, index: int) -> dict:
+    """Build a profile that exercises every scoring branch."""
+    def maybe(values):
+        return rng.choice(values + [None, ''])
+
+    profile = {
+        "username": f"user{index}",
+        "gender": rng.choice(["Male", "Female", "male", "Other", None]),
+        "familyValues": maybe(["Traditional", "Moderate", "Liberal", "Moderate-Liberal"]),
+        "partnerPreference": maybe(["honest and caring", "kind, loyal, open", "supportive"]),
+        "aboutMe": maybe(["fun and ambitious", "love travel and growth", "positive, funny"]),
+        "languagesSpoken": rng.sample(["English", "Hindi", "Telugu", "Tamil"], rng.randint(0, 3)),
+        "countryOfOrigin": maybe(["IN", "US"]),
+        "countryOfResidence": maybe(["US", "US", "IN"]),
+        "state": maybe(["CA", "TX"]),
+        "location": maybe(["San Jose", "San Francisco", "Austin", "san jose area"]),
+        "citizenshipStatus": maybe(["Citizen", "Green Card", "H1B"]),
+        "birthYear": rng.choice([None, rng.randint(1975, 2002)]),
+        "birthMonth": rng.randint(1, 12),
+        "height": maybe(["5'4\"", "5'10\"", "6'1\"", "170cm", "5 ft 7 in"]),
+        "education": maybe(["Bachelor of Science", "Master", "PhD", "MBA"]),
+        "eatingPreference": maybe(["Vegetarian", "Eggetarian", "Non-Veg", "Vegan"]),
+        "familyType": maybe(["Nuclear", "Joint"]),
+        "motherTongue": maybe(["Telugu", "Hindi"]),
+        "workLocation": maybe(["Bay Area", "Austin TX", "bay"]),
+        "religion": maybe(["Hindu", "Christian", "No Religion"]),
+        "caste": maybe(["A", "B"]),
+        "castePreference": rng.choice(["None", "Any", "Same", None]),
+    }
+    if rng.random() < 0.5:
+        profile["educationHistory"] = [{"degree": rng.choice(["BS", "MS", "PhD", "MD", "Diploma"])}]
+    if rng.random() < 0.6:
+        profile["workExperience"] = [{"title": rng.choice(["Software Engineer", "Doctor", "Teacher", "Artist"])}]
+    if rng.random() < 0.7:
+        criteria = {}
+        if rng.random() < 0.5:
+            criteria["ageRange"] = {"min": rng.choice(["", "25", 28]), "max": rng.choice(["", "35", 40])}
+        if rng.random() < 0.5:
+            criteria["ageRangeRelative"] = {"minOffset": -3, "maxOffset": 4}
+        if rng.random() < 0.5:
+            criteria["heightRange"] = {"minFeet": rng.choice(["", "5"]), "minInches": "2",
+                                       "maxFeet": rng.choice(["", "6"]), "maxInches": "0"}
+        if rng.random() < 0.3:
+            criteria["heightRangeRelative"] = {"minInches": -4, "maxInches": 2}
+        if rng.random() < 0.5:
+            criteria["educationLevel"] = rng.choice([["BS", "MS"], ["PhD"], "Any"])
+        if rng.random() < 0.5:
+            criteria["religion"] = ["Hindu", "No Religion"]
+        if rng.random() < 0.5:
+            criteria["languages"] = ["Telugu", "English"]
+        if rng.random() < 0.5:
+            criteria["eatingPreference"] = ["Vegetarian", "Eggetarian"]
+        profile["partnerCriteria"] = criteria
+    return profile
+
+
+def _assert_same(batch: dict, pairwise: dict):
+    assert batch["total_score"] == pytest.approx(pairwise["total_score"], abs=0.01)
+    assert batch["compatibility_level"] == pairwise["compatibility_level"]
+    assert batch["component_scores"].keys() == pairwise["component_scores"].keys()
+    for key, value in pairwise["component_scores"].items():
+        assert batch["component_scores"][key] == pytest.approx(value, abs=0.01)
+
+
+class TestScoreMany:
+    """Batch results must match calculate_match_score pair by pair."""
+
+    def test_matches_pairwise_scores(self):
+        engine = L3V3LMatchingEngine()
+        rng = random.Random(42)
+        profiles = [_random_profile(rng, i) for i in range(120)]
+
+        for user in profiles[:15]:
+            batch = engine.score_many(user, profiles)
+            assert len(batch) == len(profiles)
+            for candidate, result in zip(profiles, batch):
+                pairwise = engine.calculate_match_score(user, candidate)
+                _assert_same(result, pairwise)
+                assert result["match_reasons"] == pairwise["match_reasons"]
+
+    def test_encoded_features_are_reusable(self):
+        engine = L3V3LMatchingEngine()
+        rng = random.Random(7)
+        profiles = [_random_profile(rng, i) for i in range(40)]
+        features = engine.encode_profiles(profiles)
+
+        for i in (0, 5, 17):
+            candidates = [j for j in range(len(profiles)) if j != i]
+            batch = engine.score_encoded(features, i, candidates, include_reasons=False)
+            for j, result in zip(candidates, batch):
+                _assert_same(result, engine.calculate_match_score(profiles[i], profiles[j]))
+                assert result["match_reasons"] == []
+
+    def test_score_column_matches_pairwise_scores(self):
+        engine = L3V3LMatchingEngine()
+        rng = random.Random(11)
+        profiles = [_random_profile(rng, i) for i in range(60)]
+        features = engine.encode_profiles(profiles)
+
+        for j in (0, 9, 33):
+            users = [i for i in range(len(profiles)) if i != j]
+            column = engine.score_column(features, j, users)
+            for i, result in zip(users, column):
+                pairwise = engine.calculate_match_score(profiles[i], profiles[j])
+                _assert_same(result, pairwise)
+                assert result["match_reasons"] == pairwise["match_reasons"]
+
+    def test_malformed_profile_scores_like_error_path(self):
+        engine = L3V3LMatchingEngine()
+        rng = random.Random(3)
+        user = _random_profile(rng, 0)
+        broken = _random_profile(rng, 1)
+        broken["languagesSpoken"] = None  # set(None) raises in the pairwise scorer
+
+        result = engine.score_many(user, [broken])[0]
+
+        assert engine.calculate_match_score(user, broken)["compatibility_level"] == "Unknown"
+        assert result["total_score"] == 0
+        assert result["compatibility_level"] == "Unknown"
+        assert result["component_scores"] == {}
+
+    def test_empty_candidates(self):
+        engine = L3V3LMatchingEngine()
+        assert engine.score_many({"username": "solo", "gender": "Male"}, []) == []
+
+    @pytest.mark.slow
+    def test_benchmark_speedup(self):
+        """A rebuild (encode once, score each user) should beat the per-pair loop."""
+        engine = L3V3LMatchingEngine()
+        rng = random.Random(99)
+        profiles = [_random_profile(rng, i) for i in range(3000)]
+        users = range(10)
+
+        start = time.perf_counter()
+        for i in users:
+            pairwise = [engine.calculate_match_score(profiles[i], c) for c in profiles]
+        pairwise_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        features = engine.encode_profiles(profiles)
+        for i in users:
+            batch = engine.score_encoded(features, i, range(len(profiles)), include_reasons=False)
+        batch_seconds = time.perf_counter() - start
+
+        print(f"\nL3V3L scoring {len(users)} x {len(profiles)}: pairwise {pairwise_seconds:.3f}s, "
+              f"batch {batch_seconds:.3f}s, speedup {pairwise_seconds / batch_seconds:.1f}x")
+        assert len(batch) == len(pairwise)
+        assert batch_seconds < pairwise_seconds
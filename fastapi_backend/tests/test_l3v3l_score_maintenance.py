@@ -0,0 +1,118 @@
+"""
+Tests for incremental L3V3L score maintenance (dirty rows/columns, inactive cleanup, watermarks).
+"""
+import pytest
+
+from job_templates.l3v3l_score_calculator_template import L3V3LScoreCalculatorTemplate
+from l3v3l_matching_engine import matching_engine
+from services.l3v3l_score_maintenance import L3V3LScoreMaintainer
+
+
+def _profile(username: str, gender: str, **fields) -> dict:
+    profile = {
+        "username": username,
+        "gender": gender,
+        "accountStatus": "active",
+        "birthYear": 1992,
+        "birthMonth": 5,
+        "height": "5'8\"",
+        "education": "Bachelor",
+        "religion": "Hindu",
+        "countryOfResidence": "US",
+        "state": "CA",
+    }
+    profile.update(fields)
+    return profile
+
+
+class TestL3V3LScoreMaintainer:
+    """Incremental recomputation driven by the dirty queue"""
+
+    @pytest.fixture
+    async def seeded(self, test_db):
+        users = [
+            _profile("m1", "Male"),
+            _profile("m2", "Male", height="6'0\""),
+            _profile("f1", "Female", height="5'4\""),
+            _profile("f2", "Female", religion="Christian"),
+        ]
+        await test_db.users.insert_many(users)
+        template = L3V3LScoreCalculatorTemplate()
+        pool = await template._load_scoring_pool(test_db)
+        for user in pool["users"]:
+            await template._score_against_pool(test_db, pool, user["username"])
+        return template
+
+    @pytest.mark.asyncio
+    async def test_dirty_user_recomputes_both_directions(self, test_db, seeded):
+        maintainer = L3V3LScoreMaintainer(test_db)
+        await test_db.users.update_one({"username": "f1"}, {"$set": {"religion": "Christian"}})
+        await maintainer.mark_dirty("f1")
+
+        pool = await seeded._load_scoring_pool(test_db)
+        result = await maintainer.process_pending(pool)
+
+        assert result["usersProcessed"] == 1
+        assert result["totalScoresCalculated"] == 4  # f1 -> m1, m2 and m1, m2 -> f1
+        f1 = await test_db.users.find_one({"username": "f1"})
+        m1 = await test_db.users.find_one({"username": "m1"})
+        row = await test_db.l3v3l_scores.find_one({"fromUsername": "f1", "toUsername": "m1"})
+        column = await test_db.l3v3l_scores.find_one({"fromUsername": "m1", "toUsername": "f1"})
+        assert row["score"] == matching_engine.calculate_match_score(f1, m1)["total_score"]
+        assert column["score"] == matching_engine.calculate_match_score(m1, f1)["total_score"]
+
+    @pytest.mark.asyncio
+    async def test_inactive_user_scores_are_deleted(self, test_db, seeded):
+        maintainer = L3V3LScoreMaintainer(test_db)
+        await test_db.users.update_one({"username": "m2"}, {"$set": {"accountStatus": "paused"}})
+        await maintainer.mark_dirty("m2", "user_paused")
+
+        pool = await seeded._load_scoring_pool(test_db)
+        result = await maintainer.process_pending(pool)
+
+        assert result["usersDropped"] == 1
+        remaining = await test_db.l3v3l_scores.count_documents(
+            {"$or": [{"fromUsername": "m2"}, {"toUsername": "m2"}]}
+        )
+        assert remaining == 0
+        assert await test_db.l3v3l_scores.count_documents({"fromUsername": "m1"}) == 2
+
+    @pytest.mark.asyncio
+    async def test_watermark_keeps_user_pending_when_redirtied(self, test_db, seeded):
+        maintainer = L3V3LScoreMaintainer(test_db)
+        await maintainer.mark_dirty("m1")
+        doc = await test_db.l3v3l_dirty_users.find_one({"_id": "m1"})
+
+        # A newer change lands while the old version is being processed
+        await maintainer.mark_dirty("m1")
+        await maintainer._mark_clean("m1", doc["dirtyVersion"])
+
+        pending = await maintainer.get_pending(10)
+        assert [d["_id"] for d in pending] == ["m1"]
+
+    @pytest.mark.asyncio
+    async def test_orphaned_scores_are_marked_dirty(self, test_db, seeded):
+        maintainer = L3V3LScoreMaintainer(test_db)
+
+        marked = await maintainer.mark_orphaned_scores({"m1", "m2", "f1"})
+
+        assert marked == 1
+        assert (await test_db.l3v3l_dirty_users.find_one({"_id": "f2"}))["pending"] is True
+
+    @pytest.mark.asyncio
+    async def test_search_snapshots_follow_incremental_updates(self, test_db, seeded):
+        maintainer = L3V3LScoreMaintainer(test_db)
+        await test_db.users.update_one({"username": "f1"}, {"$set": {"religion": "Christian"}})
+        await maintainer.mark_dirty("f1")
+        await test_db.users.update_one({"username": "m2"}, {"$set": {"accountStatus": "paused"}})
+        await maintainer.mark_dirty("m2", "user_paused")
+
+        pool = await seeded._load_scoring_pool(test_db)
+        await maintainer.process_pending(pool)
+
+        snapshots = {s["_id"]: s async for s in test_db.l3v3l_search_snapshots.find({})}
+        assert "m2" not in snapshots
+        assert [c["username"] for c in snapshots["f1"]["candidates"]] == ["m1"]
+        column = await test_db.l3v3l_scores.find_one({"fromUsername": "m1", "toUsername": "f1"})
+        entry = next(c for c in snapshots["m1"]["candidates"] if c["username"] == "f1")
+        assert entry["matchScore"] == column["score"]
@@ -0,0 +1,108 @@
+"""
+Tests for cached /media delivery: pre-resized variants, conditional responses
+and the per-(viewer, owner) access memo.
+"""
+import io
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from config import settings
+from services.storage_service import StorageService, variant_filename
+
+
+def _jpeg(width=1200, height=900) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(buf, "JPEG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "use_gcs", False)
+    return StorageService(use_gcs=False)
+
+
+class TestImageVariants:
+    """Variants are written next to the original and resolved with fallback"""
+
+    def test_variant_filename(self):
+        assert variant_filename("abc.jpg", "thumb") == "abc_thumb.jpg"
+        assert variant_filename("abc.jpg") == "abc.jpg"
+
+    @pytest.mark.asyncio
+    async def test_save_variants_and_stat_fallback(self, local_storage, tmp_path):
+        content = _jpeg()
+        (tmp_path / "a.jpg").write_bytes(content)
+        (tmp_path / "b.jpg").write_bytes(content)
+
+        assert await local_storage.save_variants("a.jpg", content) == 2
+        thumb = await local_storage.stat_media("a.jpg", "thumb")
+        assert thumb["filename"] == "a_thumb.jpg"
+        assert max(Image.open(thumb["path"]).size) == 240
+
+        # No variants generated for b.jpg: the original is served
+        assert (await local_storage.stat_media("b.jpg", "card"))["filename"] == "b.jpg"
+        assert await local_storage.stat_media("missing.jpg") is None
+
+    @pytest.mark.asyncio
+    async def test_stream_media_yields_whole_file_in_chunks(self, local_storage, tmp_path):
+        content = _jpeg()
+        (tmp_path / "a.jpg").write_bytes(content)
+        media = await local_storage.stat_media("a.jpg")
+
+        chunks = [chunk async for chunk in local_storage.stream_media(media, chunk_size=1024)]
+        assert len(chunks) > 1
+        assert b"".join(chunks) == content
+        assert media["etag"].startswith('"') and media["etag"].endswith('"')
+
+
+class TestProtectedMediaCaching:
+    """Repeat requests revalidate with 304; one-time grants are never memoized"""
+
+    @pytest.mark.asyncio
+    async def test_etag_revalidation_and_variant(self, test_db, local_storage, tmp_path, monkeypatch):
+        import routes
+        import services.storage_service as storage_service
+
+        monkeypatch.setattr(storage_service, "_storage_service", local_storage)
+        content = _jpeg()
+        (tmp_path / "a.jpg").write_bytes(content)
+        await local_storage.save_variants("a.jpg", content)
+        await test_db.users.insert_one({"username": "alice", "images": ["/uploads/a.jpg"]})
+
+        def request(**headers):
+            return SimpleNamespace(headers={"referer": "http://localhost:3000/search", **headers})
+
+        viewer = {"username": "bob"}
+        first = await routes.get_protected_media("a.jpg", None, None, viewer, test_db, request())
+        assert first.status_code == 200
+        assert first.headers["cache-control"] == "private, no-cache"
+
+        again = await routes.get_protected_media(
+            "a.jpg", None, None, viewer, test_db, request(**{"if-none-match": first.headers["etag"]})
+        )
+        assert again.status_code == 304
+
+        thumb = await routes.get_protected_media("a.jpg", None, "thumb", viewer, test_db, request())
+        assert thumb.headers["etag"] != first.headers["etag"]
+        assert int(thumb.headers["content-length"]) < len(content)
+
+    @pytest.mark.asyncio
+    async def test_one_time_grant_is_not_memoized(self, test_db, monkeypatch):
+        import routes
+
+        grants = iter(["onetime", None])
+
+        async def fake_grant(db, requester, owner, filename=None):
+            return next(grants)
+
+        monkeypatch.setattr(routes, "_images_access_grant", fake_grant)
+        monkeypatch.setattr(routes, "_media_access_cache", {})
+
+        assert await routes._media_images_access(test_db, "bob", "alice", "a.jpg") == "onetime"
+        assert await routes._media_images_access(test_db, "bob", "alice", "a.jpg") is None
+        # The denial is memoized for the (viewer, owner) pair
+        assert await routes._media_images_access(test_db, "Bob", "alice", "a.jpg") is None
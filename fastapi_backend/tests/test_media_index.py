@@ -0,0 +1,88 @@
+"""
+Tests for the /media filename -> owner index (services/media_index.py).
+"""
+import pytest
+
+from services.media_index import (
+    MediaIndexLRU,
+    MediaIndexService,
+    build_media_entries,
+    sync_user_media,
+)
+
+
+class TestBuildMediaEntries:
+    """Entry flags mirror the access rules in get_protected_media"""
+
+    def test_visibility_buckets(self):
+        entries = build_media_entries({
+            "username": "alice",
+            "images": ["/uploads/a.jpg", "http://host/uploads/b.jpg?v=123", "/uploads/c.jpg"],
+            "imageVisibility": {
+                "profilePic": "/uploads/b.jpg",
+                "memberVisible": ["/uploads/a.jpg"],
+                "onRequest": ["/uploads/c.jpg"],
+            },
+        })
+        assert {f: e["bucket"] for f, e in entries.items()} == {
+            "a.jpg": "memberVisible", "b.jpg": "profilePic", "c.jpg": "onRequest"
+        }
+        assert [f for f, e in entries.items() if e["isProfilePic"]] == ["b.jpg"]
+        assert all(e["owner"] == "alice" for e in entries.values())
+
+    def test_legacy_first_image_and_public_images(self):
+        entries = build_media_entries({
+            "username": "bob",
+            "images": ["/uploads/x.jpg", "/uploads/y.jpg"],
+            "publicImages": ["/api/users/media/y.jpg"],
+        })
+        assert entries["x.jpg"]["isProfilePic"] and not entries["x.jpg"]["isPublic"]
+        assert entries["y.jpg"]["isPublic"] and not entries["y.jpg"]["isProfilePic"]
+        assert entries["y.jpg"]["bucket"] is None
+
+
+class TestMediaIndexLRU:
+    """Bounded size and TTL expiry"""
+
+    def test_evicts_least_recently_used(self):
+        lru = MediaIndexLRU(max_entries=2)
+        lru.put("a", {"owner": "1"})
+        lru.put("b", {"owner": "2"})
+        lru.get("a")
+        lru.put("c", {"owner": "3"})
+        assert lru.get("b") is None
+        assert lru.get("a") == {"owner": "1"}
+
+    def test_expired_entries_miss(self):
+        lru = MediaIndexLRU(ttl_seconds=0)
+        lru.put("a", {"owner": "1"})
+        assert lru.get("a") is None
+
+
+class TestMediaIndexSync:
+    """Per-owner rebuilds keep the collection and the LRU consistent"""
+
+    @pytest.mark.asyncio
+    async def test_sync_drops_removed_files_and_invalidates_lru(self, test_db):
+        lru = MediaIndexLRU()
+        service = MediaIndexService(test_db, lru=lru)
+        await test_db.users.insert_one({"username": "alice", "images": ["/uploads/a.jpg", "/uploads/b.jpg"]})
+
+        await service.sync_user(await test_db.users.find_one({"username": "alice"}))
+        assert (await service.lookup("b.jpg"))["owner"] == "alice"
+        assert (await service.lookup("a.jpg"))["isProfilePic"]
+
+        # Delete a.jpg: b.jpg becomes the legacy profile picture
+        await test_db.users.update_one({"username": "alice"}, {"$set": {"images": ["/uploads/b.jpg"]}})
+        await MediaIndexService(test_db, lru=lru).sync_user(await test_db.users.find_one({"username": "alice"}))
+
+        assert await service.lookup("a.jpg") is None
+        assert (await service.lookup("b.jpg"))["isProfilePic"]
+
+    @pytest.mark.asyncio
+    async def test_sync_helper_removes_entries_of_missing_user(self, test_db):
+        service = MediaIndexService(test_db, lru=MediaIndexLRU())
+        await service.sync_user({"username": "gone", "images": ["/uploads/g.jpg"]})
+
+        await sync_user_media(test_db, "gone")
+        assert await test_db.media_index.count_documents({"owner": "gone"}) == 0
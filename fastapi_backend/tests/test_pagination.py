@@ -0,0 +1,137 @@
+"""
+Tests for keyset (cursor) pagination helpers (utils/pagination.py).
+"""
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from utils.pagination import (
+    CountCache,
+    after_cursor,
+    decode_cursor,
+    encode_cursor,
+    keyset_match,
+    split_page,
+)
+
+
+class TestCursorEncoding:
+    """Cursors round-trip BSON values and reject garbage"""
+
+    def test_round_trip_preserves_types(self):
+        sort = [("createdAt", -1), ("_id", -1)]
+        values = [datetime(2025, 3, 1, 12, 30), ObjectId()]
+        assert decode_cursor(encode_cursor(values), sort) == values
+
+    def test_invalid_cursor_raises_value_error(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor!", [("_id", 1)])
+
+    def test_cursor_for_other_sort_is_rejected(self):
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor([1]), [("displayOrder", 1), ("_id", 1)])
+
+    def test_empty_cursor_leaves_query_unchanged(self):
+        query = {"userUsername": "alice"}
+        assert after_cursor(query, [("_id", 1)], "") is query
+        assert after_cursor(query, [("_id", 1)], None) is query
+
+
+class TestKeysetMatch:
+    """Plain range filters for never-null keys, $expr only where needed"""
+
+    def test_never_null_keys_use_plain_range_operators(self):
+        created, oid = datetime(2025, 3, 1), ObjectId()
+        assert keyset_match([("createdAt", -1), ("_id", -1)], [created, oid]) == {"$or": [
+            {"createdAt": {"$lt": created}},
+            {"createdAt": created, "_id": {"$lt": oid}},
+        ]}
+
+    def test_nullable_keys_and_null_cursor_values_use_expr(self):
+        oid = ObjectId()
+        match = keyset_match([("displayOrder", 1), ("_id", 1)], [2, oid], nullable=("displayOrder",))
+        assert "$expr" in match["$or"][0]
+        assert match["$or"][1]["_id"] == {"$gt": oid} and "$expr" in match["$or"][1]
+
+        match = keyset_match([("createdAt", 1), ("_id", 1)], [None, oid])
+        assert "$expr" in match["$or"][0] and "createdAt" not in match["$or"][1]
+
+
+class TestKeysetWalk:
+    """Walking every page must yield exactly the offset-sorted order"""
+
+    @pytest.mark.asyncio
+    async def test_pages_cover_sorted_order_with_ties_and_missing_values(self, test_db):
+        docs = []
+        for i in range(23):
+            doc = {"userUsername": "alice", "n": i}
+            if i % 5:
+                doc["displayOrder"] = i % 4  # ties and some missing values
+            docs.append(doc)
+        await test_db.favorites.insert_many(docs)
+
+        sort = [("displayOrder", 1), ("_id", 1)]
+        expected = [d["n"] for d in await test_db.favorites.find({"userUsername": "alice"}).sort(sort).to_list(None)]
+
+        seen, cursor = [], ""
+        while True:
+            query = after_cursor({"userUsername": "alice"}, sort, cursor, nullable=("displayOrder",))
+            page, cursor = split_page(await test_db.favorites.find(query).sort(sort).to_list(6), 5, sort)
+            seen += [d["n"] for d in page]
+            if cursor is None:
+                break
+
+        assert seen == expected
+
+    @pytest.mark.asyncio
+    async def test_pages_with_plain_range_filter(self, test_db):
+        await test_db.favorites.insert_many([
+            {"userUsername": "alice", "n": i, "createdAt": datetime(2025, 1, 1 + i % 7)} for i in range(23)
+        ])
+
+        sort = [("createdAt", -1), ("_id", -1)]
+        expected = [d["n"] for d in await test_db.favorites.find({"userUsername": "alice"}).sort(sort).to_list(None)]
+
+        seen, cursor = [], ""
+        while True:
+            query = after_cursor({"userUsername": "alice"}, sort, cursor)
+            page, cursor = split_page(await test_db.favorites.find(query).sort(sort).to_list(6), 5, sort)
+            seen += [d["n"] for d in page]
+            if cursor is None:
+                break
+
+        assert seen == expected
+
+
+class TestCountCache:
+    """Totals are counted once per TTL window"""
+
+    @pytest.mark.asyncio
+    async def test_counts_once_until_expiry(self):
+        cache = CountCache(ttl_seconds=60)
+        calls = []
+
+        async def count():
+            calls.append(1)
+            return 42
+
+        key = cache.key("search", {"b": 1, "a": 2})
+        assert await cache.get(key, count) == 42
+        assert await cache.get(cache.key("search", {"a": 2, "b": 1}), count) == 42
+        assert len(calls) == 1
+
+        cache._entries[key] = (42, 0)  # expire
+        await cache.get(key, count)
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_evicts_when_full(self):
+        cache = CountCache(ttl_seconds=60, max_entries=2)
+
+        async def count():
+            return 1
+
+        for i in range(5):
+            await cache.get(cache.key(i), count)
+        assert len(cache._entries) == 2
@@ -0,0 +1,98 @@
+"""
+Tests for batch PII decryption (crypto_utils.PIIEncryption.decrypt_many).
+"""
+import time
+
+import pytest
+
+from crypto_utils import PIIEncryption, generate_encryption_key
+
+
+@pytest.fixture
+def encryptor():
+    return PIIEncryption(generate_encryption_key())
+
+
+def _users(encryptor, count):
+    return [
+        encryptor.encrypt_user_pii({
+            "username": f"user{i}",
+            "firstName": f"First{i}",
+            "location": f"City{i % 10}, CA",
+            "contactEmail": f"user{i}@example.com",
+            "contactNumber": f"555-000-{i:04d}",
+            "contactNumbers": [{"number": f"555-111-{i:04d}", "label": "home"}],
+        })
+        for i in range(count)
+    ]
+
+
+class TestDecryptMany:
+    """Same output as decrypt_user_pii, restricted to the requested fields"""
+
+    def test_matches_decrypt_user_pii(self, encryptor):
+        users = _users(encryptor, 3)
+        decrypted = encryptor.decrypt_many(users)
+        assert decrypted == [encryptor.decrypt_user_pii(u) for u in users]
+        assert [u["contactEmail"] for u in decrypted] == [f"user{i}@example.com" for i in range(3)]
+        assert decrypted[2]["location"] == "City2, CA"
+        assert decrypted[0]["contactNumbers"][0]["number"] == "555-111-0000"
+        # Originals are not modified
+        assert users[0]["contactEmail"].startswith("gAAAAA")
+        assert users[0]["contactNumbers"][0]["number"].startswith("gAAAAA")
+
+    def test_projected_fields_drop_other_pii(self, encryptor, monkeypatch):
+        users = _users(encryptor, 2)
+        calls = []
+        original = encryptor.cipher.decrypt
+        monkeypatch.setattr(encryptor.cipher, "decrypt", lambda token: calls.append(token) or original(token))
+
+        decrypted = encryptor.decrypt_many(users, fields=("location",))
+        assert decrypted[1]["location"] == "City1, CA"
+        assert not {"contactEmail", "contactNumber", "contactNumbers"} & decrypted[1].keys()
+        assert len(calls) == 2
+
+        assert [u["username"] for u in encryptor.decrypt_many(users, fields=())] == ["user0", "user1"]
+        assert "location" not in encryptor.decrypt_many(users, fields=())[0]
+        assert len(calls) == 2
+
+        with pytest.raises(ValueError):
+            encryptor.decrypt_many(users, fields=("firstName",))
+
+    def test_memoized_and_thread_pool(self, encryptor, monkeypatch):
+        users = _users(encryptor, 600)
+        calls = []
+        original = encryptor.cipher.decrypt
+        monkeypatch.setattr(encryptor.cipher, "decrypt", lambda token: calls.append(token) or original(token))
+
+        first = encryptor.decrypt_many(users, workers=4)
+        assert len(calls) == 600 * 4
+        second = encryptor.decrypt_many(users)
+        assert second == first
+        assert len(calls) == 600 * 4
+        assert encryptor.decrypt_cache_hits == 600 * 4
+
+    def test_legacy_plaintext_passes_through(self, encryptor):
+        decrypted = encryptor.decrypt_many([{"username": "old", "location": "Austin, TX"}] * 3)
+        assert [u["location"] for u in decrypted] == ["Austin, TX"] * 3
+        assert encryptor.legacy_plaintext_count == 3
+
+    @pytest.mark.slow
+    def test_benchmark_search_page(self, encryptor):
+        """A 20-user result page viewed 50 times: per-user full decrypt vs projected, memoized batch"""
+        users = _users(encryptor, 20)
+
+        start = time.perf_counter()
+        for _ in range(50):
+            [encryptor.decrypt_user_pii(u) for u in users]
+            encryptor.clear_decrypt_cache()  # previous behaviour: no memo
+        legacy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(50):
+            encryptor.decrypt_many(users, fields=("location",))
+        batch_seconds = time.perf_counter() - start
+
+        print(f"\n50 x 20-user pages: decrypt_user_pii {legacy_seconds * 1000:.1f}ms, "
+              f"decrypt_many(location) {batch_seconds * 1000:.1f}ms")
+        assert batch_seconds < legacy_seconds
@@ -0,0 +1,206 @@
+"""
+Tests for the cached profile card serializer (services/profile_cards.py).
+"""
+import time
+from datetime import datetime
+
+import pytest
+
+import services.profile_cards as profile_cards
+from crypto_utils import PIIEncryption, generate_encryption_key
+from services.profile_cards import (
+    CardGenerations, ProfileCardCache, ProfileCardLRU, build_card_fragment, compact_card, render_card
+)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value))
+        return self
+
+    async def execute(self):
+        for key, value in self.commands:
+            self.redis.store[key] = value
+        return [True] * len(self.commands)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    async def delete(self, *keys):
+        return sum(1 for key in keys if self.store.pop(key, None) is not None)
+
+
+@pytest.fixture
+def encryptor(monkeypatch):
+    encryptor = PIIEncryption(generate_encryption_key())
+    monkeypatch.setattr(profile_cards, "get_encryptor", lambda: encryptor)
+    return encryptor
+
+
+def _user(encryptor, i, **fields):
+    return {
+        "username": f"user{i}",
+        "firstName": f"First{i}",
+        "lastName": "Test",
+        "birthMonth": 1,
+        "birthYear": 1990,
+        "location": encryptor.encrypt(f"City{i}, CA"),
+        "contactEmail": encryptor.encrypt(f"user{i}@example.com"),
+        "contactNumber": encryptor.encrypt("555-000-0000"),
+        "agreedToTerms": True,
+        "consentIpAddress": "127.0.0.1",
+        "images": [f"/uploads/user{i}_a.jpg", f"/uploads/user{i}_b.jpg", f"/uploads/user{i}_c.jpg"],
+        "publicImages": [f"/uploads/user{i}_b.jpg"],
+        "accountStatus": "active",
+        "createdAt": datetime(2026, 1, 1, 12, 0),
+        **fields,
+    }
+
+
+class TestRenderCard:
+
+    def _fragment(self):
+        return build_card_fragment({
+            "username": "alice",
+            "images": ["/uploads/a.jpg", "/uploads/b.jpg"],
+            "publicImages": ["/uploads/b.jpg"],
+            "contactEmail": "alice@example.com",
+            "agreedToTerms": True,
+            "createdAt": datetime(2026, 1, 1),
+        })
+
+    def test_fragment_is_plain_json_without_pii(self):
+        fragment = self._fragment()
+        assert "contactEmail" not in fragment and "agreedToTerms" not in fragment
+        assert fragment["createdAt"] == "2026-01-01T00:00:00"
+        assert fragment["publicImages"] == [profile_cards.get_full_image_url("/uploads/b.jpg")]
+
+    def test_viewer_rules(self):
+        fragment = self._fragment()
+        a_url, b_url = fragment["_imageUrls"]
+
+        admin = render_card(fragment, is_admin=True)
+        assert admin["images"] == [a_url, b_url] and admin["profilePicVisible"] is True
+
+        member = render_card(fragment, profile_pic_always_visible=True)
+        assert member["images"] == [a_url, b_url]
+        assert member["imageVisibility"] == {"profilePic": a_url, "memberVisible": [b_url], "onRequest": []}
+
+        public_only = render_card(fragment, profile_pic_always_visible=False)
+        assert public_only["images"] == [b_url] and "profilePicVisible" not in public_only
+        assert "_imageUrls" not in public_only
+
+    def test_stored_image_visibility_is_kept(self):
+        fragment = build_card_fragment({
+            "username": "bob",
+            "images": ["/uploads/a.jpg"],
+            "imageVisibility": {"profilePic": "/uploads/a.jpg", "memberVisible": [], "onRequest": ["/uploads/c.jpg"]},
+        })
+        card = render_card(fragment, profile_pic_always_visible=False)
+        assert card["images"] == [] and card["imagesMasked"] is True
+        assert card["imageVisibility"]["onRequest"] == [profile_cards.get_full_image_url("/uploads/c.jpg")]
+        assert compact_card(card)["profileImage"] is None
+
+
+class TestCardGenerations:
+
+    def test_bounded_and_evictions_still_read_as_changed(self):
+        generations = CardGenerations(max_entries=2)
+        before = generations.get("alice")
+        generations.bump("alice")
+        generations.bump("bob")
+        generations.bump("carol")
+
+        assert len(generations._entries) == 2
+        # alice was evicted, but a load that started before her bump must not look fresh
+        assert generations.get("alice") != before
+        assert generations.get("carol") != generations.get("bob")
+
+
+class TestProfileCardCache:
+
+    @pytest.mark.asyncio
+    async def test_cards_are_built_once_and_filtered_live(self, test_db, encryptor):
+        await test_db.users.insert_many([_user(encryptor, i) for i in range(3)])
+        cache = ProfileCardCache(lru=ProfileCardLRU(), redis_client=FakeRedis())
+
+        cards = await cache.get_cards(test_db, ["user0", "user1", "user2", "missing"])
+        assert sorted(cards) == ["user0", "user1", "user2"]
+        assert cards["user0"]["location"] == "City0, CA"
+        assert "contactEmail" not in cards["user0"] and "consentIpAddress" not in cards["user0"]
+        assert cards["user0"]["age"] is not None
+
+        # Status is read live, not from the cached fragment
+        await test_db.users.update_one({"username": "user1"}, {"$set": {"accountStatus": "paused"}})
+        cards = await cache.get_cards(test_db, ["user0", "user1", "user2"])
+        assert sorted(cards) == ["user0", "user2"]
+        cards = await cache.get_cards(test_db, ["user1"], active_only=False)
+        assert cards["user1"]["accountStatus"] == "paused"
+        assert cache.get_stats()["loads"] == 3
+
+    @pytest.mark.asyncio
+    async def test_invalidate_reloads_edited_profile(self, test_db, encryptor):
+        await test_db.users.insert_one(_user(encryptor, 0))
+        redis = FakeRedis()
+        cache = ProfileCardCache(lru=ProfileCardLRU(), redis_client=redis)
+        assert (await cache.get_cards(test_db, ["user0"]))["user0"]["firstName"] == "First0"
+
+        await test_db.users.update_one({"username": "user0"}, {"$set": {"firstName": "Renamed"}})
+        assert (await cache.get_cards(test_db, ["user0"]))["user0"]["firstName"] == "First0"
+
+        await cache.invalidate(["user0"])
+        assert "profile_card:user0" not in redis.store
+        assert (await cache.get_cards(test_db, ["user0"]))["user0"]["firstName"] == "Renamed"
+
+    @pytest.mark.asyncio
+    async def test_other_instances_read_from_redis(self, test_db, encryptor):
+        await test_db.users.insert_many([_user(encryptor, i) for i in range(5)])
+        redis = FakeRedis()
+        usernames = [f"user{i}" for i in range(5)]
+
+        first = ProfileCardCache(lru=ProfileCardLRU(), redis_client=redis)
+        expected = await first.get_cards(test_db, usernames)
+
+        second = ProfileCardCache(lru=ProfileCardLRU(), redis_client=redis)
+        assert await second.get_cards(test_db, usernames) == expected
+        assert second.get_stats()["redis_hits"] == 5 and second.get_stats()["loads"] == 0
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_benchmark_100_card_page(self, test_db, encryptor):
+        """Cold page (query + decrypt + build) vs warm page (LRU + viewer rules)"""
+        await test_db.users.insert_many([_user(encryptor, i) for i in range(100)])
+        usernames = [f"user{i}" for i in range(100)]
+        cache = ProfileCardCache(lru=ProfileCardLRU(), redis_client=FakeRedis())
+
+        start = time.perf_counter()
+        cold = await cache.get_cards(test_db, usernames)
+        cold_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(10):
+            warm = await cache.get_cards(test_db, usernames, is_admin=False)
+        warm_seconds = (time.perf_counter() - start) / 10
+
+        fragments = [cache.lru.get(username) for username in usernames]
+        start = time.perf_counter()
+        for _ in range(10):
+            [render_card(fragment) for fragment in fragments]
+        render_seconds = (time.perf_counter() - start) / 10
+
+        print(f"\n100-card page: cold {cold_seconds * 1000:.1f}ms, warm {warm_seconds * 1000:.1f}ms "
+              f"(render only {render_seconds * 1000:.2f}ms)")
+        assert len(cold) == len(warm) == 100
+        assert warm_seconds < cold_seconds
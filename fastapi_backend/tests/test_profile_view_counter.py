@@ -0,0 +1,292 @@
+"""
+Tests for the atomic, Redis-buffered profile view counter (services/profile_view_counter.py).
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+from redis.exceptions import ResponseError
+
+from services.profile_view_counter import PENDING_KEY, ProfileViewCounter, _known_key
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.commands.append((name, args))
+            return self
+        return queue
+
+    async def execute(self, raise_on_error=True):
+        results = []
+        for name, args in self.commands:
+            try:
+                results.append(await getattr(self.redis, name)(*args))
+            except ResponseError as e:
+                if raise_on_error:
+                    raise
+                results.append(e)
+        return results
+
+
+class FakeRedis:
+    """The hash commands the counter uses (decode_responses=True semantics)"""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = str(value)
+        return 1
+
+    async def hsetnx(self, key, field, value):
+        if field in self.hashes.get(key, {}):
+            return 0
+        return await self.hset(key, field, value)
+
+    async def hdel(self, key, *fields):
+        removed = sum(1 for field in fields if self.hashes.get(key, {}).pop(field, None) is not None)
+        if key in self.hashes and not self.hashes[key]:
+            del self.hashes[key]
+        return removed
+
+    async def expire(self, key, seconds):
+        return int(key in self.hashes)
+
+    async def hincrby(self, key, field, amount):
+        value = int(self.hashes.setdefault(key, {}).get(field, 0)) + amount
+        self.hashes[key][field] = str(value)
+        return value
+
+    async def exists(self, key):
+        return int(key in self.hashes)
+
+    async def rename(self, key, new_key):
+        if key not in self.hashes:
+            raise ResponseError("no such key")
+        self.hashes[new_key] = self.hashes.pop(key)
+        return True
+
+    async def delete(self, *keys):
+        return sum(1 for key in keys if self.hashes.pop(key, None) is not None)
+
+
+class FailOnceViews:
+    """profile_views collection whose first bulk_write fails (after applying all but `failed_index`)"""
+
+    def __init__(self, collection, error, failed_index=None):
+        self.collection = collection
+        self.error = error
+        self.failed_index = failed_index
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.error is None:
+            return await self.collection.bulk_write(operations, ordered=ordered)
+        error, self.error = self.error, None
+        if self.failed_index is not None:
+            await self.collection.bulk_write(
+                [op for i, op in enumerate(operations) if i != self.failed_index], ordered=ordered
+            )
+        raise error
+
+
+class FailOnceDB:
+    def __init__(self, db, error, failed_index=None):
+        self.db = db
+        self.profile_views = FailOnceViews(db.profile_views, error, failed_index)
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+
+async def _seed_users(db):
+    await db.users.insert_many([{"username": name} for name in ("owner", "viewer1", "viewer2")])
+
+
+class TestWriteThrough:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_views_create_one_row(self, test_db):
+        counter = ProfileViewCounter()
+        await counter.ensure_indexes(test_db)
+
+        results = await asyncio.gather(*(counter.record_view(test_db, "owner", "viewer1") for _ in range(10)))
+
+        assert await test_db.profile_views.count_documents({}) == 1
+        row = await test_db.profile_views.find_one({})
+        assert row["viewCount"] == 10
+        assert row["firstViewedAt"] <= row["lastViewedAt"]
+        assert sorted(r.view_count for r in results) == list(range(1, 11))
+        assert sum(r.first_view for r in results) == 1
+
+    @pytest.mark.asyncio
+    async def test_merges_legacy_duplicates_before_unique_index(self, test_db):
+        await test_db.profile_views.insert_many([
+            {"profileUsername": "owner", "viewedByUsername": "viewer1", "createdAt": datetime(2026, 1, 1)},
+            {"profileUsername": "owner", "viewedByUsername": "viewer1", "viewCount": 4,
+             "firstViewedAt": datetime(2026, 2, 1), "lastViewedAt": datetime(2026, 3, 1)},
+            # Legacy /views rows lack the pair fields and are left alone
+            {"viewedUsername": "owner", "viewerUsername": "viewer2"},
+            {"viewedUsername": "owner", "viewerUsername": "viewer1"},
+        ])
+
+        await ProfileViewCounter().ensure_indexes(test_db)
+
+        rows = await test_db.profile_views.find({"profileUsername": "owner"}).to_list(None)
+        assert len(rows) == 1
+        assert rows[0]["viewCount"] == 5
+        assert rows[0]["firstViewedAt"] == datetime(2026, 1, 1)
+        assert rows[0]["lastViewedAt"] == datetime(2026, 3, 1)
+        assert await test_db.profile_views.count_documents({}) == 3
+
+    @pytest.mark.asyncio
+    async def test_totals_count_legacy_rows_as_single_views(self, test_db):
+        await test_db.profile_views.insert_many([
+            {"profileUsername": "owner", "viewedByUsername": "viewer1"},
+            {"profileUsername": "owner", "viewedByUsername": "viewer2", "viewCount": 3},
+        ])
+        totals = await ProfileViewCounter().get_profile_totals(test_db, "owner")
+        assert totals == {"totalViews": 4, "uniqueViewers": 2}
+
+
+class TestBufferedViews:
+
+    @pytest.mark.asyncio
+    async def test_repeat_views_are_buffered_then_flushed(self, test_db):
+        redis = FakeRedis()
+        counter = ProfileViewCounter(redis)
+
+        first = await counter.record_view(test_db, "owner", "viewer1")
+        assert first.first_view and first.view_count == 1
+        for expected in range(2, 6):
+            assert (await counter.record_view(test_db, "owner", "viewer1")).view_count == expected
+
+        # Mongo still holds the first view; readers add the buffer
+        assert (await test_db.profile_views.find_one({}))["viewCount"] == 1
+        assert (await counter.get_profile_totals(test_db, "owner"))["totalViews"] == 5
+        assert (await counter.get_viewer_metrics(test_db, "owner", "viewer1"))["viewCount"] == 5
+
+        assert await counter.flush(test_db) == 4
+        assert (await test_db.profile_views.find_one({}))["viewCount"] == 5
+        assert await redis.exists(PENDING_KEY) == 0
+        assert (await counter.get_profile_totals(test_db, "owner"))["totalViews"] == 5
+        assert (await counter.record_view(test_db, "owner", "viewer1")).view_count == 6
+        assert counter.get_stats()["upserts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_requeues_views(self, test_db):
+        redis = FakeRedis()
+        counter = ProfileViewCounter(redis)
+        for _ in range(5):
+            await counter.record_view(test_db, "owner", "viewer1")
+
+        with pytest.raises(AutoReconnect):
+            await counter.flush(FailOnceDB(test_db, AutoReconnect("connection reset")))
+
+        # Nothing lost: the claimed buffer is back in the live keys
+        assert sorted(redis.hashes) == ["profile_views:known:owner", "profile_views:last",
+                                        "profile_views:pending", "profile_views:totals"]
+        assert (await counter.get_profile_totals(test_db, "owner"))["totalViews"] == 5
+        assert await counter.flush(test_db) == 4
+        assert (await test_db.profile_views.find_one({}))["viewCount"] == 5
+
+    @pytest.mark.asyncio
+    async def test_partially_failed_flush_requeues_only_failed_pairs(self, test_db):
+        redis = FakeRedis()
+        counter = ProfileViewCounter(redis)
+        for viewer in ("viewer1", "viewer2"):
+            for _ in range(3):
+                await counter.record_view(test_db, "owner", viewer)
+        failed_index = list(redis.hashes[PENDING_KEY]).index("owner\x1fviewer2")
+        error = BulkWriteError({"writeErrors": [{"index": failed_index, "code": 11600, "errmsg": "interrupted"}]})
+
+        # The write for viewer1 lands; viewer2's is reported failed
+        with pytest.raises(BulkWriteError):
+            await counter.flush(FailOnceDB(test_db, error, failed_index))
+        assert redis.hashes[PENDING_KEY] == {"owner\x1fviewer2": "2"}
+
+        await counter.flush(test_db)
+        counts = {row["viewedByUsername"]: row["viewCount"] async for row in test_db.profile_views.find({})}
+        assert counts == {"viewer1": 3, "viewer2": 3}
+
+    @pytest.mark.asyncio
+    async def test_flush_forgets_pairs_whose_rows_were_deleted(self, test_db):
+        redis = FakeRedis()
+        counter = ProfileViewCounter(redis)
+        for viewer in ("viewer1", "viewer2"):
+            for _ in range(2):
+                await counter.record_view(test_db, "owner", viewer)
+        await test_db.profile_views.delete_one({"viewedByUsername": "viewer2"})
+
+        await counter.flush(test_db)
+
+        # The deleted pair's next view is a fresh upsert, not a buffered repeat
+        assert redis.hashes[_known_key("owner")] == {"viewer1": "2"}
+        recorded = await counter.record_view(test_db, "owner", "viewer2")
+        assert recorded.first_view and recorded.view_count == 1
+
+    @pytest.mark.asyncio
+    async def test_forget_user_clears_known_pairs(self, test_db):
+        redis = FakeRedis()
+        counter = ProfileViewCounter(redis)
+        await counter.record_view(test_db, "owner", "viewer1")
+        await counter.record_view(test_db, "viewer1", "owner")
+        await counter.record_view(test_db, "viewer2", "owner")
+        await counter.record_view(test_db, "viewer2", "viewer1")
+
+        await counter.forget_user(test_db, "owner")
+
+        assert redis.hashes == {_known_key("viewer2"): {"viewer1": "1"}}
+
+    @pytest.mark.asyncio
+    async def test_flush_without_pending_views_is_a_noop(self, test_db):
+        counter = ProfileViewCounter(FakeRedis())
+        assert await counter.flush(test_db) == 0
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_and_writes_through(self, test_db):
+        counter = ProfileViewCounter()
+        await counter.start(test_db, FakeRedis())
+        for _ in range(3):
+            await counter.record_view(test_db, "owner", "viewer2")
+
+        await counter.stop()
+
+        assert (await test_db.profile_views.find_one({}))["viewCount"] == 3
+        assert (await counter.record_view(test_db, "owner", "viewer2")).view_count == 4
+
+
+class TestUsernameSet:
+
+    @pytest.mark.asyncio
+    async def test_cached_set_and_miss_fallthrough(self, test_db):
+        await _seed_users(test_db)
+        counter = ProfileViewCounter()
+
+        assert await counter.usernames.contains(test_db, "owner")
+        assert not await counter.usernames.contains(test_db, "nobody")
+
+        # Registered after the load: found through the fallback lookup
+        await test_db.users.insert_one({"username": "newcomer"})
+        assert await counter.usernames.contains(test_db, "newcomer")
+
+        await counter.forget_user(test_db, "owner")
+        await test_db.users.delete_one({"username": "owner"})
+        assert not await counter.usernames.contains(test_db, "owner")
@@ -0,0 +1,121 @@
+"""
+Tests for batched device-token lookups and chunked multicast push.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+import services.push_service as push_module
+from async_redis_manager import get_async_redis
+from services import messenger_service
+from services.push_service import PushNotificationService
+
+
+class MockAsyncRedis:
+    """In-memory async client counting round trips"""
+
+    def __init__(self):
+        self.store = {}
+        self.round_trips = 0
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self.store.get(key) for key in keys]
+
+    async def delete(self, *keys):
+        self.round_trips += 1
+        return sum(self.store.pop(key, None) is not None for key in keys)
+
+    def pipeline(self, transaction=False):
+        client = self
+        commands = []
+
+        class Pipeline:
+            def setex(self, key, ttl, value):
+                commands.append((key, value))
+
+            async def execute(self):
+                client.round_trips += 1
+                client.store.update(commands)
+
+        return Pipeline()
+
+
+@pytest.fixture
+def mock_redis(monkeypatch):
+    client = MockAsyncRedis()
+    monkeypatch.setattr(get_async_redis(), "redis_client", client)
+    return client
+
+
+class TestDeviceTokensMany:
+    """Tokens for a whole group come from one MGET and at most one query"""
+
+    @pytest.mark.asyncio
+    async def test_batch_lookup_and_write_back(self, test_db, mock_redis):
+        for i in range(3):
+            await messenger_service.register_device(test_db, f"user{i}", f"token{i}", "web")
+        await messenger_service.register_device(test_db, "user0", "token0b", "android")
+        mock_redis.round_trips = 0
+
+        usernames = ["user0", "user1", "user2", "no_devices"]
+        tokens = await messenger_service.get_device_tokens_many(test_db, usernames)
+        assert tokens == {"user0": ["token0", "token0b"], "user1": ["token1"], "user2": ["token2"], "no_devices": []}
+        # MGET + pipelined write-back, regardless of group size
+        assert mock_redis.round_trips == 2
+
+        # Second lookup is served from the cache, including the empty entry
+        mock_redis.round_trips = 0
+        assert await messenger_service.get_device_tokens_many(test_db, usernames) == tokens
+        assert mock_redis.round_trips == 1
+
+    @pytest.mark.asyncio
+    async def test_unregister_invalidates_cache(self, test_db, mock_redis):
+        await messenger_service.register_device(test_db, "alice", "t1", "web")
+        assert await messenger_service.get_device_tokens_many(test_db, ["alice"]) == {"alice": ["t1"]}
+
+        await messenger_service.unregister_device(test_db, "alice", "t1")
+        assert await messenger_service.get_device_tokens_many(test_db, ["alice"]) == {"alice": []}
+
+
+class TestChunkedMulticast:
+    """More than 500 tokens are sent in several multicasts, none dropped"""
+
+    @pytest.mark.asyncio
+    async def test_tokens_are_sent_in_batches(self, monkeypatch):
+        batches = []
+
+        def send_each_for_multicast(message):
+            batches.append(message.tokens)
+            responses = [
+                SimpleNamespace(success=not token.endswith("bad"), exception=None)
+                for token in message.tokens
+            ]
+            failures = sum(not r.success for r in responses)
+            return SimpleNamespace(
+                success_count=len(responses) - failures, failure_count=failures, responses=responses
+            )
+
+        fake_messaging = SimpleNamespace(
+            Notification=lambda **kw: kw,
+            AndroidConfig=lambda **kw: kw,
+            AndroidNotification=lambda **kw: kw,
+            APNSConfig=lambda **kw: kw,
+            APNSPayload=lambda **kw: kw,
+            Aps=lambda **kw: kw,
+            WebpushConfig=lambda **kw: kw,
+            WebpushNotification=lambda **kw: kw,
+            MulticastMessage=lambda **kw: SimpleNamespace(**kw),
+            send_each_for_multicast=send_each_for_multicast,
+        )
+        monkeypatch.setattr(push_module, "messaging", fake_messaging, raising=False)
+        monkeypatch.setattr(push_module, "FIREBASE_AVAILABLE", True)
+        monkeypatch.setattr(PushNotificationService, "_initialized", True)
+
+        tokens = [f"token{i}" for i in range(1199)] + ["token-bad"]
+        result = await PushNotificationService().send_to_multiple_tokens(tokens, "Ann", "hello")
+
+        assert [len(batch) for batch in batches] == [500, 500, 200]
+        assert result["successCount"] == 1199
+        assert result["failureCount"] == 1
+        assert result["failedTokens"][0]["token"] == "token-bad"
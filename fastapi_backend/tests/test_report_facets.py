@@ -0,0 +1,146 @@
+"""
+Tests for derived report facets (services/report_facets.py) and the admin
+reports that $group on them (routers/admin_reports.py).
+"""
+import time
+from datetime import datetime
+
+import pytest
+
+from crypto_utils import PIIEncryption, generate_encryption_key
+from routers.admin_reports import get_by_location_report, get_by_profession_report, get_gender_by_age_report
+from services.report_facets import build_location_facet, build_profession_facet, facet_updates
+
+ADMIN = {"username": "admin", "role": "admin"}
+
+
+def _user(i, location, gender="Male", occupation="Software Engineer", age=30):
+    user = {
+        "username": f"user{i}",
+        "profileId": f"p{i}",
+        "firstName": f"First{i}",
+        "lastName": "Last",
+        "gender": gender,
+        "accountStatus": "active",
+        "birthYear": datetime.now().year - age,
+        "birthMonth": 1,
+        "location": location,
+        "occupation": occupation,
+    }
+    user.update(facet_updates(user))
+    return user
+
+
+class TestFacets:
+    """Normalization of location and profession facets"""
+
+    def test_location_variants_share_a_key(self):
+        variants = ["Boston, MA", "boston, Massachusetts", " BOSTON ,ma "]
+        facets = [build_location_facet(v) for v in variants]
+        assert {f["key"] for f in facets} == {"boston|ma|us"}
+        assert facets[0]["label"] == "Boston, MA"
+
+        assert build_location_facet("Austin", state="Texas")["key"] == "austin|tx|us"
+        pune = build_location_facet("Pune, Maharashtra, India")
+        assert (pune["state"], pune["country"], pune["label"]) == ("Maharashtra", "IN", "Pune, Maharashtra, IN")
+        assert build_location_facet("") is None
+
+    def test_profession_and_updates(self):
+        assert build_profession_facet({"occupation": "Pediatrician"})["category"] == "Physicians & Doctors"
+        assert build_profession_facet({"workExperience": '[{"position": "Data Analyst"}]'}) == {
+            "category": "Data & Analytics", "title": "Data Analyst"
+        }
+
+        current = {"state": "CA", "occupation": "Teacher", "location": "gAAAAA-encrypted"}
+        assert facet_updates({"firstName": "A"}, current) == {}
+        updates = facet_updates({"location": "San Jose"}, current)
+        assert updates == {"locationFacet": build_location_facet("San Jose, CA")}
+        assert facet_updates({"workExperience": []}, current)["professionFacet"]["category"] == "Education"
+
+    def test_state_or_country_change_rebuilds_location_facet(self, monkeypatch):
+        import crypto_utils
+        encryptor = PIIEncryption(generate_encryption_key())
+        monkeypatch.setattr(crypto_utils, "get_encryptor", lambda: encryptor)
+
+        current = {"location": encryptor.encrypt("Austin"), "state": "TX"}
+        assert facet_updates({"state": "California"}, current) == {
+            "locationFacet": build_location_facet("Austin", state="California")
+        }
+        current = {"location": encryptor.encrypt("Pune")}
+        assert facet_updates({"countryOfResidence": "India"}, current)["locationFacet"]["country"] == "IN"
+        # No stored location: nothing to rebuild
+        assert facet_updates({"state": "CA"}, {}) == {}
+
+
+class TestFacetReports:
+    """Reports are single aggregations with no row cap"""
+
+    @pytest.mark.asyncio
+    async def test_location_report_groups_normalized_locations(self, test_db):
+        await test_db.users.insert_many([
+            _user(1, "Boston, MA"), _user(2, "boston, Massachusetts", gender="Female"),
+            _user(3, "Austin, TX"), _user(4, None),
+        ])
+
+        report = await get_by_location_report(gender=None, refresh=False, current_user=ADMIN, db=test_db)
+        assert [(r["location"], r["count"], r["maleCount"], r["femaleCount"]) for r in report.data] == [
+            ("Boston, MA", 2, 1, 1), ("Austin, TX", 1, 1, 0)
+        ]
+        assert report.totalCount == 3
+        assert report.data[0]["users"][0]["username"] == "user1"
+
+        female = await get_by_location_report(gender="female", refresh=False, current_user=ADMIN, db=test_db)
+        assert [(r["location"], r["count"]) for r in female.data] == [("Boston, MA", 1)]
+
+    @pytest.mark.asyncio
+    async def test_profession_and_age_reports(self, test_db):
+        await test_db.users.insert_many([
+            _user(1, "Boston, MA", occupation="Nurse", age=18),
+            _user(2, "Boston, MA", occupation="Registered Nurse", age=24),
+            _user(3, "Boston, MA", occupation="", age=25),
+            {"username": "legacy", "gender": "Female", "accountStatus": "active"},
+        ])
+
+        professions = await get_by_profession_report(gender=None, refresh=False, current_user=ADMIN, db=test_db)
+        assert {r["profession"]: r["count"] for r in professions.data} == {"Healthcare": 2, "Other": 2}
+        healthcare = next(r for r in professions.data if r["profession"] == "Healthcare")
+        assert healthcare["group"] == "Healthcare"
+        assert {u["occupation"] for u in healthcare["users"]} == {"Nurse", "Registered Nurse"}
+
+        ages = await get_gender_by_age_report(gender=None, refresh=False, current_user=ADMIN, db=test_db)
+        assert [(r["ageGroup"], r["ageRange"], r["count"]) for r in ages.data] == [
+            (18, "18-19", 1), (23, "23-25", 2)
+        ]
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_benchmark_location_report(self, test_db):
+        """Previous decrypt-and-group in Python (1,000-row cap) vs the facet $group
+
+        mongomock evaluates $group in Python, so the timings only show the
+        decrypt cost being removed; the assertion is about coverage.
+        """
+        encryptor = PIIEncryption(generate_encryption_key())
+        cities = ["Boston, MA", "Austin, TX", "Seattle, WA", "Columbus, OH", "Denver, CO"]
+        users = [_user(i, cities[i % 5], gender="Female" if i % 2 else "Male") for i in range(3000)]
+        await test_db.users.insert_many([encryptor.encrypt_user_pii(u) for u in users])
+
+        start = time.perf_counter()
+        legacy = await test_db.users.find(
+            {"accountStatus": "active"}, {"location": 1, "gender": 1, "username": 1}
+        ).limit(1000).to_list(None)
+        legacy_groups = {}
+        for user in legacy:
+            location = encryptor.decrypt(user["location"])
+            legacy_groups[location] = legacy_groups.get(location, 0) + 1
+        legacy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        report = await get_by_location_report(gender=None, refresh=False, current_user=ADMIN, db=test_db)
+        facet_seconds = time.perf_counter() - start
+
+        print(f"\n{len(users)} users: decrypt+group {legacy_seconds * 1000:.1f}ms "
+              f"(counted {sum(legacy_groups.values())}), facet $group {facet_seconds * 1000:.1f}ms "
+              f"(counted {report.totalCount})")
+        assert sum(legacy_groups.values()) == 1000
+        assert report.totalCount == len(users)
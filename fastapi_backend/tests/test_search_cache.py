@@ -0,0 +1,133 @@
+"""
+Tests for the shared /search result cache (services/search_cache.py).
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from services.search_cache import SearchResultCache, normalize_criteria
+
+
+class MockRedis:
+    """Minimal in-memory stand-in for the async redis client used by the cache"""
+
+    def __init__(self):
+        self.store = {}
+        self.calls = 0
+
+    async def mget(self, keys):
+        self.calls += 1
+        return [self.store.get(key) for key in keys]
+
+    async def setex(self, key, ttl, value):
+        self.calls += 1
+        self.store[key] = value
+
+    async def incr(self, key):
+        self.calls += 1
+        self.store[key] = str(int(self.store.get(key, "0")) + 1)
+
+
+def _cache() -> SearchResultCache:
+    return SearchResultCache(SimpleNamespace(redis_client=MockRedis()))
+
+
+class TestSearchResultCache:
+    """Keying, hits and generation-based invalidation"""
+
+    def test_equivalent_criteria_share_a_key(self):
+        a = normalize_criteria({"locations": ["Boston ", "austin"], "religion": "Hindu", "ageMin": 0, "hasPhoto": False})
+        b = normalize_criteria({"locations": ["Austin", "boston"], "religion": " hindu", "keyword": ""})
+        assert a == b
+
+    @pytest.mark.asyncio
+    async def test_hit_after_store_and_miss_after_invalidate(self):
+        cache = _cache()
+        criteria = {"gender": "Female", "ageMin": 25}
+
+        miss = await cache.lookup(criteria)
+        assert miss.usernames is None
+        await cache.store(criteria, miss.generation, ["f1", "f2"])
+        assert (await cache.lookup(criteria)).usernames == ["f1", "f2"]
+
+        await cache.invalidate("profile_updated")
+        assert (await cache.lookup(criteria)).usernames is None
+
+    @pytest.mark.asyncio
+    async def test_lookup_is_one_round_trip(self):
+        cache = _cache()
+        await cache.store({"gender": "Male"}, "0", ["m1"])
+        cache.client.calls = 0
+        assert (await cache.lookup({"gender": "Male"})).usernames == ["m1"]
+        assert cache.client.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_fill_racing_an_invalidation_is_stale(self):
+        cache = _cache()
+        miss = await cache.lookup({"gender": "Male"})
+        await cache.invalidate("user_paused")
+        await cache.store({"gender": "Male"}, miss.generation, ["m1"])
+        assert (await cache.lookup({"gender": "Male"})).usernames is None
+
+    @pytest.mark.asyncio
+    async def test_empty_result_is_a_hit(self):
+        cache = _cache()
+        await cache.store({"gender": "Male"}, "0", [])
+        assert (await cache.lookup({"gender": "Male"})).usernames == []
+
+    @pytest.mark.asyncio
+    async def test_uncacheable_marker(self):
+        cache = _cache()
+        await cache.store({"gender": "Male"}, "0", None)
+        cached = await cache.lookup({"gender": "Male"})
+        assert cached.usernames is None and cached.uncacheable
+
+    @pytest.mark.asyncio
+    async def test_disconnected_redis_is_a_miss(self):
+        cache = SearchResultCache(SimpleNamespace(redis_client=None))
+        await cache.store({"gender": "Male"}, "0", ["m1"])
+        assert await cache.lookup({"gender": "Male"}) is None
+
+
+class TestCachedSearchPage:
+    """Cached ids are shared across viewers; exclusions are applied per request"""
+
+    @pytest.mark.asyncio
+    async def test_viewers_share_ids_with_own_exclusions(self, test_db, monkeypatch):
+        import routes
+        import services.search_cache as search_cache
+
+        redis_manager = SimpleNamespace(redis_client=MockRedis())
+        monkeypatch.setattr(search_cache, "get_async_redis", lambda: redis_manager)
+
+        await test_db.users.insert_many([
+            {"username": f"f{i}", "gender": "Female", "createdAt": i, "images": ["a.jpg"] if i % 2 else []}
+            for i in range(6)
+        ])
+        criteria = {"gender": "Female"}
+        sort = [("createdAt", -1), ("_id", -1)]
+
+        first = await routes._search_cached_page(
+            test_db, criteria, {"gender": "Female", "username": {"$nin": ["f5", "m1"]}},
+            ["f5", "m1"], None, None, sort, 0, 10
+        )
+        assert first == (["f3", "f1", "f4", "f2", "f0"], 5)
+
+        # Second viewer is served from the cache (the collection is no longer consulted)
+        await test_db.users.delete_many({})
+        second = await routes._search_cached_page(
+            test_db, criteria, {"gender": "Female", "username": {"$nin": ["f1", "m2"]}},
+            ["f1", "m2"], None, None, sort, 1, 2
+        )
+        assert second == (["f3", "f4"], 5)
+
+    @pytest.mark.asyncio
+    async def test_without_redis_falls_back_to_mongo_paging(self, test_db, monkeypatch):
+        import routes
+        import services.search_cache as search_cache
+
+        monkeypatch.setattr(search_cache, "get_async_redis", lambda: SimpleNamespace(redis_client=None))
+        result = await routes._search_cached_page(
+            test_db, {"gender": "Female"}, {"gender": "Female"}, [], None, None, [("_id", 1)], 0, 10
+        )
+        assert result is None
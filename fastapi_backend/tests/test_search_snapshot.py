@@ -0,0 +1,104 @@
+"""
+Tests for the per-viewer /search snapshot (services/search_snapshot.py).
+"""
+from datetime import datetime
+
+import pytest
+
+from services.search_snapshot import SearchSnapshotService
+
+
+def _candidate(username: str, created_day: int, birth_year: int, images=None, **fields) -> dict:
+    candidate = {
+        "username": username,
+        "createdAt": datetime(2025, 1, created_day),
+        "birthYear": birth_year,
+        "birthMonth": 1,
+        "images": images if images is not None else [],
+    }
+    candidate.update(fields)
+    return candidate
+
+
+def _result(score: float, level: str = "Good") -> dict:
+    return {"total_score": score, "compatibility_level": level}
+
+
+class TestSearchSnapshot:
+    """Snapshot maintenance and server-side paging"""
+
+    @pytest.fixture
+    async def service(self, test_db):
+        service = SearchSnapshotService(test_db)
+        candidates = [
+            _candidate("f1", 1, 1990, images=["a.jpg"]),
+            _candidate("f2", 2, 1995),
+            _candidate("f3", 3, 1985, images=["b.jpg"]),
+            _candidate("admin1", 4, 1990, role="admin"),
+        ]
+        await service.replace("m1", candidates, [_result(70), _result(50), _result(90), _result(99)])
+        return service
+
+    @pytest.mark.asyncio
+    async def test_replace_skips_hidden_roles(self, test_db, service):
+        snapshot = await test_db.l3v3l_search_snapshots.find_one({"_id": "m1"})
+        assert [c["username"] for c in snapshot["candidates"]] == ["f1", "f2", "f3"]
+        assert snapshot["candidates"][0]["hasPhoto"] == 1
+
+    @pytest.mark.asyncio
+    async def test_page_sorts_photos_first_then_newest(self, service):
+        entries, total = await service.page("m1", exclude_usernames=["m1"])
+        assert total == 3
+        assert [e["username"] for e in entries] == ["f3", "f1", "f2"]
+        assert entries[0]["matchScore"] == 90
+
+    @pytest.mark.asyncio
+    async def test_page_filters_and_paginates(self, service):
+        age = datetime.now().year - 1990 - (1 if datetime.now().month < 1 else 0)
+        entries, total = await service.page(
+            "m1", exclude_usernames=["f3"], age_min=age - 1, age_max=age + 1, has_photo=True
+        )
+        assert total == 1
+        assert [e["username"] for e in entries] == ["f1"]
+
+        entries, total = await service.page("m1", exclude_usernames=[], skip=1, limit=1)
+        assert total == 3
+        assert [e["username"] for e in entries] == ["f1"]
+
+    @pytest.mark.asyncio
+    async def test_page_without_snapshot_returns_none(self, service):
+        assert await service.page("nobody", exclude_usernames=[]) is None
+
+    @pytest.mark.asyncio
+    async def test_page_requires_live_matches(self, service):
+        """A snapshot missing a user the live query matches (e.g. just approved) is incomplete"""
+        entries, total = await service.page("m1", exclude_usernames=[], require_usernames=["f1", "f2"])
+        assert total == 3
+        assert await service.page("m1", exclude_usernames=[], require_usernames=["f1", "f9"]) is None
+
+    @pytest.mark.asyncio
+    async def test_set_candidate_photo_resorts_page(self, service):
+        await service.set_candidate_photo("f3", 0)
+        await service.set_candidate_photo("f2", 1)
+        entries, total = await service.page("m1", exclude_usernames=[])
+        assert [e["username"] for e in entries] == ["f2", "f1", "f3"]
+
+        entries, total = await service.page("m1", exclude_usernames=[], has_photo=True)
+        assert total == 2
+
+    @pytest.mark.asyncio
+    async def test_upsert_and_remove_candidate(self, test_db, service):
+        ops = service.upsert_candidate_ops("m1", _candidate("f2", 2, 1995), _result(10, "Low"))
+        ops += service.upsert_candidate_ops("m1", _candidate("f4", 5, 1993), _result(60))
+        await service.write(ops)
+
+        snapshot = await test_db.l3v3l_search_snapshots.find_one({"_id": "m1"})
+        by_username = {c["username"]: c for c in snapshot["candidates"]}
+        assert by_username["f2"]["matchScore"] == 10
+        assert by_username["f2"]["level"] == "Low"
+        assert by_username["f4"]["matchScore"] == 60
+        assert len(snapshot["candidates"]) == 4
+
+        await service.remove_viewer("f1")
+        snapshot = await test_db.l3v3l_search_snapshots.find_one({"_id": "m1"})
+        assert "f1" not in [c["username"] for c in snapshot["candidates"]]
@@ -0,0 +1,130 @@
+"""
+Tests for the process-wide settings cache (services/settings_cache.py).
+"""
+import asyncio
+import json
+
+import pytest
+
+import services.settings_cache as settings_cache_module
+from routes import _get_profile_picture_always_visible, get_role_config, update_system_settings
+from services.settings_cache import INVALIDATION_CHANNEL, SettingsCache, settings_cache
+
+
+class FakePubSub:
+    """Delivers whatever is put on the shared queue, like a subscribed connection"""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.channels = []
+
+    async def subscribe(self, channel):
+        self.channels.append(channel)
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self):
+        pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.queue = asyncio.Queue()
+
+    def pubsub(self, ignore_subscribe_messages=True):
+        return FakePubSub(self.queue)
+
+    def announce(self, name, version):
+        self.queue.put_nowait({"type": "message", "channel": INVALIDATION_CHANNEL,
+                               "data": json.dumps({"name": name, "version": version})})
+
+
+@pytest.fixture(autouse=True)
+def reset_global_cache():
+    settings_cache.clear()
+    yield
+    settings_cache.clear()
+
+
+class TestSettingsCache:
+
+    @pytest.mark.asyncio
+    async def test_documents_load_once(self, test_db):
+        await test_db.system_settings.insert_one({"_id": "global", "profile_picture_always_visible": False})
+        cache = SettingsCache()
+
+        for _ in range(5):
+            assert await cache.get_value(test_db, "system_settings", "profile_picture_always_visible") is False
+        assert await cache.get_document(test_db, "role_config") is None
+        assert await cache.get_document(test_db, "role_config") is None
+        assert cache.get_stats()["loads"] == 2
+
+    @pytest.mark.asyncio
+    async def test_get_returns_private_copy(self, test_db):
+        await test_db.site_settings.insert_one({"_id": "site_settings", "membership": {"plans": [{"id": "basic"}]}})
+        cache = SettingsCache()
+
+        copy = await cache.get(test_db, "site_settings")
+        copy["membership"]["plans"].append({"id": "edited"})
+        assert len((await cache.get_document(test_db, "site_settings"))["membership"]["plans"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_bumps_version_and_reloads(self, test_db):
+        cache = SettingsCache()
+        assert await cache.get_document(test_db, "system_settings") is None
+
+        await test_db.system_settings.insert_one({"_id": "global", "ticket_delete_days": 7})
+        assert await cache.invalidate(test_db, "system_settings") == 1
+        assert await cache.get_value(test_db, "system_settings", "ticket_delete_days") == 7
+        assert await cache.invalidate(test_db, "system_settings") == 2
+
+    @pytest.mark.asyncio
+    async def test_announced_versions_drop_only_older_entries(self, test_db):
+        cache = SettingsCache()
+        await cache.get_document(test_db, "role_config")
+
+        cache._on_message(json.dumps({"name": "role_config", "version": 0}))
+        assert "role_config" in cache.get_stats()["cached"]
+        cache._on_message("not json")
+        cache._on_message(json.dumps({"name": "role_config", "version": 1}))
+        assert "role_config" not in cache.get_stats()["cached"]
+
+    @pytest.mark.asyncio
+    async def test_other_instance_save_seen_via_pubsub(self, test_db):
+        redis = FakeRedis()
+        reader, writer = SettingsCache(), SettingsCache()
+        await reader.start(test_db, redis)
+        await asyncio.sleep(0)
+        assert await reader.get_document(test_db, "system_settings") is None
+
+        await test_db.system_settings.insert_one({"_id": "global", "profile_picture_always_visible": False})
+        version = await writer.invalidate(test_db, "system_settings")
+        redis.announce("system_settings", version)
+        await asyncio.sleep(0.01)
+
+        assert await reader.get_value(test_db, "system_settings", "profile_picture_always_visible") is False
+        await reader.stop()
+
+    @pytest.mark.asyncio
+    async def test_fallback_version_check_without_listener(self, test_db, monkeypatch):
+        monkeypatch.setattr(settings_cache_module, "FALLBACK_CHECK_SECONDS", 0)
+        reader, writer = SettingsCache(), SettingsCache()
+        assert await reader.get_document(test_db, "system_settings") is None
+
+        await test_db.system_settings.insert_one({"_id": "global", "ticket_delete_days": 3})
+        await writer.invalidate(test_db, "system_settings")
+        assert await reader.get_value(test_db, "system_settings", "ticket_delete_days") == 3
+
+    @pytest.mark.asyncio
+    async def test_endpoints_read_through_cache(self, test_db):
+        assert await _get_profile_picture_always_visible(test_db) is True
+        await update_system_settings({"profile_picture_always_visible": False}, db=test_db)
+        assert await _get_profile_picture_always_visible(test_db) is False
+
+        await test_db.role_config.insert_one({"_id": "default", "limits": {"admin": {}}})
+        await settings_cache.invalidate(test_db, "role_config")
+        assert await get_role_config(db=test_db) == {"limits": {"admin": {}}}
+        # The response is a copy; the cached document keeps its _id
+        assert (await settings_cache.get_document(test_db, "role_config"))["_id"] == "default"
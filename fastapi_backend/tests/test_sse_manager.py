@@ -0,0 +1,60 @@
+"""
+Tests for the SSE fan-out multiplexer (sse_manager.py).
+
+Redis is not used here: without a connection, published messages are fanned
+out to this process's streams through the same path the shared listener uses.
+"""
+import json
+
+import pytest
+
+import sse_manager as sse
+
+
+@pytest.fixture
+def manager():
+    return sse.SSEManager()
+
+
+class TestFanOut:
+    """One payload reaches every open stream of the user"""
+
+    @pytest.mark.asyncio
+    async def test_publish_reaches_all_streams_of_user(self, manager):
+        alice_tabs = [manager.subscribe_to_user_channel("alice") for _ in range(2)]
+        bob = manager.subscribe_to_user_channel("bob")
+        for stream in alice_tabs + [bob]:
+            assert (await stream.__anext__())["event"] == "connected"
+
+        assert await manager.broadcast_new_message("bob", "alice", "hi", "m1")
+
+        for stream in alice_tabs:
+            event = await stream.__anext__()
+            assert event["event"] == "new_message"
+            assert json.loads(event["data"])["message_id"] == "m1"
+
+        metrics = manager.get_metrics()
+        assert metrics["connections"] == 3
+        assert metrics["events_enqueued"] == 2
+        assert all(queue.empty() for queue in manager.active_connections["bob"])
+
+    def test_non_json_payload_is_forwarded_raw(self, manager):
+        assert manager._build_event("plain text") == {"event": "message", "data": "plain text"}
+
+
+class TestBackpressure:
+    """Slow consumers are dropped instead of blocking fan-out"""
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_consumer_and_ends_stream(self, manager, monkeypatch):
+        monkeypatch.setattr(sse, "QUEUE_MAX_SIZE", 2)
+        stream = manager.subscribe_to_user_channel("alice")
+        await stream.__anext__()
+
+        for i in range(3):
+            manager._fan_out("alice", json.dumps({"n": i}))
+
+        assert manager.get_metrics()["consumers_dropped"] == 1
+        with pytest.raises(StopAsyncIteration):
+            await stream.__anext__()
+        assert "alice" not in manager.active_connections
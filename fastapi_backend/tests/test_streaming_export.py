@@ -0,0 +1,172 @@
+"""
+Tests for streaming backup/data export (services/streaming_export.py) and the
+matching streaming import in restore_backup.py.
+"""
+import csv
+import gzip
+import io
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect
+
+from job_templates import backup_job
+from job_templates.base import JobExecutionContext
+from job_templates.data_export import DataExportTemplate
+from restore_backup import iter_backup_batches
+from services.streaming_export import GzipStreamWriter, export_collections, open_local_sink, write_csv
+
+
+class KeepOpenBuffer(io.BytesIO):
+    """In-memory sink that stays readable after the writer closes it"""
+
+    def close(self):
+        pass
+
+
+class FailingCursor:
+    """Cursor that drops its connection after `fail_after` documents"""
+
+    def __init__(self, cursor, fail_after):
+        self.cursor = cursor
+        self.fail_after = fail_after
+
+    def batch_size(self, size):
+        self.cursor = self.cursor.batch_size(size)
+        return self
+
+    async def __aiter__(self):
+        count = 0
+        async for doc in self.cursor:
+            if count == self.fail_after:
+                raise AutoReconnect("connection reset")
+            yield doc
+            count += 1
+
+
+class FailingCollectionDB:
+    def __init__(self, db, failing, fail_after=5):
+        self.db = db
+        self.failing = failing
+        self.fail_after = fail_after
+
+    def __getitem__(self, name):
+        collection = self.db[name]
+        if name != self.failing:
+            return collection
+        fail_after = self.fail_after
+
+        class Collection:
+            def find(self, *args, **kwargs):
+                return FailingCursor(collection.find(*args, **kwargs), fail_after)
+        return Collection()
+
+
+async def _seed(db):
+    await db.users.insert_many([
+        {"username": f"user{i}", "createdAt": datetime(2026, 1, 1, 12, i), "profile": {"city": "Austin"}}
+        for i in range(25)
+    ])
+    await db.messages.insert_many([{"from": "user1", "to": "user2", "n": i} for i in range(12)])
+    await db.empty_collection.insert_one({"only": True})
+    await db.empty_collection.delete_many({})
+
+
+class TestBackupArchive:
+
+    @pytest.mark.asyncio
+    async def test_round_trip_preserves_types_in_bounded_batches(self, test_db, tmp_path):
+        await _seed(test_db)
+        archive = tmp_path / "backup.ndjson.gz"
+        done = []
+
+        writer = GzipStreamWriter(open_local_sink(archive))
+        counts = await export_collections(
+            test_db, ["users", "messages", "empty_collection"], writer,
+            batch_size=7, concurrency=2, on_collection_done=lambda name, count, error: done.append((name, error))
+        )
+        await writer.close()
+
+        assert counts == {"users": 25, "messages": 12, "empty_collection": 0}
+        assert sorted(done) == [("empty_collection", None), ("messages", None), ("users", None)]
+        assert writer.bytes_written == archive.stat().st_size
+
+        with gzip.open(archive, "rt") as lines:
+            batches = list(iter_backup_batches(lines, batch_size=10))
+        assert all(len(docs) <= 10 for _, docs in batches)
+
+        users = [doc for name, docs in batches if name == "users" for doc in docs]
+        assert len(users) == 25
+        assert isinstance(users[0]["_id"], ObjectId)
+        assert isinstance(users[0]["createdAt"], datetime)
+        assert users[0]["profile"] == {"city": "Austin"}
+        assert sum(len(docs) for name, docs in batches if name == "messages") == 12
+
+    @pytest.mark.asyncio
+    async def test_backup_discards_archive_when_a_collection_fails(self, test_db, tmp_path, monkeypatch):
+        await _seed(test_db)
+        monkeypatch.setattr(backup_job, "BACKUP_DIR", tmp_path)
+        context = JobExecutionContext(job_id="job", job_name="backup",
+                                      db=FailingCollectionDB(test_db, "messages"), parameters={})
+
+        with pytest.raises(RuntimeError, match="messages"):
+            await backup_job.BackupJobTemplate()._backup_python(
+                context, "testdb", "20260101_000000", ["users", "messages"]
+            )
+        assert list(tmp_path.iterdir()) == []
+
+    def test_import_batches_interleaved_collections(self):
+        lines = [
+            '{"collection": "a", "document": {"n": 1}}',
+            '{"collection": "b", "document": {"n": 1}}',
+            '',
+            '{"collection": "a", "document": {"n": 2}}',
+            '{"collection": "a", "document": {"n": 3}}',
+        ]
+        assert list(iter_backup_batches(lines, batch_size=2)) == [
+            ("a", [{"n": 1}, {"n": 2}]),
+            ("a", [{"n": 3}]),
+            ("b", [{"n": 1}]),
+        ]
+
+
+class TestDataExport:
+
+    @pytest.mark.asyncio
+    async def test_csv_uses_projection_columns(self, test_db):
+        await _seed(test_db)
+        raw = KeepOpenBuffer()
+        writer = GzipStreamWriter(raw)
+
+        rows, dropped = await write_csv(test_db.users.find({}, {"username": 1, "_id": 0}).sort("username", 1),
+                                        writer, columns=["username"], batch_size=4)
+        await writer.close()
+
+        reader = list(csv.reader(io.StringIO(gzip.decompress(raw.getvalue()).decode())))
+        assert rows == 25 and dropped == 0
+        assert reader[0] == ["username"]
+        assert reader[1] == ["user0"] and len(reader) == 26
+
+    @pytest.mark.asyncio
+    async def test_job_streams_ndjson_and_csv_files(self, test_db, tmp_path, monkeypatch):
+        await _seed(test_db)
+        monkeypatch.chdir(tmp_path)
+        template = DataExportTemplate()
+
+        for format_type, name in (("json", "users.ndjson.gz"), ("csv", "users.csv.gz")):
+            context = JobExecutionContext(job_id="job", job_name="export", db=test_db, parameters={
+                "collection": "users", "format": format_type, "limit": 20, "filename": "users",
+                "projection": {"username": 1, "profile": 1},
+            })
+            result = await template.execute(context)
+            assert result.status == "success"
+            assert result.details["record_count"] == 20
+            assert result.details["export_path"] == f"exports/{name}"
+
+        with gzip.open(tmp_path / "exports" / "users.csv.gz", "rt") as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == ["_id", "username", "profile"]
+        assert rows[1][2] == '{"city": "Austin"}'
+        with gzip.open(tmp_path / "exports" / "users.ndjson.gz", "rt") as f:
+            assert sum(1 for _ in f) == 20
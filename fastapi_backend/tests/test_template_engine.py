@@ -0,0 +1,111 @@
+"""
+Tests for the compiled notification template engine (services/template_engine.py).
+"""
+import time
+
+import pytest
+
+from services.notification_service import NotificationService
+from services.template_engine import (
+    CompiledTemplateCache,
+    compile_template,
+    template_cache_key,
+)
+
+DIGEST_TEMPLATE = """<h1>Hi {{user.firstName}}, {stats.newMessages} new</h1>
+{% if stats.newMessages > 0 %}<ul>
+{% for msg in activity.new_messages %}<li>{msg.firstName}: {msg.preview} ({user_firstName})</li>
+{% endfor %}</ul>{% endif %}
+{% if activity.favorited_by %}Favorited by {% for user in activity.favorited_by[:2] %}{user.firstName} {% endfor %}{% endif %}
+<a href="{app_url}/dashboard">Open</a> <style>p { color: red; }</style>"""
+
+
+def _digest_data(i: int) -> dict:
+    return {
+        "user": {"firstName": f"User{i}"},
+        "stats": {"newMessages": 2},
+        "activity": {
+            "new_messages": [
+                {"firstName": "Ann", "preview": "hello"},
+                {"firstName": "Bob", "preview": "hi"},
+            ],
+            "favorited_by": [{"firstName": "Cat"}, {"firstName": "Dan"}, {"firstName": "Eve"}],
+        },
+        "app_url": "https://example.com",
+    }
+
+
+class TestTemplateSyntax:
+    """Placeholders, loops and conditionals render in one pass"""
+
+    def test_variables(self):
+        template = compile_template("{{match.firstName}} {match_lastName} {count} {missing} {empty} {match}")
+        rendered = template.render({"match": {"firstName": "Ann", "lastName": "Lee"}, "count": 3, "empty": None})
+        # Unknown placeholders and dict values are left as written
+        assert rendered == "Ann Lee 3 {missing}  {match}"
+
+    def test_loops_and_conditionals(self):
+        rendered = compile_template(DIGEST_TEMPLATE).render(_digest_data(1))
+        assert "<li>Ann: hello (User1)</li>" in rendered
+        assert "<li>Bob: hi (User1)</li>" in rendered
+        # Loop variables shadow the top-level `user` only inside the loop
+        assert "Favorited by Cat Dan \n" in rendered
+        assert "Hi User1, 2 new" in rendered
+        assert "p { color: red; }" in rendered
+
+    def test_comparisons_and_else(self):
+        template = compile_template(
+            "{% if n >= 5 %}big{% else %}small{% endif %}|{% if s == on %}on{% endif %}|{% if n > x %}bad{% endif %}"
+        )
+        assert template.render({"n": 7, "s": "on"}) == "big|on|"
+        assert template.render({"n": "2", "s": "off"}) == "small||"
+
+    def test_unbalanced_tags_are_left_as_text(self):
+        template = compile_template("a {% if x %}b {% endfor %}c")
+        assert template.render({"x": True}) == "a {% if x %}b {% endfor %}c"
+
+
+class TestCompiledTemplateCache:
+    """Compiled templates are reused per (trigger, version, field)"""
+
+    def test_key_hit_and_source_change(self):
+        cache = CompiledTemplateCache()
+        doc = {"trigger": "new_message", "updatedAt": "v1", "subject": "Hi {name}"}
+        key = template_cache_key(doc, "subject")
+
+        first = cache.get(doc["subject"], key)
+        assert cache.get(doc["subject"], key) is first
+        assert (cache.hits, cache.compiles) == (1, 1)
+
+        # Edited in place without a version bump: recompiled, not served stale
+        assert cache.get("Bye {name}", key).render({"name": "Ann"}) == "Bye Ann"
+
+        cache.invalidate("new_message")
+        cache.get("Bye {name}", key)
+        assert cache.compiles == 3
+
+    def test_service_render_template(self):
+        service = NotificationService(type("DB", (), {"__getattr__": lambda self, name: None})())
+        key = ("digest", "v1", "email.body")
+        assert service.render_template("{a} {b_c}", {"a": 1, "b": {"c": 2}}, cache_key=key) == "1 2"
+
+    @pytest.mark.slow
+    def test_benchmark_batch_of_digests(self):
+        """A batch of 1,000 digests renders from one compiled template"""
+        batch = [_digest_data(i) for i in range(1000)]
+        cache = CompiledTemplateCache()
+        key = ("daily_digest", "v1", "email.body")
+
+        start = time.perf_counter()
+        per_message = [compile_template(DIGEST_TEMPLATE).render(data) for data in batch]
+        uncached_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cached = [cache.get(DIGEST_TEMPLATE, key).render(data) for data in batch]
+        cached_seconds = time.perf_counter() - start
+
+        print(f"\nRendered {len(batch)} digests: compile per message {uncached_seconds:.3f}s, "
+              f"compiled once {cached_seconds:.3f}s")
+        assert cached == per_message
+        assert cache.compiles == 1
+        assert cached_seconds < uncached_seconds
@@ -20,6 +20,8 @@ Architecture:
 - Polls every 30 seconds for jobs ready to execute
 - Supports both sync and async job functions
 - Handles timeouts, retries, and error logging
+- Dynamic jobs are claimed under a lease (see job_worker.py); with
+  SCHEDULER_MODE=enqueue they are left to the `python -m job_worker` process
 
 See /docs/SINGLE_SCHEDULER_ARCHITECTURE.md for complete documentation.
 """
@@ -152,32 +154,28 @@ class UnifiedScheduler:
                 await asyncio.sleep(60)  # Wait longer on error
     
     async def check_dynamic_jobs(self):
-        """Check for and execute dynamic jobs from database"""
+        """
+        Run due dynamic jobs from the database
+        
+        Jobs are claimed under a lease, so with several API instances each due
+        run executes once. In "enqueue" mode this process runs nothing: the
+        `job_worker` process claims and executes the jobs instead.
+        """
         try:
-            from services.job_registry import JobRegistryService
-            from services.job_executor import JobExecutor
+            from config import settings
+            from job_worker import JobWorker
             
-            registry = JobRegistryService(self.db)
-            executor = JobExecutor(self.db)
+            if settings.scheduler_mode == "enqueue":
+                return
             
-            # Get jobs ready to run
-            jobs_to_run = await registry.get_jobs_ready_to_run()
-            
-            if jobs_to_run:
-                # Only log info if there are actually jobs to run, otherwise use debug
-                logger.debug(f"📋 Found {len(jobs_to_run)} dynamic job(s) ready to run")
-                
-                for job in jobs_to_run:
-                    try:
-                        # Execute job
-                        logger.info(f"▶️ Executing dynamic job: {job['name']}")
-                        await executor.execute_job(job, triggered_by="scheduler")
-                        
-                        # Update job's next run time
-                        await registry.update_job_after_execution(job["_id"], {})
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Error executing dynamic job {job['name']}: {e}", exc_info=True)
+            worker = JobWorker(
+                self.db,
+                concurrency=settings.job_worker_concurrency,
+                lease_seconds=settings.job_lease_seconds
+            )
+            ran = await worker.run_due_jobs()
+            if ran:
+                logger.debug(f"📋 Ran {ran} dynamic job(s)")
         
         except Exception as e:
             logger.error(f"❌ Error checking dynamic jobs: {e}", exc_info=True)
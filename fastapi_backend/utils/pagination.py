@@ -0,0 +1,146 @@
+"""
+Keyset (cursor) pagination helpers
+
+Opt-in alternative to $skip pagination for list endpoints. A cursor encodes
+the sort-key values of the last document on a page; the next page matches
+only documents strictly after that position, so deep pages cost the same as
+the first one instead of re-scanning and skipping everything before them.
+
+Sort specs are the same [(field, direction), ...] lists the endpoints already
+use, and must end with a unique field (_id / username) so positions are stable.
+
+Sort keys that are always present compare with plain range operators, so an
+index on the sort keys bounds each page's scan. Keys that may be missing, null
+or of mixed types (e.g. collections with mixed datetime/string createdAt
+values) are declared `nullable` and compare through $expr instead, which
+follows the same cross-type BSON order as $sort and treats missing fields as
+null exactly like they sort.
+
+Total counts for cursor pages are served from a short-TTL in-memory cache so
+paging does not re-count the whole result set on every request.
+"""
+
+import base64
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from bson import json_util
+
+SortSpec = Sequence[Tuple[str, int]]
+
+COUNT_CACHE_TTL_SECONDS = 60
+COUNT_CACHE_MAX_ENTRIES = 1000
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Opaque, URL-safe cursor for a list of sort-key values (datetimes/ObjectIds preserved)"""
+    raw = json_util.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: SortSpec) -> List[Any]:
+    """Decode a cursor produced by encode_cursor; raises ValueError if it doesn't fit `sort`"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise ValueError("Cursor does not match the requested sort")
+    return values
+
+
+def cursor_for(doc: Dict[str, Any], sort: SortSpec) -> str:
+    """Cursor pointing just after `doc`"""
+    return encode_cursor([doc.get(field) for field, _ in sort])
+
+
+def keyset_match(sort: SortSpec, values: List[Any], nullable: Sequence[str] = ()) -> Dict[str, Any]:
+    """
+    Filter selecting documents strictly after the cursor position in `sort` order
+
+    Usable both as a find() filter and as a $match stage. Fields in `nullable`,
+    and any field whose cursor value is null, compare through $expr; all others
+    use plain (index-bounded) range operators.
+    """
+    def ref(field: str) -> Dict[str, Any]:
+        return {"$ifNull": [f"${field}", None]}
+
+    def term(i: int, op: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """(plain condition, $expr condition) comparing sort key i to its cursor value"""
+        field, value = sort[i][0], values[i]
+        if field in nullable or value is None:
+            return None, {op: [ref(field), {"$literal": value}]}
+        return {field: value if op == "$eq" else {op: value}}, None
+
+    clauses = []
+    for i, (_, direction) in enumerate(sort):
+        terms = [term(j, "$eq") for j in range(i)] + [term(i, "$gt" if direction == 1 else "$lt")]
+        clause: Dict[str, Any] = {}
+        exprs = []
+        for plain, expr in terms:
+            if plain:
+                clause.update(plain)
+            else:
+                exprs.append(expr)
+        if exprs:
+            clause["$expr"] = exprs[0] if len(exprs) == 1 else {"$and": exprs}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def after_cursor(query: Dict[str, Any], sort: SortSpec, cursor: Optional[str],
+                 nullable: Sequence[str] = ()) -> Dict[str, Any]:
+    """`query` restricted to documents after `cursor` (unchanged when cursor is empty, i.e. the first page)"""
+    if not cursor:
+        return query
+    return {"$and": [query, keyset_match(sort, decode_cursor(cursor, sort), nullable)]}
+
+
+def split_page(docs: List[Dict[str, Any]], limit: int, sort: SortSpec) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Trim a `limit + 1` fetch to one page
+
+    Returns:
+        (page docs, nextCursor or None when this is the last page)
+    """
+    if len(docs) <= limit:
+        return docs, None
+    page = docs[:limit]
+    return page, cursor_for(page[-1], sort)
+
+
+class CountCache:
+    """Short-TTL cache of result-set totals keyed by query shape"""
+
+    def __init__(self, ttl_seconds: int = COUNT_CACHE_TTL_SECONDS, max_entries: int = COUNT_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[int, float]] = {}
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """Stable key for a query (dict key order doesn't matter)"""
+        payload = json.dumps(json.loads(json_util.dumps(parts)), sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str, count: Callable[[], Awaitable[int]]) -> int:
+        """Cached total for `key`, running `count()` only on a miss or after expiry"""
+        now = time.time()
+        cached = self._entries.get(key)
+        if cached and cached[1] > now:
+            return cached[0]
+
+        total = await count()
+        if len(self._entries) >= self.max_entries:
+            # Drop expired entries first, then the oldest ones
+            self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+            while len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (total, now + self.ttl_seconds)
+        return total
+
+
+count_cache = CountCache()
@@ -103,7 +103,7 @@ user_sessions = {}
 @sio.event
 async def connect(sid, environ):
     """Handle client connection"""
-    from redis_manager import get_redis_manager
+    from async_redis_manager import get_async_redis
     
     # Get username from query parameters (Socket.IO connection)
     query_string = environ.get('QUERY_STRING', '')
@@ -125,8 +125,8 @@ async def connect(sid, environ):
             logger.warning(f"⚠️ Failed to join room for user '{username}' (sid: {sid}): {e}")
         
         # Mark user as online in Redis
-        redis = get_redis_manager()
-        success = redis.set_user_online(username)
+        redis = get_async_redis()
+        success = await redis.set_user_online(username)
         
         logger.info(f"🟢 User '{username}' connected (sid: {sid})")
         logger.info(f"   Redis set_user_online result: {success}")
@@ -144,7 +144,7 @@ async def connect(sid, environ):
 @sio.event
 async def disconnect(sid):
     """Handle client disconnection"""
-    from redis_manager import get_redis_manager
+    from async_redis_manager import get_async_redis
     
     logger.info(f"🔌 Client disconnected: {sid}")
     
@@ -162,8 +162,8 @@ async def disconnect(sid):
         del user_sessions[sid]
         
         # Mark user as offline in Redis
-        redis = get_redis_manager()
-        success = redis.set_user_offline(username)
+        redis = get_async_redis()
+        success = await redis.set_user_offline(username)
         
         logger.info(f"⚪ User '{username}' went offline")
         logger.info(f"   Redis set_user_offline result: {success}")
@@ -176,7 +176,7 @@ async def disconnect(sid):
 @sio.event
 async def send_message(sid, data):
     """Send real-time message"""
-    from redis_manager import get_redis_manager
+    from async_redis_manager import get_async_redis
     
     from_username = data.get('from')
     to_username = data.get('to')
@@ -186,8 +186,8 @@ async def send_message(sid, data):
     logger.info(f"💬 Real-time message: {from_username} → {to_username}")
     
     # Store message in Redis
-    redis = get_redis_manager()
-    redis.send_message(from_username, to_username, message, message_id)
+    redis = get_async_redis()
+    await redis.send_message(from_username, to_username, message, message_id)
     
     # Send to recipient if online via WebSocket
     if to_username in online_users:
@@ -205,17 +205,17 @@ async def send_message(sid, data):
 @sio.event
 async def typing(sid, data):
     """Handle typing indicator"""
-    from redis_manager import get_redis_manager
+    from async_redis_manager import get_async_redis
     
     from_username = data.get('from')
     to_username = data.get('to')
     is_typing = data.get('isTyping', True)
     
-    redis = get_redis_manager()
+    redis = get_async_redis()
     if is_typing:
-        redis.set_typing(from_username, to_username)
+        await redis.set_typing(from_username, to_username)
     else:
-        redis.clear_typing(from_username, to_username)
+        await redis.clear_typing(from_username, to_username)
     
     # Send to recipient if online
     if to_username in online_users: